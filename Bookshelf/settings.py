@@ -223,14 +223,89 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Cerebras API (para procesamiento de noticias). El modelo de IA activo se
 # configura en la BD (my_news.AIModelSetting, editable desde el admin).
 CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
+# Cuota de Cerebras compartida entre procesos (cron, gunicorn): fichero JSON
+# bloqueado con portalocker. Vacío = cada proceso lleva la suya en memoria.
+CEREBRAS_QUOTA_LEDGER = os.getenv('CEREBRAS_QUOTA_LEDGER', str(BASE_DIR / 'my_news_cerebras_quota.json'))
 
 # Gemini Embeddings
 GEMINI_EMBEDDING_MODEL = os.getenv('GEMINI_EMBEDDING_MODEL', 'gemini-embedding-001')
 GEMINI_EMBEDDING_DIM = int(os.getenv('GEMINI_EMBEDDING_DIM', 768))
+# Textos por petición de embeddings (batchEmbedContents admite hasta 100).
+GEMINI_EMBEDDING_BATCH_SIZE = int(os.getenv('GEMINI_EMBEDDING_BATCH_SIZE', 100))
+# Caché de vectores por hash del texto (tabla my_news_embeddingcacheentry).
+NEWS_EMBEDDING_CACHE_ENABLED = os.getenv('NEWS_EMBEDDING_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+NEWS_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('NEWS_EMBEDDING_CACHE_MAX_ENTRIES', 5000))
 
 # Qdrant (vector DB)
 QDRANT_URL = os.getenv('QDRANT_URL', 'http://localhost:6333')
 QDRANT_COLLECTION = os.getenv('QDRANT_COLLECTION', 'news_embeddings_gemini001_d768_v1')
+# gRPC (puerto 6334 de Qdrant) para los lotes grandes; REST por defecto.
+QDRANT_PREFER_GRPC = os.getenv('QDRANT_PREFER_GRPC', 'false').lower() in ('true', '1', 'yes')
+QDRANT_GRPC_PORT = int(os.getenv('QDRANT_GRPC_PORT', '6334'))
+# Los vectores se mandan al índice en lotes de este tamaño, o cuando el más
+# antiguo lleva estos segundos esperando.
+NEWS_VECTOR_UPSERT_BATCH = int(os.getenv('NEWS_VECTOR_UPSERT_BATCH', '64'))
+NEWS_VECTOR_UPSERT_MAX_AGE = int(os.getenv('NEWS_VECTOR_UPSERT_MAX_AGE', '5'))
+# Horas de cada tramo de published_ts que la purga concilia entre el índice
+# vectorial y la BD (solo recorre los tramos cuyos conteos no cuadran).
+NEWS_VECTOR_RECONCILE_BUCKET_HOURS = int(os.getenv('NEWS_VECTOR_RECONCILE_BUCKET_HOURS', '24'))
+# Backend del índice vectorial: 'qdrant' o 'local' (matriz float32 mapeada en
+# memoria en NEWS_VECTOR_INDEX_DIR, sin servicio aparte).
+NEWS_VECTOR_BACKEND = os.getenv('NEWS_VECTOR_BACKEND', 'qdrant').lower()
+NEWS_VECTOR_INDEX_DIR = os.getenv('NEWS_VECTOR_INDEX_DIR', str(BASE_DIR / 'my_news_vectors'))
+
+# Ingesta de noticias: descargas simultáneas de feeds (en total y por dominio).
+NEWS_FEED_MAX_CONCURRENCY = int(os.getenv('NEWS_FEED_MAX_CONCURRENCY', 8))
+NEWS_FEED_MAX_PER_HOST = int(os.getenv('NEWS_FEED_MAX_PER_HOST', 2))
+# El parser de feeds deja de leer tras estas entradas seguidas más viejas que
+# el corte de la fuente (0 lee el feed entero).
+NEWS_FEED_STOP_AFTER_OLD = int(os.getenv('NEWS_FEED_STOP_AFTER_OLD', 5))
+# Máximo de entradas que la ingesta vectoriza en una sola llamada a Gemini.
+NEWS_INGEST_WINDOW = int(os.getenv('NEWS_INGEST_WINDOW', 20))
+# Pipeline de ingesta: hilos que preparan entradas (descarga de artículos) y
+# tamaño de las colas entre etapas.
+NEWS_PIPELINE_FETCH_WORKERS = int(os.getenv('NEWS_PIPELINE_FETCH_WORKERS', 4))
+NEWS_PIPELINE_QUEUE_SIZE = int(os.getenv('NEWS_PIPELINE_QUEUE_SIZE', 20))
+# Resúmenes de Cerebras en vuelo a la vez (el rate limiter acota el resto).
+NEWS_SUMMARY_WORKERS = int(os.getenv('NEWS_SUMMARY_WORKERS', 4))
+# Noticias por petición de resumen como máximo (1: una por petición). Con más,
+# el tamaño de cada lote se ajusta a los tokens libres del minuto.
+NEWS_SUMMARY_BATCH_SIZE = int(os.getenv('NEWS_SUMMARY_BATCH_SIZE', 1))
+# Cómo se acota el texto de cada noticia en el prompt: 'truncate' corta en
+# el límite de caracteres; 'extractive' se queda antes con las frases más
+# relevantes hasta NEWS_PROMPT_TOKEN_BUDGET tokens.
+NEWS_PROMPT_COMPRESSION = os.getenv('NEWS_PROMPT_COMPRESSION', 'truncate')
+NEWS_PROMPT_TOKEN_BUDGET = int(os.getenv('NEWS_PROMPT_TOKEN_BUDGET', 1500))
+# Sin cuota de IA, las noticias que quedan se publican con un resumen
+# extractivo local (sin marcar como procesadas por IA) en lugar de esperar a
+# la próxima pasada; retry_summarize_pending las resume después.
+NEWS_LOCAL_SUMMARY_ENABLED = os.getenv('NEWS_LOCAL_SUMMARY_ENABLED', 'true').lower() in ('true', '1', 'yes')
+NEWS_LOCAL_SUMMARY_SENTENCES = int(os.getenv('NEWS_LOCAL_SUMMARY_SENTENCES', 3))
+# Caché de resúmenes por hash del contenido, modelo e instrucciones de filtro
+# (tabla my_news_summarycacheentry). TTL en segundos; 0 la desactiva.
+NEWS_SUMMARY_CACHE_ENABLED = os.getenv('NEWS_SUMMARY_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+NEWS_SUMMARY_CACHE_TTL = int(os.getenv('NEWS_SUMMARY_CACHE_TTL', 3 * 24 * 3600))
+NEWS_SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('NEWS_SUMMARY_CACHE_MAX_ENTRIES', 2000))
+# Con presupuesto de IA por pasada, las candidatas lo gastan por una mezcla de
+# interés (posición de InterestModel.score en la pasada) y antigüedad; las que
+# llevan NEWS_AI_PRIORITY_MAX_WAIT_HOURS publicadas van siempre primero y el
+# cron las reintenta todas aunque pasen de su límite.
+NEWS_AI_PRIORITY_ENABLED = os.getenv('NEWS_AI_PRIORITY_ENABLED', 'true').lower() in ('true', '1', 'yes')
+NEWS_AI_PRIORITY_INTEREST_WEIGHT = float(os.getenv('NEWS_AI_PRIORITY_INTEREST_WEIGHT', 1.0))
+NEWS_AI_PRIORITY_AGE_WEIGHT = float(os.getenv('NEWS_AI_PRIORITY_AGE_WEIGHT', 0.5))
+NEWS_AI_PRIORITY_MAX_WAIT_HOURS = float(os.getenv('NEWS_AI_PRIORITY_MAX_WAIT_HOURS', 24))
+# Caché en disco de los artículos completos descargados (texto e imagen por
+# URL). TTL en segundos; 0 la desactiva.
+NEWS_ARTICLE_CACHE_DIR = os.getenv('NEWS_ARTICLE_CACHE_DIR', str(BASE_DIR / 'my_news_article_cache'))
+NEWS_ARTICLE_CACHE_TTL = int(os.getenv('NEWS_ARTICLE_CACHE_TTL', 2 * 24 * 3600))
+NEWS_ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv('NEWS_ARTICLE_CACHE_MAX_ENTRIES', 2000))
+# Escritura de la ingesta por lotes: filas por transacción y segundos máximos
+# que una fila espera en memoria antes de guardarse.
+NEWS_WRITE_BATCH_SIZE = int(os.getenv('NEWS_WRITE_BATCH_SIZE', 50))
+NEWS_WRITE_MAX_AGE = int(os.getenv('NEWS_WRITE_MAX_AGE', 10))
+# Espera antes de reintentar el vector o el resumen de una noticia que
+# falló; se duplica en cada fallo (tope de un día).
+NEWS_RETRY_BACKOFF_MINUTES = int(os.getenv('NEWS_RETRY_BACKOFF_MINUTES', 30))
 
 # Simkl (historial de películas/series; reemplazó a Trakt en agosto 2026).
 # Crear app en https://simkl.com/settings/developer/ y obtener el token con
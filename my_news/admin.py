@@ -108,7 +108,7 @@ class NewsFeedbackAdmin(admin.ModelAdmin):
 
 @admin.register(AIModelSetting)
 class AIModelSettingAdmin(admin.ModelAdmin):
-    list_display = ('model_name', 'updated_at')
+    list_display = ('model_name', 'fallback_models', 'updated_at')
 
     def has_add_permission(self, request):
         return not AIModelSetting.objects.exists()
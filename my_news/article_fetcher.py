@@ -0,0 +1,228 @@
+"""Descarga del artículo completo con sesiones persistentes y caché en disco.
+
+Para las fuentes con ``deep_search`` (o con feeds de una línea) la ingesta
+descarga la página de cada noticia. Antes era un ``requests.get`` suelto por
+artículo: conexión TLS nueva cada vez y, si la pasada se cortaba por el
+presupuesto de IA, la siguiente volvía a descargar los mismos artículos.
+
+Aquí:
+
+* Cada host tiene su ``requests.Session`` con un pool keep-alive, compartida
+  por los hilos de la etapa de preparación del pipeline. Un semáforo por host
+  limita las descargas simultáneas contra un mismo servidor.
+* El texto y la imagen extraídos se guardan en una caché en disco
+  (``FileBasedCache`` de Django) por URL, con TTL y tope de entradas. Solo se
+  cachean las extracciones con texto: un fallo se reintenta en la próxima.
+"""
+
+import hashlib
+import logging
+import threading
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from requests.adapters import HTTPAdapter
+
+from .downloads import DEFAULT_MAX_PER_HOST, host_of
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+DEFAULT_TIMEOUT = 10
+DEFAULT_CACHE_TTL = 2 * 24 * 3600
+DEFAULT_CACHE_MAX_ENTRIES = 2000
+# Subirlo al cambiar extract_article invalida lo cacheado con la versión vieja.
+EXTRACTOR_VERSION = 1
+
+
+def extract_article(url, content_text):
+    """Texto principal y primera imagen relevante de una página de noticia."""
+    soup = BeautifulSoup(content_text, 'html.parser')
+
+    # Eliminar elementos no deseados (boilerplate que contamina el texto).
+    # OJO: no eliminar <noscript>: en sitios renderizados por JS (p.ej.
+    # foros Flarum como WOW Chakra) el cuerpo del artículo vive ahí.
+    for element in soup.find_all([
+        'script', 'style', 'nav', 'header', 'footer', 'iframe',
+        'aside', 'form', 'button',
+    ]):
+        element.decompose()
+
+    # Buscar el contenido principal con diferentes selectores
+    content = (
+        soup.find('div', {'itemprop': 'articleBody'}) or
+        soup.find('article') or
+        soup.find(class_=['content', 'article-content', 'post-content', 'entry-content'])
+    )
+
+    # Inicializar variables para el retorno
+    text_content = None
+    image_url = None
+
+    if content:
+        # Buscar la primera imagen relevante
+        img_tag = content.find('img')
+        if img_tag and img_tag.get('src'):
+            image_url = urljoin(url, img_tag['src'])
+
+        # Si no encontramos imagen en el contenido principal, buscar en todo el artículo
+        if not image_url:
+            img_tag = soup.find('img', {'class': ['featured-image', 'wp-post-image', 'article-image']})
+            if img_tag and img_tag.get('src'):
+                image_url = urljoin(url, img_tag['src'])
+
+        # Preferir solo los párrafos: evita pies de foto, bloques de
+        # "relacionados", banners de cookies/suscripción, etc.
+        paragraphs = [p.get_text(' ', strip=True) for p in content.find_all('p')]
+        paragraph_text = ' '.join(part for part in paragraphs if part)
+        if len(paragraph_text) >= 300:
+            text_content = paragraph_text
+        else:
+            text_content = content.get_text(separator=' ', strip=True)
+
+    return {
+        'text': text_content,
+        'image_url': image_url
+    }
+
+
+class ArticleFetcher:
+    """Descarga y extrae artículos; seguro para usar desde varios hilos."""
+
+    def __init__(self, cache=None, max_per_host=DEFAULT_MAX_PER_HOST, timeout=DEFAULT_TIMEOUT,
+                 cache_factory=None):
+        # ``cache_factory`` retrasa la creación de la caché (y de su directorio)
+        # hasta la primera descarga.
+        self._cache = cache
+        self._cache_factory = cache_factory
+        self.max_per_host = max(1, int(max_per_host))
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._slots = {}
+        self.stats = {'cache_hits': 0, 'downloads': 0, 'failures': 0}
+
+    @classmethod
+    def from_settings(cls):
+        ttl = int(getattr(settings, 'NEWS_ARTICLE_CACHE_TTL', DEFAULT_CACHE_TTL))
+        location = getattr(
+            settings, 'NEWS_ARTICLE_CACHE_DIR', settings.BASE_DIR / 'my_news_article_cache'
+        )
+        max_entries = int(getattr(
+            settings, 'NEWS_ARTICLE_CACHE_MAX_ENTRIES', DEFAULT_CACHE_MAX_ENTRIES
+        ))
+
+        def cache_factory():
+            return FileBasedCache(str(location), {
+                'TIMEOUT': ttl,
+                'OPTIONS': {'MAX_ENTRIES': max_entries},
+            })
+
+        return cls(
+            max_per_host=getattr(settings, 'NEWS_FEED_MAX_PER_HOST', DEFAULT_MAX_PER_HOST),
+            cache_factory=cache_factory if ttl > 0 and location else None,
+        )
+
+    @property
+    def cache(self):
+        with self._lock:
+            if self._cache is None and self._cache_factory is not None:
+                self._cache = self._cache_factory()
+                self._cache_factory = None
+            return self._cache
+
+    @staticmethod
+    def cache_key(url):
+        digest = hashlib.sha256((url or '').encode('utf-8')).hexdigest()
+        return f'article:v{EXTRACTOR_VERSION}:{digest}'
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def summary_since(self, snapshot):
+        current = self.snapshot()
+        delta = {name: current[name] - snapshot.get(name, 0) for name in current}
+        return (
+            f"{delta['cache_hits']} de caché, {delta['downloads']} descargados, "
+            f"{delta['failures']} fallos"
+        )
+
+    def _session_and_slot(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers['User-Agent'] = USER_AGENT
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_per_host)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+                self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return session, self._slots[host]
+
+    def _cache_get(self, key):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(key)
+        except Exception:
+            logger.exception("Error leyendo la caché de artículos; se ignora")
+            return None
+
+    def _cache_set(self, key, value):
+        if self.cache is None:
+            return
+        try:
+            self.cache.set(key, value)
+        except Exception:
+            logger.exception("Error guardando en la caché de artículos; se ignora")
+
+    def fetch(self, url):
+        """``{'text', 'image_url'}`` del artículo; ambos None si no se pudo."""
+        key = self.cache_key(url)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count('cache_hits')
+            return dict(cached)
+
+        session, slot = self._session_and_slot(host_of(url))
+        try:
+            with slot:
+                response = session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+
+                # Intentar decodificar explícitamente como UTF-8
+                try:
+                    content_text = response.content.decode('utf-8')
+                except UnicodeDecodeError:
+                    # Si UTF-8 falla, intentar con la codificación detectada por requests
+                    content_text = response.text
+
+            article = extract_article(url, content_text)
+        except Exception:
+            self._count('failures')
+            logger.exception("Error obteniendo contenido completo")
+            return {'text': None, 'image_url': None}
+
+        self._count('downloads')
+        if article['text']:
+            self._cache_set(key, article)
+        return article
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            self._slots = {}
+        for session in sessions.values():
+            session.close()
@@ -0,0 +1,168 @@
+"""El contenido de una entrada, limpiado una sola vez.
+
+La ingesta pedía el mismo texto plano varias veces por noticia: para el filtro
+por palabras y los embeddings, otra vez tras descargar el artículo y otra más
+dentro de ``process_content_with_cerebras`` para el prompt. Cada vez era un
+``BeautifulSoup`` nuevo sobre el mismo HTML, y después los embeddings volvían
+a quitar etiquetas con regex. ``ContentDocument`` guarda el HTML de la entrada
+y calcula cada derivado la primera vez que se pide:
+
+* ``plain_text``: el texto limpio sin truncar (lo que devolvía
+  ``prepare_content_for_cerebras`` con ``content_limit=None``).
+* ``prompt_text(limit)``: ese texto recortado para el prompt, por límite (y,
+  si se pide, comprimido antes con ``extractive.compress``).
+* ``embedding_text``: lo que se vectoriza (título y texto plano, acotado).
+* ``first_image``: la primera ``<img src="...">`` del HTML.
+
+La mayoría de descripciones de los feeds son unos pocos ``<p>``, ``<a>`` o
+``<img>``. Para esas se quitan las etiquetas con una regex, que da el mismo
+texto que ``BeautifulSoup(..., 'html.parser').get_text(' ', strip=True)``
+tras normalizar espacios. Si hay algo que la regex no puede asegurar
+(comentarios, CDATA, ``<script>``/``<style>`` o cualquiera de las etiquetas
+que se descartan, etiquetas sin cerrar, entidades desconocidas) se usa
+BeautifulSoup como antes.
+"""
+
+import html
+import re
+from html.entities import html5 as HTML5_ENTITIES
+from functools import cached_property
+
+from bs4 import BeautifulSoup
+
+from .extractive import compress
+
+# Etiquetas cuyo contenido no es parte de la noticia.
+SKIPPED_TAGS = ('script', 'style', 'nav', 'header', 'footer', 'iframe', 'noscript')
+EMBEDDING_TEXT_LIMIT = 8000
+
+_TAG = re.compile(r'''<(/?)([a-zA-Z][^\s/<>]*)(?:[^<>"']|"[^"]*"|'[^']*')*>''')
+# Lo que html.parser trataría como marcado y no como texto.
+_MARKUP_START = re.compile(r'<[a-zA-Z/!?]')
+# Referencias que html.parser y html.unescape decodifican igual; con cualquier
+# otro ``&`` delante de letra o ``#`` se deja a BeautifulSoup.
+_ENTITY = re.compile(r'&(?:#([0-9]{1,7}|[xX][0-9a-fA-F]{1,6});|([a-zA-Z][a-zA-Z0-9]*;)|[a-zA-Z#])')
+_SPACES = re.compile(r'\s+')
+_IMAGE = re.compile(r'<img[^>]+src="([^">]+)"')
+_TIMESTAMP_PREFIX = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z\s+')
+_SOCIAL_NOISE = re.compile(r'\bLinkedin\s+twitter\s+instagram\b', re.IGNORECASE)
+_POSTS_NOISE = re.compile(r'\b\d+\s+publicaciones\s+de\s+', re.IGNORECASE)
+_EMBEDDING_TAGS = re.compile(r'<.*?>')
+
+
+class _NeedsParser(Exception):
+    pass
+
+
+def _strip_tag(match):
+    if match.group(2).lower() in SKIPPED_TAGS:
+        raise _NeedsParser
+    return ' '
+
+
+def _plain_entities(text):
+    for match in _ENTITY.finditer(text):
+        number, name = match.groups()
+        if number:
+            codepoint = int(number[1:], 16) if number[0] in 'xX' else int(number)
+            if not 0 < codepoint < 0xD800 and not 0xDFFF < codepoint < 0x110000:
+                return False
+        elif name not in HTML5_ENTITIES:
+            return False
+    return True
+
+
+def html_to_text(raw_content, fast=True):
+    """Texto de un fragmento HTML; con ``fast`` prueba antes la regex."""
+    if '<' not in raw_content or '>' not in raw_content:
+        return raw_content
+    if fast:
+        try:
+            text = _TAG.sub(_strip_tag, raw_content)
+        except _NeedsParser:
+            text = None
+        if text is not None and not _MARKUP_START.search(text) and _plain_entities(text):
+            # html.parser decodifica las entidades del texto.
+            return html.unescape(text)
+    soup = BeautifulSoup(raw_content, 'html.parser')
+    for element in soup.find_all(list(SKIPPED_TAGS)):
+        element.decompose()
+    return soup.get_text(' ', strip=True)
+
+
+def first_image(raw_html):
+    """URL de la primera ``<img src="...">`` del HTML, o None."""
+    match = _IMAGE.search(raw_html or '')
+    return match.group(1) if match else None
+
+
+def clean_embedding_text(text):
+    """Texto plano y acotado que se manda a vectorizar."""
+    clean_text = _EMBEDDING_TAGS.sub(' ', text or '')  # Eliminar etiquetas HTML
+    clean_text = _SPACES.sub(' ', clean_text).strip()  # Normalizar espacios
+    # Asegurar que el texto no sea demasiado largo
+    return clean_text[:EMBEDDING_TEXT_LIMIT]
+
+
+def truncate_for_prompt(clean_text, content_limit):
+    if not content_limit or len(clean_text) <= content_limit:
+        return clean_text
+    truncated = clean_text[:content_limit]
+    # Cortar en el final de la última frase completa para no partir
+    # a mitad de oración justo el dato que el resumen necesita.
+    sentence_end = max(
+        truncated.rfind('. '),
+        truncated.rfind('! '),
+        truncated.rfind('? '),
+    )
+    if sentence_end > content_limit * 0.6:
+        truncated = truncated[:sentence_end + 1]
+    return truncated.strip()
+
+
+class ContentDocument:
+    def __init__(self, title, raw_html, fast=True):
+        self.title = title or ''
+        self.raw_html = raw_html or ''
+        self.fast = fast
+        self._prompt_texts = {}
+
+    @cached_property
+    def plain_text(self):
+        raw_content = html.unescape(self.raw_html)
+        if not raw_content:
+            return ''
+
+        clean_text = html.unescape(html_to_text(raw_content, fast=self.fast))
+        clean_text = _SPACES.sub(' ', clean_text).strip()
+
+        safe_title = _SPACES.sub(' ', self.title).strip()
+        if safe_title and clean_text.lower().startswith(safe_title.lower()):
+            clean_text = clean_text[len(safe_title):].lstrip(' :-|')
+
+        clean_text = _TIMESTAMP_PREFIX.sub('', clean_text)
+        clean_text = _SOCIAL_NOISE.sub(' ', clean_text)
+        clean_text = _POSTS_NOISE.sub(' ', clean_text)
+        return _SPACES.sub(' ', clean_text).strip()
+
+    def prompt_text(self, content_limit, token_budget=None):
+        """``plain_text`` recortado a ``content_limit`` (None: sin recortar).
+
+        Con ``token_budget`` antes se queda con las frases más relevantes que
+        caben en ese presupuesto (ver ``extractive.py``).
+        """
+        key = (content_limit, token_budget)
+        if key not in self._prompt_texts:
+            text = self.plain_text
+            if token_budget:
+                text = compress(self.title, text, token_budget)
+            self._prompt_texts[key] = truncate_for_prompt(text, content_limit)
+        return self._prompt_texts[key]
+
+    @cached_property
+    def embedding_text(self):
+        return clean_embedding_text(f"{self.title} {self.plain_text}")
+
+    @cached_property
+    def first_image(self):
+        return first_image(self.raw_html)
@@ -0,0 +1,164 @@
+"""Deduplicación en memoria de las noticias aceptadas durante una pasada.
+
+Cuando Qdrant no está, ``check_redundancy`` comparaba cada candidata con la
+lista de aceptadas llamando a ``cosine_similarity`` por pareja: dos arrays
+nuevos y dos normas por comparación. En una pasada de recuperación tras horas
+caído (cientos de entradas) ese bucle crece con el cuadrado.
+
+``RedundancyMatrix`` guarda las aceptadas ya normalizadas en una matriz
+float32 reservada por bloques: cada candidata cuesta un producto
+matriz-vector. ``deduplicate`` resuelve un lote entero con un par de
+productos de matrices y aplica después la misma regla que el bucle en serie
+(cada una se compara solo con las aceptadas antes que ella).
+"""
+
+import numpy as np
+
+DEFAULT_CHUNK_ROWS = 256
+
+
+def normalize(embedding):
+    """Vector float32 de norma 1, o None si está vacío o es nulo."""
+    if embedding is None or len(embedding) == 0:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return None
+    return vector / norm
+
+
+class RedundancyMatrix:
+    """Embeddings aceptados (normalizados) y el objeto al que pertenece cada fila."""
+
+    def __init__(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.chunk_rows = max(1, int(chunk_rows))
+        self._rows = None
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    @property
+    def matrix(self):
+        """Vista de las filas ocupadas (n × dim)."""
+        if self._rows is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._rows[:len(self._items)]
+
+    def _reserve(self, extra, dim):
+        if self._rows is None:
+            capacity = max(self.chunk_rows, extra)
+            self._rows = np.empty((capacity, dim), dtype=np.float32)
+            return
+        if self._rows.shape[1] != dim:
+            raise ValueError(
+                f"Dimensión {dim} distinta de la de la matriz ({self._rows.shape[1]})"
+            )
+        needed = len(self._items) + extra
+        if needed <= self._rows.shape[0]:
+            return
+        # Crecer por bloques enteros: copiar la matriz solo de vez en cuando.
+        chunks = -(-needed // self.chunk_rows)
+        grown = np.empty((chunks * self.chunk_rows, dim), dtype=np.float32)
+        grown[:len(self._items)] = self.matrix
+        self._rows = grown
+
+    def add(self, item, embedding):
+        """Añade ``item``; devuelve False si el embedding no sirve."""
+        vector = normalize(embedding)
+        if vector is None:
+            return False
+        self._add_normalized(item, vector)
+        return True
+
+    def _add_normalized(self, item, vector):
+        self._reserve(1, vector.shape[0])
+        self._rows[len(self._items)] = vector
+        self._items.append(item)
+
+    def _dim_matches(self, vector):
+        return self._rows is None or self._rows.shape[1] == vector.shape[-1]
+
+    def best_match(self, embedding, exclude=None):
+        """``(item, similitud)`` de la fila más parecida; ``(None, 0.0)`` si no hay."""
+        vector = normalize(embedding)
+        if vector is None or not self._items or not self._dim_matches(vector):
+            return None, 0.0
+        scores = self.matrix @ vector
+        if exclude is not None:
+            for row, item in enumerate(self._items):
+                if item is exclude:
+                    scores[row] = -np.inf
+        row = int(np.argmax(scores))
+        score = float(scores[row])
+        if score <= 0.0:
+            return None, 0.0
+        return self._items[row], score
+
+    def deduplicate(self, items, embeddings, thresholds, admit=None):
+        """Decide un lote de candidatas de una vez, en orden.
+
+        Cada candidata se compara con las filas ya aceptadas y con las del
+        lote aceptadas antes que ella; es redundante si la mejor similitud
+        llega a su umbral. Las que no lo son se añaden a la matriz si
+        ``admit(indice)`` (opcional) lo permite; así el llamante puede cortar
+        por presupuesto sin que las rechazadas cuenten para las siguientes.
+
+        Devuelve, por candidata, ``(es_redundante, item_parecido, similitud)``.
+        """
+        results = [(False, None, 0.0)] * len(items)
+        vectors = [normalize(embedding) for embedding in embeddings]
+        positions = {}
+        for index, vector in enumerate(vectors):
+            if vector is not None and self._dim_matches(vector):
+                positions[index] = len(positions)
+
+        batch = None
+        if positions:
+            batch = np.stack([vectors[index] for index in positions])
+            # Un producto contra lo ya aceptado y otro del lote contra sí mismo.
+            against_existing = batch @ self.matrix.T if self._items else None
+            within = batch @ batch.T
+        accepted = []  # índices (en ``items``) de las aceptadas del lote con vector
+        accepted_mask = np.zeros(len(positions), dtype=bool)
+        index_at = list(positions)
+
+        for index in range(len(items)):
+            position = positions.get(index)
+            if position is None:
+                # Sin vector no se puede comparar: pasa, pero no sirve de referencia.
+                if admit is not None:
+                    admit(index)
+                continue
+
+            best_score, best_item = 0.0, None
+            if against_existing is not None:
+                row = int(np.argmax(against_existing[position]))
+                best_score = float(against_existing[position, row])
+                best_item = self._items[row]
+            if accepted:
+                scores = np.where(accepted_mask, within[position], -np.inf)
+                row = int(np.argmax(scores))
+                if float(scores[row]) > best_score:
+                    best_score = float(scores[row])
+                    best_item = items[index_at[row]]
+            if best_score <= 0.0:
+                best_score, best_item = 0.0, None
+
+            if best_item is not None and best_score >= thresholds[index]:
+                results[index] = (True, best_item, best_score)
+                continue
+            results[index] = (False, best_item, best_score)
+            if admit is None or admit(index):
+                accepted.append(index)
+                accepted_mask[position] = True
+
+        if accepted:
+            self._reserve(len(accepted), batch.shape[1])
+            for index in accepted:
+                self._add_normalized(items[index], batch[positions[index]])
+        return results
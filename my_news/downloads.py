@@ -0,0 +1,109 @@
+"""Descargas HTTP concurrentes con tope global y por host.
+
+La ingesta descargaba cada feed una detrás de otra con su propio timeout de
+15 s: la fase de recolección duraba la suma de todos los feeds y un host lento
+retrasaba el cron entero. Aquí las descargas se lanzan a la vez en un pool de
+hilos (la espera es de red, así que el GIL no estorba) con dos topes:
+
+* uno global, el tamaño del pool, para no abrir decenas de conexiones
+  simultáneas desde la Raspberry;
+* otro por host, porque varias fuentes comparten dominio (feeds por sección de
+  un mismo medio) y no conviene martillear un mismo servidor.
+
+Los resultados se devuelven en el mismo orden en que se pidieron, de modo que
+lo que venga después (parseo, orden por fecha) es idéntico a la versión
+secuencial. El módulo no sabe nada de feeds: recibe la función que descarga.
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_PER_HOST = 2
+
+
+def host_of(url):
+    """Host en minúsculas de una URL, o cadena vacía si no se puede leer."""
+    try:
+        return (urlsplit(url or "").hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+@dataclass
+class DownloadResult:
+    item: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class ConcurrentDownloader:
+    """Ejecuta ``fetch(item)`` en paralelo respetando los topes de conexiones.
+
+    ``fetch`` no debe tocar la base de datos: corre en hilos sin conexión
+    propia de Django.
+    """
+
+    def __init__(self, fetch, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST):
+        self.fetch = fetch
+        self.max_workers = max(1, int(max_workers or 1))
+        self.max_per_host = max(1, int(max_per_host or 1))
+
+    def _run(self, item):
+        started = time.monotonic()
+        try:
+            value = self.fetch(item)
+        except Exception as exc:
+            return DownloadResult(item, error=exc, elapsed=time.monotonic() - started)
+        return DownloadResult(item, value=value, elapsed=time.monotonic() - started)
+
+    def download_all(self, items, url_of):
+        """Descarga todos los ``items`` y devuelve sus resultados en el mismo orden.
+
+        El tope por host se aplica antes de mandar nada al pool: cada host
+        tiene su cola y solo ``max_per_host`` de sus descargas están en el pool
+        a la vez; cuando una termina entra la siguiente de ese host. Así los
+        hilos del pool nunca se quedan bloqueados esperando a un host ocupado
+        mientras las descargas de otros hosts esperan turno.
+        """
+        items = list(items)
+        if not items:
+            return []
+        workers = min(self.max_workers, len(items))
+        if workers == 1:
+            return [self._run(item) for item in items]
+
+        queues = {}
+        for index, item in enumerate(items):
+            queues.setdefault(host_of(url_of(item)), deque()).append(index)
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="news-dl") as pool:
+            running = {}
+
+            def submit_next(host):
+                index = queues[host].popleft()
+                running[pool.submit(self._run, items[index])] = (index, host)
+
+            for host, queue in queues.items():
+                for _ in range(min(self.max_per_host, len(queue))):
+                    submit_next(host)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, host = running.pop(future)
+                    results[index] = future.result()
+                    if queues[host]:
+                        submit_next(host)
+        return results
@@ -0,0 +1,216 @@
+"""Caché persistente de embeddings por hash de contenido.
+
+El mismo texto se vectorizaba una y otra vez: cuando una pasada se corta por
+el presupuesto de IA, la siguiente vuelve a vectorizar las mismas entradas, y
+``resolve_vector``, ``retry_missing_embeddings`` o ``check_all_redundancy``
+regeneran vectores que ya se habían pagado. Aquí se guardan en SQLite
+(``EmbeddingCacheEntry``) con el mismo empaquetado float32 que las etiquetas de
+interés, indexados por (hash del texto normalizado, modelo, dimensión).
+
+El tamaño está acotado por ``NEWS_EMBEDDING_CACHE_MAX_ENTRIES``: al pasarse se
+expulsan las entradas usadas hace más tiempo. Con 768 dimensiones cada entrada
+son ~3 KB, así que las 5.000 por defecto ocupan unos 15 MB.
+
+Un fallo de la caché nunca impide vectorizar: se registra y se sigue como si
+no hubiera acertado.
+"""
+
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .interest import pack_vector, unpack_vector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 5000
+# Al expulsar se libera un 10 % extra para no tener que hacerlo en cada escritura.
+EVICTION_SLACK = 0.1
+
+
+class CacheStats:
+    """Contadores de aciertos del proceso; la ingesta resume su diferencia."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def snapshot(self):
+        with self._lock:
+            return self.hits, self.misses
+
+    def summary_since(self, snapshot):
+        """Texto para el log con los aciertos desde ``snapshot``."""
+        hits, misses = self.snapshot()
+        hits -= snapshot[0]
+        misses -= snapshot[1]
+        total = hits + misses
+        ratio = (100.0 * hits / total) if total else 0.0
+        return f"{hits} aciertos de {total} consultas ({ratio:.0f}%)"
+
+
+stats = CacheStats()
+
+
+def is_enabled():
+    return bool(getattr(settings, "NEWS_EMBEDDING_CACHE_ENABLED", True))
+
+
+def current_signature():
+    model = getattr(settings, "GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+    dim = int(getattr(settings, "GEMINI_EMBEDDING_DIM", 768))
+    return model, dim
+
+
+def make_key(clean_text, model, dim):
+    """Clave de un texto ya normalizado para un modelo y una dimensión."""
+    raw = f"{model}\x1f{dim}\x1f{clean_text}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def key_for(clean_text):
+    """Clave de ``clean_text`` con el modelo y la dimensión configurados."""
+    model, dim = current_signature()
+    return make_key(clean_text, model, dim)
+
+
+def lookup(keys, touch=True):
+    """Vectores cacheados para ``keys``, como dict clave → lista de floats.
+
+    Con ``touch=False`` no se actualiza ``last_used_at`` (solo lee); lo usa
+    ``WriteBehind`` para dejar todas las escrituras al hilo que la vacía.
+    """
+    from .models import EmbeddingCacheEntry
+
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not keys or not is_enabled():
+        return {}
+
+    found = {}
+    try:
+        for start in range(0, len(keys), 500):
+            rows = EmbeddingCacheEntry.objects.filter(
+                key__in=keys[start:start + 500]
+            ).values_list("key", "vector")
+            for key, blob in rows:
+                arr = unpack_vector(blob)
+                if arr is not None:
+                    found[key] = [float(value) for value in arr]
+        if found and touch:
+            touch_keys(found)
+    except Exception:
+        logger.exception("Error leyendo la caché de embeddings; se ignora")
+        found = {}
+
+    stats.record(len(found), len(keys) - len(found))
+    return found
+
+
+def touch_keys(keys):
+    """Marca ``keys`` como usadas ahora (para la expulsión LRU)."""
+    from .models import EmbeddingCacheEntry
+
+    keys = list(keys)
+    for start in range(0, len(keys), 500):
+        EmbeddingCacheEntry.objects.filter(key__in=keys[start:start + 500]).update(
+            last_used_at=timezone.now()
+        )
+
+
+def store(vectors_by_key):
+    """Guarda vectores nuevos y expulsa los más viejos si se supera el tope."""
+    from .models import EmbeddingCacheEntry
+
+    if not vectors_by_key or not is_enabled():
+        return 0
+
+    model, dim = current_signature()
+    now = timezone.now()
+    rows = []
+    for key, vector in vectors_by_key.items():
+        packed = pack_vector(vector)
+        if not key or packed is None:
+            continue
+        rows.append(
+            EmbeddingCacheEntry(
+                key=key,
+                model_version=model,
+                dim=dim,
+                vector=packed,
+                last_used_at=now,
+            )
+        )
+    if not rows:
+        return 0
+
+    try:
+        EmbeddingCacheEntry.objects.bulk_create(rows, ignore_conflicts=True, batch_size=200)
+        evict()
+    except Exception:
+        logger.exception("Error guardando en la caché de embeddings; se ignora")
+        return 0
+    return len(rows)
+
+
+def evict(max_entries=None):
+    """Borra las entradas usadas hace más tiempo hasta volver bajo el tope."""
+    from .models import EmbeddingCacheEntry
+
+    max_entries = int(
+        max_entries
+        or getattr(settings, "NEWS_EMBEDDING_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+    )
+    total = EmbeddingCacheEntry.objects.count()
+    if total <= max_entries:
+        return 0
+    excess = total - max_entries + int(max_entries * EVICTION_SLACK)
+    stale_ids = list(
+        EmbeddingCacheEntry.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:excess]
+    )
+    deleted, _ = EmbeddingCacheEntry.objects.filter(id__in=stale_ids).delete()
+    if deleted:
+        logger.info("Caché de embeddings: %s entradas expulsadas (tope %s)", deleted, max_entries)
+    return deleted
+
+
+class WriteBehind:
+    """Escrituras de la caché aplazadas hasta ``flush``.
+
+    Las etapas del pipeline de ingesta vectorizan en otros hilos y con SQLite
+    no pueden escribir mientras el hilo principal tiene una transacción
+    abierta. Leen la caché igual, pero los vectores nuevos y los aciertos
+    (para la expulsión LRU) se apuntan aquí y los guarda el hilo principal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.vectors = {}
+        self.touched = set()
+
+    def add(self, vectors_by_key):
+        with self._lock:
+            self.vectors.update(vectors_by_key)
+
+    def touch(self, keys):
+        with self._lock:
+            self.touched.update(keys)
+
+    def flush(self):
+        with self._lock:
+            vectors, self.vectors = self.vectors, {}
+            touched, self.touched = self.touched - set(vectors), set()
+        if touched and is_enabled():
+            try:
+                touch_keys(touched)
+            except Exception:
+                logger.exception("Error actualizando la caché de embeddings; se ignora")
+        return store(vectors)
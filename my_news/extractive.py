@@ -0,0 +1,189 @@
+"""Compresión extractiva del texto de una noticia antes del prompt.
+
+``truncate_for_prompt`` corta el texto limpio en los primeros
+``content_limit`` caracteres (hasta 10.000). En los artículos largos de
+``deep_search`` buena parte de eso es la cola del artículo (relacionadas,
+firmas, avisos legales), y con los 30k TPM de gemma-4-31b esos tokens son los
+que faltan para resumir más noticias por minuto.
+
+``compress`` parte el texto en frases, puntúa cada una y se queda con las
+mejores hasta un presupuesto de tokens, en su orden original. La puntuación
+suma, con los pesos de ``WEIGHTS``:
+
+* ``headline``: qué parte de los términos del titular aparece en la frase;
+* ``position``: las primeras frases pesan más (la entradilla);
+* ``numbers``: densidad de cifras (fechas, precios, versiones);
+* ``entities``: densidad de palabras en mayúscula que no abren la frase
+  (nombres propios, marcas, siglas).
+
+Las frases muy cortas (``Leer más.``, ``Compartir``) puntúan a la mitad. Si
+el texto ya cabe en el presupuesto se devuelve tal cual.
+
+``summarize`` es el resumen local que se publica cuando no queda cuota de IA
+(ver ``fetch_and_save_news``): un TextRank sobre el grafo de frases, con la
+similitud por términos compartidos, y esa misma puntuación como preferencia
+del paseo aleatorio para que pesen el titular y la entradilla.
+"""
+
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+from .token_estimator import DEFAULT_CHARS_PER_TOKEN
+
+WEIGHTS = {'headline': 3.0, 'position': 1.0, 'numbers': 1.0, 'entities': 1.0}
+MIN_SENTENCE_WORDS = 4
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+
+# Fin de frase (con comillas o paréntesis de cierre) seguido de algo que
+# puede abrir la siguiente.
+_BOUNDARY = re.compile(r'''([.!?…]+["'”»)\]]*)\s+(?=[¿¡"“«'(\[]*[A-ZÁÉÍÓÚÑÜ0-9])''')
+_WORD = re.compile(r'\w+')
+_STOPWORDS = frozenset('''
+    a al algo ante antes aqui asi aun como con contra cual cuando de del desde
+    donde dos el ella ellas ellos en entre era es esa ese eso esta este esto fue
+    ha han hasta hay la las le les lo los mas me mi muy ni no nos o otra otro
+    para pero por que se sea ser si sin sobre son su sus tambien te tiene todo
+    tras tu un una uno unos unas y ya
+    an and are as at be by for from has have in is it its of on or that the
+    this to was were will with
+'''.split())
+
+
+def _fold(word):
+    return ''.join(
+        char for char in unicodedata.normalize('NFD', word.lower())
+        if unicodedata.category(char) != 'Mn'
+    )
+
+
+def _terms(text):
+    return {
+        folded for folded in (_fold(word) for word in _WORD.findall(text))
+        if len(folded) > 2 and folded not in _STOPWORDS
+    }
+
+
+def split_sentences(text):
+    """Frases de un texto plano ya normalizado (espacios simples)."""
+    marked = _BOUNDARY.sub(lambda match: match.group(1) + '\x00', text or '')
+    return [sentence.strip() for sentence in marked.split('\x00') if sentence.strip()]
+
+
+def score_sentences(title, sentences):
+    """Puntuación de cada frase; mismo orden que ``sentences``."""
+    headline = _terms(title)
+    count = len(sentences)
+    scores = []
+    for index, sentence in enumerate(sentences):
+        words = _WORD.findall(sentence)
+        if not words:
+            scores.append(0.0)
+            continue
+        overlap = len(_terms(sentence) & headline) / len(headline) if headline else 0.0
+        numbers = sum(1 for word in words if any(char.isdigit() for char in word))
+        entities = sum(1 for word in words[1:] if word[0].isupper())
+        score = (
+            WEIGHTS['headline'] * overlap
+            + WEIGHTS['position'] * (1.0 - index / count)
+            + WEIGHTS['numbers'] * min(1.0, numbers / len(words))
+            + WEIGHTS['entities'] * min(1.0, entities / len(words))
+        )
+        if len(words) < MIN_SENTENCE_WORDS:
+            score /= 2
+        scores.append(score)
+    return scores
+
+
+def compress(title, text, token_budget, chars_per_token=DEFAULT_CHARS_PER_TOKEN):
+    """Las frases más relevantes de ``text`` que caben en ``token_budget``.
+
+    Devuelve ``text`` sin cambios si ya cabe. Si ni la mejor frase cabe
+    (texto sin puntuación), devuelve el principio del texto.
+    """
+    text = text or ''
+    max_chars = int(token_budget * chars_per_token)
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+
+    sentences = split_sentences(text)
+    scores = score_sentences(title, sentences)
+    ranked = sorted(range(len(sentences)), key=lambda index: (-scores[index], index))
+    kept = []
+    used = 0
+    for index in ranked:
+        length = len(sentences[index]) + (1 if kept else 0)
+        if used + length <= max_chars:
+            kept.append(index)
+            used += length
+    if not kept:
+        return text[:max_chars].strip()
+    return ' '.join(sentences[index] for index in sorted(kept))
+
+
+def _similarity(first, second):
+    """Similitud de TextRank: términos compartidos sobre el log de los tamaños."""
+    if len(first) < 2 or len(second) < 2:
+        return 0.0
+    return len(first & second) / (math.log(len(first)) + math.log(len(second)))
+
+
+def textrank(title, sentences):
+    """Peso de cada frase en el grafo de similitudes; mismo orden que ``sentences``."""
+    count = len(sentences)
+    if not count:
+        return []
+    terms = [_terms(sentence) for sentence in sentences]
+    weights = np.zeros((count, count))
+    for row in range(count):
+        for column in range(row + 1, count):
+            weights[row, column] = weights[column, row] = _similarity(terms[row], terms[column])
+    prior = np.asarray(score_sentences(title, sentences)) + 1e-6
+    prior /= prior.sum()
+    totals = weights.sum(axis=1, keepdims=True)
+    # Una frase sin vecinas reparte su peso según la preferencia.
+    transition = np.where(totals > 0, weights / np.where(totals > 0, totals, 1), prior)
+    ranks = prior.copy()
+    for _ in range(TEXTRANK_ITERATIONS):
+        updated = (1 - TEXTRANK_DAMPING) * prior + TEXTRANK_DAMPING * transition.T @ ranks
+        if np.abs(updated - ranks).sum() < 1e-6:
+            ranks = updated
+            break
+        ranks = updated
+    return ranks.tolist()
+
+
+def truncate(text, max_chars):
+    """Principio de ``text`` cortado en la última palabra completa."""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(' ', 1)[0].rstrip(' ,;:') + '…'
+
+
+def summarize(title, text, max_sentences=3, max_chars=600):
+    """Resumen extractivo: las ``max_sentences`` frases centrales, en su orden.
+
+    Las frases repetidas (avisos, firmas) cuentan una sola vez: si no, se
+    refuerzan entre sí en el grafo.
+    """
+    sentences = list(dict.fromkeys(split_sentences(text)))
+    if not sentences:
+        return ''
+    ranks = textrank(title, sentences)
+    ranked = sorted(range(len(sentences)), key=lambda index: (-ranks[index], index))
+    kept = []
+    used = 0
+    for index in ranked:
+        if len(kept) >= max_sentences:
+            break
+        length = len(sentences[index]) + (1 if kept else 0)
+        if used + length <= max_chars:
+            kept.append(index)
+            used += length
+    if not kept:
+        return truncate(text, max_chars)
+    return ' '.join(sentences[index] for index in sorted(kept))
+
@@ -0,0 +1,146 @@
+"""Filtro por palabras clave (``FilterWord``) en una sola pasada.
+
+Antes cada palabra era una regex propia y ``should_filter_news`` las probaba
+una detrás de otra sobre el título y la descripción completa: el coste crecía
+con la lista. ``KeywordMatcher`` mete todas las palabras en un autómata de
+Aho-Corasick y recorre cada texto una vez, cueste lo que cueste la lista.
+
+Se mantiene la regla de antes:
+
+* Sin distinguir mayúsculas, y los espacios de una frase valen por cualquier
+  racha de espacios (el ``\\s+`` de antes): texto y palabras se pasan a
+  minúsculas y con los espacios colapsados antes de comparar.
+* Límites de palabra: el carácter anterior y el siguiente a la coincidencia no
+  pueden ser de palabra (``(?<!\\w)`` y ``(?!\\w)`` en la regex de antes).
+* Las ``title_only`` solo cuentan en el título.
+* Si coinciden varias, gana la que va antes en la lista.
+
+Una alternancia en una sola regex no bastaba: ``re`` prueba cada alternativa en
+cada posición, así que el coste seguía creciendo con el número de palabras.
+
+``KeywordMatcher.active()`` guarda el matcher construido entre pasadas y solo
+lo reconstruye si cambian las palabras activas (id, texto o ``title_only``).
+Se compara con la BD en cada llamada porque la ingesta corre en el proceso del
+cron y las palabras se editan desde el admin, en otro proceso.
+"""
+
+import re
+import threading
+from collections import deque
+
+_SPACES = re.compile(r'\s+')
+
+
+def _normalize(text):
+    return _SPACES.sub(' ', text.lower())
+
+
+def _is_word_char(char):
+    # La misma definición que ``\w`` de ``re`` para str.
+    return char.isalnum() or char == '_'
+
+
+class KeywordMatcher:
+    def __init__(self, filter_words):
+        self.words = []
+        # Trie: transiciones, enlace de fallo y salidas (índice, longitud,
+        # solo_título) de cada estado.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for filter_word in filter_words:
+            raw_word = getattr(filter_word, 'word', '')
+            cleaned_word = ' '.join(raw_word.split()) if raw_word else ''
+            if not cleaned_word:
+                continue
+            self._insert(
+                _normalize(cleaned_word),
+                len(self.words),
+                bool(getattr(filter_word, 'title_only', False)),
+            )
+            self.words.append(filter_word)
+        self._link()
+
+    def _insert(self, pattern, index, title_only):
+        state = 0
+        for char in pattern:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = following
+        self._out[state].append((index, len(pattern), title_only))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                self._out[following] = self._out[following] + self._out[self._fail[following]]
+
+    def __len__(self):
+        return len(self.words)
+
+    def _scan(self, text, in_title, best):
+        """El índice más bajo que coincide en ``text``; el 0 ya no se mejora."""
+        if not self.words or not text:
+            return best
+        text = _normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            after = text[end + 1] if end + 1 < len(text) else ''
+            if after and _is_word_char(after):
+                continue
+            for index, length, title_only in out[state]:
+                if title_only and not in_title:
+                    continue
+                if best is not None and index >= best:
+                    continue
+                start = end - length + 1
+                if start and _is_word_char(text[start - 1]):
+                    continue
+                best = index
+                if best == 0:
+                    return best
+        return best
+
+    def match(self, title, description):
+        """La ``FilterWord`` que filtra la noticia (la primera de la lista), o None."""
+        best = self._scan(title, True, None)
+        if best != 0:
+            best = self._scan(description, False, best)
+        return None if best is None else self.words[best]
+
+    # --- caché entre pasadas ---------------------------------------------------
+
+    _cached = None
+    _fingerprint = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def active(cls):
+        """Matcher de las ``FilterWord`` activas, reconstruido solo si cambiaron."""
+        from .models import FilterWord
+
+        words = list(FilterWord.objects.filter(active=True))
+        fingerprint = tuple((word.pk, word.word, word.title_only) for word in words)
+        with cls._lock:
+            if cls._cached is None or cls._fingerprint != fingerprint:
+                cls._cached = cls(words)
+                cls._fingerprint = fingerprint
+            return cls._cached
@@ -0,0 +1,448 @@
+"""Índice vectorial local: un fichero float32 mapeado en memoria.
+
+La ventana de 15 días son unos 1.000 vectores de 768 dimensiones (~3 MB).
+Con Qdrant cada búsqueda de duplicados, ``vectors_for_guids`` o
+``get_vector`` es una petición HTTP al contenedor, y si el contenedor cae la
+deduplicación se queda sin historial. Este backend implementa la misma
+interfaz que ``VectorIndexService`` sobre dos ficheros:
+
+* ``vectors.f32``: matriz ``capacidad × dim`` de vectores normalizados
+  (Qdrant también normaliza con distancia coseno), abierta con
+  ``numpy.memmap`` y ampliada por bloques.
+* ``meta.json``: guid y payload de cada fila, en el mismo orden.
+
+La búsqueda es fuerza bruta: un producto matriz-vector sobre las filas que
+pasan los filtros, que para este tamaño tarda menos que el viaje HTTP.
+
+Cron y workers de gunicorn comparten los ficheros: las lecturas toman un
+bloqueo compartido y las escrituras uno exclusivo (portalocker, como el ledger
+de cuota), y cada proceso recarga ``meta.json`` cuando cambia.
+
+Se elige con ``NEWS_VECTOR_BACKEND=local`` (``NEWS_VECTOR_INDEX_DIR``).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import portalocker
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_TIMEOUT = 5
+CHUNK_ROWS = 1024
+
+
+class LocalVectorIndexUnavailable(Exception):
+    """No se pudo bloquear el índice local."""
+
+
+@dataclass
+class LocalPoint:
+    """Lo mismo que usan los llamantes de los puntos de Qdrant."""
+    id: str
+    payload: dict
+    vector: Optional[List[float]] = None
+    score: Optional[float] = None
+
+
+def point_id_for(guid: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, guid))
+
+
+class LocalVectorIndex:
+    def __init__(self, directory, collection: str, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+        self.collection = collection
+        self.directory = os.path.join(str(directory), collection)
+        self.vectors_path = os.path.join(self.directory, 'vectors.f32')
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.lock_path = os.path.join(self.directory, 'index.lock')
+        self.lock_timeout = lock_timeout
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._clear()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            getattr(settings, 'NEWS_VECTOR_INDEX_DIR', os.path.join(settings.BASE_DIR, 'my_news_vectors')),
+            getattr(settings, 'QDRANT_COLLECTION', 'news_embeddings_gemini001_d768_v1'),
+        )
+
+    # --- estado en memoria ------------------------------------------------------
+
+    def _clear(self):
+        self.dim = None
+        self._capacity = 0
+        self._matrix = None
+        self._guids = []
+        self._payloads = []
+        self._rows = {}
+        self._rebuild_columns()
+
+    def _rebuild_columns(self):
+        # Columnas de filtro en numpy: la búsqueda no recorre los payloads.
+        self._published = np.array(
+            [int(p.get('published_ts') or 0) for p in self._payloads], dtype=np.int64
+        )
+        self._visible = np.array(
+            [not p.get('is_filtered') and not p.get('is_redundant') for p in self._payloads],
+            dtype=bool,
+        )
+
+    def _open_matrix(self):
+        if self.dim is None or not self._capacity:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(
+            self.vectors_path, dtype=np.float32, mode='r+', shape=(self._capacity, self.dim)
+        )
+
+    def _refresh(self):
+        """Recarga ``meta.json`` si otro proceso (o este) lo reescribió."""
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            if self._stamp is not None:
+                self._stamp = None
+                self._clear()
+            return
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        with open(self.meta_path, encoding='utf-8') as handle:
+            meta = json.load(handle)
+        self.dim = meta['dim']
+        self._capacity = meta['capacity']
+        self._guids = meta['guids']
+        self._payloads = meta['payloads']
+        self._rows = {guid: row for row, guid in enumerate(self._guids)}
+        self._rebuild_columns()
+        self._open_matrix()
+        self._stamp = stamp
+
+    def _save_meta(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'dim': self.dim,
+                'capacity': self._capacity,
+                'guids': self._guids,
+                'payloads': self._payloads,
+            }, handle)
+        os.replace(tmp_path, self.meta_path)
+        stat = os.stat(self.meta_path)
+        self._stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._rebuild_columns()
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        flags = portalocker.LockFlags.EXCLUSIVE if exclusive else portalocker.LockFlags.SHARED
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            lock = portalocker.Lock(
+                self.lock_path,
+                timeout=self.lock_timeout,
+                flags=flags | portalocker.LockFlags.NON_BLOCKING,
+            )
+            try:
+                lock.acquire()
+            except (portalocker.exceptions.LockException, OSError) as error:
+                raise LocalVectorIndexUnavailable(
+                    f"No se pudo bloquear {self.lock_path}: {error}"
+                ) from error
+            try:
+                self._refresh()
+                yield
+            finally:
+                lock.release()
+
+    def _grow(self, rows_needed):
+        if rows_needed <= self._capacity:
+            return
+        capacity = -(-rows_needed // CHUNK_ROWS) * CHUNK_ROWS
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.vectors_path, 'ab') as handle:
+            handle.truncate(capacity * self.dim * 4)
+        self._capacity = capacity
+        self._open_matrix()
+
+    # --- interfaz de VectorIndexService -------------------------------------------
+
+    def ensure_collection(self, dim: int) -> None:
+        """Crea los ficheros si no existen; falla si la dimensión no cuadra."""
+        if self.dim == int(dim):
+            return
+        with self._locked(exclusive=True):
+            if self.dim is None:
+                self.dim = int(dim)
+                if os.path.exists(self.vectors_path):
+                    os.remove(self.vectors_path)
+                self._grow(CHUNK_ROWS)
+                self._save_meta()
+            elif self.dim != int(dim):
+                raise ValueError(
+                    f"El índice local {self.collection} es de {self.dim} dimensiones, no de {dim}"
+                )
+
+    @staticmethod
+    def guid_hash(guid: str) -> str:
+        return hashlib.sha256(guid.encode("utf-8")).hexdigest()
+
+    def upsert(self, guid: str, vector: List[float], payload: dict) -> None:
+        self.upsert_many([(guid, vector, payload)])
+
+    def upsert_many(self, points, wait: bool = True) -> int:
+        """Inserta ``(guid, vector, payload)`` con una sola reescritura de ``meta.json``.
+
+        ``wait`` se acepta por compatibilidad con Qdrant; aquí siempre es síncrono.
+        """
+        prepared = []
+        for guid, vector, payload in points:
+            row_vector = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(row_vector))
+            if norm:
+                row_vector = row_vector / norm
+            prepared.append((guid, row_vector, payload))
+        if not prepared:
+            return 0
+        with self._locked(exclusive=True):
+            if self.dim is None:
+                raise LocalVectorIndexUnavailable(
+                    f"El índice local {self.collection} no existe; llama a ensure_collection"
+                )
+            for _, row_vector, _ in prepared:
+                if row_vector.shape != (self.dim,):
+                    raise ValueError(
+                        f"Vector de {row_vector.shape} para un índice de {self.dim} dimensiones"
+                    )
+            new_guids = {guid for guid, _, _ in prepared if guid not in self._rows}
+            self._grow(len(self._guids) + len(new_guids))
+            for guid, row_vector, payload in prepared:
+                row = self._rows.get(guid)
+                if row is None:
+                    row = len(self._guids)
+                    self._guids.append(guid)
+                    self._payloads.append(None)
+                    self._rows[guid] = row
+                self._matrix[row] = row_vector
+                self._payloads[row] = {'guid': guid, 'guid_hash': self.guid_hash(guid), **payload}
+            self._save_meta()
+        return len(prepared)
+
+    def _delete_rows(self, guids) -> None:
+        # Se mueve la última fila al hueco: la matriz sigue compacta.
+        for guid in guids:
+            row = self._rows.pop(guid, None)
+            if row is None:
+                continue
+            last = len(self._guids) - 1
+            if row != last:
+                moved = self._guids[last]
+                self._matrix[row] = self._matrix[last]
+                self._guids[row] = moved
+                self._payloads[row] = self._payloads[last]
+                self._rows[moved] = row
+            self._guids.pop()
+            self._payloads.pop()
+
+    def delete(self, guid: str) -> None:
+        self.delete_many([guid])
+
+    def delete_many(self, guids: List[str]) -> int:
+        cleaned = [guid for guid in guids if guid]
+        if not cleaned:
+            return 0
+        with self._locked(exclusive=True):
+            if self.dim is not None:
+                self._delete_rows(cleaned)
+                self._save_meta()
+        return len(cleaned)
+
+    def delete_point_ids(self, point_ids: List[str]) -> int:
+        cleaned = {str(point_id) for point_id in point_ids if point_id is not None}
+        if not cleaned:
+            return 0
+        with self._locked(exclusive=True):
+            if self.dim is not None:
+                self._delete_rows([g for g in list(self._guids) if point_id_for(g) in cleaned])
+                self._save_meta()
+        return len(cleaned)
+
+    def vectors_for_guids(self, guids) -> dict:
+        """Vectores de varias noticias a la vez, indexados por guid."""
+        with self._locked():
+            return {
+                guid: np.array(self._matrix[self._rows[guid]])
+                for guid in guids
+                if guid and guid in self._rows
+            }
+
+    def get_vector(self, guid: str) -> Optional[List[float]]:
+        with self._locked():
+            row = self._rows.get(guid)
+            if row is None:
+                return None
+            return self._matrix[row].tolist()
+
+    def scroll_points(self, limit: int = 256, with_vectors: bool = False):
+        # Se copia todo bajo el bloqueo: quien recorre puede borrar mientras.
+        with self._locked():
+            points = [
+                LocalPoint(
+                    id=point_id_for(guid),
+                    payload=dict(self._payloads[row]),
+                    vector=self._matrix[row].tolist() if with_vectors else None,
+                )
+                for row, guid in enumerate(self._guids)
+            ]
+        yield from points
+
+    def _between(self, min_ts, max_ts):
+        mask = np.ones(len(self._guids), dtype=bool)
+        if min_ts is not None:
+            mask &= self._published >= int(min_ts)
+        if max_ts is not None:
+            mask &= self._published < int(max_ts)
+        return mask
+
+    def count_points(self, min_ts=None, max_ts=None) -> int:
+        """Puntos con ``published_ts`` en ``[min_ts, max_ts)``."""
+        with self._locked():
+            return int(self._between(min_ts, max_ts).sum())
+
+    def purge_before(self, cutoff_ts: int) -> int:
+        """Borra los puntos anteriores a ``cutoff_ts`` marcados con ``is_saved`` a False."""
+        with self._locked(exclusive=True):
+            if self.dim is None:
+                return 0
+            doomed = [
+                self._guids[row]
+                for row in np.flatnonzero(self._between(None, cutoff_ts))
+                if self._payloads[row].get('is_saved') is False
+            ]
+            if doomed:
+                self._delete_rows(doomed)
+                self._save_meta()
+        return len(doomed)
+
+    def set_saved(self, guids, is_saved: bool) -> int:
+        """Marca (o desmarca) como guardadas las noticias de ``guids`` en su payload."""
+        with self._locked(exclusive=True):
+            rows = [self._rows[guid] for guid in guids if guid in self._rows]
+            for row in rows:
+                self._payloads[row]['is_saved'] = bool(is_saved)
+            if rows:
+                self._save_meta()
+        return len(rows)
+
+    def news_ids_between(self, min_ts=None, max_ts=None, limit: int = 256) -> dict:
+        """``{id de punto: news_id}`` de los puntos del rango."""
+        with self._locked():
+            return {
+                point_id_for(self._guids[row]): self._payloads[row].get('news_id')
+                for row in np.flatnonzero(self._between(min_ts, max_ts))
+            }
+
+    @staticmethod
+    def _matches(payload, condition):
+        # Condiciones de Qdrant (FieldCondition) por duck typing: match o range.
+        value = payload.get(condition.key)
+        match = getattr(condition, 'match', None)
+        if match is not None:
+            return value == getattr(match, 'value', None)
+        bounds = getattr(condition, 'range', None)
+        if bounds is None or value is None:
+            return False
+        return all((
+            bounds.gte is None or value >= bounds.gte,
+            bounds.gt is None or value > bounds.gt,
+            bounds.lte is None or value <= bounds.lte,
+            bounds.lt is None or value < bounds.lt,
+        ))
+
+    def _mask(self, min_published_ts, exclude_guid, extra_must):
+        mask = self._visible.copy()
+        if min_published_ts is not None:
+            mask &= self._published >= int(min_published_ts)
+        if exclude_guid and exclude_guid in self._rows:
+            mask[self._rows[exclude_guid]] = False
+        for condition in extra_must or []:
+            for row in np.flatnonzero(mask):
+                if not self._matches(self._payloads[row], condition):
+                    mask[row] = False
+        return mask
+
+    def search_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        min_published_ts: Optional[int] = None,
+        exclude_guids: Optional[List[Optional[str]]] = None,
+        extra_must: Optional[list] = None,
+        with_payload=True,
+    ):
+        """Varias búsquedas con un solo producto de matrices."""
+        if not len(vectors):
+            return []
+        exclude_guids = exclude_guids or [None] * len(vectors)
+        queries = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+        with self._locked():
+            if not self._guids or self.dim != queries.shape[1]:
+                return [[] for _ in range(len(queries))]
+            base = self._mask(min_published_ts, None, extra_must)
+            scores = queries @ self._matrix[:len(self._guids)].T
+            results = []
+            for query_scores, norm, exclude_guid in zip(scores, norms[:, 0], exclude_guids):
+                mask = base.copy()
+                if exclude_guid and exclude_guid in self._rows:
+                    mask[self._rows[exclude_guid]] = False
+                if not norm or not mask.any():
+                    results.append([])
+                    continue
+                candidates = np.flatnonzero(mask)
+                ranked = candidates[np.argsort(-query_scores[candidates])[:top_k]]
+                results.append([
+                    LocalPoint(
+                        id=point_id_for(self._guids[row]),
+                        payload=self._select(self._payloads[row], with_payload),
+                        score=float(query_scores[row]),
+                    )
+                    for row in ranked
+                ])
+            return results
+
+    def search(
+        self,
+        vector: List[float],
+        top_k: int,
+        min_published_ts: Optional[int] = None,
+        exclude_guid: Optional[str] = None,
+        extra_must: Optional[list] = None,
+        with_payload=True,
+    ):
+        return self.search_batch(
+            [vector], top_k, min_published_ts, [exclude_guid], extra_must, with_payload
+        )[0]
+
+    @staticmethod
+    def _select(payload, with_payload):
+        if with_payload is True:
+            return dict(payload)
+        if not with_payload:
+            return {}
+        return {key: payload[key] for key in with_payload if key in payload}
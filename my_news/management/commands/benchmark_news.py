@@ -0,0 +1,716 @@
+"""Mide piezas de la ingesta de noticias contra la BD y servicios configurados.
+
+Cada caso imprime tiempos reales de esta máquina (la idea es correrlo en la
+Raspberry); no hay cifras de referencia guardadas en el repo.
+
+Casos:
+
+* ``writes``: guardar una pasada de N noticias fila a fila con ``create``
+  (como hacía la ingesta) frente a ``NewsWriteBuffer``. Escribe en la BD
+  configurada bajo una fuente temporal inactiva y la borra al terminar.
+* ``dedup``: deduplicar en memoria N candidatas (sin Qdrant) con el bucle
+  pareja a pareja de antes, con ``RedundancyMatrix`` una a una y con su modo
+  por lotes. No toca la BD ni la red.
+* ``vector_index``: latencia de ``search``, ``vectors_for_guids`` y
+  ``get_vector`` con N vectores sintéticos en el índice local y, si responde,
+  en Qdrant (``QDRANT_URL``). Usa una colección temporal que se borra al final.
+* ``upserts``: escribir N vectores en Qdrant con un ``upsert`` por noticia
+  (REST), con ``UpsertBuffer`` por REST y con ``UpsertBuffer`` por gRPC
+  (``QDRANT_GRPC_PORT``). Cada variante usa su colección temporal. Sin Qdrant
+  no mide nada.
+* ``feeds``: parsear los feeds de las fuentes activas con feedparser y con
+  ``parse_feed`` (con y sin el corte por antigüedad de la ingesta) y comprobar
+  que salen las mismas entradas. Con ``--feeds-dir`` los feeds se guardan ahí
+  la primera vez y después se leen de disco, para comparar siempre lo mismo.
+* ``content``: limpiar el contenido de cada entrada de esos mismos feeds como
+  antes (BeautifulSoup para el texto plano, otra vez para el prompt y regex
+  para el embedding) frente a un ``ContentDocument`` por entrada, y comprobar
+  que la vía rápida da el mismo texto que BeautifulSoup. Acepta ``--feeds-dir``.
+* ``summaries``: cuántas noticias por minuto caben en la cuota segura de
+  Cerebras del modelo configurado al resumirlas de una en una o en lotes de
+  varias (``process_batch_with_cerebras``). Cuenta los tokens con la
+  estimación del limitador (calibrada si el ledger ya tiene respuestas) sobre
+  las entradas de los feeds capturados; no llama a Cerebras. Acepta
+  ``--feeds-dir`` y ``--entries``.
+* ``compression``: tokens del texto del prompt truncando (como hasta ahora)
+  frente a la compresión extractiva (``extractive.py``) con
+  ``--token-budget``, sobre los artículos completos guardados en la caché de
+  artículos (noticias de fuentes con ``deep_search``) o, si no hay, sobre las
+  entradas de los feeds capturados. Informa la reducción media, cuánto del
+  titular y de las cifras conserva cada variante, e imprime unos pocos
+  artículos comprimidos (``--samples``) para revisarlos a mano.
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+import feedparser
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from my_news.article_fetcher import ArticleFetcher
+from my_news.content_document import ContentDocument, clean_embedding_text
+from my_news.extractive import split_sentences
+from my_news.dedup import RedundancyMatrix
+from my_news.feed_parser import DEFAULT_STOP_AFTER_OLD, parse_feed
+from my_news.local_vector_index import LocalVectorIndex
+from my_news.models import AIFilterInstruction, AIModelSetting, FeedSource, News
+from my_news.services import (
+    DEFAULT_AI_CONTENT_LIMIT,
+    DEFAULT_AI_MODEL,
+    SUMMARY_COMPLETION_TOKENS,
+    EmbeddingService,
+    FeedService,
+)
+from my_news.vector_index import UpsertBuffer
+from my_news.write_buffer import NewsWriteBuffer
+
+
+class Command(BaseCommand):
+    help = "Mide el coste de partes de la ingesta de noticias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("case", choices=["writes", "dedup", "vector_index", "upserts", "feeds", "content", "summaries", "compression"], help="Qué medir.")
+        parser.add_argument(
+            "--entries",
+            type=int,
+            default=None,
+            help="Noticias por pasada simulada (por defecto 200; 500 en dedup; 1000 vectores en vector_index y upserts).",
+        )
+        parser.add_argument(
+            "--dim",
+            type=int,
+            default=768,
+            help="Dimensión de los vectores sintéticos (dedup, vector_index, upserts).",
+        )
+        parser.add_argument(
+            "--skip-qdrant",
+            action="store_true",
+            help="En vector_index, medir solo el índice local.",
+        )
+        parser.add_argument(
+            "--feeds-dir",
+            default=None,
+            help="En feeds, content, summaries y compression, directorio con los feeds capturados (se rellena si está vacío).",
+        )
+        parser.add_argument(
+            "--token-budget",
+            type=int,
+            default=None,
+            help="En compression, tokens de la compresión extractiva (por defecto NEWS_PROMPT_TOKEN_BUDGET).",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=3,
+            help="En compression, artículos comprimidos que se imprimen para revisarlos.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Repeticiones de cada variante; se informa la mediana.",
+        )
+
+    def handle(self, *args, **options):
+        getattr(self, f"bench_{options['case']}")(options)
+
+    def report(self, label, samples, entries):
+        median = statistics.median(samples)
+        per_row = median / entries * 1000 if entries else 0
+        self.stdout.write(
+            f"  {label}: mediana {median:.3f}s ({per_row:.2f} ms/fila), "
+            f"min {min(samples):.3f}s, max {max(samples):.3f}s"
+        )
+        return median
+
+    # --- writes ---------------------------------------------------------------
+
+    def bench_writes(self, options):
+        entries = max(1, options["entries"] or 200)
+        repeat = max(1, options["repeat"])
+        source = FeedSource.objects.create(
+            name=f"benchmark-{uuid.uuid4().hex[:8]}",
+            url="https://example.invalid/rss.xml",
+            active=False,
+        )
+        self.stdout.write(f"Escritura de {entries} noticias ({repeat} repeticiones):")
+        try:
+            per_row, buffered = [], []
+            for _ in range(repeat):
+                per_row.append(self._time_writes(source, entries, buffered=False))
+                buffered.append(self._time_writes(source, entries, buffered=True))
+            slow = self.report("create por fila", per_row, entries)
+            fast = self.report("NewsWriteBuffer", buffered, entries)
+            if fast:
+                self.stdout.write(f"  relación: {slow / fast:.1f}x")
+        finally:
+            source.delete()
+
+    def _time_writes(self, source, entries, buffered):
+        rows = self._rows(source, entries)
+        started = time.perf_counter()
+        if buffered:
+            with NewsWriteBuffer.from_settings() as buffer:
+                for news in rows:
+                    buffer.add(news)
+        else:
+            for news in rows:
+                # Igual que la ingesta antes del buffer: un create (y una
+                # transacción implícita) por fila.
+                if news.similar_to is not None and news.similar_to.pk is None:
+                    news.similar_to = None
+                news.save(force_insert=True)
+        elapsed = time.perf_counter() - started
+        News.objects.filter(source=source).delete()
+        return elapsed
+
+    @staticmethod
+    def _rows(source, entries):
+        # Mezcla parecida a una pasada real: una de cada cinco es redundante y
+        # apunta a la anterior aceptada.
+        now = timezone.now()
+        prefix = uuid.uuid4().hex[:8]
+        rows, last_accepted = [], None
+        for i in range(entries):
+            redundant = i % 5 == 4 and last_accepted is not None
+            news = News(
+                guid=f"benchmark-{prefix}-{i}",
+                title=f"Noticia de prueba {i}",
+                description="Texto de prueba. " * 40,
+                link=f"https://example.invalid/{prefix}/{i}",
+                published_date=now,
+                source=source,
+                is_ai_processed=True,
+                is_redundant=redundant,
+                is_filtered=redundant,
+                similar_to=last_accepted if redundant else None,
+                similarity_score=0.9 if redundant else None,
+            )
+            if not redundant:
+                last_accepted = news
+            rows.append(news)
+        return rows
+
+    # --- dedup ----------------------------------------------------------------
+
+    def bench_dedup(self, options):
+        entries = max(1, options["entries"] or 500)
+        repeat = max(1, options["repeat"])
+        dim = max(2, options["dim"])
+        threshold = 0.85
+        rng = np.random.default_rng(0)
+        # Una de cada cinco es casi copia de una anterior.
+        base = rng.normal(size=(entries, dim)).astype(np.float32)
+        for i in range(4, entries, 5):
+            base[i] = base[i - 3] + rng.normal(scale=0.05, size=dim)
+        embeddings = [list(map(float, row)) for row in base]
+
+        self.stdout.write(f"Deduplicación en memoria de {entries} candidatas de {dim} dims ({repeat} repeticiones):")
+        variants = [
+            ("cosine_similarity por pareja", self._dedup_pairwise),
+            ("RedundancyMatrix una a una", self._dedup_incremental),
+            ("RedundancyMatrix por lote", self._dedup_batch),
+        ]
+        decisions = {}
+        medians = []
+        for label, func in variants:
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                decisions[label] = func(embeddings, threshold)
+                samples.append(time.perf_counter() - started)
+            medians.append(self.report(label, samples, entries))
+        if len({tuple(result) for result in decisions.values()}) != 1:
+            self.stdout.write(self.style.WARNING("  ¡las variantes no coinciden en las redundantes!"))
+        else:
+            self.stdout.write(f"  redundantes: {sum(next(iter(decisions.values())))}")
+        if medians[1] and medians[2]:
+            self.stdout.write(
+                f"  relación frente a por pareja: {medians[0] / medians[1]:.1f}x una a una, "
+                f"{medians[0] / medians[2]:.1f}x por lote"
+            )
+
+    @staticmethod
+    def _dedup_pairwise(embeddings, threshold):
+        accepted, redundant = [], []
+        for embedding in embeddings:
+            best = max(
+                (EmbeddingService.cosine_similarity(embedding, other) for other in accepted),
+                default=0.0,
+            )
+            redundant.append(best >= threshold)
+            if best < threshold:
+                accepted.append(embedding)
+        return redundant
+
+    @staticmethod
+    def _dedup_incremental(embeddings, threshold):
+        matrix, redundant = RedundancyMatrix(), []
+        for index, embedding in enumerate(embeddings):
+            best = matrix.best_match(embedding)[1]
+            redundant.append(best >= threshold)
+            if best < threshold:
+                matrix.add(index, embedding)
+        return redundant
+
+    @staticmethod
+    def _dedup_batch(embeddings, threshold):
+        results = RedundancyMatrix().deduplicate(
+            list(range(len(embeddings))), embeddings, [threshold] * len(embeddings)
+        )
+        return [is_redundant for is_redundant, _, _ in results]
+
+    # --- vector_index -----------------------------------------------------------
+
+    def bench_vector_index(self, options):
+        entries = max(1, options["entries"] or 1000)
+        repeat = max(1, options["repeat"])
+        dim = max(2, options["dim"])
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(entries, dim)).astype(np.float32)
+        now = int(time.time())
+        guids = [f"benchmark-{i}" for i in range(entries)]
+        payloads = [
+            {
+                "news_id": i,
+                "source_id": 1,
+                "published_ts": now - int(rng.integers(0, 15 * 24 * 3600)),
+                "is_filtered": False,
+                "is_redundant": False,
+            }
+            for i in range(entries)
+        ]
+        queries = [list(map(float, row)) for row in rng.normal(size=(50, dim))]
+        lookup = guids[: min(200, entries)]
+
+        backends = []
+        tmpdir = tempfile.mkdtemp(prefix="benchmark-vectors-")
+        backends.append(("local", LocalVectorIndex(tmpdir, "benchmark"), None))
+        if not options["skip_qdrant"]:
+            qdrant = self._temporary_qdrant()
+            if qdrant is not None:
+                backends.append(("qdrant", qdrant, qdrant.collection))
+
+        self.stdout.write(
+            f"Índice vectorial con {entries} vectores de {dim} dims "
+            f"({len(queries)} búsquedas, {repeat} repeticiones):"
+        )
+        try:
+            for name, index, _ in backends:
+                index.ensure_collection(dim)
+                started = time.perf_counter()
+                for guid, vector, payload in zip(guids, vectors, payloads):
+                    index.upsert(guid, vector.tolist(), payload)
+                self.stdout.write(f" {name}: carga {time.perf_counter() - started:.2f}s")
+                min_ts = now - 14 * 24 * 3600
+                self._latency("search", repeat, lambda: [
+                    index.search(vector=q, top_k=5, min_published_ts=min_ts, exclude_guid=guids[0])
+                    for q in queries
+                ], len(queries))
+                self._latency(
+                    f"vectors_for_guids({len(lookup)})", repeat,
+                    lambda: index.vectors_for_guids(lookup), 1,
+                )
+                self._latency("get_vector", repeat, lambda: [
+                    index.get_vector(guid) for guid in lookup[:50]
+                ], min(50, len(lookup)))
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            for name, index, collection in backends:
+                if collection:
+                    index.client.delete_collection(collection)
+
+    def _latency(self, label, repeat, func, calls):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) / calls)
+        self.stdout.write(
+            f"   {label}: mediana {statistics.median(samples) * 1000:.2f} ms/llamada, "
+            f"max {max(samples) * 1000:.2f} ms"
+        )
+
+    # --- upserts ----------------------------------------------------------------
+
+    def bench_upserts(self, options):
+        entries = max(1, options["entries"] or 1000)
+        repeat = max(1, options["repeat"])
+        dim = max(2, options["dim"])
+        batch_size = getattr(settings, "NEWS_VECTOR_UPSERT_BATCH", 64)
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(entries, dim)).astype(np.float32)
+        now = int(time.time())
+        points = [
+            (
+                f"benchmark-{i}",
+                vectors[i].tolist(),
+                {"news_id": i, "source_id": 1, "published_ts": now, "is_filtered": False, "is_redundant": False},
+            )
+            for i in range(entries)
+        ]
+
+        variants = [
+            ("REST, un upsert por noticia", False, None),
+            (f"REST, lotes de {batch_size}", False, batch_size),
+            (f"gRPC, lotes de {batch_size}", True, batch_size),
+        ]
+        self.stdout.write(f"Escritura de {entries} vectores de {dim} dims en Qdrant ({repeat} repeticiones):")
+        medians = []
+        for label, prefer_grpc, batch in variants:
+            samples = []
+            for _ in range(repeat):
+                index = self._temporary_qdrant(prefer_grpc=prefer_grpc)
+                if index is None:
+                    return
+                try:
+                    index.ensure_collection(dim)
+                    samples.append(self._time_upserts(index, points, batch))
+                finally:
+                    index.client.delete_collection(index.collection)
+            medians.append(self.report(label, samples, entries))
+        if medians[1] and medians[2]:
+            self.stdout.write(
+                f"  relación frente a uno por noticia: {medians[0] / medians[1]:.1f}x REST por lotes, "
+                f"{medians[0] / medians[2]:.1f}x gRPC por lotes"
+            )
+
+    @staticmethod
+    def _time_upserts(index, points, batch):
+        started = time.perf_counter()
+        if batch is None:
+            for guid, vector, payload in points:
+                index.upsert(guid, vector, payload)
+        else:
+            with UpsertBuffer(index, batch_size=batch, max_age=None) as buffer:
+                for guid, vector, payload in points:
+                    buffer.add(guid, vector, payload)
+            if buffer.stats["failed"]:
+                raise RuntimeError(f"{buffer.stats['failed']} vectores no se escribieron")
+        return time.perf_counter() - started
+
+    # --- feeds ------------------------------------------------------------------
+
+    def bench_feeds(self, options):
+        repeat = max(1, options["repeat"])
+        feeds = self._captured_feeds(options["feeds_dir"])
+        if not feeds:
+            self.stdout.write(self.style.WARNING("No hay feeds que medir."))
+            return
+        # El corte de la ingesta cuando una fuente no tiene noticias recientes.
+        cutoff = timezone.now() - timedelta(days=15)
+        stop_after_old = getattr(settings, "NEWS_FEED_STOP_AFTER_OLD", DEFAULT_STOP_AFTER_OLD)
+        total_bytes = sum(len(content) for _, content in feeds)
+        self.stdout.write(
+            f"Parseo de {len(feeds)} feeds ({total_bytes / 1024:.0f} KB, {repeat} repeticiones):"
+        )
+
+        variants = [
+            ("feedparser", lambda content: feedparser.parse(content)),
+            ("parse_feed", lambda content: parse_feed(content)),
+            ("parse_feed con corte", lambda content: parse_feed(
+                content, cutoff=cutoff, stop_after_old=stop_after_old
+            )),
+        ]
+        medians = []
+        for label, func in variants:
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for _, content in feeds:
+                    func(content)
+                samples.append(time.perf_counter() - started)
+            medians.append(self.report(label, samples, len(feeds)))
+        if medians[1] and medians[2]:
+            self.stdout.write(
+                f"  relación frente a feedparser: {medians[0] / medians[1]:.1f}x sin corte, "
+                f"{medians[0] / medians[2]:.1f}x con corte"
+            )
+
+        fallbacks, mismatched = [], []
+        for name, content in feeds:
+            parsed = parse_feed(content)
+            if parsed.parser == "feedparser":
+                fallbacks.append(name)
+                continue
+            expected = feedparser.parse(content).entries
+            if [self._entry_key(e) for e in parsed.entries] != [self._entry_key(e) for e in expected]:
+                mismatched.append(name)
+        self.stdout.write(
+            f"  vía rápida en {len(feeds) - len(fallbacks)} de {len(feeds)} feeds"
+            + (f"; con feedparser: {', '.join(fallbacks)}" if fallbacks else "")
+        )
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f"  entradas distintas de feedparser en: {', '.join(mismatched)}"))
+
+    # --- content --------------------------------------------------------------
+
+    def bench_content(self, options):
+        repeat = max(1, options["repeat"])
+        entries = []
+        for _, content in self._captured_feeds(options["feeds_dir"]):
+            for entry in parse_feed(content).entries:
+                entries.append((entry.get("title") or "", self._entry_html(entry)))
+        if not entries:
+            self.stdout.write(self.style.WARNING("No hay entradas que medir."))
+            return
+        total_bytes = sum(len(raw) for _, raw in entries)
+        self.stdout.write(
+            f"Limpieza del contenido de {len(entries)} entradas ({total_bytes / 1024:.0f} KB, "
+            f"{repeat} repeticiones):"
+        )
+
+        def before():
+            for title, raw in entries:
+                plain = ContentDocument(title, raw, fast=False).plain_text
+                clean_embedding_text(f"{title} {plain}")
+                ContentDocument(title, raw, fast=False).prompt_text(DEFAULT_AI_CONTENT_LIMIT)
+
+        def after():
+            for title, raw in entries:
+                document = ContentDocument(title, raw)
+                document.plain_text
+                document.embedding_text
+                document.prompt_text(DEFAULT_AI_CONTENT_LIMIT)
+
+        medians = []
+        for label, func in (("BeautifulSoup por paso", before), ("ContentDocument", after)):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                func()
+                samples.append(time.perf_counter() - started)
+            medians.append(self.report(label, samples, len(entries)))
+        if medians[1]:
+            self.stdout.write(f"  relación: {medians[0] / medians[1]:.1f}x")
+
+        mismatched = sum(
+            1 for title, raw in entries
+            if ContentDocument(title, raw).plain_text != ContentDocument(title, raw, fast=False).plain_text
+        )
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f"  {mismatched} entradas con texto distinto de BeautifulSoup"))
+
+    # --- summaries ------------------------------------------------------------
+
+    SUMMARY_BATCH_SIZES = (1, 2, 3, 4, 6, 8)
+
+    def bench_summaries(self, options):
+        documents = [
+            ContentDocument(entry.get("title") or "", self._entry_html(entry))
+            for _, content in self._captured_feeds(options["feeds_dir"])
+            for entry in parse_feed(content).entries
+        ][:options["entries"] or 200]
+        if not documents:
+            self.stdout.write(self.style.WARNING("No hay entradas que medir."))
+            return
+        setting = AIModelSetting.objects.first()
+        model_name = setting.model_name if setting else DEFAULT_AI_MODEL
+        instructions = FeedService.build_filter_instructions_text(
+            AIFilterInstruction.objects.filter(active=True)
+        )
+        limiter = FeedService.rate_limiter(model_name)
+        # Carga del ledger lo aprendido de respuestas anteriores.
+        limiter.reset_if_needed()
+        calibrated = limiter.estimator.dump().get(model_name, {}).get("samples", 0)
+        token_limit, request_limit = limiter.get_limits(model_name)
+        self.stdout.write(
+            f"Resúmenes de {len(documents)} entradas con {model_name}: {token_limit} TPM y "
+            f"{request_limit} RPM seguros, estimación "
+            + (f"calibrada con {calibrated} respuestas" if calibrated else "sin calibrar (len/4 + máximo de respuesta)")
+            + ":"
+        )
+
+        baseline = None
+        for size in self.SUMMARY_BATCH_SIZES:
+            tokens = 0
+            requests = 0
+            for start in range(0, len(documents), size):
+                chunk = documents[start:start + size]
+                if len(chunk) == 1:
+                    prompt = FeedService._PROMPT_TEMPLATE.format(
+                        title=FeedService._escape_braces(chunk[0].title),
+                        content=FeedService._escape_braces(chunk[0].prompt_text(
+                            DEFAULT_AI_CONTENT_LIMIT, FeedService.prompt_token_budget()
+                        )),
+                        instructions=FeedService._escape_braces(instructions),
+                    )
+                else:
+                    prompt = FeedService._batch_prompt(chunk, instructions, DEFAULT_AI_CONTENT_LIMIT)
+                tokens += limiter.estimate_tokens(
+                    prompt, SUMMARY_COMPLETION_TOKENS * len(chunk), model_name, articles=len(chunk)
+                )
+                requests += 1
+            per_article = tokens / len(documents)
+            per_minute = min(token_limit / per_article, request_limit * len(documents) / requests)
+            baseline = baseline or per_minute
+            self.stdout.write(
+                f"  lotes de {size}: {per_article:.0f} tokens por noticia, "
+                f"{per_minute:.1f} noticias/min ({per_minute / baseline:.1f}x)"
+            )
+
+    # --- compression ----------------------------------------------------------
+
+    def bench_compression(self, options):
+        limit = options["entries"] or 200
+        documents = self._stored_articles(limit)
+        origin = "artículos guardados en la caché"
+        if not documents:
+            documents = [
+                ContentDocument(entry.get("title") or "", self._entry_html(entry))
+                for _, content in self._captured_feeds(options["feeds_dir"])
+                for entry in parse_feed(content).entries
+            ][:limit]
+            origin = "entradas de los feeds"
+        if not documents:
+            self.stdout.write(self.style.WARNING("No hay artículos que medir."))
+            return
+        budget = options["token_budget"] or int(getattr(settings, "NEWS_PROMPT_TOKEN_BUDGET", 1500))
+        setting = AIModelSetting.objects.first()
+        model_name = setting.model_name if setting else DEFAULT_AI_MODEL
+        limiter = FeedService.rate_limiter(model_name)
+        limiter.reset_if_needed()
+
+        def tokens(text):
+            return limiter.estimate_tokens(text, 0, model_name)
+
+        rows = []
+        for document in documents:
+            truncated = document.prompt_text(DEFAULT_AI_CONTENT_LIMIT)
+            extracted = document.prompt_text(DEFAULT_AI_CONTENT_LIMIT, budget)
+            rows.append((document, truncated, extracted, tokens(truncated), tokens(extracted)))
+        compressed = [row for row in rows if row[1] != row[2]]
+        before = sum(row[3] for row in rows)
+        after = sum(row[4] for row in rows)
+        self.stdout.write(
+            f"Texto del prompt de {len(rows)} {origin} con {model_name}, presupuesto {budget} tokens:"
+        )
+        self.stdout.write(
+            f"  truncando: {before / len(rows):.0f} tokens de media; "
+            f"extractiva: {after / len(rows):.0f} "
+            f"({100.0 * (before - after) / before if before else 0:.0f}% menos)"
+        )
+        if compressed:
+            reduction = statistics.mean(1 - row[4] / row[3] for row in compressed if row[3])
+            self.stdout.write(
+                f"  {len(compressed)} artículos pasan del presupuesto; en ellos la reducción media es "
+                f"{100.0 * reduction:.0f}%"
+            )
+            for label, position in (("truncando", 1), ("extractiva", 2)):
+                headline = statistics.mean(self._headline_coverage(row[0].title, row[position]) for row in compressed)
+                numbers = statistics.mean(self._numbers_kept(row[0].plain_text, row[position]) for row in compressed)
+                self.stdout.write(
+                    f"  {label}: conserva el {100.0 * headline:.0f}% de los términos del titular "
+                    f"y el {100.0 * numbers:.0f}% de las cifras"
+                )
+
+        for document, truncated, extracted, _, _ in sorted(compressed, key=lambda row: -row[3])[:options["samples"]]:
+            self.stdout.write("")
+            self.stdout.write(
+                f"  {document.title} ({len(split_sentences(extracted))} de "
+                f"{len(split_sentences(document.plain_text))} frases)"
+            )
+            self.stdout.write(f"    {extracted[:600]}...")
+
+    def _stored_articles(self, limit):
+        """Artículos completos que la ingesta ya descargó y dejó en la caché."""
+        cache = FeedService.article_fetcher().cache
+        if cache is None:
+            return []
+        documents = []
+        news = News.objects.filter(source__deep_search=True).order_by("-published_date")
+        for title, link in news.values_list("title", "link").iterator():
+            article = cache.get(ArticleFetcher.cache_key(link))
+            if article and article.get("text"):
+                documents.append(ContentDocument(title, article["text"]))
+                if len(documents) >= limit:
+                    break
+        return documents
+
+    @staticmethod
+    def _headline_coverage(title, text):
+        words = {word.lower() for word in title.split() if len(word) > 3}
+        if not words:
+            return 1.0
+        lowered = text.lower()
+        return sum(1 for word in words if word in lowered) / len(words)
+
+    @staticmethod
+    def _numbers_kept(original, text):
+        numbers = {word for word in original.split() if any(char.isdigit() for char in word)}
+        if not numbers:
+            return 1.0
+        return sum(1 for number in numbers if number in text) / len(numbers)
+
+    @staticmethod
+    def _entry_html(entry):
+        """El bloque más largo entre ``description`` y ``content``, como la ingesta."""
+        raw = entry.get("description") or ""
+        for block in entry.get("content") or []:
+            value = block.get("value") or ""
+            if len(value) > len(raw):
+                raw = value
+        return raw
+
+    @staticmethod
+    def _entry_key(entry):
+        return (
+            entry.get("id", entry.get("link")),
+            entry.get("title"),
+            entry.get("link"),
+            tuple(entry.get("published_parsed") or ())[:6],
+        )
+
+    def _captured_feeds(self, directory):
+        """``[(nombre, bytes)]`` de disco o, si no hay, de las fuentes activas."""
+        if directory and os.path.isdir(directory) and os.listdir(directory):
+            feeds = []
+            for name in sorted(os.listdir(directory)):
+                with open(os.path.join(directory, name), "rb") as handle:
+                    feeds.append((name, handle.read()))
+            return feeds
+
+        feeds = []
+        for source in FeedSource.objects.filter(active=True).order_by("id"):
+            try:
+                # Sin validadores: hace falta el cuerpo aunque no haya cambiado.
+                content = FeedService.download_feed(SimpleNamespace(url=source.url)).content
+            except Exception as error:
+                self.stdout.write(self.style.WARNING(f"  {source.name}: no se pudo descargar ({error})"))
+                continue
+            feeds.append((f"{source.id:03d}-{source.name}", content))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            for name, content in feeds:
+                safe = "".join(char if char.isalnum() or char in "-_" else "_" for char in name)
+                with open(os.path.join(directory, f"{safe}.xml"), "wb") as handle:
+                    handle.write(content)
+            self.stdout.write(f"  {len(feeds)} feeds guardados en {directory}")
+        return feeds
+
+    def _temporary_qdrant(self, prefer_grpc=False):
+        try:
+            from my_news.vector_index import VectorIndexService
+
+            index = VectorIndexService(
+                url=getattr(settings, "QDRANT_URL", "http://localhost:6333"),
+                collection=f"benchmark_{uuid.uuid4().hex[:8]}",
+                api_key=getattr(settings, "QDRANT_API_KEY", None),
+                prefer_grpc=prefer_grpc,
+                grpc_port=getattr(settings, "QDRANT_GRPC_PORT", 6334),
+            )
+            index.client.get_collections()
+        except Exception as error:
+            self.stdout.write(self.style.WARNING(f"Qdrant no disponible ({error}); se omite su medición."))
+            return None
+        return index
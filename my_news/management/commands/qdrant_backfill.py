@@ -6,6 +6,7 @@ import numpy as np
 
 from my_news.models import News
 from my_news.services import FeedService, EmbeddingService
+from my_news.vector_index import UpsertBuffer
 
 
 class Command(BaseCommand):
@@ -77,16 +78,31 @@ class Command(BaseCommand):
         vector_index.ensure_collection(target_dim)
 
         start = time.time()
-        for news in qs.iterator():
-            processed += 1
-            text = f"{news.title} {news.description or ''}".strip()
-            emb = EmbeddingService.generate_embedding(text, gemini_client)
-            if not emb:
-                skipped += 1
-                continue
-
-            try:
-                vector_index.ensure_collection(len(emb))
+        batch_size = int(
+            getattr(settings, "GEMINI_EMBEDDING_BATCH_SIZE", EmbeddingService.DEFAULT_BATCH_SIZE)
+        )
+        batch = []
+        upserts = UpsertBuffer.from_settings(vector_index)
+
+        indexed_guids = []
+
+        def count_indexed(guid):
+            nonlocal indexed
+            indexed += 1
+            indexed_guids.append(guid)
+
+        def index_batch(batch):
+            nonlocal skipped
+            embeddings = EmbeddingService.generate_embeddings_batch(
+                [f"{news.title} {news.description or ''}".strip() for news in batch],
+                gemini_client,
+                batch_size=batch_size,
+            )
+            for news, emb in zip(batch, embeddings):
+                if not emb:
+                    skipped += 1
+                    continue
+
                 published_ts = int(news.published_date.timestamp()) if news.published_date else int(time.time())
                 payload = {
                     "news_id": news.id,
@@ -94,16 +110,31 @@ class Command(BaseCommand):
                     "published_ts": published_ts,
                     "is_filtered": bool(getattr(news, "is_filtered", False)),
                     "is_redundant": bool(getattr(news, "is_redundant", False)),
+                    "is_saved": bool(news.is_saved),
                     "model_version": getattr(settings, "GEMINI_EMBEDDING_MODEL", "gemini-embedding-001"),
                 }
-                vector_index.upsert(news.guid, emb, payload)
-                indexed += 1
-            except Exception as e:
-                skipped += 1
-                self.stderr.write(f"Error indexando guid={news.guid}: {e}")
-
-            if processed % 50 == 0:
-                self.stdout.write(f"Progreso: {processed}/{total} procesadas, {indexed} indexadas, {skipped} omitidas")
+                # Los puntos se mandan a Qdrant en lotes (NEWS_VECTOR_UPSERT_BATCH).
+                upserts.add(news.guid, emb, payload, on_written=count_indexed)
+
+        with upserts:
+            for news in qs.iterator():
+                processed += 1
+                batch.append(news)
+                if len(batch) >= batch_size:
+                    index_batch(batch)
+                    batch = []
+
+                if processed % 50 == 0:
+                    self.stdout.write(f"Progreso: {processed}/{total} procesadas, {indexed} indexadas, {skipped} omitidas")
+
+            if batch:
+                index_batch(batch)
+
+        FeedService.mark_indexed(indexed_guids)
+        if upserts.stats["failed"]:
+            skipped += upserts.stats["failed"]
+            self.stderr.write(f"{upserts.stats['failed']} vectores no se pudieron indexar (ver el log).")
+        self.stdout.write(f"Indexación: {upserts.summary()}")
 
         elapsed = time.time() - start
         self.stdout.write(
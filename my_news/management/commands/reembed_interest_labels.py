@@ -25,7 +25,7 @@ class Command(BaseCommand):
             "--limit",
             type=int,
             default=100,
-            help="Máximo de etiquetas a regenerar (1 llamada a Gemini cada una).",
+            help="Máximo de etiquetas a regenerar (se vectorizan en lotes).",
         )
         parser.add_argument(
             "--dry-run",
@@ -58,10 +58,12 @@ class Command(BaseCommand):
             return
 
         client = FeedService.initialize_gemini()
+        vectores = EmbeddingService.generate_embeddings_batch(
+            [etiqueta.title for etiqueta in pendientes], client
+        )
         regeneradas = 0
         fallidas = 0
-        for etiqueta in pendientes:
-            vector = EmbeddingService.generate_embedding(etiqueta.title, client)
+        for etiqueta, vector in zip(pendientes, vectores):
             packed = pack_vector(vector)
             if packed is None:
                 fallidas += 1
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_news', '0034_newsfeedback_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedsource',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='feedsource',
+            name='etag',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='feedsource',
+            name='last_modified',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_news', '0035_feedsource_http_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model_version', models.CharField(max_length=100)),
+                ('dim', models.PositiveIntegerField()),
+                ('vector', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Embedding en caché',
+                'verbose_name_plural': 'Embeddings en caché',
+                'indexes': [models.Index(fields=['last_used_at', 'id'], name='embcache_last_used_idx')],
+            },
+        ),
+    ]
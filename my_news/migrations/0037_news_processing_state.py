@@ -0,0 +1,71 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+def backfill_states(apps, schema_editor):
+    # Las existentes quedan pendientes: la migración no puede saber cuáles
+    # tienen punto en Qdrant. retry_missing_embeddings mira primero en Qdrant
+    # y solo pide a Gemini el vector de las que no lo tienen; la conciliación
+    # (purge_orphan_vectors) marca como indexadas las demás que ya tienen
+    # punto. Las que no se indexan por diseño (filtradas por palabra o IA,
+    # redundantes) quedan fuera de los reintentos.
+    News = apps.get_model('my_news', 'News')
+    skipped = (
+        models.Q(filtered_by__isnull=False)
+        | models.Q(is_redundant=True)
+        | models.Q(is_ai_filtered=True)
+    )
+    News.objects.filter(skipped).update(embedding_state='skipped')
+    News.objects.exclude(skipped).update(embedding_state='pending')
+    News.objects.filter(is_ai_processed=True).update(summary_state='done')
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_news', '0036_embeddingcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='embedding_attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Reintentos del vector'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='embedding_retry_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Próximo reintento del vector'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='embedding_state',
+            field=models.CharField(choices=[('pending', 'Sin embedding'), ('embedded', 'Con embedding, sin indexar'), ('indexed', 'Indexada'), ('skipped', 'No se indexa')], default='pending', max_length=10, verbose_name='Estado del vector'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='summary_attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Reintentos del resumen'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='summary_retry_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Próximo reintento del resumen'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='summary_state',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('done', 'Resumida'), ('skipped', 'No se resume')], default='pending', max_length=10, verbose_name='Estado del resumen'),
+        ),
+        migrations.RunPython(backfill_states, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['embedding_state', 'embedding_retry_at'], name='news_embedding_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['summary_state', 'summary_retry_at'], name='news_summary_state_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_news', '0037_news_processing_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='is_provisional',
+            field=models.BooleanField(default=False, verbose_name='Resumen provisional'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='pending_content',
+            field=models.TextField(blank=True, null=True, verbose_name='Contenido por resumir'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_news', '0038_news_provisional_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model_name', models.CharField(max_length=100)),
+                ('instructions_hash', models.CharField(max_length=64)),
+                ('summary', models.TextField()),
+                ('short_answer', models.TextField(blank=True, null=True)),
+                ('ai_filter_reason', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Resumen en caché',
+                'verbose_name_plural': 'Resúmenes en caché',
+                'indexes': [models.Index(fields=['last_used_at', 'id'], name='sumcache_last_used_idx'), models.Index(fields=['created_at'], name='sumcache_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_news', '0039_summarycacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodelsetting',
+            name='fallback_models',
+            field=models.CharField(blank=True, default='', help_text="Modelos separados por comas, en orden de preferencia. Cuando el principal no tiene cuota libre, las noticias que sobran van al primero que la tenga (ej: 'gpt-oss-120b, zai-glm-4.7').", max_length=500, verbose_name='Modelos de respaldo'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='summary_model',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Modelo del resumen'),
+        ),
+    ]
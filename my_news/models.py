@@ -8,7 +8,10 @@ class VisibleNewsManager(models.Manager):
 
     def editorial_filter(self):
         """Filtro compartido para contenido apto para mostrarse."""
-        return Q(is_filtered=False) & Q(is_ai_filtered=False) & Q(is_redundant=False) & Q(is_ai_processed=True)
+        return (
+            Q(is_filtered=False) & Q(is_ai_filtered=False) & Q(is_redundant=False)
+            & (Q(is_ai_processed=True) | Q(is_provisional=True))
+        )
     
     def visible_filter(self):
         """Devuelve el filtro Q para noticias visibles"""
@@ -34,6 +37,12 @@ class FeedSource(models.Model):
             "un tercio de los duplicados."
         )
     )
+    # Validadores HTTP de la última versión del feed ya procesada entera. Con
+    # ellos se pide el feed de forma condicional y, si no cambió, no se parsea.
+    etag = models.CharField(max_length=255, blank=True, default="", editable=False)
+    last_modified = models.CharField(max_length=100, blank=True, default="", editable=False)
+    # sha256 del cuerpo: respaldo para servidores que no mandan validadores.
+    content_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
     
     def __str__(self):
         return self.name
@@ -78,7 +87,55 @@ class News(models.Model):
         verbose_name="Interés",
         help_text="Estimación en [-1, 1] a partir de los pulgares. Solo informativa: no filtra nada.",
     )
-    
+
+    # Estado de cada noticia en los pasos que pueden fallar y reintentarse.
+    # Los reintentos buscan por estos campos (indexados) en lugar de recorrer
+    # Qdrant o toda la ventana. "Puntuada" no necesita campo: es
+    # interest_score no nulo, y rescore_recent_news repasa la ventana entera
+    # a propósito.
+    EMBEDDING_PENDING = "pending"
+    EMBEDDING_EMBEDDED = "embedded"
+    EMBEDDING_INDEXED = "indexed"
+    EMBEDDING_SKIPPED = "skipped"
+    EMBEDDING_STATE_CHOICES = [
+        (EMBEDDING_PENDING, "Sin embedding"),
+        (EMBEDDING_EMBEDDED, "Con embedding, sin indexar"),
+        (EMBEDDING_INDEXED, "Indexada"),
+        (EMBEDDING_SKIPPED, "No se indexa"),
+    ]
+    SUMMARY_PENDING = "pending"
+    SUMMARY_DONE = "done"
+    SUMMARY_SKIPPED = "skipped"
+    SUMMARY_STATE_CHOICES = [
+        (SUMMARY_PENDING, "Pendiente"),
+        (SUMMARY_DONE, "Resumida"),
+        (SUMMARY_SKIPPED, "No se resume"),
+    ]
+
+    embedding_state = models.CharField(
+        max_length=10,
+        choices=EMBEDDING_STATE_CHOICES,
+        default=EMBEDDING_PENDING,
+        verbose_name="Estado del vector",
+    )
+    embedding_attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Reintentos del vector")
+    embedding_retry_at = models.DateTimeField(null=True, blank=True, verbose_name="Próximo reintento del vector")
+    summary_state = models.CharField(
+        max_length=10,
+        choices=SUMMARY_STATE_CHOICES,
+        default=SUMMARY_PENDING,
+        verbose_name="Estado del resumen",
+    )
+    summary_attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Reintentos del resumen")
+    summary_retry_at = models.DateTimeField(null=True, blank=True, verbose_name="Próximo reintento del resumen")
+    # Sin cuota de IA la noticia se publica con un resumen extractivo local
+    # (my_news/extractive.py); el texto de origen queda aquí para que
+    # retry_summarize_pending la resuma después con el modelo.
+    is_provisional = models.BooleanField(default=False, verbose_name="Resumen provisional")
+    pending_content = models.TextField(null=True, blank=True, verbose_name="Contenido por resumir")
+    # Modelo de Cerebras que generó el resumen (ver AIModelSetting.route).
+    summary_model = models.CharField(max_length=100, null=True, blank=True, verbose_name="Modelo del resumen")
+
     # Managers
     objects = models.Manager()  # Manager por defecto
     visible = VisibleNewsManager()  # Manager para noticias visibles
@@ -94,6 +151,8 @@ class News(models.Model):
             ),
             models.Index(fields=['created_at', 'id'], name='news_created_id_idx'),
             models.Index(fields=['is_deleted', 'deleted_at', 'id'], name='news_deleted_at_idx'),
+            models.Index(fields=['embedding_state', 'embedding_retry_at'], name='news_embedding_state_idx'),
+            models.Index(fields=['summary_state', 'summary_retry_at'], name='news_summary_state_idx'),
         ]
     
     def __str__(self):
@@ -146,6 +205,61 @@ class NewsFeedback(models.Model):
         return f"{'+1' if self.vote > 0 else '-1'} {self.title[:80]}"
 
 
+class EmbeddingCacheEntry(models.Model):
+    """Embedding ya pagado de un texto, para no pedírselo a Gemini dos veces.
+
+    La clave es el sha256 del texto normalizado junto con el modelo y la
+    dimensión, así que cambiar ``GEMINI_EMBEDDING_MODEL`` o
+    ``GEMINI_EMBEDDING_DIM`` deja de acertar sin tener que vaciar nada: las
+    entradas viejas se van con la expulsión por antigüedad de uso.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    model_version = models.CharField(max_length=100)
+    dim = models.PositiveIntegerField()
+    # float32 crudo normalizado L2, igual que NewsFeedback.vector.
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Embedding en caché"
+        verbose_name_plural = "Embeddings en caché"
+        indexes = [models.Index(fields=["last_used_at", "id"], name="embcache_last_used_idx")]
+
+    def __str__(self):
+        return f"{self.model_version}/{self.dim} {self.key[:12]}"
+
+
+class SummaryCacheEntry(models.Model):
+    """Resumen de Cerebras ya pagado, para no pedir dos veces el mismo texto.
+
+    La clave es el sha256 del contenido preparado junto con el modelo y el
+    hash de las instrucciones de filtro (ver my_news/summary_cache.py), así
+    que cambiar el modelo o las instrucciones deja de acertar sin vaciar nada.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    instructions_hash = models.CharField(max_length=64)
+    summary = models.TextField()
+    short_answer = models.TextField(null=True, blank=True)
+    ai_filter_reason = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Resumen en caché"
+        verbose_name_plural = "Resúmenes en caché"
+        indexes = [
+            models.Index(fields=["last_used_at", "id"], name="sumcache_last_used_idx"),
+            models.Index(fields=["created_at"], name="sumcache_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} {self.key[:12]}"
+
+
 class FilterWord(models.Model):
     word = models.CharField(
         max_length=100,
@@ -199,8 +313,24 @@ class AIModelSetting(models.Model):
         verbose_name="Modelo IA Global",
         help_text="Nombre del modelo de IA a utilizar para resúmenes (ej: 'gemma-4-31b')."
     )
+    fallback_models = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        verbose_name="Modelos de respaldo",
+        help_text=(
+            "Modelos separados por comas, en orden de preferencia. Cuando el principal "
+            "no tiene cuota libre, las noticias que sobran van al primero que la tenga "
+            "(ej: 'gpt-oss-120b, zai-glm-4.7')."
+        ),
+    )
     updated_at = models.DateTimeField(auto_now=True)
 
+    def route(self):
+        """Modelo principal seguido de los de respaldo, sin repetidos."""
+        names = [self.model_name] + (self.fallback_models or '').replace('\n', ',').split(',')
+        return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+
     def __str__(self):
         return f"Configuración Global de Modelo IA ({self.model_name})"
 
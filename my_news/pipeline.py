@@ -0,0 +1,341 @@
+"""Motor de etapas encadenadas con colas acotadas.
+
+La ingesta de noticias era un bucle en serie: mientras se descargaba un
+artículo o se esperaba a Gemini o a Cerebras, todo lo demás estaba parado.
+Aquí cada etapa corre en sus propios hilos y se comunica con la siguiente por
+una ``queue.Queue`` de tamaño fijo, de modo que la descarga de la entrada 5, el
+embedding de la 3 y el resumen de la 1 ocurren a la vez.
+
+Garantías que la ingesta necesita:
+
+- Orden: cada etapa entrega sus resultados en el mismo orden en que llegaron,
+  aunque tenga varios hilos. El consumidor los recibe como si fuera en serie.
+- Contrapresión: si una etapa se atasca, las colas se llenan y las anteriores
+  esperan en lugar de acumular trabajo sin límite.
+- Corte: el consumidor puede parar (presupuesto agotado, fallo de la IA) y los
+  hilos terminan sin procesar lo que queda.
+
+Cada etapa lleva sus contadores (``StageStats``): entradas, salidas, tiempo
+ocupado y profundidad máxima de su cola.
+
+Las funciones de las etapas no deberían escribir en la base de datos: con
+SQLite las escrituras desde otro hilo chocan con las del consumidor. Las
+escrituras se hacen en el hilo que itera ``Pipeline.run``.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 20
+
+# Marca de fin de la entrada de una etapa (una por hilo).
+_DONE = object()
+# Cada cuánto se revisa si hay que parar mientras se espera una cola.
+_POLL_SECONDS = 0.1
+
+
+class PipelineStopped(Exception):
+    """Se pidió parar mientras un hilo esperaba una cola."""
+
+
+class StageStats:
+    """Contadores de una etapa; se actualizan desde varios hilos."""
+
+    def __init__(self, name, queue_size):
+        self.name = name
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._queue = None
+        self.items_in = 0
+        self.items_out = 0
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, count, seconds):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic() - seconds
+            self.items_in += count
+            self.items_out += count
+            self.calls += 1
+            self.busy_seconds += seconds
+            self.finished_at = time.monotonic()
+
+    def observe_depth(self, depth):
+        with self._lock:
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    @property
+    def depth(self):
+        """Elementos esperando ahora mismo en la cola de entrada."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def throughput(self):
+        """Elementos por segundo de trabajo efectivo (capacidad de la etapa)."""
+        return self.items_out / self.busy_seconds if self.busy_seconds else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            active = (
+                (self.finished_at - self.started_at)
+                if self.started_at is not None and self.finished_at is not None
+                else 0.0
+            )
+            return {
+                'name': self.name,
+                'items_in': self.items_in,
+                'items_out': self.items_out,
+                'calls': self.calls,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'active_seconds': round(active, 3),
+                'throughput': round(self.throughput, 2),
+                'depth': self.depth,
+                'max_depth': self.max_depth,
+                'queue_size': self.queue_size,
+            }
+
+    def summary(self):
+        data = self.snapshot()
+        return (
+            f"{data['name']}: {data['items_out']} elementos en {data['busy_seconds']:.2f}s "
+            f"ocupados ({data['throughput']:.1f}/s), cola máx. {data['max_depth']}/{data['queue_size']}"
+        )
+
+
+class Stage:
+    """Una etapa: ``func(item) -> item`` o, por lotes, ``func(items) -> items``.
+
+    Con ``batch_size`` cada hilo junta hasta ``batch_size`` elementos; si la
+    cola se vacía antes, espera como mucho ``max_wait`` segundos a que llegue
+    otro y, si no, procesa lo que tiene. Con ``max_wait=None`` espera a llenar
+    el lote o a que se acabe la entrada: con un ``batch_size`` tan grande como
+    la entrada, la etapa ve todos los elementos a la vez. Por defecto hay un
+    solo hilo; con ``workers`` varios lotes se procesan a la vez.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=None, max_wait=0.0):
+        self.name = name
+        self.func = func
+        self.batch_size = max(1, int(batch_size)) if batch_size else None
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.max_wait = None if max_wait is None else max(0.0, float(max_wait))
+        self.stats = StageStats(name, self.queue_size)
+
+
+class _OrderedEmitter:
+    """Reordena las salidas de una etapa con varios hilos por número de secuencia."""
+
+    def __init__(self, pipeline, out_queue):
+        self._pipeline = pipeline
+        self._out = out_queue
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next_seq = 0
+
+    def emit(self, seq, value):
+        with self._lock:
+            self._pending[seq] = value
+            while self._next_seq in self._pending:
+                item = self._pending.pop(self._next_seq)
+                self._pipeline._put(self._out, (self._next_seq, item))
+                self._next_seq += 1
+
+
+class Pipeline:
+    """Encadena ``stages`` y entrega los resultados en el orden de entrada."""
+
+    def __init__(self, stages, name='pipeline'):
+        self.stages = list(stages)
+        if not self.stages:
+            raise ValueError("El pipeline necesita al menos una etapa")
+        self.name = name
+        self._stop = threading.Event()
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    @property
+    def stats(self):
+        return [stage.stats for stage in self.stages]
+
+    def stop(self):
+        """Pide a todas las etapas que terminen cuanto antes."""
+        self._stop.set()
+
+    def summary(self):
+        return '; '.join(stats.summary() for stats in self.stats)
+
+    def _put(self, target, value, stats=None):
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            try:
+                target.put(value, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            if stats is not None:
+                stats.observe_depth(target.qsize())
+            return
+
+    def _get(self, source, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            wait = _POLL_SECONDS
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise queue.Empty
+            try:
+                return source.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _fail(self, error):
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def run(self, items):
+        """Generador con los resultados de la última etapa, en orden.
+
+        Si el consumidor deja de iterar, conviene cerrar el generador
+        (``contextlib.closing``) para que los hilos paren enseguida.
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        out_queue = queue.Queue(maxsize=self.stages[-1].queue_size)
+        for stage, stage_queue in zip(self.stages, queues):
+            stage.stats._queue = stage_queue
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            in_queue = queues[index]
+            if index + 1 < len(self.stages):
+                next_queue, next_stage = queues[index + 1], self.stages[index + 1]
+            else:
+                next_queue, next_stage = out_queue, None
+            emitter = _OrderedEmitter(self, next_queue)
+            remaining = {'workers': stage.workers}
+            remaining_lock = threading.Lock()
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, in_queue, emitter, next_queue, next_stage, remaining, remaining_lock),
+                    name=f"{self.name}-{stage.name}-{number}",
+                    daemon=True,
+                )
+                threads.append(thread)
+
+        feeder = threading.Thread(
+            target=self._feed, args=(items, queues[0], self.stages[0]),
+            name=f"{self.name}-feed", daemon=True,
+        )
+        threads.append(feeder)
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    value = self._get(out_queue)
+                except PipelineStopped:
+                    break
+                if value is _DONE:
+                    break
+                yield value[1]
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _feed(self, items, first_queue, first_stage):
+        try:
+            for seq, item in enumerate(items):
+                self._put(first_queue, (seq, item), first_stage.stats)
+            for _ in range(first_stage.workers):
+                self._put(first_queue, _DONE)
+        except PipelineStopped:
+            pass
+        except Exception as error:
+            self._fail(error)
+
+    def _worker(self, stage, in_queue, emitter, next_queue, next_stage, remaining, remaining_lock):
+        next_stats = next_stage.stats if next_stage is not None else None
+        try:
+            if stage.batch_size:
+                self._run_batches(stage, in_queue, emitter)
+            else:
+                while True:
+                    value = self._get(in_queue)
+                    if value is _DONE:
+                        break
+                    seq, item = value
+                    started = time.monotonic()
+                    result = stage.func(item)
+                    stage.stats.record(1, time.monotonic() - started)
+                    emitter.emit(seq, result)
+                    if next_stats is not None:
+                        next_stats.observe_depth(next_queue.qsize())
+            with remaining_lock:
+                remaining['workers'] -= 1
+                last = remaining['workers'] == 0
+            if last:
+                # Todos los hilos de esta etapa acabaron: ya se emitió todo.
+                for _ in range(next_stage.workers if next_stage is not None else 1):
+                    self._put(next_queue, _DONE)
+        except PipelineStopped:
+            pass
+        except Exception as error:
+            logger.exception("Fallo en la etapa %s del pipeline %s", stage.name, self.name)
+            self._fail(error)
+        finally:
+            # Las conexiones a la BD son por hilo: cerrarlas al salir.
+            connections.close_all()
+
+    def _run_batches(self, stage, in_queue, emitter):
+        finished = False
+        while not finished:
+            value = self._get(in_queue)
+            if value is _DONE:
+                return
+            batch = [value]
+            while len(batch) < stage.batch_size:
+                try:
+                    if stage.max_wait is None:
+                        value = self._get(in_queue)
+                    elif in_queue.empty() and stage.max_wait:
+                        value = self._get(in_queue, timeout=stage.max_wait)
+                    else:
+                        value = in_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if value is _DONE:
+                    finished = True
+                    break
+                batch.append(value)
+
+            started = time.monotonic()
+            results = stage.func([item for _, item in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"La etapa {stage.name} devolvió {len(results)} resultados para {len(batch)} elementos"
+                )
+            stage.stats.record(len(batch), time.monotonic() - started)
+            for (seq, _), result in zip(batch, results):
+                emitter.emit(seq, result)
@@ -0,0 +1,113 @@
+"""Orden en que se gasta el presupuesto de IA de una pasada.
+
+``fetch_and_save_news(max_ai_items=20)`` resumía por orden de publicación:
+las 20 más antiguas se llevaban el presupuesto aunque fueran las que menos
+interesan, y las demás esperaban a la siguiente pasada. Cuando llega al
+resumen, cada candidata (pasó palabras clave y redundancia) ya tiene su
+embedding, así que ``InterestModel.score`` sale casi gratis.
+
+No se espera a tener todas las candidatas de la pasada: la ingesta las ordena
+por ventanas de ``NEWS_INGEST_WINDOW`` entradas y cada ventana se lleva la
+parte del presupuesto que le corresponde por las entradas que quedan (la
+última, todo lo que sobre). Así los primeros resúmenes no esperan a la
+descarga más lenta.
+
+``rank`` ordena las candidatas por una mezcla de interés y antigüedad:
+
+* ``interest``: posición del score dentro de las candidatas de la pasada (0 la
+  que menos, 1 la que más). El score crudo se desplaza con el número de
+  etiquetas (ver my_news/interest.py); la posición relativa no. Sin score
+  (modelo sin entrenar, sin embedding) cuenta como 0,5.
+* ``age``: horas desde la publicación sobre ``NEWS_AI_PRIORITY_MAX_WAIT_HOURS``,
+  con tope 1.
+
+Los pesos son ``NEWS_AI_PRIORITY_INTEREST_WEIGHT`` y
+``NEWS_AI_PRIORITY_AGE_WEIGHT``. Las que ya llevan
+``NEWS_AI_PRIORITY_MAX_WAIT_HOURS`` publicadas van delante de todas, las más
+antiguas primero. Sin modelo de interés entrenado el orden es el de siempre:
+las más antiguas primero.
+
+Solo decide quién gasta presupuesto: las noticias se guardan en su orden de
+publicación. Las que se quedan fuera también se guardan (con resumen local, o
+ocultas si ``NEWS_LOCAL_SUMMARY_ENABLED`` está desactivado) y
+``retry_summarize_pending`` las resume después, las más antiguas primero; así
+ninguna se pierde aunque la pasada guarde otras más nuevas de su fuente. Esas
+ya no vuelven a ``rank``: el cron pide también todas las pendientes publicadas
+antes de ``overdue_before()``, aunque pasen del límite del reintento, para que
+ninguna espere más de ``NEWS_AI_PRIORITY_MAX_WAIT_HOURS`` (más lo que tarde la
+siguiente pasada).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULT_INTEREST_WEIGHT = 1.0
+DEFAULT_AGE_WEIGHT = 0.5
+DEFAULT_MAX_WAIT_HOURS = 24
+NEUTRAL_INTEREST = 0.5
+
+
+def is_enabled():
+    return bool(getattr(settings, "NEWS_AI_PRIORITY_ENABLED", True))
+
+
+def wait_hours():
+    return float(getattr(settings, "NEWS_AI_PRIORITY_MAX_WAIT_HOURS", DEFAULT_MAX_WAIT_HOURS))
+
+
+def overdue_before(now=None):
+    """Fecha de publicación antes de la cual una pendiente ya esperó bastante; None sin tope."""
+    hours = wait_hours()
+    if not is_enabled() or hours <= 0:
+        return None
+    return (now or timezone.now()) - timedelta(hours=hours)
+
+
+def interest_percentiles(scores):
+    """Posición en [0, 1] de cada score entre los conocidos; None → ``NEUTRAL_INTEREST``.
+
+    Los empates comparten la posición media.
+    """
+    known = sorted(score for score in scores if score is not None)
+    if len(known) < 2:
+        return [NEUTRAL_INTEREST] * len(scores)
+    positions = {}
+    start = 0
+    while start < len(known):
+        end = start
+        while end + 1 < len(known) and known[end + 1] == known[start]:
+            end += 1
+        positions[known[start]] = (start + end) / 2 / (len(known) - 1)
+        start = end + 1
+    return [NEUTRAL_INTEREST if score is None else positions[score] for score in scores]
+
+
+def rank(candidates, now=None, interest_weight=None, age_weight=None, max_wait_hours=None):
+    """Índices de ``candidates`` en el orden en que reciben presupuesto.
+
+    ``candidates`` son pares ``(score de interés o None, fecha de publicación)``.
+    """
+    if interest_weight is None:
+        interest_weight = float(getattr(settings, "NEWS_AI_PRIORITY_INTEREST_WEIGHT", DEFAULT_INTEREST_WEIGHT))
+    if age_weight is None:
+        age_weight = float(getattr(settings, "NEWS_AI_PRIORITY_AGE_WEIGHT", DEFAULT_AGE_WEIGHT))
+    if max_wait_hours is None:
+        max_wait_hours = wait_hours()
+    now = now or timezone.now()
+
+    interests = interest_percentiles([score for score, _ in candidates])
+    ages = [max(0.0, (now - published).total_seconds() / 3600) for _, published in candidates]
+
+    def key(index):
+        published = candidates[index][1]
+        if max_wait_hours > 0 and ages[index] >= max_wait_hours:
+            # Ya esperó bastante: delante, por antigüedad.
+            return (0, 0.0, published, index)
+        age = min(1.0, ages[index] / max_wait_hours) if max_wait_hours > 0 else 0.0
+        priority = interest_weight * interests[index] + age_weight * age
+        return (1, -priority, published, index)
+
+    return sorted(range(len(candidates)), key=key)
+
@@ -0,0 +1,97 @@
+"""Cuota de Cerebras compartida entre procesos.
+
+El cron, la vista ``update_feed`` de cada worker de gunicorn y
+``retry_summaries`` tenían cada uno su ``CerebrasRateLimiter`` en memoria y
+creían disponer de toda la cuota: se pisaban y acababan durmiendo en 429. El
+estado de la ventana (tokens y peticiones usados, lo aprendido de los headers,
+la pausa tras un 429 y las peticiones en vuelo) vive ahora en un JSON pequeño
+junto a la BD, y cada cambio se hace con el fichero bloqueado con portalocker
+(el mismo mecanismo que el lock del cron).
+
+Cada modelo de Cerebras tiene su propia cuota: el del modelo por defecto usa
+el fichero configurado y los demás uno al lado con el nombre del modelo
+(``my_news_cerebras_quota.gpt-oss-120b.json``).
+
+Las horas se guardan en epoch (``time.time()``): ``time.monotonic()`` no es
+comparable entre procesos.
+"""
+
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+
+import portalocker
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_TIMEOUT = 5
+
+
+class QuotaLedgerUnavailable(Exception):
+    """No se pudo bloquear o leer el fichero; el limitador sigue en memoria."""
+
+
+class QuotaLedger:
+    def __init__(self, path, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+        self.path = str(path)
+        self.lock_path = f"{self.path}.lock"
+        self.lock_timeout = lock_timeout
+
+    @classmethod
+    def from_settings(cls, model_name=None):
+        """Ledger configurado en ``CEREBRAS_QUOTA_LEDGER``; vacío lo desactiva.
+
+        Con ``model_name`` es el fichero de ese modelo, junto al configurado.
+        """
+        path = getattr(
+            settings,
+            'CEREBRAS_QUOTA_LEDGER',
+            os.path.join(settings.BASE_DIR, 'my_news_cerebras_quota.json'),
+        )
+        if not path:
+            return None
+        if model_name:
+            root, extension = os.path.splitext(path)
+            path = f"{root}.{re.sub(r'[^A-Za-z0-9._-]', '_', model_name)}{extension}"
+        return cls(path)
+
+    @contextmanager
+    def locked(self):
+        """Bloquea el fichero y entrega el estado como dict.
+
+        Lo que quede en el dict al salir del ``with`` se guarda; si el bloque
+        lanza una excepción no se escribe nada.
+        """
+        lock = portalocker.Lock(self.lock_path, timeout=self.lock_timeout)
+        try:
+            lock.acquire()
+        except (portalocker.exceptions.LockException, OSError) as error:
+            raise QuotaLedgerUnavailable(f"No se pudo bloquear {self.lock_path}: {error}") from error
+        try:
+            state = self._read()
+            yield state
+            self._write(state)
+        finally:
+            lock.release()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                state = json.load(handle)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            # Un fichero corrupto no debe bloquear los resúmenes: se empieza de cero.
+            logger.warning("Ledger de cuota de Cerebras ilegible (%s); se reinicia.", self.path)
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _write(self, state):
+        # Escritura atómica: un lector nunca ve el fichero a medias.
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(state, handle)
+        os.replace(tmp_path, self.path)
@@ -1,18 +1,17 @@
-import feedparser
 from datetime import datetime, timedelta
 from django.utils import timezone
 import pytz
-from .models import News, FeedSource, FilterWord, AIFilterInstruction, AIModelSetting
+from .models import News, FeedSource, AIFilterInstruction, AIModelSetting
 from .interest import InterestModel
+import math
 import re
 from google import genai
 from google.genai import types
 import time
+import threading
 import requests
 import os
 from cerebras.cloud.sdk import Cerebras
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
 import numpy as np
 from django.db.models import Max
 import hashlib
@@ -20,8 +19,23 @@ import json
 import textwrap
 import html
 import logging
+from contextlib import ExitStack, closing, contextmanager, nullcontext
 from django.conf import settings
 from Bookshelf.html_sanitizer import sanitize_html
+from . import embedding_cache, summary_cache
+from .article_fetcher import ArticleFetcher
+from .dedup import RedundancyMatrix
+from .local_vector_index import LocalVectorIndex
+from .downloads import ConcurrentDownloader, DEFAULT_MAX_PER_HOST, DEFAULT_MAX_WORKERS
+from .pipeline import DEFAULT_QUEUE_SIZE, Pipeline, Stage
+from .quota_ledger import QuotaLedger, QuotaLedgerUnavailable
+from .feed_parser import DEFAULT_STOP_AFTER_OLD, parse_feed
+from .content_document import ContentDocument, clean_embedding_text, first_image
+from . import extractive, priority
+from .keyword_filter import KeywordMatcher
+from .token_estimator import TokenEstimator, usage_tokens
+from .vector_index import UpsertBuffer
+from .write_buffer import NewsWriteBuffer
 
 try:
     from .vector_index import VectorIndexService, VectorIndexUnavailable
@@ -36,10 +50,28 @@ logger = logging.getLogger(__name__)
 # (AIModelSetting, editable desde el admin) y este es solo el fallback.
 DEFAULT_AI_MODEL = 'gemma-4-31b'
 DEFAULT_AI_CONTENT_LIMIT = 10_000
+# Tokens de respuesta por noticia (una petición de varias pide tantos como noticias).
+SUMMARY_COMPLETION_TOKENS = 512
+# Cuánto espera la etapa de embeddings a completar un lote antes de mandarlo.
+EMBED_BATCH_WAIT_SECONDS = 0.5
+# Lo único que la deduplicación lee del payload de cada resultado.
+SIMILAR_PAYLOAD_FIELDS = ['news_id', 'guid']
 
 
 class CerebrasRateLimiter:
-    """Rate limiter simple por proceso para no superar cuotas de Cerebras."""
+    """Rate limiter para no superar cuotas de Cerebras.
+
+    Es seguro entre hilos: la ingesta tiene varias peticiones de resumen en
+    vuelo a la vez. Los tokens de esas peticiones se reservan en ``acquire`` y
+    se liberan en ``release`` cuando llega la respuesta; hasta entonces los
+    headers ``x-ratelimit-remaining-*`` todavía no los descuentan. Con el
+    ``usage`` de la respuesta, ``reconcile`` cambia lo reservado por lo que se
+    gastó de verdad y calibra ``estimator`` (ver my_news/token_estimator.py).
+
+    Con un ``ledger`` (``QuotaLedger``) el estado de la ventana se comparte
+    entre procesos: se carga del fichero y se guarda en cada operación, con el
+    fichero bloqueado. Sin ledger (o si falla) vive solo en memoria.
+    """
 
     DEFAULT_RPM = 300
     DEFAULT_TPM = 500_000
@@ -53,8 +85,11 @@ class CerebrasRateLimiter:
         'gpt-oss-120b': {'tpm': 1_000_000, 'rpm': 1_000},
         'zai-glm-4.7': {'tpm': 500_000, 'rpm': 500},
     }
+    # Una reserva de un proceso que murió sin liberarla caduca sola.
+    RESERVATION_TTL_SECONDS = 300
 
-    def __init__(self):
+    def __init__(self, ledger=None):
+        self.ledger = ledger
         self.window_seconds = 60.0
         self.window_start = time.monotonic()
         self.used_tokens = 0
@@ -65,6 +100,92 @@ class CerebrasRateLimiter:
         self.reset_requests_at = None
         self.limit_tokens = None
         self.limit_requests = None
+        # Peticiones en vuelo: (pid, tokens, caduca_en).
+        self.reservations = []
+        # Pausa compartida: un 429 en un hilo frena a todos (Retry-After).
+        self.paused_until = None
+        self.estimator = TokenEstimator()
+        self._lock = threading.RLock()
+        self._ledger_active = False
+
+    @property
+    def in_flight_tokens(self):
+        return sum(tokens for _, tokens, _ in self.reservations)
+
+    @property
+    def in_flight_requests(self):
+        return len(self.reservations)
+
+    @contextmanager
+    def _locked(self):
+        """Lock del proceso y, si hay ledger, el estado compartido cargado."""
+        with self._lock, ExitStack() as stack:
+            state = None
+            if self.ledger is not None and not self._ledger_active:
+                try:
+                    state = stack.enter_context(self.ledger.locked())
+                except QuotaLedgerUnavailable:
+                    logger.warning(
+                        "Ledger de cuota de Cerebras no disponible; se usa el estado en memoria.",
+                        exc_info=True,
+                    )
+                if state is not None:
+                    self._load_shared(state)
+                    self._ledger_active = True
+                    stack.callback(setattr, self, '_ledger_active', False)
+            yield
+            if state is not None:
+                self._dump_shared(state)
+
+    def _load_shared(self, state):
+        if not state:
+            # Ledger nuevo: se siembra con lo que este proceso ya sabía.
+            return
+        offset = time.monotonic() - time.time()
+
+        def to_monotonic(value):
+            return None if value is None else float(value) + offset
+
+        self.window_start = to_monotonic(state.get('window_start')) or time.monotonic()
+        self.used_tokens = int(state.get('used_tokens') or 0)
+        self.used_requests = int(state.get('used_requests') or 0)
+        self.remaining_tokens = state.get('remaining_tokens')
+        self.remaining_requests = state.get('remaining_requests')
+        self.reset_tokens_at = to_monotonic(state.get('reset_tokens_at'))
+        self.reset_requests_at = to_monotonic(state.get('reset_requests_at'))
+        self.limit_tokens = state.get('limit_tokens')
+        self.limit_requests = state.get('limit_requests')
+        self.paused_until = to_monotonic(state.get('paused_until'))
+        now = time.monotonic()
+        self.reservations = [
+            (pid, int(tokens), expires + offset)
+            for pid, tokens, expires in state.get('reservations') or []
+            if expires + offset > now
+        ]
+        self.estimator.load(state.get('token_stats'))
+
+    def _dump_shared(self, state):
+        offset = time.time() - time.monotonic()
+
+        def to_epoch(value):
+            return None if value is None else value + offset
+
+        state.update(
+            window_start=to_epoch(self.window_start),
+            used_tokens=self.used_tokens,
+            used_requests=self.used_requests,
+            remaining_tokens=self.remaining_tokens,
+            remaining_requests=self.remaining_requests,
+            reset_tokens_at=to_epoch(self.reset_tokens_at),
+            reset_requests_at=to_epoch(self.reset_requests_at),
+            limit_tokens=self.limit_tokens,
+            limit_requests=self.limit_requests,
+            paused_until=to_epoch(self.paused_until),
+            reservations=[
+                [pid, tokens, to_epoch(expires)] for pid, tokens, expires in self.reservations
+            ],
+            token_stats=self.estimator.dump(),
+        )
 
     class Deferred(Exception):
         """Señal interna: conviene pausar esta corrida y reintentar luego."""
@@ -78,10 +199,8 @@ class CerebrasRateLimiter:
         safe_rpm = max(1, min(int(rpm * self.SAFETY_FACTOR), self.SAFE_RPM_CAP))
         return safe_tpm, safe_rpm
 
-    def estimate_tokens(self, prompt, max_completion_tokens=1024):
-        prompt_text = prompt or ''
-        prompt_tokens = max(1, len(prompt_text) // 4)
-        return prompt_tokens + int(max_completion_tokens or 0)
+    def estimate_tokens(self, prompt, max_completion_tokens=1024, model_name=None, articles=1):
+        return self.estimator.estimate(model_name, prompt, max_completion_tokens, articles)
 
     def seconds_until_next_window(self):
         elapsed = time.monotonic() - self.window_start
@@ -110,6 +229,10 @@ class CerebrasRateLimiter:
         return headers.get(name) or headers.get(name.title()) or headers.get(name.lower())
 
     def update_from_headers(self, headers):
+        with self._locked():
+            self._update_from_headers(headers)
+
+    def _update_from_headers(self, headers):
         now = time.monotonic()
         remaining_tokens = (
             self._read_header(headers, 'x-ratelimit-remaining-tokens-minute')
@@ -178,6 +301,10 @@ class CerebrasRateLimiter:
             time.sleep(wait_time)
 
     def reset_if_needed(self):
+        with self._locked():
+            self._reset_if_needed()
+
+    def _reset_if_needed(self):
         if time.monotonic() - self.window_start >= self.window_seconds:
             self.window_start = time.monotonic()
             self.used_tokens = 0
@@ -187,67 +314,231 @@ class CerebrasRateLimiter:
             if self.reset_tokens_at is None:
                 self.remaining_tokens = None
 
-    def acquire(self, model_name, prompt, max_completion_tokens=1024):
-        estimated_tokens = self.estimate_tokens(prompt, max_completion_tokens)
+    def pause(self, seconds):
+        """Frena todas las peticiones durante ``seconds`` (p. ej. tras un 429)."""
+        with self._locked():
+            until = time.monotonic() + max(0.0, float(seconds))
+            if self.paused_until is None or until > self.paused_until:
+                self.paused_until = until
+
+    def pause_after_rate_limit(self, seconds):
+        """Pausa tras un 429 que el llamador quizá no espere.
+
+        Si la pausa pedida es más larga de lo que ``_sleep_or_defer`` espera,
+        el llamador pospone la noticia en vez de esperar; lo que queda en el
+        ledger compartido se limita entonces al reinicio de la ventana, para
+        no frenar a los demás procesos durante un Retry-After largo.
+        """
+        with self._locked():
+            seconds = max(0.0, float(seconds))
+            if seconds > self.MAX_RETRY_SLEEP_SECONDS:
+                seconds = min(seconds, self.seconds_until_next_window() + 1)
+            self.pause(seconds)
+        return seconds
+
+    def release(self, reserved_tokens):
+        """Libera la reserva de ``acquire`` cuando la petición ya terminó."""
+        with self._locked():
+            self._release(reserved_tokens)
+
+    def _release(self, reserved_tokens):
+        pid = os.getpid()
+        for index, (owner, tokens, expires) in enumerate(self.reservations):
+            if owner == pid and tokens == int(reserved_tokens or 0):
+                del self.reservations[index]
+                return expires
+        return None
+
+    def reconcile(self, model_name, reserved_tokens, prompt, usage, articles=1):
+        """Libera la reserva y cuenta en la ventana lo que gastó la respuesta.
+
+        Si la ventana local se reinició mientras la petición estaba en vuelo,
+        lo reservado ya no cuenta y no hay nada que corregir. Sin ``usage``
+        equivale a ``release``. ``articles`` es cuántas noticias resumía la
+        petición (ver ``TokenEstimator.record``).
+        """
+        tokens = usage_tokens(usage)
+        with self._locked():
+            expires = self._release(reserved_tokens)
+            if tokens is None:
+                return
+            prompt_tokens, completion_tokens = tokens
+            acquired_at = None if expires is None else expires - self.RESERVATION_TTL_SECONDS
+            if acquired_at is not None and acquired_at >= self.window_start:
+                self.used_tokens = max(
+                    0, self.used_tokens + prompt_tokens + completion_tokens - int(reserved_tokens or 0)
+                )
+            error = self.estimator.record(
+                model_name, len(prompt or ''), prompt_tokens, completion_tokens, reserved_tokens,
+                articles,
+            )
+        logger.debug(
+            "Tokens Cerebras (%s): reservados %s, gastados %s (%s prompt + %s respuesta), error %+d",
+            model_name, reserved_tokens, prompt_tokens + completion_tokens,
+            prompt_tokens, completion_tokens, error,
+        )
+
+    def available_tokens(self, model_name):
+        """Tokens que caben ahora en la ventana sin esperar (local y headers)."""
+        token_limit, _ = self.get_limits(model_name)
+        with self._locked():
+            self._reset_if_needed()
+            available = token_limit - self.used_tokens
+            if self.remaining_tokens is not None:
+                available = min(available, self.remaining_tokens - self.in_flight_tokens)
+        return max(0, available)
+
+    def has_capacity(self, model_name, prompt, max_completion_tokens=1024, articles=1):
+        """Si ``acquire`` reservaría ahora mismo, sin esperar ni posponer."""
+        return self.seconds_until_capacity(model_name, prompt, max_completion_tokens, articles) == 0
+
+    def seconds_until_capacity(self, model_name, prompt, max_completion_tokens=1024, articles=1):
+        """Segundos que ``acquire`` esperaría (o pospondría) antes de reservar; 0 si no espera."""
+        token_limit, request_limit = self.get_limits(model_name)
+        with self._locked():
+            self._reset_if_needed()
+            estimated_tokens = self.estimate_tokens(prompt, max_completion_tokens, model_name, articles)
+            now = time.monotonic()
+            if self.paused_until is not None and self.paused_until > now:
+                return self.paused_until - now
+            if (
+                self.remaining_requests is not None
+                and self.remaining_requests - self.in_flight_requests <= 0
+            ):
+                if self.reset_requests_at:
+                    return max(0.0, self.reset_requests_at - now + 1)
+                return self.seconds_until_next_window() + 1
+            if (
+                self.remaining_tokens is not None
+                and estimated_tokens + self.in_flight_tokens > self.remaining_tokens
+            ):
+                if self.reset_tokens_at:
+                    return max(0.0, self.reset_tokens_at - now + 1)
+                return self.seconds_until_next_window() + 1
+            if (
+                self.used_tokens + estimated_tokens <= token_limit
+                and self.used_requests + 1 <= request_limit
+            ):
+                return 0.0
+            return self.seconds_until_next_window() + 1
+
+    def acquire(self, model_name, prompt, max_completion_tokens=1024, articles=1):
+        """Espera a que haya cupo y reserva la petición; devuelve los tokens reservados.
+
+        Las esperas se hacen fuera del lock para que los demás hilos puedan
+        liberar su reserva mientras tanto.
+        """
         token_limit, request_limit = self.get_limits(model_name)
 
         while True:
-            self.reset_if_needed()
-            now = time.monotonic()
-            if self.remaining_requests is not None and self.remaining_requests <= 0:
-                wait_time = (self.reset_requests_at - now + 1) if self.reset_requests_at else self.seconds_until_next_window() + 1
-                self._sleep_or_defer(wait_time, 'sin requests disponibles')
-                self.remaining_requests = None
-                continue
-            if self.remaining_tokens is not None and estimated_tokens > self.remaining_tokens:
-                wait_time = (self.reset_tokens_at - now + 1) if self.reset_tokens_at else self.seconds_until_next_window() + 1
-                self._sleep_or_defer(wait_time, 'tokens insuficientes')
-                self.remaining_tokens = None
-                continue
+            with self._locked():
+                self._reset_if_needed()
+                # Dentro del lock: con ledger, la calibración es la compartida.
+                estimated_tokens = self.estimate_tokens(prompt, max_completion_tokens, model_name, articles)
+                now = time.monotonic()
+                wait_time = None
+                clear = None
+                if self.paused_until is not None and self.paused_until > now:
+                    wait_time, reason = self.paused_until - now, 'pausa tras un 429'
+                elif (
+                    self.remaining_requests is not None
+                    and self.remaining_requests - self.in_flight_requests <= 0
+                ):
+                    wait_time = (self.reset_requests_at - now + 1) if self.reset_requests_at else self.seconds_until_next_window() + 1
+                    reason, clear = 'sin requests disponibles', 'remaining_requests'
+                elif (
+                    self.remaining_tokens is not None
+                    and estimated_tokens + self.in_flight_tokens > self.remaining_tokens
+                ):
+                    wait_time = (self.reset_tokens_at - now + 1) if self.reset_tokens_at else self.seconds_until_next_window() + 1
+                    reason, clear = 'tokens insuficientes', 'remaining_tokens'
+                else:
+                    would_exceed_tokens = self.used_tokens + estimated_tokens > token_limit
+                    would_exceed_requests = self.used_requests + 1 > request_limit
 
-            would_exceed_tokens = self.used_tokens + estimated_tokens > token_limit
-            would_exceed_requests = self.used_requests + 1 > request_limit
+                    if not would_exceed_tokens and not would_exceed_requests:
+                        return self._reserve(estimated_tokens)
 
-            if not would_exceed_tokens and not would_exceed_requests:
-                self.used_tokens += estimated_tokens
-                self.used_requests += 1
-                return estimated_tokens
+                    if estimated_tokens > token_limit and self.used_tokens == 0 and self.used_requests == 0:
+                        logger.warning(
+                            f"Rate limit Cerebras local: una petición estimada en {estimated_tokens} tokens "
+                            f"supera el límite seguro de {token_limit}; se enviará una sola petición."
+                        )
+                        return self._reserve(estimated_tokens)
 
-            if estimated_tokens > token_limit and self.used_tokens == 0 and self.used_requests == 0:
-                logger.warning(
-                    f"Rate limit Cerebras local: una petición estimada en {estimated_tokens} tokens "
-                    f"supera el límite seguro de {token_limit}; se enviará una sola petición."
-                )
-                self.used_tokens = estimated_tokens
-                self.used_requests = 1
-                return estimated_tokens
+                    local_wait = self.seconds_until_next_window() + 1
+                    logger.warning(
+                        f"Rate limit Cerebras local: esperando {local_wait:.1f}s "
+                        f"(modelo={model_name}, estimado={estimated_tokens} tokens, "
+                        f"usados={self.used_tokens}/{token_limit})."
+                    )
 
-            wait_time = self.seconds_until_next_window() + 1
-            logger.warning(
-                f"Rate limit Cerebras local: esperando {wait_time:.1f}s "
-                f"(modelo={model_name}, estimado={estimated_tokens} tokens, "
-                f"usados={self.used_tokens}/{token_limit})."
-            )
-            time.sleep(wait_time)
+            if wait_time is None:
+                time.sleep(local_wait)
+                continue
+            self._sleep_or_defer(wait_time, reason)
+            if clear is not None:
+                # Tras esperar al reset, los headers viejos ya no valen.
+                with self._locked():
+                    setattr(self, clear, None)
+
+    def _reserve(self, estimated_tokens):
+        self.used_tokens += estimated_tokens
+        self.used_requests += 1
+        self.reservations.append(
+            (os.getpid(), estimated_tokens, time.monotonic() + self.RESERVATION_TTL_SECONDS)
+        )
+        return estimated_tokens
 
 
 class EmbeddingService:
+    # Tope de textos por petición de batchEmbedContents en la API de Gemini.
+    DEFAULT_BATCH_SIZE = 100
+
     @staticmethod
-    # Cambiado: Aceptar client en lugar de model_name
-    def generate_embedding(text, client, max_retries=3):
-        """Genera embeddings para un texto usando la API de Gemini a través del cliente."""
-        
-        # Preprocesar el texto para tener un contenido más limpio
-        clean_text = re.sub(r'<.*?>', ' ', text)  # Eliminar etiquetas HTML
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()  # Normalizar espacios
-        
-        # Asegurar que el texto no sea demasiado largo
-        if len(clean_text) > 8000:
-            clean_text = clean_text[:8000]
+    def _clean_embedding_text(text):
+        """Texto plano y acotado que se manda a vectorizar."""
+        return clean_embedding_text(text)
 
+    @staticmethod
+    def _embedding_config():
         # Config por defecto para embeddings (modelo y dimensión)
         embedding_model = getattr(settings, 'GEMINI_EMBEDDING_MODEL', 'gemini-embedding-001')
         output_dim = int(getattr(settings, 'GEMINI_EMBEDDING_DIM', 768))
+        return embedding_model, types.EmbedContentConfig(
+            task_type="SEMANTIC_SIMILARITY",
+            output_dimensionality=output_dim,
+        )
+
+    @staticmethod
+    def _normalize_values(values):
+        # Normalizar L2 (recomendado para dims != 3072)
+        vec = np.array(values, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        return list(map(float, vec.tolist()))
+
+    @staticmethod
+    # Cambiado: Aceptar client en lugar de model_name
+    def generate_embedding(text, client, max_retries=3, write_behind=None):
+        """Genera embeddings para un texto usando la API de Gemini a través del cliente.
+
+        Con ``write_behind`` (``embedding_cache.WriteBehind``) la caché solo se
+        lee; el vector nuevo se apunta ahí para guardarlo después.
+        """
+        
+        # Preprocesar el texto para tener un contenido más limpio
+        clean_text = EmbeddingService._clean_embedding_text(text)
+        embedding_model, config = EmbeddingService._embedding_config()
+
+        # Un texto ya vectorizado (en esta pasada o en otra) no se vuelve a pagar.
+        cache_key = embedding_cache.key_for(clean_text)
+        cached = embedding_cache.lookup([cache_key], touch=write_behind is None).get(cache_key)
+        if cached:
+            if write_behind is not None:
+                write_behind.touch([cache_key])
+            return cached
         
         for attempt in range(max_retries):
             try:
@@ -255,10 +546,7 @@ class EmbeddingService:
                 result = client.models.embed_content(
                     model=embedding_model,
                     contents=clean_text,
-                    config=types.EmbedContentConfig(
-                        task_type="SEMANTIC_SIMILARITY",
-                        output_dimensionality=output_dim,
-                    ) 
+                    config=config,
                 )
                 
                 # Extraer los valores del embedding
@@ -266,12 +554,12 @@ class EmbeddingService:
                     if hasattr(result, 'embeddings') and result.embeddings:
                         first_embedding = result.embeddings[0]
                         if hasattr(first_embedding, 'values'):
-                            # Normalizar L2 (recomendado para dims != 3072)
-                            vec = np.array(first_embedding.values, dtype=np.float32)
-                            norm = np.linalg.norm(vec)
-                            if norm > 0:
-                                vec = vec / norm
-                            return list(map(float, vec.tolist()))
+                            vector = EmbeddingService._normalize_values(first_embedding.values)
+                            if write_behind is not None:
+                                write_behind.add({cache_key: vector})
+                            else:
+                                embedding_cache.store({cache_key: vector})
+                            return vector
                     
                     # Fallback seguro
                     return []
@@ -290,6 +578,108 @@ class EmbeddingService:
         logger.warning("Se agotaron los reintentos para generar embedding.")
         return None
 
+    @staticmethod
+    def generate_embeddings_batch(texts, client, max_retries=3, batch_size=None, write_behind=None):
+        """Vectoriza varios textos empaquetando hasta ``batch_size`` por petición.
+
+        Devuelve una lista alineada con ``texts``: el vector normalizado L2 de
+        cada uno, o None si ese texto no se pudo vectorizar. Si un lote falla
+        por algo que no sea el rate limit (o la respuesta no cuadra con lo
+        pedido), se repite de uno en uno para que un texto problemático no
+        arrastre a los demás. ``write_behind`` funciona como en
+        ``generate_embedding``. Un ``ContentDocument`` en ``texts`` aporta
+        su ``embedding_text``, ya limpio.
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        batch_size = max(1, int(
+            batch_size
+            or getattr(settings, 'GEMINI_EMBEDDING_BATCH_SIZE', EmbeddingService.DEFAULT_BATCH_SIZE)
+        ))
+        embedding_model, config = EmbeddingService._embedding_config()
+
+        # Agrupar por clave de caché: los textos repetidos se piden una sola vez
+        # y los que ya estaban vectorizados no se piden.
+        positions_by_key = {}
+        text_by_key = {}
+        for position, text in enumerate(texts):
+            if isinstance(text, ContentDocument):
+                clean_text = text.embedding_text
+            else:
+                clean_text = EmbeddingService._clean_embedding_text(text)
+            if not clean_text:
+                continue
+            cache_key = embedding_cache.key_for(clean_text)
+            positions_by_key.setdefault(cache_key, []).append(position)
+            text_by_key[cache_key] = clean_text
+
+        vectors_by_key = embedding_cache.lookup(
+            list(positions_by_key), touch=write_behind is None
+        )
+        if write_behind is not None and vectors_by_key:
+            write_behind.touch(vectors_by_key)
+        pending = [
+            (cache_key, clean_text)
+            for cache_key, clean_text in text_by_key.items()
+            if cache_key not in vectors_by_key
+        ]
+        fresh = {}
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            embeddings = None
+            rate_limited = False
+            for attempt in range(max_retries):
+                try:
+                    result = client.models.embed_content(
+                        model=embedding_model,
+                        contents=[clean_text for _, clean_text in chunk],
+                        config=config,
+                    )
+                    embeddings = list(getattr(result, 'embeddings', None) or [])
+                    break
+                except Exception as e:
+                    rate_limited = "429" in str(e)
+                    if rate_limited and attempt < max_retries - 1:
+                        wait_time = (attempt + 1) * 5
+                        logger.warning(f"Límite de peticiones alcanzado. Esperando {wait_time} segundos...")
+                        time.sleep(wait_time)
+                        continue
+                    logger.exception("Error generando un lote de %s embeddings", len(chunk))
+                    break
+
+            if embeddings is not None and len(embeddings) == len(chunk):
+                for (cache_key, _), embedding in zip(chunk, embeddings):
+                    values = getattr(embedding, 'values', None)
+                    if values:
+                        fresh[cache_key] = EmbeddingService._normalize_values(values)
+                continue
+
+            if rate_limited:
+                # Repetir de uno en uno contra una cuota agotada solo suma 429.
+                continue
+            for cache_key, clean_text in chunk:
+                vector = EmbeddingService.generate_embedding(
+                    clean_text, client, max_retries=max_retries, write_behind=write_behind
+                )
+                if vector:
+                    vectors_by_key[cache_key] = vector
+
+        if write_behind is not None:
+            write_behind.add(fresh)
+        else:
+            embedding_cache.store(fresh)
+        vectors_by_key.update(fresh)
+        for cache_key, positions in positions_by_key.items():
+            vector = vectors_by_key.get(cache_key)
+            for position in positions:
+                results[position] = list(vector) if vector else None
+
+        failures = sum(1 for vector in results if not vector)
+        if failures:
+            logger.warning("Embeddings en lote: %s de %s textos sin vector.", failures, len(texts))
+        return results
+
     @staticmethod
     def cosine_similarity(embedding1, embedding2):
         """Calcula la similitud del coseno entre dos embeddings"""
@@ -329,7 +719,8 @@ class EmbeddingService:
         threshold = news_item.source.similarity_threshold
 
         embedding = getattr(news_item, "_embedding_vector", None)
-        if not embedding:
+        # Si ya se intentó en un lote y falló, no se repite la llamada aquí.
+        if not embedding and not getattr(news_item, "_embedding_attempted", False):
             content_for_embedding = f"{news_item.title} {news_item.description}"
             embedding = EmbeddingService.generate_embedding(content_for_embedding, client)
             news_item._embedding_vector = embedding
@@ -348,6 +739,7 @@ class EmbeddingService:
                     top_k=5,
                     min_published_ts=min_ts,
                     exclude_guid=getattr(news_item, 'guid', None),
+                    with_payload=SIMILAR_PAYLOAD_FIELDS,
                 )
                 if hits:
                     best = hits[0]
@@ -366,41 +758,100 @@ class EmbeddingService:
         except Exception:
             logger.exception("Error consultando Qdrant en check_redundancy; se usa el fallback en memoria.")
 
-        if recent_news_cache is not None:
-            candidates = [
-                cached_news
-                for cached_news in recent_news_cache
-                if cached_news.id != getattr(news_item, 'id', None)
-                and getattr(cached_news, "_embedding_vector", None)
-            ]
-        else:
-            candidates = []
-        highest_similarity = 0.0
-        most_similar_news = None
-
-        for existing_news in candidates:
-            similarity = EmbeddingService.cosine_similarity(
-                embedding, getattr(existing_news, "_embedding_vector", None)
-            )
-            if similarity > highest_similarity:
-                highest_similarity = similarity
-                most_similar_news = existing_news
-
+        most_similar_news, highest_similarity = EmbeddingService.most_similar(
+            news_item, embedding, recent_news_cache
+        )
         is_redundant = highest_similarity >= threshold
 
         return is_redundant, most_similar_news, highest_similarity
 
+    @staticmethod
+    def check_redundancy_batch(news_items, vector_index):
+        """Primera pasada contra el índice vectorial para varias noticias a la vez.
+
+        Una sola petición (``search_batch``) para todas las que tienen
+        embedding, y dos consultas a la BD para resolver las parecidas. Solo
+        mira lo ya indexado (ventana de 14 días): las aceptadas en la misma
+        pasada las compara el llamante en memoria. Si el índice falla lanza
+        la excepción, para que el llamante decida el fallback.
+
+        Returns:
+            list: ``(es_redundante, noticia_similar, puntuación_similitud)`` por noticia.
+        """
+        results = [(False, None, 0.0)] * len(news_items)
+        pending = []
+        for position, news_item in enumerate(news_items):
+            embedding = getattr(news_item, "_embedding_vector", None)
+            if embedding:
+                pending.append((position, news_item, embedding))
+        if not pending:
+            return results
+
+        vector_index.ensure_collection(len(pending[0][2]))
+        min_ts = int(time.time()) - 14 * 24 * 3600
+        hits_per_item = vector_index.search_batch(
+            [embedding for _, _, embedding in pending],
+            top_k=5,
+            min_published_ts=min_ts,
+            exclude_guids=[getattr(news_item, 'guid', None) for _, news_item, _ in pending],
+            with_payload=SIMILAR_PAYLOAD_FIELDS,
+        )
+        best_hits = [hits[0] if hits else None for hits in hits_per_item]
+        payloads = [getattr(hit, 'payload', {}) or {} for hit in best_hits if hit is not None]
+
+        by_id = News.objects.in_bulk(
+            [payload['news_id'] for payload in payloads if payload.get('news_id')]
+        )
+        missing_guids = [
+            payload['guid'] for payload in payloads
+            if payload.get('guid') and payload.get('news_id') not in by_id
+        ]
+        by_guid = {
+            news.guid: news for news in News.objects.filter(guid__in=missing_guids)
+        } if missing_guids else {}
+
+        for (position, news_item, _), hit in zip(pending, best_hits):
+            if hit is None:
+                continue
+            score = float(getattr(hit, 'score', 0.0) or 0.0)
+            payload = getattr(hit, 'payload', {}) or {}
+            similar = by_id.get(payload.get('news_id')) or by_guid.get(payload.get('guid'))
+            is_redundant = score >= news_item.source.similarity_threshold and similar is not None
+            results[position] = (is_redundant, similar, score)
+        return results
+
+    @staticmethod
+    def most_similar(news_item, embedding, recent_news_cache):
+        """La noticia en memoria más parecida a ``embedding`` y su similitud.
+
+        ``recent_news_cache`` puede ser una lista de noticias con
+        ``_embedding_vector`` o una ``RedundancyMatrix`` ya construida.
+        """
+        if recent_news_cache is None:
+            return None, 0.0
+        if isinstance(recent_news_cache, RedundancyMatrix):
+            return recent_news_cache.best_match(embedding, exclude=news_item)
+
+        matrix = RedundancyMatrix()
+        for cached_news in recent_news_cache:
+            if cached_news is news_item or (
+                cached_news.id is not None and cached_news.id == getattr(news_item, 'id', None)
+            ):
+                continue
+            matrix.add(cached_news, getattr(cached_news, "_embedding_vector", None))
+        return matrix.best_match(embedding)
+
 
 
 
 
 class FeedService:
-    _PROMPT_TEMPLATE = textwrap.dedent("""\
-        Analiza el siguiente titular y contenido de noticia:
-        Titular: '{title}'
-        Contenido: '{content}...'
+    # Contadores por etapa de la última ingesta (ver my_news/pipeline.py).
+    last_pipeline_stats = []
 
-        Realiza las siguientes tareas y devuelve el resultado EXACTAMENTE en formato JSON:
+    # Tareas y reglas de cada noticia; las comparten la petición individual y
+    # la de varias noticias (ver process_batch_with_cerebras).
+    _ANALYSIS_TASKS = textwrap.dedent("""\
         1.  **summary**: Genera un resumen conciso y objetivo del contenido completo, en español, de aproximadamente 60 a 70 palabras. Explica qué ocurrió, quiénes participaron, dónde/cuándo, causas, consecuencias o cifras relevantes. El summary debe añadir contexto nuevo respecto al titular y al short_answer, evitando cualquier tono de clickbait. NO apliques formato HTML aquí, solo texto plano.
         2.  **short_answer**: Analiza el titular. Este campo NO es un resumen decorativo; es una respuesta anti-clickbait. Si el titular:
             (a) Es una pregunta directa (ej: '¿Por qué deberías...?', '¿Cuál es...?').
@@ -419,6 +870,14 @@ class FeedService:
         - Ambos campos deben ser complementarios y libres de relleno o frases ambiguas; evita cualquier forma de clickbait.
         - El summary NUNCA debe ser null: describe lo ocurrido incluso si el short_answer ya dio el dato principal.
 
+        """)
+    _PROMPT_TEMPLATE = textwrap.dedent("""\
+        Analiza el siguiente titular y contenido de noticia:
+        Titular: '{title}'
+        Contenido: '{content}...'
+
+        Realiza las siguientes tareas y devuelve el resultado EXACTAMENTE en formato JSON:
+        """) + _ANALYSIS_TASKS + textwrap.dedent("""\
         Ejemplo del formato de salida:
         {{"summary": "Texto del resumen aquí.", "short_answer": null, "ai_filter": null}}
 
@@ -442,11 +901,60 @@ class FeedService:
             },
         },
     }
+    _BATCH_PROMPT_TEMPLATE = textwrap.dedent("""\
+        Analiza las siguientes {count} noticias. Cada una lleva un id numérico, su titular y su contenido:
+
+        {articles}
+
+        Para CADA noticia, por separado y sin mezclar datos entre ellas, realiza las siguientes tareas:
+        """) + _ANALYSIS_TASKS + textwrap.dedent("""\
+        Devuelve EXACTAMENTE un objeto JSON con la clave "articles": una lista con un elemento por noticia, en el mismo orden, cada uno con el "id" de su noticia.
+        Ejemplo del formato de salida:
+        {{"articles": [{{"id": 1, "summary": "Texto del resumen aquí.", "short_answer": null, "ai_filter": null}}]}}
+
+        IMPORTANTE: Responde únicamente con el objeto JSON válido, sin texto adicional antes o después.
+        """)
+    _BATCH_ARTICLE_TEMPLATE = "[id {id}]\nTitular: '{title}'\nContenido: '{content}...'"
+    _BATCH_ANALYSIS_RESPONSE_FORMAT = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "news_batch_analysis",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "articles": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "additionalProperties": False,
+                            "properties": {
+                                "id": {"type": "integer"},
+                                "summary": {"type": "string"},
+                                "short_answer": {"type": ["string", "null"]},
+                                "ai_filter": {"type": ["string", "null"]},
+                            },
+                            "required": ["id", "summary", "short_answer", "ai_filter"],
+                        },
+                    },
+                },
+                "required": ["articles"],
+            },
+        },
+    }
 
     _GEMINI_CLIENT = None
     _CEREBRAS_CLIENT = None
     _VECTOR_INDEX = None
-    _CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+    # Compartido entre procesos (cron, vistas de cada worker de gunicorn) a
+    # través del ledger en disco. Es el del modelo por defecto; cada uno de los
+    # demás tiene su cuota en Cerebras y su limitador (ver rate_limiter).
+    _CEREBRAS_RATE_LIMITER = CerebrasRateLimiter(ledger=QuotaLedger.from_settings())
+    _MODEL_RATE_LIMITERS = {}
+    _RATE_LIMITERS_LOCK = threading.Lock()
+    # Se crea al primer uso: la caché en disco crea su directorio al instanciarse.
+    _ARTICLE_FETCHER = None
 
     @staticmethod
     def initialize_gemini():
@@ -470,15 +978,25 @@ class FeedService:
 
     @staticmethod
     def initialize_vector_index():
-        if VectorIndexService is None:
-            return None
         if FeedService._VECTOR_INDEX is not None:
             return FeedService._VECTOR_INDEX
+        if getattr(settings, 'NEWS_VECTOR_BACKEND', 'qdrant') == 'local':
+            # Ficheros locales mapeados en memoria (ver my_news/local_vector_index.py).
+            FeedService._VECTOR_INDEX = LocalVectorIndex.from_settings()
+            return FeedService._VECTOR_INDEX
+        if VectorIndexService is None:
+            return None
         try:
             url = getattr(settings, 'QDRANT_URL', 'http://localhost:6333')
             collection = getattr(settings, 'QDRANT_COLLECTION', 'news_embeddings_gemini001_d768_v1')
             api_key = getattr(settings, 'QDRANT_API_KEY', None)
-            FeedService._VECTOR_INDEX = VectorIndexService(url=url, collection=collection, api_key=api_key)
+            FeedService._VECTOR_INDEX = VectorIndexService(
+                url=url,
+                collection=collection,
+                api_key=api_key,
+                prefer_grpc=getattr(settings, 'QDRANT_PREFER_GRPC', False),
+                grpc_port=getattr(settings, 'QDRANT_GRPC_PORT', 6334),
+            )
         except Exception:
             FeedService._VECTOR_INDEX = None
         return FeedService._VECTOR_INDEX
@@ -501,9 +1019,21 @@ class FeedService:
             'published_ts': published_ts,
             'is_filtered': False,
             'is_redundant': False,
+            # La purga por fecha conserva las marcadas (ver purge_before).
+            'is_saved': bool(news_item.is_saved),
             'model_version': getattr(settings, 'GEMINI_EMBEDDING_MODEL', 'gemini-embedding-001'),
         }
 
+    @staticmethod
+    def mark_indexed(guids):
+        """Marca como indexadas las noticias cuyos vectores ya están en el índice."""
+        guids = list(guids)
+        for start in range(0, len(guids), 500):
+            News.objects.filter(guid__in=guids[start:start + 500]).update(
+                embedding_state=News.EMBEDDING_INDEXED,
+                embedding_retry_at=None,
+            )
+
     @staticmethod
     def build_filter_instructions_text(instructions):
         instructions_list = list(instructions or [])
@@ -518,39 +1048,79 @@ class FeedService:
 
     @staticmethod
     def build_filter_word_patterns(filter_words):
-        patterns = []
-        for filter_word in filter_words:
-            raw_word = getattr(filter_word, 'word', '')
-            cleaned_word = raw_word.strip() if raw_word else ''
-            if not cleaned_word:
-                continue
-            escaped_terms = [re.escape(term) for term in cleaned_word.split()]
-            escaped_phrase = r'\s+'.join(escaped_terms)
-            compiled = re.compile(
-                r'(?<![\w])' + escaped_phrase + r'(?![\w])',
-                re.IGNORECASE,
+        """Todas las palabras en un solo matcher (ver my_news/keyword_filter.py)."""
+        return KeywordMatcher(filter_words)
+
+    @staticmethod
+    def rate_limiter(model_name=None):
+        """Limitador de la cuota de ``model_name`` (por defecto, el del modelo por defecto)."""
+        if not model_name or model_name == DEFAULT_AI_MODEL:
+            return FeedService._CEREBRAS_RATE_LIMITER
+        with FeedService._RATE_LIMITERS_LOCK:
+            limiter = FeedService._MODEL_RATE_LIMITERS.get(model_name)
+            if limiter is None:
+                limiter = CerebrasRateLimiter(ledger=QuotaLedger.from_settings(model_name))
+                FeedService._MODEL_RATE_LIMITERS[model_name] = limiter
+            return limiter
+
+    @staticmethod
+    def models_by_capacity(model_names, prompt, max_completion_tokens=SUMMARY_COMPLETION_TOKENS):
+        """``model_names`` con los que tienen cupo ahora delante, cada grupo en su orden.
+
+        Así el principal se usa mientras le quede cuota y lo que sobra va al
+        primer respaldo libre; si ninguno tiene cupo se espera al principal.
+        """
+        ready, waiting = [], []
+        for model_name in model_names:
+            limiter = FeedService.rate_limiter(model_name)
+            if limiter.has_capacity(model_name, prompt, max_completion_tokens):
+                ready.append(model_name)
+            else:
+                waiting.append(model_name)
+        return ready + waiting
+
+    @staticmethod
+    def seconds_until_quota(model_names, prompt, max_completion_tokens=SUMMARY_COMPLETION_TOKENS):
+        """Segundos hasta que alguno de ``model_names`` tenga cupo; 0 si ya lo tiene.
+
+        Distingue un resumen pospuesto por cuota (hay que esperar al reinicio)
+        de un fallo del modelo o del contenido.
+        """
+        return min(
+            FeedService.rate_limiter(model_name).seconds_until_capacity(
+                model_name, prompt, max_completion_tokens
             )
-            patterns.append((filter_word, compiled, bool(getattr(filter_word, 'title_only', False))))
-        return patterns
+            for model_name in model_names
+        )
+
+    @staticmethod
+    def _routing_prompt(title, document, filter_instructions_text, content_limit=DEFAULT_AI_CONTENT_LIMIT):
+        """El prompt con el que se estima el cupo de cada modelo de la ruta."""
+        return FeedService._analysis_prompt(
+            title,
+            document.prompt_text(content_limit, FeedService.prompt_token_budget()),
+            filter_instructions_text,
+        )
 
     @staticmethod
-    def _extract_retry_after_seconds(error):
+    def _extract_retry_after_seconds(error, model_name=None):
         response = getattr(error, 'response', None)
         headers = getattr(response, 'headers', None)
+        limiter = FeedService.rate_limiter(model_name)
         if headers:
-            FeedService._CEREBRAS_RATE_LIMITER.update_from_headers(headers)
+            limiter.update_from_headers(headers)
             retry_after = headers.get('retry-after') or headers.get('Retry-After')
             if retry_after:
                 try:
                     return max(1, int(float(retry_after)))
                 except (TypeError, ValueError):
                     pass
-            reset_tokens = FeedService._CEREBRAS_RATE_LIMITER.parse_reset_seconds(
+            reset_tokens = limiter.parse_reset_seconds(
                 headers.get('x-ratelimit-reset-tokens-minute')
                 or headers.get('X-Ratelimit-Reset-Tokens-Minute')
                 or headers.get('x-ratelimit-reset-tokens')
             )
-            reset_requests = FeedService._CEREBRAS_RATE_LIMITER.parse_reset_seconds(
+            reset_requests = limiter.parse_reset_seconds(
                 headers.get('x-ratelimit-reset-requests-minute')
                 or headers.get('x-ratelimit-reset-requests-day')
                 or headers.get('X-Ratelimit-Reset-Requests-Day')
@@ -568,7 +1138,7 @@ class FeedService:
 
         match = re.search(r'try again in ([0-9.]+s|(?:[0-9.]+m)?[0-9.]+s)', str(error), re.IGNORECASE)
         if match:
-            retry_seconds = FeedService._CEREBRAS_RATE_LIMITER.parse_reset_seconds(match.group(1))
+            retry_seconds = limiter.parse_reset_seconds(match.group(1))
             if retry_seconds is not None:
                 return max(1, int(retry_seconds) + 1)
 
@@ -635,44 +1205,116 @@ class FeedService:
 
         Con ``content_limit=None`` devuelve el texto limpio sin truncar.
         """
-        raw_content = html.unescape(original_content or '')
-        if not raw_content:
-            return ''
-
-        if '<' in raw_content and '>' in raw_content:
-            soup = BeautifulSoup(raw_content, 'html.parser')
-            for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'iframe', 'noscript']):
-                element.decompose()
-            clean_text = soup.get_text(' ', strip=True)
+        # La limpieza vive en ContentDocument (my_news/content_document.py).
+        return ContentDocument(title, original_content).prompt_text(content_limit)
+
+    @staticmethod
+    def prompt_token_budget():
+        """Tokens a los que se comprime el texto del prompt, o None si solo se trunca.
+
+        ``NEWS_PROMPT_COMPRESSION='extractive'`` activa la compresión
+        extractiva (``extractive.py``) con ``NEWS_PROMPT_TOKEN_BUDGET``.
+        """
+        if getattr(settings, 'NEWS_PROMPT_COMPRESSION', 'truncate') != 'extractive':
+            return None
+        return max(1, int(getattr(settings, 'NEWS_PROMPT_TOKEN_BUDGET', 1500)))
+
+    @staticmethod
+    def _escape_braces(text):
+        return text.replace("{", "{{").replace("}", "}}")
+
+    @staticmethod
+    def _response_format(mode, schema):
+        if mode == "json_schema":
+            return schema
+        if mode == "json_object":
+            return {"type": "json_object"}
+        return None
+
+    @staticmethod
+    def _request_cerebras(cerebras_client, model_name, prompt, max_completion_tokens, response_format=None,
+                          articles=1):
+        """Envía un prompt a Cerebras con la cuota reservada y devuelve el texto de la respuesta.
+
+        La reserva se cambia por el ``usage`` de la respuesta (``reconcile``)
+        o, si la petición falla, se libera.
+        """
+        limiter = FeedService.rate_limiter(model_name)
+        reserved_tokens = limiter.acquire(model_name, prompt, max_completion_tokens, articles)
+        try:
+            request_kwargs = {
+                "model": model_name,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "Eres un asistente que analiza noticias y responde ÚNICAMENTE con JSON válido."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                "temperature": 0.3,
+                "max_completion_tokens": max_completion_tokens,
+            }
+            if FeedService._uses_low_reasoning(model_name):
+                request_kwargs["reasoning_effort"] = "low"
+            if response_format is not None:
+                request_kwargs["response_format"] = response_format
+
+            completions = cerebras_client.chat.completions
+            raw_completions = getattr(completions, 'with_raw_response', None)
+            if raw_completions is not None:
+                raw_response = raw_completions.create(**request_kwargs)
+                limiter.update_from_headers(getattr(raw_response, 'headers', None))
+                response = raw_response.parse()
+            else:
+                response = completions.create(**request_kwargs)
+        except BaseException:
+            limiter.release(reserved_tokens)
+            raise
+        limiter.reconcile(model_name, reserved_tokens, prompt, getattr(response, 'usage', None), articles)
+        return response.choices[0].message.content or ''
+
+    @staticmethod
+    def _analysis_result(result_json, plain_content):
+        """``(resumen HTML, short_answer, ai_filter)`` de un JSON del modelo, o None si no sirve."""
+        summary_text = FeedService._clean_optional_text(result_json.get('summary'))
+        short_answer = FeedService._clean_optional_text(result_json.get('short_answer'))
+        ai_filter_reason = FeedService._clean_optional_text(result_json.get('ai_filter'))
+
+        if not summary_text:
+            if plain_content:
+                summary_text = plain_content[:600]
+            elif short_answer:
+                summary_text = short_answer
+            else:
+                return None
+
+        processed_summary = summary_text
+        processed_summary = re.sub(r'^\* (.+?)$', r' <strong>\1</strong>', processed_summary, flags=re.MULTILINE)
+        processed_summary = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', processed_summary)
+        processed_summary = processed_summary.replace('\n\n', '<br><br>').replace('\n', '<br>')
+        processed_summary = processed_summary.replace('', '<br>')
+
+        return sanitize_html(processed_summary), short_answer, ai_filter_reason
+
+    @staticmethod
+    def _cache_summaries(entries, write_behind=None):
+        if write_behind is not None:
+            write_behind.add(entries)
         else:
-            clean_text = raw_content
-
-        clean_text = html.unescape(clean_text)
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-
-        safe_title = re.sub(r'\s+', ' ', title or '').strip()
-        if safe_title and clean_text.lower().startswith(safe_title.lower()):
-            clean_text = clean_text[len(safe_title):].lstrip(' :-|')
-
-        clean_text = re.sub(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z\s+', '', clean_text)
-        clean_text = re.sub(r'\bLinkedin\s+twitter\s+instagram\b', ' ', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\b\d+\s+publicaciones\s+de\s+', ' ', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-
-        if content_limit and len(clean_text) > content_limit:
-            truncated = clean_text[:content_limit]
-            # Cortar en el final de la última frase completa para no partir
-            # a mitad de oración justo el dato que el resumen necesita.
-            sentence_end = max(
-                truncated.rfind('. '),
-                truncated.rfind('! '),
-                truncated.rfind('? '),
-            )
-            if sentence_end > content_limit * 0.6:
-                truncated = truncated[:sentence_end + 1]
-            clean_text = truncated.strip()
+            summary_cache.store(entries)
 
-        return clean_text
+    @staticmethod
+    def _analysis_prompt(title, plain_content, filter_instructions_text):
+        return FeedService._PROMPT_TEMPLATE.format(
+            title=FeedService._escape_braces(title or ""),
+            content=FeedService._escape_braces(plain_content),
+            instructions=FeedService._escape_braces(
+                filter_instructions_text or FeedService._DEFAULT_FILTER_INSTRUCTIONS
+            ),
+        )
 
     @staticmethod
     def process_content_with_cerebras(
@@ -683,61 +1325,45 @@ class FeedService:
         filter_instructions_text,
         max_retries=2,
         content_limit=DEFAULT_AI_CONTENT_LIMIT,
+        document=None,
+        write_behind=None,
     ):
-        """Genera el resumen principal, la respuesta corta y determina si debe filtrarse por IA."""
-
-        instructions_section = (filter_instructions_text or FeedService._DEFAULT_FILTER_INSTRUCTIONS)
-        base_content = FeedService.prepare_content_for_cerebras(title, original_content, content_limit=content_limit)
-        plain_content = base_content
+        """Genera el resumen principal, la respuesta corta y determina si debe filtrarse por IA.
 
-        safe_title = (title or "").replace("{", "{{").replace("}", "}}")
-        safe_content = base_content.replace("{", "{{").replace("}", "}}")
-        safe_instructions = instructions_section.replace("{", "{{").replace("}", "}}")
+        Con ``document`` (el ``ContentDocument`` de la entrada) se reutiliza el
+        texto ya limpio en lugar de volver a parsear ``original_content``. El
+        resultado se busca antes en la caché de resúmenes; con
+        ``write_behind`` (``summary_cache.WriteBehind``) la caché solo se lee
+        aquí y las escrituras quedan para quien la vacíe.
+        """
 
-        prompt = FeedService._PROMPT_TEMPLATE.format(
-            title=safe_title,
-            content=safe_content,
-            instructions=safe_instructions
+        if document is None:
+            document = ContentDocument(title, original_content)
+        plain_content = document.prompt_text(content_limit, FeedService.prompt_token_budget())
+        cache_key = summary_cache.make_key(
+            title, plain_content, model_name,
+            filter_instructions_text or FeedService._DEFAULT_FILTER_INSTRUCTIONS,
         )
-        max_completion_tokens = 512
+        cached = summary_cache.lookup([cache_key], touch=write_behind is None).get(cache_key)
+        if cached is not None:
+            if write_behind is not None:
+                write_behind.touch([cache_key])
+            return cached
+        prompt = FeedService._analysis_prompt(title, plain_content, filter_instructions_text)
         response_format_mode = "json_schema"
 
+        limiter = FeedService.rate_limiter(model_name)
         for attempt in range(max_retries):
             try:
-                FeedService._CEREBRAS_RATE_LIMITER.acquire(model_name, prompt, max_completion_tokens)
-                request_kwargs = {
-                    "model": model_name,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "Eres un asistente que analiza noticias y responde ÚNICAMENTE con JSON válido."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "temperature": 0.3,
-                    "max_completion_tokens": max_completion_tokens,
-                }
-                if FeedService._uses_low_reasoning(model_name):
-                    request_kwargs["reasoning_effort"] = "low"
-                if response_format_mode == "json_schema":
-                    request_kwargs["response_format"] = FeedService._NEWS_ANALYSIS_RESPONSE_FORMAT
-                elif response_format_mode == "json_object":
-                    request_kwargs["response_format"] = {"type": "json_object"}
-
-                completions = cerebras_client.chat.completions
-                raw_completions = getattr(completions, 'with_raw_response', None)
-                if raw_completions is not None:
-                    raw_response = raw_completions.create(**request_kwargs)
-                    FeedService._CEREBRAS_RATE_LIMITER.update_from_headers(
-                        getattr(raw_response, 'headers', None)
-                    )
-                    response = raw_response.parse()
-                else:
-                    response = completions.create(**request_kwargs)
-                response_text = response.choices[0].message.content or ''
+                response_text = FeedService._request_cerebras(
+                    cerebras_client,
+                    model_name,
+                    prompt,
+                    SUMMARY_COMPLETION_TOKENS,
+                    FeedService._response_format(
+                        response_format_mode, FeedService._NEWS_ANALYSIS_RESPONSE_FORMAT
+                    ),
+                )
                 if not response_text.strip():
                     logger.warning(f"Cerebras devolvió contenido vacío (intento {attempt + 1}/{max_retries}).")
                     if attempt == max_retries - 1:
@@ -745,27 +1371,18 @@ class FeedService:
                     time.sleep(5)
                     continue
                 try:
-                    result_json = FeedService._parse_model_json(response_text)
-                    summary_text = FeedService._clean_optional_text(result_json.get('summary'))
-                    short_answer = FeedService._clean_optional_text(result_json.get('short_answer'))
-                    ai_filter_reason = FeedService._clean_optional_text(result_json.get('ai_filter'))
-
-                    if not summary_text:
-                        if plain_content:
-                            summary_text = plain_content[:600]
-                        elif short_answer:
-                            summary_text = short_answer
-                        else:
-                            logger.warning("JSON recibido no contiene 'summary' ni 'short_answer' válidos.")
-                            continue
-
-                    processed_summary = summary_text
-                    processed_summary = re.sub(r'^\* (.+?)$', r' <strong>\1</strong>', processed_summary, flags=re.MULTILINE)
-                    processed_summary = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', processed_summary)
-                    processed_summary = processed_summary.replace('\n\n', '<br><br>').replace('\n', '<br>')
-                    processed_summary = processed_summary.replace('', '<br>')
-
-                    return sanitize_html(processed_summary), short_answer, ai_filter_reason
+                    result = FeedService._analysis_result(
+                        FeedService._parse_model_json(response_text), plain_content
+                    )
+                    if result is None:
+                        logger.warning("JSON recibido no contiene 'summary' ni 'short_answer' válidos.")
+                        continue
+                    FeedService._cache_summaries({cache_key: (
+                        model_name,
+                        filter_instructions_text or FeedService._DEFAULT_FILTER_INSTRUCTIONS,
+                        result,
+                    )}, write_behind)
+                    return result
 
                 except json.JSONDecodeError as json_e:
                     logger.warning(f"Error decodificando JSON de Cerebras (intento {attempt + 1}): {json_e}")
@@ -790,9 +1407,14 @@ class FeedService:
                         logger.warning("Cerebras rechazó el modo JSON estricto; reintentando sin response_format.")
                     continue
                 if "429" in error_str or "rate_limit" in error_str.lower():
-                    retry_after = FeedService._extract_retry_after_seconds(e)
-                    wait_time = retry_after or max(FeedService._CEREBRAS_RATE_LIMITER.seconds_until_next_window() + 1, 120)
-                    if wait_time > FeedService._CEREBRAS_RATE_LIMITER.MAX_RETRY_SLEEP_SECONDS:
+                    retry_after = FeedService._extract_retry_after_seconds(e, model_name)
+                    wait_time = retry_after or max(limiter.seconds_until_next_window() + 1, 120)
+                    # Las demás peticiones en vuelo esperan lo mismo (o se
+                    # posponen si es demasiado) en lugar de sumar más 429.
+                    # Si esta se pospone, la pausa compartida no pasa del
+                    # reinicio de la ventana.
+                    limiter.pause_after_rate_limit(wait_time)
+                    if wait_time > limiter.MAX_RETRY_SLEEP_SECONDS:
                         logger.warning(
                             f"Cerebras pidió esperar {wait_time}s por rate limit; "
                             "se pospone esta noticia para una próxima actualización."
@@ -818,103 +1440,388 @@ class FeedService:
         logger.warning("Se agotaron los reintentos para procesar contenido con Cerebras.")
         return None, None, None
 
+    @staticmethod
+    def process_content_routed(
+        title,
+        original_content,
+        cerebras_client,
+        model_names,
+        filter_instructions_text,
+        content_limit=DEFAULT_AI_CONTENT_LIMIT,
+        document=None,
+        write_behind=None,
+    ):
+        """``process_content_with_cerebras`` con la ruta de modelos de ``AIModelSetting``.
+
+        Devuelve ``(resultado, modelo)``. Se empieza por el primer modelo con
+        cupo (ver ``models_by_capacity``) y, si no da resumen (pospuesto por
+        cuota, error), se prueba el siguiente; el modelo es None si ninguno.
+        """
+        if document is None:
+            document = ContentDocument(title, original_content)
+        model_names = list(model_names)
+        if len(model_names) > 1:
+            model_names = FeedService.models_by_capacity(
+                model_names,
+                FeedService._routing_prompt(title, document, filter_instructions_text, content_limit),
+            )
+        for position, model_name in enumerate(model_names):
+            result = FeedService.process_content_with_cerebras(
+                title,
+                original_content,
+                cerebras_client,
+                model_name,
+                filter_instructions_text,
+                content_limit=content_limit,
+                document=document,
+                write_behind=write_behind,
+            )
+            if result[0]:
+                return result, model_name
+            if position < len(model_names) - 1:
+                logger.info("Sin resumen con %s; se prueba con %s.", model_name, model_names[position + 1])
+        return (None, None, None), None
+
+    @staticmethod
+    def _batch_prompt(documents, filter_instructions_text, content_limit):
+        token_budget = FeedService.prompt_token_budget()
+        articles = "\n\n".join(
+            FeedService._BATCH_ARTICLE_TEMPLATE.format(
+                id=number,
+                title=document.title,
+                content=document.prompt_text(content_limit, token_budget),
+            )
+            for number, document in enumerate(documents, start=1)
+        )
+        return FeedService._BATCH_PROMPT_TEMPLATE.format(
+            count=len(documents),
+            articles=FeedService._escape_braces(articles),
+            instructions=FeedService._escape_braces(
+                filter_instructions_text or FeedService._DEFAULT_FILTER_INSTRUCTIONS
+            ),
+        )
+
+    @staticmethod
+    def summary_batch_size(documents, model_name, filter_instructions_text, max_size,
+                           content_limit=DEFAULT_AI_CONTENT_LIMIT):
+        """Cuántas de ``documents`` (desde la primera) caben en una petición ahora.
+
+        Se añaden noticias mientras la estimación de la petición entera quepa
+        en los tokens libres de la ventana; al menos una siempre, que ya
+        esperará su turno en ``acquire``.
+        """
+        limiter = FeedService.rate_limiter(model_name)
+        available = limiter.available_tokens(model_name)
+        size = 1
+        while size < min(max_size, len(documents)):
+            candidate = documents[:size + 1]
+            estimated = limiter.estimate_tokens(
+                FeedService._batch_prompt(candidate, filter_instructions_text, content_limit),
+                SUMMARY_COMPLETION_TOKENS * len(candidate),
+                model_name,
+                articles=len(candidate),
+            )
+            if estimated > available:
+                break
+            size += 1
+        return size
+
+    @staticmethod
+    def process_batch_with_cerebras(
+        documents,
+        cerebras_client,
+        model_name,
+        filter_instructions_text,
+        content_limit=DEFAULT_AI_CONTENT_LIMIT,
+        write_behind=None,
+    ):
+        """Resume varias noticias (``ContentDocument``) en una sola petición.
+
+        La plantilla y las instrucciones de filtro van una vez para todas y la
+        respuesta es una lista ``{id, summary, short_answer, ai_filter}``.
+        Devuelve una lista alineada con ``documents`` como la de
+        ``process_content_with_cerebras``. Las que ya están en la caché de
+        resúmenes no se piden; las que no vuelven bien (falta su id, JSON
+        inválido, la petición falla) se piden de una en una.
+        """
+        instructions = filter_instructions_text or FeedService._DEFAULT_FILTER_INSTRUCTIONS
+        token_budget = FeedService.prompt_token_budget()
+        keys = [
+            summary_cache.make_key(
+                document.title, document.prompt_text(content_limit, token_budget), model_name, instructions
+            )
+            for document in documents
+        ]
+        cached = summary_cache.lookup(keys, touch=write_behind is None)
+        if cached and write_behind is not None:
+            write_behind.touch(cached)
+        results = [cached.get(key) for key in keys]
+        pending = [index for index, result in enumerate(results) if result is None]
+
+        if len(pending) > 1:
+            batch = [documents[index] for index in pending]
+            prompt = FeedService._batch_prompt(batch, filter_instructions_text, content_limit)
+            fresh = {}
+            try:
+                response_text = FeedService._request_cerebras(
+                    cerebras_client,
+                    model_name,
+                    prompt,
+                    SUMMARY_COMPLETION_TOKENS * len(batch),
+                    FeedService._BATCH_ANALYSIS_RESPONSE_FORMAT,
+                    articles=len(batch),
+                )
+                articles = FeedService._parse_model_json(response_text).get('articles')
+                for article in articles if isinstance(articles, list) else []:
+                    number = article.get('id') if isinstance(article, dict) else None
+                    if not isinstance(number, int) or not 1 <= number <= len(batch):
+                        continue
+                    index = pending[number - 1]
+                    if results[index] is None:
+                        results[index] = FeedService._analysis_result(
+                            article, documents[index].prompt_text(content_limit, token_budget)
+                        )
+                        if results[index] is not None:
+                            fresh[keys[index]] = (model_name, instructions, results[index])
+            except CerebrasRateLimiter.Deferred as error:
+                logger.warning(str(error))
+                return [result or (None, None, None) for result in results]
+            except Exception as error:
+                if "429" in str(error) or "rate_limit" in str(error).lower():
+                    # Las peticiones de una en una respetan la misma pausa.
+                    limiter = FeedService.rate_limiter(model_name)
+                    limiter.pause_after_rate_limit(
+                        FeedService._extract_retry_after_seconds(error, model_name)
+                        or max(limiter.seconds_until_next_window() + 1, 120)
+                    )
+                logger.warning(
+                    "Fallo el resumen por lotes de %s noticias (%s); se piden de una en una.",
+                    len(batch), error,
+                )
+            if fresh:
+                FeedService._cache_summaries(fresh, write_behind)
+            missing = results.count(None)
+            if missing:
+                logger.info("Resumen por lotes: %s de %s noticias se repiten solas.", missing, len(batch))
+
+        for index, document in enumerate(documents):
+            if results[index] is None:
+                results[index] = FeedService.process_content_with_cerebras(
+                    document.title,
+                    document.raw_html,
+                    cerebras_client,
+                    model_name,
+                    filter_instructions_text,
+                    content_limit=content_limit,
+                    document=document,
+                    write_behind=write_behind,
+                )
+        return results
+
     @staticmethod
     def extract_image_from_description(description):
         # Buscar una URL de imagen en el HTML de la descripción
-        img_pattern = r'<img[^>]+src="([^">]+)"'
-        match = re.search(img_pattern, description)
-        return match.group(1) if match else None
+        return first_image(description)
 
     @staticmethod
     def get_full_article_content(url):
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # Intentar decodificar explícitamente como UTF-8
-            try:
-                content_text = response.content.decode('utf-8')
-            except UnicodeDecodeError:
-                # Si UTF-8 falla, intentar con la codificación detectada por requests
-                content_text = response.text 
-
-            soup = BeautifulSoup(content_text, 'html.parser')
-
-            # Eliminar elementos no deseados (boilerplate que contamina el texto).
-            # OJO: no eliminar <noscript>: en sitios renderizados por JS (p.ej.
-            # foros Flarum como WOW Chakra) el cuerpo del artículo vive ahí.
-            for element in soup.find_all([
-                'script', 'style', 'nav', 'header', 'footer', 'iframe',
-                'aside', 'form', 'button',
-            ]):
-                element.decompose()
-            
-            # Buscar el contenido principal con diferentes selectores
-            content = (
-                soup.find('div', {'itemprop': 'articleBody'}) or
-                soup.find('article') or 
-                soup.find(class_=['content', 'article-content', 'post-content', 'entry-content'])
+        # Sesión keep-alive por host y caché en disco por URL (article_fetcher.py).
+        return FeedService.article_fetcher().fetch(url)
+
+    @staticmethod
+    def article_fetcher():
+        if FeedService._ARTICLE_FETCHER is None:
+            FeedService._ARTICLE_FETCHER = ArticleFetcher.from_settings()
+        return FeedService._ARTICLE_FETCHER
+
+    @staticmethod
+    def download_feed(source):
+        """Descarga el cuerpo de un feed. Corre en un hilo: no toca la BD.
+
+        La petición es condicional si la fuente guarda validadores de la pasada
+        anterior; un 304 vuelve como respuesta normal y sin cuerpo.
+        """
+        headers = {'User-Agent': 'Mozilla/5.0 (compatible; johanfer-news-bot/1.0)'}
+        if getattr(source, 'etag', ''):
+            headers['If-None-Match'] = source.etag
+        if getattr(source, 'last_modified', ''):
+            headers['If-Modified-Since'] = source.last_modified
+        response = requests.get(source.url, timeout=15, headers=headers)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def feed_validators(response):
+        """ETag, Last-Modified y hash del cuerpo de una respuesta de feed."""
+        headers = getattr(response, 'headers', None) or {}
+        content = getattr(response, 'content', b'') or b''
+        return {
+            'etag': (headers.get('ETag') or '')[:255],
+            'last_modified': (headers.get('Last-Modified') or '')[:100],
+            'content_hash': hashlib.sha256(content).hexdigest(),
+        }
+
+    @staticmethod
+    def download_feeds(sources):
+        """Descarga en paralelo los feeds de ``sources`` y los devuelve en su orden.
+
+        Los topes se configuran con ``NEWS_FEED_MAX_CONCURRENCY`` (global) y
+        ``NEWS_FEED_MAX_PER_HOST`` (por dominio).
+        """
+        downloader = ConcurrentDownloader(
+            FeedService.download_feed,
+            max_workers=getattr(settings, 'NEWS_FEED_MAX_CONCURRENCY', DEFAULT_MAX_WORKERS),
+            max_per_host=getattr(settings, 'NEWS_FEED_MAX_PER_HOST', DEFAULT_MAX_PER_HOST),
+        )
+        started = time.monotonic()
+        results = downloader.download_all(sources, url_of=lambda source: source.url)
+        if results:
+            slowest = max(results, key=lambda result: result.elapsed)
+            logger.info(
+                "Descargados %s feeds en %.2fs (el más lento: %s, %.2fs; suma en serie: %.2fs)",
+                len(results),
+                time.monotonic() - started,
+                slowest.item.name,
+                slowest.elapsed,
+                sum(result.elapsed for result in results),
             )
-            
-            # Inicializar variables para el retorno
-            text_content = None
-            image_url = None
-            
-            if content:
-                # Buscar la primera imagen relevante
-                img_tag = content.find('img')
-                if img_tag and img_tag.get('src'):
-                    image_url = urljoin(url, img_tag['src'])
-                
-                # Si no encontramos imagen en el contenido principal, buscar en todo el artículo
-                if not image_url:
-                    img_tag = soup.find('img', {'class': ['featured-image', 'wp-post-image', 'article-image']})
-                    if img_tag and img_tag.get('src'):
-                        image_url = urljoin(url, img_tag['src'])
-
-                # Preferir solo los párrafos: evita pies de foto, bloques de
-                # "relacionados", banners de cookies/suscripción, etc.
-                paragraphs = [p.get_text(' ', strip=True) for p in content.find_all('p')]
-                paragraph_text = ' '.join(part for part in paragraphs if part)
-                if len(paragraph_text) >= 300:
-                    text_content = paragraph_text
-                else:
-                    text_content = content.get_text(separator=' ', strip=True)
-            
-            return {
-                'text': text_content,
-                'image_url': image_url
-            }
-        except Exception:
-            logger.exception("Error obteniendo contenido completo")
-            return {'text': None, 'image_url': None}
+        return results
 
     @staticmethod
     def should_filter_news(title, description, filter_word_patterns):
         if not filter_word_patterns:
             return False, None
 
-        safe_title = title or ""
-        safe_description = description or ""
+        filter_word = filter_word_patterns.match(title or "", description or "")
+        return filter_word is not None, filter_word
 
-        for filter_word, pattern, title_only in filter_word_patterns:
-            if title_only:
-                if pattern.search(safe_title):
-                    return True, filter_word
-            else:
-                if pattern.search(safe_title) or pattern.search(safe_description):
-                    return True, filter_word
+    @staticmethod
+    def prepare_entry(item, filter_word_patterns, fifteen_days_ago):
+        """Primera etapa de la ingesta: deja una entrada lista para decidir.
 
-        return False, None
+        No toca la base de datos (corre en los hilos del pipeline). Devuelve un
+        dict con los datos de la entrada y ``outcome``: None si sigue adelante,
+        o 'long_title' / 'keyword' / 'too_old' si ya está decidida.
+        """
+        entry = item['entry']
+        source = item['source']
+        published = item['published']
+        prepared = dict(item, outcome=None)
+
+        logger.info(f"\nProcesando entrada: {entry.title} ({published})")
+
+        # Validación: títulos anormalmente largos se guardan como filtradas
+        # (registrando el guid) para no re-descargarlas en cada ciclo.
+        if len(entry.title) > 200:
+            logger.info(f"FILTRANDO noticia con título muy largo ({len(entry.title)} caracteres): {entry.title[:100]}...")
+            prepared['outcome'] = 'long_title'
+            return prepared
+
+        # Primero intentar obtener la imagen del feed
+        image_url = None
+
+        # 1. Buscar en media_content
+        if hasattr(entry, 'media_content') and entry.media_content:
+            image_url = entry.media_content[0].get('url')
+
+        # 2. Buscar en enclosures
+        if not image_url and hasattr(entry, 'enclosures') and entry.enclosures:
+            for enclosure in entry.enclosures:
+                if enclosure.get('type', '').startswith('image/'):
+                    image_url = enclosure.get('href')
+                    break
+
+        # 3. Buscar en la descripción
+        if not image_url and hasattr(entry, 'description'):
+            image_url = FeedService.extract_image_from_description(entry.description)
+
+        # 4. Buscar en content
+        if not image_url and hasattr(entry, 'content'):
+            for content in entry.content:
+                if 'value' in content:
+                    found_image = FeedService.extract_image_from_description(content['value'])
+                    if found_image:
+                        image_url = found_image
+                        break
+
+        # Obtener el contenido original para procesar
+        # Intentar obtener descripción del feed, asegurando UTF-8 si es posible
+        original_description = entry.get('description', '')
+        if isinstance(original_description, bytes):
+            try:
+                original_description = original_description.decode('utf-8')
+            except UnicodeDecodeError:
+                 # Si falla, usar una decodificación con reemplazo
+                original_description = original_description.decode('utf-8', 'replace')
+
+        # Feeds Atom/WordPress suelen traer el cuerpo completo en
+        # entry.content y solo un extracto (o nada) en description:
+        # usar el bloque más largo para no resumir a ciegas.
+        if hasattr(entry, 'content') and entry.content:
+            for content_block in entry.content:
+                try:
+                    block_value = content_block.get('value')
+                except AttributeError:
+                    block_value = getattr(content_block, 'value', None)
+                if block_value and len(block_value) > len(original_description):
+                    original_description = block_value
+
+        # Texto plano para filtrado y embeddings (sin markup, sin truncar). El
+        # documento se limpia una vez y las etapas siguientes lo reutilizan.
+        document = ContentDocument(entry.title, original_description)
+        plain_description = document.plain_text
+        prepared.update(
+            image_url=image_url,
+            original_description=original_description,
+            document=document,
+            plain_description=plain_description,
+            ai_content_limit=DEFAULT_AI_CONTENT_LIMIT,
+        )
+
+        # >>>>> ORDEN CAMBIADO: Primero filtro por PALABRA CLAVE <<<<<
+        # Se filtra sobre texto plano para no matchear dentro de URLs o atributos HTML.
+        should_filter, filter_word = FeedService.should_filter_news(entry.title, plain_description, filter_word_patterns)
+        if should_filter:
+            logger.info(f"Noticia FILTRADA por palabra clave: {filter_word.word}")
+            prepared['outcome'] = 'keyword'
+            prepared['filter_word'] = filter_word
+            return prepared
+        # <<<<< FIN FILTRO PALABRA CLAVE >>>>>
+
+        # Obtener contenido completo (solo noticias no filtradas por keyword) si:
+        # - deep_search está activado para la fuente, o
+        # - el feed trajo tan poco texto que la IA resumiría a ciegas.
+        if source.deep_search or len(plain_description) < 200:
+            full_content = FeedService.get_full_article_content(entry.link)
+            if full_content['text'] and (
+                source.deep_search or len(full_content['text']) > len(plain_description)
+            ):
+                prepared['original_description'] = full_content['text']
+                prepared['document'] = ContentDocument(entry.title, full_content['text'])
+                prepared['plain_description'] = prepared['document'].plain_text
+                # El mismo límite amplio cubre tanto el RSS como el artículo
+                # descargado sin penalizar a las fuentes que ya entregan el
+                # cuerpo completo en el feed.
+                prepared['ai_content_limit'] = DEFAULT_AI_CONTENT_LIMIT
+            # Solo usar la imagen del contenido si no se encontró una en el feed
+            if not image_url and full_content['image_url']:
+                prepared['image_url'] = full_content['image_url']
+
+        # Guard extra: nunca crear noticias anteriores a 15 días
+        if published < fifteen_days_ago:
+            prepared['outcome'] = 'too_old'
+        return prepared
 
     @staticmethod
     def fetch_and_save_news(max_ai_items=None):
         logger.info("Iniciando proceso de obtención de noticias...")
         start_time = time.time()
         
+        embedding_cache_snapshot = embedding_cache.stats.snapshot()
+        summary_cache_snapshot = summary_cache.stats.snapshot()
+        article_fetcher = FeedService.article_fetcher()
+        article_snapshot = article_fetcher.snapshot()
+
         logger.info("Inicializando modelos...")
         # Cliente Gemini solo para embeddings
         gemini_client = FeedService.initialize_gemini()
@@ -940,25 +1847,25 @@ class FeedService:
             if not ai_model_setting:
                 logger.warning("No se encontró configuración global de modelo IA. Creando con modelo predeterminado.")
                 ai_model_setting = AIModelSetting.objects.create(model_name=DEFAULT_AI_MODEL)
-            ai_model_name = ai_model_setting.model_name
+            # El principal y, por orden, los de respaldo para lo que no quepa en su cuota.
+            ai_models = ai_model_setting.route() or [DEFAULT_AI_MODEL]
         except Exception:
             logger.exception("Error al obtener configuración de modelo IA. Usando default.")
-            ai_model_name = DEFAULT_AI_MODEL
+            ai_models = [DEFAULT_AI_MODEL]
+        token_snapshots = {
+            model_name: FeedService.rate_limiter(model_name).estimator.snapshot() for model_name in ai_models
+        }
         
-        filter_word_patterns = FeedService.build_filter_word_patterns(
-            FilterWord.objects.filter(active=True)
-        )
+        # Compilado una vez y reutilizado mientras no cambien las palabras.
+        filter_word_patterns = KeywordMatcher.active()
         filter_instructions_text = FeedService.build_filter_instructions_text(
             AIFilterInstruction.objects.filter(active=True)
         )
 
         sources = list(FeedSource.objects.filter(active=True))
-        logger.info(f"Procesando {len(sources)} fuentes activas con Cerebras ({ai_model_name})")
-        new_articles_count = 0
-        
+        logger.info(f"Procesando {len(sources)} fuentes activas con Cerebras ({', '.join(ai_models)})")
         # Calcular la fecha límite (15 días atrás)
         fifteen_days_ago = timezone.now() - timedelta(days=15)
-        recent_news_cache = []
 
         existing_guids = set(
             News.objects.filter(published_date__gte=fifteen_days_ago).values_list('guid', flat=True)
@@ -981,9 +1888,19 @@ class FeedService:
         
         # Lista para almacenar todas las entradas de todas las fuentes
         all_entries = []
-        
+
+        # Descargar todos los feeds a la vez: la recolección pasa a durar lo que
+        # el feed más lento y no la suma de todos. El parseo sigue en el orden
+        # de las fuentes para que el resultado sea el mismo que en serie.
+        downloads = FeedService.download_feeds(sources)
+        # Validadores HTTP nuevos por fuente; se guardan al final solo si todas
+        # sus entradas llegaron a la BD (ver más abajo).
+        new_validators = {}
+        feed_cache_stats = {'not_modified': 0, 'same_body': 0, 'parsed': 0, 'bytes': 0, 'rapido': 0, 'feedparser': 0}
+
         # Primero, recolectar todas las entradas de todas las fuentes
-        for source in sources:
+        for download in downloads:
+            source = download.item
             logger.info(f"\nRecolectando entradas de fuente: {source.name}")
             
             # Obtener la fecha de la última noticia visible por fuente (cacheada en memoria)
@@ -992,18 +1909,39 @@ class FeedService:
             # Usar la fecha más reciente entre la última noticia y hace 15 días
             cutoff_date = max(latest_date, fifteen_days_ago)
             
-            try:
-                feed_response = requests.get(
-                    source.url,
-                    timeout=15,
-                    headers={'User-Agent': 'Mozilla/5.0 (compatible; johanfer-news-bot/1.0)'},
+            if not download.ok:
+                if not isinstance(download.error, requests.RequestException):
+                    raise download.error
+                logger.error(
+                    f"Error descargando feed de {source.name}; se omite esta fuente en este ciclo.",
+                    exc_info=download.error,
                 )
-                feed_response.raise_for_status()
-                feed = feedparser.parse(feed_response.content)
-            except requests.RequestException:
-                logger.exception(f"Error descargando feed de {source.name}; se omite esta fuente en este ciclo.")
                 continue
-            logger.info(f"Encontradas {len(feed.entries)} entradas en el feed")
+            feed_response = download.value
+            if getattr(feed_response, 'status_code', 200) == 304:
+                feed_cache_stats['not_modified'] += 1
+                logger.info(f"Feed sin cambios (304); no se parsea ({download.elapsed:.2f}s)")
+                continue
+            validators = FeedService.feed_validators(feed_response)
+            feed_cache_stats['bytes'] += len(feed_response.content or b'')
+            if source.content_hash and validators['content_hash'] == source.content_hash:
+                feed_cache_stats['same_body'] += 1
+                logger.info(f"Feed con el mismo contenido que la pasada anterior; no se parsea ({download.elapsed:.2f}s)")
+                continue
+            feed_cache_stats['parsed'] += 1
+            new_validators[source.id] = validators
+            # Vía rápida para RSS 2.0/Atom bien formados (feedparser si no);
+            # deja de leer tras una racha de entradas anteriores al corte.
+            feed = parse_feed(
+                feed_response.content,
+                cutoff=cutoff_date,
+                stop_after_old=getattr(settings, 'NEWS_FEED_STOP_AFTER_OLD', DEFAULT_STOP_AFTER_OLD),
+            )
+            feed_cache_stats[feed.parser] += 1
+            logger.info(
+                f"Encontradas {len(feed.entries)} entradas en el feed "
+                f"({feed.parser}{', cortado por antigüedad' if feed.stopped_early else ''}, {download.elapsed:.2f}s)"
+            )
             
             # Recolectar entradas válidas
             for entry in feed.entries:
@@ -1046,28 +1984,325 @@ class FeedService:
         all_entries.sort(key=lambda x: x['published'])
         logger.info(f"\nSe recolectaron {len(all_entries)} nuevas entradas de todas las fuentes")
 
-        # Contador para noticias redundantes
-        redundant_count = 0
-        ai_attempts = 0
-        # Fallos de vectorización: hasta ahora se perdían en silencio.
-        embedding_failures = 0
-        indexing_failures = 0
-        
-        # Procesar todas las entradas en orden (de más antigua a más reciente)
-        for item in all_entries:
+        # Las entradas pasan por etapas encadenadas con colas acotadas (ver
+        # my_news/pipeline.py): mientras se descarga el artículo de una, otra
+        # se vectoriza y otra se resume. Las etapas no escriben en la BD; las
+        # decisiones se aplican aquí, en orden de más antigua a más reciente.
+        queue_size = max(1, int(getattr(settings, 'NEWS_PIPELINE_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)))
+        fetch_workers = max(1, int(getattr(settings, 'NEWS_PIPELINE_FETCH_WORKERS', 4)))
+        # Resúmenes en vuelo a la vez; CerebrasRateLimiter decide cuántos caben
+        # realmente en la ventana de tokens y peticiones.
+        summary_workers = max(1, int(getattr(settings, 'NEWS_SUMMARY_WORKERS', 4)))
+        # Noticias por petición de resumen como máximo (1: una por petición).
+        summary_batch_size = max(1, int(getattr(settings, 'NEWS_SUMMARY_BATCH_SIZE', 1)))
+        # Sin cuota de IA (presupuesto agotado, Deferred, fallo) las noticias
+        # que quedan se publican con un resumen local en vez de cortar la pasada.
+        local_summaries = bool(getattr(settings, 'NEWS_LOCAL_SUMMARY_ENABLED', True))
+        local_summary_sentences = max(1, int(getattr(settings, 'NEWS_LOCAL_SUMMARY_SENTENCES', 3)))
+        embed_batch_size = max(1, int(getattr(settings, 'NEWS_INGEST_WINDOW', 20)))
+        # Con presupuesto, se reparte por interés y antigüedad en ventanas de
+        # NEWS_INGEST_WINDOW entradas (ver my_news/priority.py).
+        prioritize = max_ai_items is not None and priority.is_enabled()
+        cache_writes = embedding_cache.WriteBehind()
+        summary_writes = summary_cache.WriteBehind()
+        # Estado de la etapa de redundancia (un solo hilo: decide en orden) y
+        # marca de fallo que comparten los hilos de la etapa de resumen.
+        run_accepted = RedundancyMatrix()
+        ai_slots = {'used': 0, 'seen': 0}
+        summarizer = {'failed': False}
+
+        def prepare_stage(item):
+            return FeedService.prepare_entry(item, filter_word_patterns, fifteen_days_ago)
+
+        def embed_stage(items):
+            pending = [item for item in items if item['outcome'] is None]
+            vectors = EmbeddingService.generate_embeddings_batch(
+                [item['document'] for item in pending],
+                gemini_client,
+                write_behind=cache_writes,
+            ) if pending else []
+            for item, vector in zip(pending, vectors):
+                item['embedding'] = vector
+            return items
+
+        def build_candidate(item):
+            # Verificar redundancia ANTES de llamar a la IA: una noticia
+            # redundante no debe consumir presupuesto de resúmenes. Este objeto
+            # es el que se guardará después, así que las que se comparen con
+            # él apuntarán a la fila real.
             entry = item['entry']
-            source = item['source']
-            published = item['published']
-            guid = item['guid']
-            
-            logger.info(f"\nProcesando entrada: {entry.title} ({published})")
-            
-            # Validación: títulos anormalmente largos se guardan como filtradas
-            # (registrando el guid) para no re-descargarlas en cada ciclo.
-            if len(entry.title) > 200:
-                logger.info(f"FILTRANDO noticia con título muy largo ({len(entry.title)} caracteres): {entry.title[:100]}...")
-                try:
-                    News.objects.create(
+            candidate = News(
+                guid=item['guid'],
+                title=entry.title,
+                description=item['plain_description'],
+                source=item['source'],
+                published_date=item['published'],
+            )
+            candidate._embedding_vector = item.get('embedding')
+            candidate._embedding_attempted = True
+            item['candidate'] = candidate
+            return candidate
+
+        def take_ai_slot(item):
+            if prioritize:
+                # El presupuesto se reparte después, en prioritize_stage.
+                return True
+            if max_ai_items is not None and ai_slots['used'] >= max_ai_items:
+                item['outcome'] = 'budget'
+                # Con resumen local se guarda igual y sirve de referencia.
+                return local_summaries
+            ai_slots['used'] += 1
+            return True
+
+        def decide(item, is_redundant, similar_news, similarity_score):
+            item.update(
+                embedding=getattr(item['candidate'], "_embedding_vector", None),
+                similar=similar_news,
+                similarity_score=similarity_score,
+            )
+            if is_redundant and similar_news:
+                item['outcome'] = 'redundant'
+
+        def redundancy_stage(items):
+            pending = [item for item in items if item['outcome'] is None]
+            candidates = [build_candidate(item) for item in pending]
+
+            if vector_index is None:
+                # Sin Qdrant, el lote entero se compara de una vez con las
+                # aceptadas de la pasada y entre sí (ver my_news/dedup.py).
+                decisions = run_accepted.deduplicate(
+                    candidates,
+                    [item.get('embedding') for item in pending],
+                    [item['source'].similarity_threshold for item in pending],
+                    admit=lambda index: take_ai_slot(pending[index]),
+                )
+                for item, decision in zip(pending, decisions):
+                    decide(item, *decision)
+                return items
+
+            # Con índice: una sola búsqueda por lote contra lo ya indexado y,
+            # después, las aceptadas de esta pasada (que aún no están en el
+            # índice) en memoria.
+            try:
+                first_pass = EmbeddingService.check_redundancy_batch(candidates, vector_index)
+            except Exception:
+                logger.exception(
+                    "Error consultando el índice vectorial por lotes; se compara solo en memoria."
+                )
+                first_pass = [(False, None, 0.0)] * len(candidates)
+            for item, candidate, decision in zip(pending, candidates, first_pass):
+                is_redundant, similar_news, similarity_score = decision
+                embedding = getattr(candidate, "_embedding_vector", None)
+                if embedding and len(run_accepted):
+                    # Qdrant todavía no tiene las aceptadas que siguen en vuelo:
+                    # compararlas también en memoria.
+                    in_run, in_run_score = run_accepted.best_match(embedding, exclude=candidate)
+                    if in_run is not None and in_run_score > similarity_score:
+                        similar_news, similarity_score = in_run, in_run_score
+                        is_redundant = similarity_score >= item['source'].similarity_threshold
+                decide(item, is_redundant, similar_news, similarity_score)
+                if item['outcome'] is None and take_ai_slot(item) and embedding:
+                    run_accepted.add(candidate, embedding)
+            return items
+
+        def prioritize_stage(items):
+            # Una ventana de entradas (un solo hilo, en orden). Se lleva la parte
+            # del presupuesto que le toca por las entradas que quedan; lo que no
+            # gasta pasa a las siguientes y la última se queda con todo lo que
+            # sobre. Así el resumen empieza sin esperar a la descarga más lenta.
+            pending = [item for item in items if item['outcome'] is None]
+            remaining_entries = max(1, len(all_entries) - ai_slots['seen'])
+            ai_slots['seen'] += len(items)
+            remaining_budget = max(0, max_ai_items - ai_slots['used'])
+            if ai_slots['seen'] >= len(all_entries):
+                share = remaining_budget
+            else:
+                share = min(remaining_budget, math.ceil(remaining_budget * len(items) / remaining_entries))
+            order = priority.rank([
+                (
+                    interest_model.score(item['embedding']) if item.get('embedding') else None,
+                    item['published'],
+                )
+                for item in pending
+            ])
+            for position, index in enumerate(order):
+                if position >= share:
+                    pending[index]['outcome'] = 'budget'
+            ai_slots['used'] += min(share, len(pending))
+            if len(pending) > share:
+                logger.info(
+                    "Presupuesto de IA repartido por interés y antigüedad: %s de %s candidatas de la ventana.",
+                    share, len(pending),
+                )
+            return items
+
+        def apply_summary(item, result, model_name):
+            processed_description, short_answer, ai_filter_reason = result
+            if not processed_description:
+                summarizer['failed'] = True
+                item['outcome'] = 'ai_failed'
+                return
+            item.update(
+                processed_description=processed_description,
+                short_answer=short_answer,
+                ai_filter_reason=ai_filter_reason,
+                summary_model=model_name,
+            )
+
+        def summarize_stage(item):
+            if item['outcome'] is not None:
+                return item
+            if summarizer['failed']:
+                # Tras un fallo (Deferred, 429 largo, error) no se manda nada más.
+                item['outcome'] = 'skipped'
+                return item
+            # Si no se filtró por palabra clave ni es redundante, procesar con IA (Cerebras)
+            apply_summary(item, *FeedService.process_content_routed(
+                item['entry'].title,
+                item['original_description'],
+                cerebras_client,
+                ai_models,
+                filter_instructions_text,
+                content_limit=item['ai_content_limit'],
+                document=item['document'],
+                write_behind=summary_writes,
+            ))
+            return item
+
+        def summarize_batch_stage(items):
+            # Varias noticias por petición; cuántas, según los tokens libres.
+            pending = [item for item in items if item['outcome'] is None]
+            while pending:
+                if summarizer['failed']:
+                    for item in pending:
+                        item['outcome'] = 'skipped'
+                    break
+                # Un lote comparte el límite de contenido del prompt.
+                content_limit = pending[0]['ai_content_limit']
+                documents = []
+                for item in pending:
+                    if item['ai_content_limit'] != content_limit:
+                        break
+                    documents.append(item['document'])
+                # El lote va entero al primer modelo con cupo; las que no
+                # vuelvan resumidas prueban solas con los demás.
+                route = ai_models
+                if len(ai_models) > 1:
+                    route = FeedService.models_by_capacity(ai_models, FeedService._batch_prompt(
+                        documents[:1], filter_instructions_text, content_limit,
+                    ))
+                size = FeedService.summary_batch_size(
+                    documents, route[0], filter_instructions_text, summary_batch_size,
+                    content_limit=content_limit,
+                )
+                results = FeedService.process_batch_with_cerebras(
+                    documents[:size],
+                    cerebras_client,
+                    route[0],
+                    filter_instructions_text,
+                    content_limit=content_limit,
+                    write_behind=summary_writes,
+                )
+                for item, result in zip(pending[:size], results):
+                    model_name = route[0]
+                    if not result[0] and len(route) > 1:
+                        result, model_name = FeedService.process_content_routed(
+                            item['entry'].title,
+                            item['original_description'],
+                            cerebras_client,
+                            route[1:],
+                            filter_instructions_text,
+                            content_limit=content_limit,
+                            document=item['document'],
+                            write_behind=summary_writes,
+                        )
+                    apply_summary(item, result, model_name)
+                pending = pending[size:]
+            return items
+
+        if summary_batch_size > 1:
+            summary_stage = Stage('resumen', summarize_batch_stage, workers=summary_workers,
+                                  queue_size=queue_size, batch_size=summary_batch_size)
+        else:
+            summary_stage = Stage('resumen', summarize_stage, workers=summary_workers, queue_size=queue_size)
+
+        stages = [
+            Stage('preparar', prepare_stage, workers=fetch_workers, queue_size=queue_size),
+            Stage('embeddings', embed_stage, queue_size=queue_size,
+                  batch_size=embed_batch_size, max_wait=EMBED_BATCH_WAIT_SECONDS),
+            Stage('redundancia', redundancy_stage, queue_size=queue_size,
+                  batch_size=embed_batch_size),
+        ]
+        if prioritize:
+            stages.append(Stage('prioridad', prioritize_stage, queue_size=queue_size,
+                                batch_size=embed_batch_size, max_wait=EMBED_BATCH_WAIT_SECONDS))
+        pipeline = Pipeline(stages + [summary_stage], name='ingesta')
+
+        # Las filas se guardan por lotes en una transacción cada uno (ver
+        # my_news/write_buffer.py); lo que indexa en Qdrant o cuenta la fila
+        # se ejecuta al guardarse, ya con id. Al salir del ``with`` se escribe
+        # lo pendiente, también si la pasada se corta con una excepción.
+        write_buffer = NewsWriteBuffer.from_settings()
+        counts = {'new': 0, 'redundant': 0, 'no_embedding': 0, 'provisional': 0, 'pending_summary': 0}
+
+        def count_new(news):
+            counts['new'] += 1
+
+        def count_redundant(news):
+            counts['new'] += 1
+            counts['redundant'] += 1
+
+        # Los vectores de las guardadas se indexan en lotes (ver UpsertBuffer).
+        upserts = UpsertBuffer.from_settings(vector_index) if vector_index is not None else nullcontext()
+        indexed_guids = []
+
+        def index_saved(news_item):
+            counts['new'] += 1
+            embedding = getattr(news_item, '_embedding_vector', None)
+            if embedding:
+                # Indexar en Qdrant (si está disponible) para futuras búsquedas
+                if vector_index is not None:
+                    upserts.add(
+                        news_item.guid,
+                        embedding,
+                        FeedService.build_vector_payload(news_item),
+                        on_written=indexed_guids.append,
+                    )
+            else:
+                # Sin embedding esta noticia no pasó por el control de duplicados
+                # y tampoco servirá para comparar las futuras.
+                counts['no_embedding'] += 1
+                logger.warning(
+                    "Noticia guardada SIN embedding (se salta el control de duplicados). "
+                    "news_id=%s título=%s",
+                    news_item.id,
+                    news_item.title[:100],
+                )
+
+        # Fuentes con una entrada que se queda sin guardar en esta pasada: sus
+        # entradas siguientes tampoco se guardan. Si no, el corte por fuente (la
+        # última visible) pasaría por encima de la pendiente y la próxima
+        # pasada ya no la recogería.
+        held_sources = set()
+
+        # Procesar todas las entradas en orden (de más antigua a más reciente).
+        # Al salir, primero se escriben las filas pendientes y después sus vectores.
+        with closing(pipeline.run(all_entries)) as results, upserts, write_buffer:
+            for item in results:
+                entry = item['entry']
+                source = item['source']
+                published = item['published']
+                guid = item['guid']
+                outcome = item['outcome']
+
+                if outcome == 'too_old':
+                    continue
+
+                if source.id in held_sources:
+                    continue
+
+                if outcome == 'long_title':
+                    write_buffer.add(News(
                         guid=guid,
                         title=entry.title[:500],
                         # Fila oculta: guardar solo texto plano recortado
@@ -1079,81 +2314,23 @@ class FeedService:
                         source=source,
                         is_filtered=True,
                         is_ai_processed=True,
-                    )
-                except Exception:
-                    logger.exception(
-                        "Error al guardar noticia con título largo. GUID=%s", guid[:100]
-                    )
-                continue
-            
-            # Primero intentar obtener la imagen del feed
-            image_url = None
-            
-            # 1. Buscar en media_content
-            if hasattr(entry, 'media_content') and entry.media_content:
-                image_url = entry.media_content[0].get('url')
-            
-            # 2. Buscar en enclosures
-            if not image_url and hasattr(entry, 'enclosures') and entry.enclosures:
-                for enclosure in entry.enclosures:
-                    if enclosure.get('type', '').startswith('image/'):
-                        image_url = enclosure.get('href')
-                        break
+                        embedding_state=News.EMBEDDING_SKIPPED,
+                        summary_state=News.SUMMARY_SKIPPED,
+                    ), label='noticia con título largo')
+                    continue
 
-            # 3. Buscar en la descripción
-            if not image_url and hasattr(entry, 'description'):
-                image_url = FeedService.extract_image_from_description(entry.description)
-
-            # 4. Buscar en content
-            if not image_url and hasattr(entry, 'content'):
-                for content in entry.content:
-                    if 'value' in content:
-                        found_image = FeedService.extract_image_from_description(content['value'])
-                        if found_image:
-                            image_url = found_image
-                            break
-
-            # Obtener el contenido original para procesar
-            # Intentar obtener descripción del feed, asegurando UTF-8 si es posible
-            original_description = entry.get('description', '')
-            if isinstance(original_description, bytes):
-                try:
-                    original_description = original_description.decode('utf-8')
-                except UnicodeDecodeError:
-                     # Si falla, usar una decodificación con reemplazo
-                    original_description = original_description.decode('utf-8', 'replace')
-
-            # Feeds Atom/WordPress suelen traer el cuerpo completo en
-            # entry.content y solo un extracto (o nada) en description:
-            # usar el bloque más largo para no resumir a ciegas.
-            if hasattr(entry, 'content') and entry.content:
-                for content_block in entry.content:
-                    try:
-                        block_value = content_block.get('value')
-                    except AttributeError:
-                        block_value = getattr(content_block, 'value', None)
-                    if block_value and len(block_value) > len(original_description):
-                        original_description = block_value
-
-            # Texto plano para filtrado y embeddings (sin markup, sin truncar)
-            plain_description = FeedService.prepare_content_for_cerebras(
-                entry.title, original_description, content_limit=None
-            )
+                image_url = item['image_url']
+                original_description = item['original_description']
+                plain_description = item['plain_description']
 
-            # >>>>> ORDEN CAMBIADO: Primero filtro por PALABRA CLAVE <<<<<
-            # Se filtra sobre texto plano para no matchear dentro de URLs o atributos HTML.
-            should_filter, filter_word = FeedService.should_filter_news(entry.title, plain_description, filter_word_patterns)
-            if should_filter:
-                logger.info(f"Noticia FILTRADA por palabra clave: {filter_word.word}")
-                
-                # Validaciones adicionales para campos que podrían ser muy largos
-                logger.debug(f"Longitudes: título={len(entry.title)}, guid={len(guid)}, link={len(entry.link)}")
-                if hasattr(entry, 'description') and entry.description:
-                    logger.debug(f"Descripción original: {len(entry.description)} caracteres")
-                logger.debug(f"Descripción procesada: {len(original_description)} caracteres")
-                
-                try:
-                    News.objects.create(
+                if outcome == 'keyword':
+                    # Validaciones adicionales para campos que podrían ser muy largos
+                    logger.debug(f"Longitudes: título={len(entry.title)}, guid={len(guid)}, link={len(entry.link)}")
+                    if hasattr(entry, 'description') and entry.description:
+                        logger.debug(f"Descripción original: {len(entry.description)} caracteres")
+                    logger.debug(f"Descripción procesada: {len(original_description)} caracteres")
+
+                    write_buffer.add(News(
                         guid=guid,
                         title=entry.title,
                         short_answer=None,
@@ -1163,69 +2340,35 @@ class FeedService:
                         published_date=published,
                         source=source,
                         is_filtered=True,
-                        filtered_by=filter_word,
+                        filtered_by=item['filter_word'],
                         image_url=image_url,
-                        is_ai_processed=True
-                    )
-                    new_articles_count += 1
-                except Exception:
-                    logger.exception(
-                        "Error al guardar noticia filtrada por keyword. GUID=%s título=%s link=%s descripción_len=%s",
-                        guid[:100],
-                        entry.title[:100],
-                        entry.link[:100],
-                        len(original_description) if original_description else 0,
-                    )
+                        is_ai_processed=True,
+                        embedding_state=News.EMBEDDING_SKIPPED,
+                        summary_state=News.SUMMARY_SKIPPED,
+                    ), label='noticia filtrada por keyword', on_saved=count_new)
                     continue
 
-                continue # Pasar a la siguiente noticia
-            # <<<<< FIN FILTRO PALABRA CLAVE >>>>>
-
-            # Obtener contenido completo (solo noticias no filtradas por keyword) si:
-            # - deep_search está activado para la fuente, o
-            # - el feed trajo tan poco texto que la IA resumiría a ciegas.
-            ai_content_limit = DEFAULT_AI_CONTENT_LIMIT
-            if source.deep_search or len(plain_description) < 200:
-                full_content = FeedService.get_full_article_content(entry.link)
-                if full_content['text'] and (
-                    source.deep_search or len(full_content['text']) > len(plain_description)
-                ):
-                    original_description = full_content['text']
-                    plain_description = FeedService.prepare_content_for_cerebras(
-                        entry.title, original_description, content_limit=None
-                    )
-                    # El mismo límite amplio cubre tanto el RSS como el artículo
-                    # descargado sin penalizar a las fuentes que ya entregan el
-                    # cuerpo completo en el feed.
-                    ai_content_limit = DEFAULT_AI_CONTENT_LIMIT
-                # Solo usar la imagen del contenido si no se encontró una en el feed
-                if not image_url and full_content['image_url']:
-                    image_url = full_content['image_url']
-
-            # Guard extra: nunca crear noticias anteriores a 15 días
-            if published < fifteen_days_ago:
-                continue
-
-            # Verificar redundancia ANTES de llamar a la IA: una noticia
-            # redundante no debe consumir presupuesto de resúmenes. El
-            # embedding se genera desde título + contenido original limpio.
-            candidate = News(
-                guid=guid,
-                title=entry.title,
-                description=plain_description,
-                source=source,
-                published_date=published,
-            )
-            is_redundant, similar_news, similarity_score = EmbeddingService.check_redundancy(
-                candidate, gemini_client, recent_news_cache, vector_index
-            )
-            embedding = getattr(candidate, "_embedding_vector", None)
+                similar_news = item['similar']
+                similarity_score = item['similarity_score']
+                reference_lost = (
+                    similar_news is not None and similar_news.pk is None
+                    and not write_buffer.is_pending(similar_news)
+                )
+                if reference_lost:
+                    # La parecida era de esta misma pasada y no llegó a guardarse.
+                    similar_news = None
+
+                if outcome == 'redundant' and reference_lost:
+                    # Sin la parecida guardada no hay nada que la sustituya en la
+                    # rejilla: se queda, con su fuente, para la próxima pasada,
+                    # que la comparará con lo que sí se guardó.
+                    held_sources.add(source.id)
+                    continue
 
-            if is_redundant and similar_news:
-                logger.info(f"¡Noticia redundante detectada! Similar a: {similar_news.title}")
-                logger.info(f"Puntuación de similitud: {similarity_score:.4f} (Umbral: {source.similarity_threshold})")
-                try:
-                    News.objects.create(
+                if outcome == 'redundant':
+                    logger.info(f"¡Noticia redundante detectada! Similar a: {item['similar'].title}")
+                    logger.info(f"Puntuación de similitud: {similarity_score:.4f} (Umbral: {source.similarity_threshold})")
+                    write_buffer.add(News(
                         guid=guid,
                         title=entry.title,
                         short_answer=None,
@@ -1240,155 +2383,172 @@ class FeedService:
                         similar_to=similar_news,
                         similarity_score=similarity_score,
                         is_ai_processed=True,
-                    )
-                    new_articles_count += 1
-                    redundant_count += 1
-                except Exception:
-                    logger.exception(
-                        "Error al guardar noticia redundante. GUID=%s título=%s",
-                        guid[:100],
-                        entry.title[:100],
-                    )
-                continue
-
-            ai_was_processed = False
-            short_answer = None
-            ai_filter_reason = None
-
-            if max_ai_items is not None and ai_attempts >= max_ai_items:
-                logger.info(
-                    f"Presupuesto de IA agotado ({max_ai_items}); "
-                    "se pausa la ingesta para continuar en la próxima actualización."
-                )
-                break
+                        embedding_state=News.EMBEDDING_SKIPPED,
+                        summary_state=News.SUMMARY_SKIPPED,
+                    ), label='noticia redundante', on_saved=count_redundant)
+                    continue
 
-            ai_attempts += 1
+                if outcome in ('budget', 'ai_failed', 'skipped') and local_summaries:
+                    if not counts['provisional']:
+                        logger.info(
+                            "Sin resumen de IA (%s); las noticias que quedan se publican con un "
+                            "resumen local hasta que retry_summarize_pending las resuma.",
+                            f"presupuesto de {max_ai_items} agotado" if outcome == 'budget' else "Cerebras no disponible",
+                        )
+                    counts['provisional'] += 1
+                    news_item = item['candidate']
+                    embedding = item['embedding']
+                    news_item.description = sanitize_html(extractive.summarize(
+                        entry.title, plain_description, max_sentences=local_summary_sentences
+                    ))
+                    news_item.pending_content = plain_description[:DEFAULT_AI_CONTENT_LIMIT]
+                    news_item.is_provisional = True
+                    news_item.link = entry.link
+                    news_item.image_url = image_url
+                    news_item.embedding_state = (
+                        News.EMBEDDING_EMBEDDED if embedding else News.EMBEDDING_PENDING
+                    )
+                    news_item.interest_score = interest_model.score(embedding) if embedding else None
+                    news_item.similar_to = similar_news
+                    news_item.similarity_score = similarity_score if similar_news else None
+                    write_buffer.add(news_item, label='noticia con resumen local', on_saved=index_saved)
+                    continue
 
-            # Si no se filtró por palabra clave ni es redundante, procesar con IA (Cerebras)
-            processed_description, short_answer, ai_filter_reason = FeedService.process_content_with_cerebras(
-                entry.title,
-                original_description,
-                cerebras_client,
-                ai_model_name,
-                filter_instructions_text,
-                content_limit=ai_content_limit,
-            )
-            if processed_description:
-                ai_was_processed = True
-            else:
-                logger.warning(
-                    "Cerebras no generó resumen; se pausa la ingesta para reintentar luego."
-                )
-                break
+                if outcome == 'budget' and prioritize:
+                    # Las que se quedaron fuera están repartidas por la pasada y
+                    # sin guardarlas el corte por fuente pasaría por encima de
+                    # ellas. Se guardan ocultas y pendientes: retry_summarize_pending
+                    # las resume (las más antiguas primero) y entonces se publican.
+                    if not counts['pending_summary']:
+                        logger.info(
+                            "Presupuesto de IA agotado (%s); las que quedan se guardan ocultas "
+                            "hasta que retry_summarize_pending las resuma.",
+                            max_ai_items,
+                        )
+                    counts['pending_summary'] += 1
+                    news_item = item['candidate']
+                    embedding = item['embedding']
+                    # Fila oculta: texto plano recortado; el de origen va en pending_content.
+                    news_item.description = sanitize_html(plain_description[:2000])
+                    news_item.pending_content = plain_description[:DEFAULT_AI_CONTENT_LIMIT]
+                    news_item.link = entry.link
+                    news_item.image_url = image_url
+                    news_item.embedding_state = (
+                        News.EMBEDDING_EMBEDDED if embedding else News.EMBEDDING_PENDING
+                    )
+                    news_item.interest_score = interest_model.score(embedding) if embedding else None
+                    news_item.similar_to = similar_news
+                    news_item.similarity_score = similarity_score if similar_news else None
+                    write_buffer.add(news_item, label='noticia pendiente de resumen', on_saved=index_saved)
+                    continue
 
-            # >>>>> LÓGICA DE FILTRADO IA (después de palabra clave) <<<<<
-            # Asegurarnos que ai_filter_reason es un string no vacío antes de usarlo
-            if ai_was_processed and ai_filter_reason and isinstance(ai_filter_reason, str) and ai_filter_reason.strip():
-                logger.info(f"Noticia marcada para FILTRAR por IA. Razón: {ai_filter_reason}")
-                
-                try:
-                    News.objects.create(
-                        guid=guid,
-                        title=entry.title,
-                        short_answer=short_answer,
-                        description=processed_description,
-                        link=entry.link,
-                        published_date=published,
-                        source=source,
-                        image_url=image_url,
-                        is_filtered=True,
-                        is_ai_filtered=True,
-                        ai_filter_reason=ai_filter_reason.strip(),
-                        is_ai_processed=True
+                if outcome == 'budget':
+                    logger.info(
+                        f"Presupuesto de IA agotado ({max_ai_items}); "
+                        "se pausa la ingesta para continuar en la próxima actualización."
                     )
-                    new_articles_count += 1
-                except Exception:
-                    logger.exception(
-                        "Error al guardar noticia filtrada por IA. GUID=%s título=%s link=%s ai_filter_reason=%s",
-                        guid[:100],
-                        entry.title[:100],
-                        entry.link[:100],
-                        ai_filter_reason[:100],
+                    break
+
+                if outcome == 'ai_failed':
+                    # Las que ya estaban en vuelo y sí tienen resumen se guardan
+                    # igual, salvo las de esta misma fuente; la ingesta se corta
+                    # en la primera que no llegó a mandarse ('skipped').
+                    logger.warning(
+                        "Cerebras no generó resumen; se pausa la ingesta para reintentar luego."
                     )
+                    held_sources.add(source.id)
                     continue
-                    
-                continue # Pasar a la siguiente noticia
-            elif ai_filter_reason: # Si Gemini devolvió algo pero no es un string válido
-                logger.warning(f"Gemini devolvió un valor para ai_filter ({ai_filter_reason}) pero no es la instrucción esperada. No se filtrará.")
-            # <<<<< FIN LÓGICA FILTRADO IA >>>>>
-
-            # Puntuación de interés personal: el embedding ya está calculado, así
-            # que solo cuesta un producto matriz-vector. Es informativa; no
-            # descarta nada ni sustituye a las palabras filtro.
-            interest_score = interest_model.score(embedding) if embedding else None
 
-            # Crear la nueva noticia (si no fue filtrada por IA ni por palabra)
-            try:
-                news_item = News.objects.create(
-                    guid=guid,
-                    title=entry.title,
-                    short_answer=short_answer,
-                    description=processed_description,
-                    link=entry.link,
-                    published_date=published,
-                    source=source,
-                    image_url=image_url,
-                    is_ai_processed=ai_was_processed,
-                    interest_score=interest_score,
-                    # Conservar la referencia a la más parecida aunque no supere el umbral
-                    similar_to=similar_news,
-                    similarity_score=similarity_score if similar_news else None,
-                )
-                new_articles_count += 1
-            except Exception:
-                logger.exception(
-                    "Error al guardar noticia normal. GUID=%s título=%s link=%s",
-                    guid[:100],
-                    entry.title[:100],
-                    entry.link[:100],
+                if outcome == 'skipped':
+                    break
+
+                news_item = item['candidate']
+                embedding = item['embedding']
+                processed_description = item['processed_description']
+                short_answer = item['short_answer']
+                ai_filter_reason = item['ai_filter_reason']
+                news_item.short_answer = short_answer
+                news_item.description = processed_description
+                news_item.link = entry.link
+                news_item.image_url = image_url
+                news_item.is_ai_processed = True
+                news_item.summary_model = item['summary_model']
+                news_item.summary_state = News.SUMMARY_DONE
+                # Pasa a indexada cuando su vector llega al índice (ver
+                # index_saved); si no llega, retry_missing_embeddings la recoge.
+                news_item.embedding_state = (
+                    News.EMBEDDING_EMBEDDED if embedding else News.EMBEDDING_PENDING
                 )
-                continue
 
-            if embedding:
-                news_item._embedding_vector = embedding
-                recent_news_cache.append(news_item)
-                # Indexar en Qdrant (si está disponible) para futuras búsquedas
-                if vector_index is not None:
-                    try:
-                        vector_index.ensure_collection(len(embedding))
-                        vector_index.upsert(
-                            news_item.guid,
-                            embedding,
-                            FeedService.build_vector_payload(news_item),
-                        )
-                    except Exception:
-                        # No se silencia: una noticia sin indexar no participa en
-                        # la detección de duplicados de las siguientes, y el fallo
-                        # era invisible hasta ahora.
-                        indexing_failures += 1
-                        logger.exception(
-                            "Error indexando en Qdrant. news_id=%s título=%s",
-                            news_item.id,
-                            news_item.title[:100],
-                        )
-            else:
-                # Sin embedding esta noticia no pasó por el control de duplicados
-                # y tampoco servirá para comparar las futuras.
-                embedding_failures += 1
-                logger.warning(
-                    "Noticia guardada SIN embedding (se salta el control de duplicados). "
-                    "news_id=%s título=%s",
-                    news_item.id,
-                    news_item.title[:100],
-                )
+                # >>>>> LÓGICA DE FILTRADO IA (después de palabra clave) <<<<<
+                # Asegurarnos que ai_filter_reason es un string no vacío antes de usarlo
+                if ai_filter_reason and isinstance(ai_filter_reason, str) and ai_filter_reason.strip():
+                    logger.info(f"Noticia marcada para FILTRAR por IA. Razón: {ai_filter_reason}")
+
+                    news_item.is_filtered = True
+                    news_item.is_ai_filtered = True
+                    news_item.ai_filter_reason = ai_filter_reason.strip()
+                    news_item.embedding_state = News.EMBEDDING_SKIPPED
+                    write_buffer.add(news_item, label='noticia filtrada por IA', on_saved=count_new)
+                    continue # Pasar a la siguiente noticia
+                elif ai_filter_reason: # Si Gemini devolvió algo pero no es un string válido
+                    logger.warning(f"Gemini devolvió un valor para ai_filter ({ai_filter_reason}) pero no es la instrucción esperada. No se filtrará.")
+                # <<<<< FIN LÓGICA FILTRADO IA >>>>>
+
+                # Puntuación de interés personal: el embedding ya está calculado, así
+                # que solo cuesta un producto matriz-vector. Es informativa; no
+                # descarta nada ni sustituye a las palabras filtro.
+                news_item.interest_score = interest_model.score(embedding) if embedding else None
+                # Conservar la referencia a la más parecida aunque no supere el umbral
+                news_item.similar_to = similar_news
+                news_item.similarity_score = similarity_score if similar_news else None
+
+                # Crear la nueva noticia (si no fue filtrada por IA ni por palabra);
+                # se indexa cuando el lote se guarda y ya tiene id.
+                write_buffer.add(news_item, label='noticia normal', on_saved=index_saved)
+
+        new_articles_count = counts['new']
+        redundant_count = counts['redundant']
+        embedding_failures = counts['no_embedding']
+        indexing_failures = upserts.stats['failed'] if vector_index is not None else 0
+        FeedService.mark_indexed(indexed_guids)
+        logger.info("Escrituras en la BD: %s", write_buffer.summary())
+        if vector_index is not None:
+            logger.info("Indexación vectorial: %s", upserts.summary())
+        cache_writes.flush()
+        summary_writes.flush()
+        FeedService.last_pipeline_stats = [stats.snapshot() for stats in pipeline.stats]
+        logger.info("Etapas de la ingesta: %s", pipeline.summary())
+
+        # Los validadores solo se guardan si todas las entradas recogidas de esa
+        # fuente están ya en la BD. Si la pasada se cortó (presupuesto de IA,
+        # error al guardar), la próxima tiene que volver a parsear el feed
+        # aunque no haya cambiado: si no, las pendientes no se verían nunca.
+        collected_guids = [item['guid'] for item in all_entries]
+        saved_guids = set()
+        for start in range(0, len(collected_guids), 500):
+            saved_guids.update(
+                News.objects.filter(
+                    guid__in=collected_guids[start:start + 500]
+                ).values_list('guid', flat=True)
+            )
+        unsettled_sources = {
+            item['source'].id for item in all_entries if item['guid'] not in saved_guids
+        }
 
-        
         # Actualizar la fecha de última obtención para todas las fuentes con una sola escritura
         fetched_at = timezone.now()
         for source in sources:
             source.last_fetch = fetched_at
+            validators = new_validators.get(source.id)
+            if validators and source.id not in unsettled_sources:
+                source.etag = validators['etag']
+                source.last_modified = validators['last_modified']
+                source.content_hash = validators['content_hash']
         if sources:
-            FeedSource.objects.bulk_update(sources, ['last_fetch'])
+            FeedSource.objects.bulk_update(
+                sources, ['last_fetch', 'etag', 'last_modified', 'content_hash']
+            )
             for source in sources:
                 logger.info(f"Actualizada fecha de última obtención para {source.name}")
         
@@ -1396,6 +2556,40 @@ class FeedService:
         logger.info(f"\nProceso completado en {total_time:.2f} segundos")
         logger.info(f"Total de nuevas noticias: {new_articles_count}")
         logger.info(f"Noticias redundantes eliminadas: {redundant_count}")
+        if counts['provisional']:
+            logger.info(f"Publicadas con resumen local (pendientes de IA): {counts['provisional']}")
+        if counts['pending_summary']:
+            logger.info(f"Guardadas ocultas fuera del presupuesto (pendientes de IA): {counts['pending_summary']}")
+        logger.info(
+            "Caché de embeddings: %s",
+            embedding_cache.stats.summary_since(embedding_cache_snapshot),
+        )
+        logger.info(
+            "Caché de resúmenes: %s",
+            summary_cache.stats.summary_since(summary_cache_snapshot),
+        )
+        logger.info(
+            "Artículos completos: %s",
+            article_fetcher.summary_since(article_snapshot),
+        )
+        for model_name, token_snapshot in token_snapshots.items():
+            logger.info(
+                "Tokens de Cerebras con %s (estimado frente a real): %s",
+                model_name,
+                FeedService.rate_limiter(model_name).estimator.summary_since(token_snapshot),
+            )
+        logger.info(
+            "Caché condicional de feeds: %s aciertos (%s con 304, %s con el mismo contenido), "
+            "%s fallos parseados (%s por la vía rápida, %s con feedparser), %.1f KB descargados%s",
+            feed_cache_stats['not_modified'] + feed_cache_stats['same_body'],
+            feed_cache_stats['not_modified'],
+            feed_cache_stats['same_body'],
+            feed_cache_stats['parsed'],
+            feed_cache_stats['rapido'],
+            feed_cache_stats['feedparser'],
+            feed_cache_stats['bytes'] / 1024,
+            f"; {len(unsettled_sources)} fuentes quedan pendientes de re-parsear" if unsettled_sources else "",
+        )
         if embedding_failures or indexing_failures:
             logger.warning(
                 "Vectorización con fallos: %s sin embedding y %s sin indexar. "
@@ -0,0 +1,198 @@
+"""Caché persistente de resúmenes de Cerebras.
+
+El mismo artículo llega a menudo por varios feeds (agencias, versiones en
+otras secciones) y ``retry_summarize_pending`` vuelve a pedir resúmenes de
+textos que el modelo ya vio. Con 30k TPM cada petición ahorrada son unos
+miles de tokens para otra noticia. Aquí se guarda el resultado de
+``process_content_with_cerebras`` (resumen HTML, respuesta corta y razón de
+filtro) en ``SummaryCacheEntry``.
+
+La clave es el sha256 del contenido preparado (titular y texto tal como van
+al prompt) junto con el modelo y el hash de las instrucciones de filtro
+activas. Cambiar ``AIModelSetting`` o cualquier ``AIFilterInstruction`` (o la
+compresión del prompt) cambia la clave, así que lo anterior deja de acertar
+sin vaciar nada; esas entradas se van por TTL o por expulsión.
+
+El tamaño está acotado por ``NEWS_SUMMARY_CACHE_MAX_ENTRIES`` (se expulsan
+las usadas hace más tiempo) y cada entrada caduca a los
+``NEWS_SUMMARY_CACHE_TTL`` segundos. Solo se guardan resultados con resumen.
+Un fallo de la caché nunca impide resumir: se registra y se sigue.
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .embedding_cache import CacheStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = 3 * 24 * 3600
+# Al expulsar se libera un 10 % extra para no tener que hacerlo en cada escritura.
+EVICTION_SLACK = 0.1
+
+stats = CacheStats()
+
+
+def is_enabled():
+    return bool(getattr(settings, "NEWS_SUMMARY_CACHE_ENABLED", True))
+
+
+def ttl_seconds():
+    return int(getattr(settings, "NEWS_SUMMARY_CACHE_TTL", DEFAULT_TTL))
+
+
+def instructions_hash(filter_instructions_text):
+    return hashlib.sha256((filter_instructions_text or "").encode("utf-8")).hexdigest()
+
+
+def make_key(title, content, model_name, filter_instructions_text):
+    """Clave del contenido preparado para un modelo y unas instrucciones."""
+    raw = "\x1f".join([
+        model_name or "",
+        instructions_hash(filter_instructions_text),
+        title or "",
+        content or "",
+    ]).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def lookup(keys, touch=True):
+    """Resultados cacheados y vigentes para ``keys``, como dict clave → tupla.
+
+    Con ``touch=False`` no se actualiza ``last_used_at`` (ver ``WriteBehind``).
+    """
+    from .models import SummaryCacheEntry
+
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not keys or not is_enabled() or ttl_seconds() <= 0:
+        return {}
+
+    found = {}
+    try:
+        fresh_since = timezone.now() - timedelta(seconds=ttl_seconds())
+        for start in range(0, len(keys), 500):
+            rows = SummaryCacheEntry.objects.filter(
+                key__in=keys[start:start + 500], created_at__gte=fresh_since,
+            ).values_list("key", "summary", "short_answer", "ai_filter_reason")
+            for key, summary, short_answer, ai_filter_reason in rows:
+                found[key] = (summary, short_answer, ai_filter_reason)
+        if found and touch:
+            touch_keys(found)
+    except Exception:
+        logger.exception("Error leyendo la caché de resúmenes; se ignora")
+        found = {}
+
+    stats.record(len(found), len(keys) - len(found))
+    return found
+
+
+def touch_keys(keys):
+    """Marca ``keys`` como usadas ahora (para la expulsión LRU)."""
+    from .models import SummaryCacheEntry
+
+    keys = list(keys)
+    for start in range(0, len(keys), 500):
+        SummaryCacheEntry.objects.filter(key__in=keys[start:start + 500]).update(
+            last_used_at=timezone.now()
+        )
+
+
+def store(entries):
+    """Guarda ``{clave: (modelo, instrucciones, resultado)}`` y aplica los topes."""
+    from .models import SummaryCacheEntry
+
+    if not entries or not is_enabled() or ttl_seconds() <= 0:
+        return 0
+
+    now = timezone.now()
+    rows = [
+        SummaryCacheEntry(
+            key=key,
+            model_name=model_name or "",
+            instructions_hash=instructions_hash(filter_instructions_text),
+            summary=result[0],
+            short_answer=result[1],
+            ai_filter_reason=result[2],
+            last_used_at=now,
+        )
+        for key, (model_name, filter_instructions_text, result) in entries.items()
+        if key and result and result[0]
+    ]
+    if not rows:
+        return 0
+
+    try:
+        # Si la clave ya estaba es una entrada caducada: se reemplaza.
+        SummaryCacheEntry.objects.filter(key__in=[row.key for row in rows]).delete()
+        SummaryCacheEntry.objects.bulk_create(rows, ignore_conflicts=True, batch_size=200)
+        evict()
+    except Exception:
+        logger.exception("Error guardando en la caché de resúmenes; se ignora")
+        return 0
+    return len(rows)
+
+
+def evict(max_entries=None):
+    """Borra las caducadas y, si aún sobran, las usadas hace más tiempo."""
+    from .models import SummaryCacheEntry
+
+    expired, _ = SummaryCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=ttl_seconds())
+    ).delete()
+
+    max_entries = int(
+        max_entries
+        or getattr(settings, "NEWS_SUMMARY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+    )
+    total = SummaryCacheEntry.objects.count()
+    deleted = 0
+    if total > max_entries:
+        excess = total - max_entries + int(max_entries * EVICTION_SLACK)
+        stale_ids = list(
+            SummaryCacheEntry.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:excess]
+        )
+        deleted, _ = SummaryCacheEntry.objects.filter(id__in=stale_ids).delete()
+    if expired or deleted:
+        logger.info(
+            "Caché de resúmenes: %s caducadas y %s expulsadas (tope %s)", expired, deleted, max_entries
+        )
+    return expired + deleted
+
+
+class WriteBehind:
+    """Escrituras aplazadas hasta ``flush``, como ``embedding_cache.WriteBehind``.
+
+    La etapa de resumen corre en otros hilos mientras el principal guarda
+    noticias en transacciones; los resultados nuevos y los aciertos se
+    apuntan aquí y los escribe el hilo principal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.touched = set()
+
+    def add(self, entries):
+        with self._lock:
+            self.entries.update(entries)
+
+    def touch(self, keys):
+        with self._lock:
+            self.touched.update(keys)
+
+    def flush(self):
+        with self._lock:
+            entries, self.entries = self.entries, {}
+            touched, self.touched = self.touched - set(entries), set()
+        if touched and is_enabled():
+            try:
+                touch_keys(touched)
+            except Exception:
+                logger.exception("Error actualizando la caché de resúmenes; se ignora")
+        return store(entries)
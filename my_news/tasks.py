@@ -1,14 +1,20 @@
 from .services import EmbeddingService, FeedService, DEFAULT_AI_MODEL
+from .content_document import ContentDocument
 from .interest import INTEREST_DISTRIBUTION_CACHE_KEY, InterestModel, scored_population
 from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from .models import News
 from .models import AIModelSetting
 from .models import AIFilterInstruction
+from . import priority, summary_cache
+from .pipeline import Pipeline, Stage
+from .vector_index import UpsertBuffer
 from django.conf import settings
 from django.db import connection
+from django.db.models import Q
 import os
+import time
 import portalocker
 import logging
 
@@ -16,44 +22,117 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def purge_orphan_vectors(batch_size: int = 256):
-    """Elimina de Qdrant puntos cuyo news_id ya no existe en la base de datos."""
-    try:
-        vector_index = FeedService.initialize_vector_index()
-        if vector_index is None:
-            return 0
+def purge_orphan_vectors(days: int = 15, vector_index=None, check_all: bool = False):
+    """Concilia el índice vectorial con la BD por tramos de ``published_ts``.
 
-        existing_news_ids = set(News.objects.values_list('id', flat=True))
-        orphan_point_ids = []
+    Antes se cargaban todos los ids de News y se recorría la colección entera
+    en cada purga. Ahora, por cada tramo de la ventana (y uno más para lo
+    anterior, donde solo deberían quedar las guardadas), se compara cuántos
+    puntos cuenta el índice con cuántas noticias indexadas tiene la BD. Solo
+    se recorren los tramos que no cuadran (o todos con ``check_all``), y sin
+    vectores:
 
-        for point in vector_index.scroll_points(limit=batch_size):
-            payload = getattr(point, 'payload', {}) or {}
-            news_id = payload.get('news_id')
-            if news_id is None:
-                orphan_point_ids.append(point.id)
-                continue
+    * los puntos cuya noticia ya no existe se borran;
+    * las noticias que tienen punto quedan como indexadas;
+    * las marcadas como indexadas sin punto vuelven a 'pending' para que
+      ``retry_missing_embeddings`` las recupere.
 
-            try:
-                normalized_news_id = int(news_id)
-            except (TypeError, ValueError):
-                orphan_point_ids.append(point.id)
-                continue
+    Un tramo con tantos huérfanos como noticias sin punto cuadra y no se
+    revisa; ``check_all`` existe para esos casos.
+    """
+    try:
+        if vector_index is None:
+            vector_index = FeedService.initialize_vector_index()
+        if vector_index is None:
+            return 0
 
-            if normalized_news_id not in existing_news_ids:
-                orphan_point_ids.append(point.id)
+        bucket = max(1, int(getattr(settings, 'NEWS_VECTOR_RECONCILE_BUCKET_HOURS', 24))) * 3600
+        cutoff_ts = int((timezone.now() - timedelta(days=days)).timestamp())
+        now_ts = int(time.time())
+        edges = [None] + list(range(cutoff_ts, now_ts + 1, bucket)) + [None]
 
         deleted_vectors = 0
-        for start in range(0, len(orphan_point_ids), batch_size):
-            deleted_vectors += vector_index.delete_point_ids(
-                orphan_point_ids[start:start + batch_size]
+        checked = 0
+        for min_ts, max_ts in zip(edges, edges[1:]):
+            indexed = News.objects.filter(
+                _published_between(min_ts, max_ts), embedding_state=News.EMBEDDING_INDEXED
             )
+            if not check_all and vector_index.count_points(min_ts, max_ts) == indexed.count():
+                continue
+            checked += 1
+            deleted_vectors += _reconcile_range(vector_index, min_ts, max_ts, indexed)
 
-        logger.info(f"Limpieza Qdrant completada: {deleted_vectors} vectores huérfanos eliminados")
+        logger.info(
+            f"Conciliación del índice vectorial: {checked} de {len(edges) - 1} tramos revisados, "
+            f"{deleted_vectors} vectores huérfanos eliminados"
+        )
         return deleted_vectors
     except Exception:
         logger.exception("Error limpiando vectores huérfanos en Qdrant")
         return 0
 
+
+def _published_between(min_ts, max_ts):
+    """Las noticias cuyo ``published_ts`` (segundos enteros) cae en ``[min_ts, max_ts)``."""
+    condition = Q()
+    if min_ts is not None:
+        condition &= Q(published_date__gte=datetime.fromtimestamp(min_ts, tz=dt_timezone.utc))
+    if max_ts is not None:
+        condition &= Q(published_date__lt=datetime.fromtimestamp(max_ts, tz=dt_timezone.utc))
+    return condition
+
+
+def _reconcile_range(vector_index, min_ts, max_ts, indexed):
+    points = vector_index.news_ids_between(min_ts, max_ts)
+    point_news_ids = set()
+    for news_id in points.values():
+        try:
+            point_news_ids.add(int(news_id))
+        except (TypeError, ValueError):
+            continue
+    existing = set()
+    ids = list(point_news_ids)
+    for start in range(0, len(ids), 500):
+        existing.update(
+            News.objects.filter(id__in=ids[start:start + 500]).values_list('id', flat=True)
+        )
+
+    orphans = []
+    for point_id, news_id in points.items():
+        try:
+            if int(news_id) in existing:
+                continue
+        except (TypeError, ValueError):
+            pass
+        orphans.append(point_id)
+    deleted = 0
+    for start in range(0, len(orphans), 256):
+        deleted += vector_index.delete_point_ids(orphans[start:start + 256])
+
+    missing = set(indexed.values_list('id', flat=True)) - existing
+    if missing:
+        News.objects.filter(id__in=missing).update(
+            embedding_state=News.EMBEDDING_PENDING, embedding_retry_at=None
+        )
+    relabel = list(existing)
+    for start in range(0, len(relabel), 500):
+        News.objects.filter(id__in=relabel[start:start + 500]).exclude(
+            embedding_state=News.EMBEDDING_INDEXED
+        ).update(embedding_state=News.EMBEDDING_INDEXED, embedding_retry_at=None)
+    return deleted
+
+
+def _due(step, now):
+    """Las de ``step`` ('embedding' o 'summary') sin reintento programado o ya vencido."""
+    return Q(**{f'{step}_retry_at__isnull': True}) | Q(**{f'{step}_retry_at__lte': now})
+
+
+def _next_retry(attempts, now):
+    """Espera exponencial desde NEWS_RETRY_BACKOFF_MINUTES, con tope de un día."""
+    base = max(1, int(getattr(settings, 'NEWS_RETRY_BACKOFF_MINUTES', 30)))
+    return now + timedelta(minutes=min(base * 2 ** max(0, attempts - 1), 24 * 60))
+
+
 def retry_missing_embeddings(limit: int = 25, days: int = 15):
     """Indexa las noticias que se quedaron sin vector por un fallo puntual.
 
@@ -75,26 +154,20 @@ def retry_missing_embeddings(limit: int = 25, days: int = 15):
             logger.warning("Qdrant no disponible; no se reintentan los embeddings pendientes.")
             return 0
 
-        indexados = set()
-        for point in vector_index.scroll_points(limit=256):
-            news_id = (getattr(point, 'payload', {}) or {}).get('news_id')
-            if news_id is not None:
-                try:
-                    indexados.add(int(news_id))
-                except (TypeError, ValueError):
-                    continue
-
-        cutoff = timezone.now() - timedelta(days=days)
-        # Se excluyen las que no se indexan por diseño: filtradas por palabra
-        # (el filtro corta antes del embedding), redundantes y filtradas por IA.
+        now = timezone.now()
+        cutoff = now - timedelta(days=days)
+        # El estado dice qué falta: las que no se indexan por diseño (filtradas
+        # por palabra o por IA, redundantes) ya están en 'skipped'. Los flags se
+        # siguen comprobando por si alguien las filtró después desde el admin.
         pendientes = (
             News.objects.filter(
+                _due('embedding', now),
+                embedding_state__in=[News.EMBEDDING_PENDING, News.EMBEDDING_EMBEDDED],
                 published_date__gte=cutoff,
                 filtered_by__isnull=True,
                 is_redundant=False,
                 is_ai_filtered=False,
             )
-            .exclude(id__in=indexados)
             .order_by('-published_date')[:limit]
         )
 
@@ -102,41 +175,72 @@ def retry_missing_embeddings(limit: int = 25, days: int = 15):
             return 0
 
         gemini_client = FeedService.initialize_gemini()
-        recuperadas = 0
+        pendientes = list(pendientes)
+        # Las que ya tienen punto (p. ej. las que la migración 0037 dejó en
+        # 'pending' sin poder comprobarlo) solo cambian de estado: no se le
+        # vuelve a pedir el vector a Gemini.
+        try:
+            en_indice = vector_index.vectors_for_guids([news.guid for news in pendientes])
+        except Exception:
+            logger.exception("Error consultando en Qdrant los vectores de las pendientes")
+            en_indice = {}
+        indexadas = set()
+        faltan = []
         for news in pendientes:
-            texto = f"{news.title} {news.description or ''}"
-            embedding = EmbeddingService.generate_embedding(texto, gemini_client)
-            if not embedding:
-                logger.warning(
-                    "Sigue sin poder generarse el embedding de la noticia %s", news.id
+            vector = en_indice.get(news.guid)
+            if vector is not None and len(vector):
+                news._embedding_vector = vector
+                indexadas.add(news.guid)
+            else:
+                faltan.append(news)
+        # Una sola petición a Gemini para todas las que faltan de la pasada.
+        vectores = EmbeddingService.generate_embeddings_batch(
+            [f"{news.title} {news.description or ''}" for news in faltan],
+            gemini_client,
+        ) if faltan else []
+        # Los vectores se mandan al índice en lotes; solo las que llegan
+        # cuentan como recuperadas.
+        with UpsertBuffer.from_settings(vector_index) as upserts:
+            for news, embedding in zip(faltan, vectores):
+                if not embedding:
+                    logger.warning(
+                        "Sigue sin poder generarse el embedding de la noticia %s", news.id
+                    )
+                    continue
+                news._embedding_vector = embedding
+                upserts.add(
+                    news.guid,
+                    embedding,
+                    FeedService.build_vector_payload(news),
+                    on_written=indexadas.add,
                 )
-                continue
+        recuperadas = len(indexadas)
+        for news in pendientes:
+            if news.guid in indexadas:
+                news.embedding_state = News.EMBEDDING_INDEXED
+                news.embedding_retry_at = None
+            else:
+                news.embedding_attempts += 1
+                news.embedding_retry_at = _next_retry(news.embedding_attempts, now)
+        News.objects.bulk_update(
+            pendientes, ['embedding_state', 'embedding_attempts', 'embedding_retry_at']
+        )
 
+        for news in pendientes:
+            # Solo informativo: se anota el parecido, sin ocultar nada.
+            if news.guid not in indexadas or news.similarity_score is not None:
+                continue
             try:
-                vector_index.ensure_collection(len(embedding))
-                vector_index.upsert(
-                    news.guid, embedding, FeedService.build_vector_payload(news)
+                _, similar, score = EmbeddingService.check_redundancy(
+                    news, gemini_client, None, vector_index
                 )
             except Exception:
-                logger.exception("Error indexando la noticia %s en el reintento", news.id)
+                logger.exception("Error calculando similitud de la noticia %s", news.id)
                 continue
-
-            recuperadas += 1
-
-            # Solo informativo: se anota el parecido, sin ocultar nada.
-            if news.similarity_score is None:
-                news._embedding_vector = embedding
-                try:
-                    _, similar, score = EmbeddingService.check_redundancy(
-                        news, gemini_client, None, vector_index
-                    )
-                except Exception:
-                    logger.exception("Error calculando similitud de la noticia %s", news.id)
-                    continue
-                if similar is not None:
-                    news.similar_to = similar
-                    news.similarity_score = score
-                    news.save(update_fields=['similar_to', 'similarity_score'])
+            if similar is not None:
+                news.similar_to = similar
+                news.similarity_score = score
+                news.save(update_fields=['similar_to', 'similarity_score'])
 
         logger.info(
             "Reintento de embeddings: %s noticias indexadas de %s pendientes revisadas",
@@ -232,7 +336,8 @@ def update_news_cron():
         with portalocker.Lock(lock_path, timeout=0):
             # Completar algunas pendientes antes de traer nuevas, sin solapar el siguiente cron.
             try:
-                retry_summarize_pending(limit=5, days=15)
+                # Las que ya esperaron NEWS_AI_PRIORITY_MAX_WAIT_HOURS van todas.
+                retry_summarize_pending(limit=5, days=15, overdue_before=priority.overdue_before())
             except Exception:
                 logger.exception("Error reintentando resúmenes pendientes antes del cron")
             FeedService.fetch_and_save_news(max_ai_items=20)
@@ -265,20 +370,32 @@ def purge_old_news(days: int = 15):
     usuario haya marcado como guardadas.
     """
     try:
-        cutoff = timezone.now() - timedelta(days=days)
+        # En segundos enteros, como el published_ts de los vectores.
+        cutoff = (timezone.now() - timedelta(days=days)).replace(microsecond=0)
         stale_news = News.objects.filter(published_date__lt=cutoff, is_saved=False)
-        stale_guids = list(stale_news.values_list('guid', flat=True))
         deleted_count, _ = stale_news.delete()
 
         deleted_vectors = 0
         vector_index = FeedService.initialize_vector_index()
         if vector_index is not None:
+            # Un solo borrado por filtro en el servidor. Las guardadas conservan
+            # su vector (votarlas después no obliga a pedírselo otra vez a
+            # Gemini) por la marca is_saved de su payload, que pone la vista al
+            # guardarlas. Por si aquello no llegó al índice, antes se marcan las
+            # guardadas que cruzan ahora el corte: un día de noticias, no todo
+            # el historial.
+            expiring = News.objects.filter(
+                published_date__lt=cutoff,
+                published_date__gte=cutoff - timedelta(days=1),
+                is_saved=True,
+            ).values_list('guid', flat=True)
             try:
-                deleted_vectors += vector_index.delete_many(stale_guids)
+                vector_index.set_saved(list(expiring), True)
+                deleted_vectors += vector_index.purge_before(int(cutoff.timestamp()))
             except Exception:
                 logger.exception("Error eliminando vectores antiguos en Qdrant")
 
-            deleted_vectors += purge_orphan_vectors()
+            deleted_vectors += purge_orphan_vectors(days, vector_index)
 
         # Tras borrar filas, refrescar estadísticas del planificador de SQLite.
         # (VACUUM completo se evita: bloquea toda la BD y corre cada 30 min.)
@@ -300,21 +417,28 @@ def purge_old_news(days: int = 15):
         return 0
 
 
-def retry_summarize_pending(limit: int = 50, days: int = 15):
+def retry_summarize_pending(limit: int = 50, days: int = 15, overdue_before=None):
     """Reintenta generar resumen/short_answer para noticias recientes no filtradas por IA.
 
     Ampliado a una ventana de 15 días y sin depender de short_answer__isnull.
-    Solo cuenta como procesada si se guardan cambios.
+    Solo cuenta como procesada si se guardan cambios; si no, la noticia sigue
+    pendiente con su próximo reintento más lejos (``summary_retry_at``). Las
+    publicadas con resumen local se resumen desde ``pending_content`` (el
+    texto de origen) y dejan de ser provisionales.
+
+    Con ``overdue_before`` entran todas las publicadas antes de esa fecha
+    aunque pasen de ``limit`` (ver ``priority.overdue_before``); el resto
+    completa hasta ``limit``.
     """
     try:
         cerebras_client = FeedService.initialize_cerebras()
         try:
-            ai_model_name = (
+            ai_models = (
                 AIModelSetting.objects.first()
                 or AIModelSetting(model_name=DEFAULT_AI_MODEL)
-            ).model_name
+            ).route() or [DEFAULT_AI_MODEL]
         except Exception:
-            ai_model_name = DEFAULT_AI_MODEL
+            ai_models = [DEFAULT_AI_MODEL]
 
         try:
             filter_instructions_text = FeedService.build_filter_instructions_text(
@@ -323,23 +447,56 @@ def retry_summarize_pending(limit: int = 50, days: int = 15):
         except Exception:
             filter_instructions_text = FeedService._DEFAULT_FILTER_INSTRUCTIONS
 
-        cutoff = timezone.now() - timedelta(days=days)
+        now = timezone.now()
+        cutoff = now - timedelta(days=days)
         qs = News.objects.filter(
+            _due('summary', now),
+            summary_state=News.SUMMARY_PENDING,
             created_at__gte=cutoff,
             is_deleted=False,     # no reintentar si el usuario la eliminó
             is_ai_processed=False # solo las no procesadas por IA
-        ).order_by('created_at', 'id')[:limit]
-
-        processed = 0
-        for news in qs:
-            processed_description, short_answer, ai_filter_reason = FeedService.process_content_with_cerebras(
+        ).order_by('created_at', 'id')
+        if overdue_before is not None:
+            overdue = list(qs.filter(published_date__lt=overdue_before))
+            rest = qs.exclude(id__in=[news.id for news in overdue])
+            qs = overdue + list(rest[:max(0, limit - len(overdue))])
+        else:
+            qs = qs[:limit]
+
+        # Los hilos solo leen la caché de resúmenes; este la escribe al final.
+        summary_writes = summary_cache.WriteBehind()
+
+        def summarize(news):
+            content = news.pending_content or news.description or ''
+            document = ContentDocument(news.title, content)
+            result, model_name = FeedService.process_content_routed(
                 news.title,
-                news.description or '',
+                content,
                 cerebras_client,
-                ai_model_name,
-                filter_instructions_text
+                ai_models,
+                filter_instructions_text,
+                document=document,
+                write_behind=summary_writes,
             )
+            # Sin resumen y sin cupo en ningún modelo: se pospuso por cuota.
+            quota_wait = 0.0
+            if not result[0] and not result[2]:
+                quota_wait = FeedService.seconds_until_quota(
+                    ai_models, FeedService._routing_prompt(news.title, document, filter_instructions_text)
+                )
+            return news, result, model_name, quota_wait
 
+        # Varias peticiones en vuelo (las que permita CerebrasRateLimiter); las
+        # escrituras siguen en este hilo.
+        workers = max(1, int(getattr(settings, 'NEWS_SUMMARY_WORKERS', 4)))
+        pool = Pipeline([Stage('resumen', summarize, workers=workers)], name='reintento-resumenes')
+
+        token_snapshots = {
+            model_name: FeedService.rate_limiter(model_name).estimator.snapshot() for model_name in ai_models
+        }
+        summary_cache_snapshot = summary_cache.stats.snapshot()
+        processed = 0
+        for news, (processed_description, short_answer, ai_filter_reason), model_name, quota_wait in pool.run(list(qs)):
             if ai_filter_reason and isinstance(ai_filter_reason, str) and ai_filter_reason.strip():
                 news.description = processed_description or news.description
                 news.short_answer = short_answer
@@ -347,6 +504,11 @@ def retry_summarize_pending(limit: int = 50, days: int = 15):
                 news.is_ai_filtered = True
                 news.ai_filter_reason = ai_filter_reason.strip()
                 news.is_ai_processed = True
+                news.summary_model = model_name
+                news.is_provisional = False
+                news.pending_content = None
+                news.summary_state = News.SUMMARY_DONE
+                news.summary_retry_at = None
                 news.save()
                 processed += 1
                 continue
@@ -359,10 +521,33 @@ def retry_summarize_pending(limit: int = 50, days: int = 15):
                 news.description = new_description
                 news.short_answer = new_short_answer
                 news.is_ai_processed = True
+                news.summary_model = model_name
+                news.is_provisional = False
+                news.pending_content = None
+                news.summary_state = News.SUMMARY_DONE
+                news.summary_retry_at = None
                 news.save()
                 processed += 1
-
+            elif quota_wait > 0:
+                # Pospuesta por cuota (Deferred, 429 largo): no es un intento
+                # fallido; se vuelve a pedir cuando se reinicie el límite.
+                news.summary_retry_at = timezone.now() + timedelta(seconds=quota_wait)
+                news.save(update_fields=['summary_retry_at'])
+            else:
+                # Sin resumen: se espera cada vez más antes de volver a pedirlo.
+                news.summary_attempts += 1
+                news.summary_retry_at = _next_retry(news.summary_attempts, now)
+                news.save(update_fields=['summary_attempts', 'summary_retry_at'])
+
+        summary_writes.flush()
         logger.info(f"Reintento resúmenes completado. Noticias procesadas: {processed}")
+        logger.info("Caché de resúmenes: %s", summary_cache.stats.summary_since(summary_cache_snapshot))
+        for model_name, token_snapshot in token_snapshots.items():
+            logger.info(
+                "Tokens de Cerebras con %s (estimado frente a real): %s",
+                model_name,
+                FeedService.rate_limiter(model_name).estimator.summary_since(token_snapshot),
+            )
         return processed
     except Exception:
         logger.exception("Error en retry_summarize_pending")
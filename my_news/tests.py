@@ -1,15 +1,18 @@
 from datetime import timedelta
+import threading
+import time
 import uuid
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from types import SimpleNamespace
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.test import SimpleTestCase
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
+from .feed_parser import ParsedFeed
 from .models import FeedSource, News
 from .services import FeedService, CerebrasRateLimiter
 from .tasks import purge_old_news
@@ -123,10 +126,15 @@ class CerebrasContentPreparationTests(SimpleTestCase):
         self.assertEqual(len(cleaned), 10000)
 
 
+# Sin BD: la caché de resúmenes se prueba en tests_summary_cache.py.
+@override_settings(NEWS_SUMMARY_CACHE_ENABLED=False, CEREBRAS_QUOTA_LEDGER='')
 class CerebrasRateLimiterTests(SimpleTestCase):
     def setUp(self):
         FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
         FeedService._CEREBRAS_RATE_LIMITER.SAFE_RPM_CAP = 500
+        patcher = patch.object(FeedService, '_MODEL_RATE_LIMITERS', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_model_limits_are_conservative_for_news_processing(self):
         limiter = CerebrasRateLimiter()
@@ -190,6 +198,45 @@ class CerebrasRateLimiterTests(SimpleTestCase):
 
         self.assertIsNone(limiter.remaining_requests)
 
+    def test_in_flight_requests_are_counted_against_header_capacity(self):
+        limiter = CerebrasRateLimiter()
+        limiter.remaining_tokens = 2500
+        limiter.reset_tokens_at = limiter.window_start + 120
+
+        first = limiter.acquire('gemma-4-31b', 'x' * 400, 1000)
+        limiter.acquire('gemma-4-31b', 'x' * 400, 1000)
+        with self.assertRaises(CerebrasRateLimiter.Deferred):
+            limiter.acquire('gemma-4-31b', 'x' * 400, 1000)
+
+        limiter.release(first)
+        limiter.acquire('gemma-4-31b', 'x' * 400, 1000)
+        self.assertEqual(limiter.in_flight_requests, 2)
+
+    def test_pause_after_429_holds_back_every_thread(self):
+        limiter = CerebrasRateLimiter()
+        limiter.pause(limiter.MAX_RETRY_SLEEP_SECONDS + 30)
+
+        with self.assertRaises(CerebrasRateLimiter.Deferred):
+            limiter.acquire('gemma-4-31b', 'prompt', 8)
+
+    def test_concurrent_acquire_and_release_keep_counters_consistent(self):
+        limiter = CerebrasRateLimiter()
+
+        def worker():
+            for _ in range(25):
+                reserved = limiter.acquire('gpt-oss-120b', 'prompt', 8)
+                limiter.release(reserved)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(limiter.used_requests, 200)
+        self.assertEqual(limiter.in_flight_requests, 0)
+        self.assertEqual(limiter.in_flight_tokens, 0)
+
     def test_retry_after_is_read_from_response_headers(self):
         class Response:
             headers = {'Retry-After': '42'}
@@ -249,6 +296,10 @@ class CerebrasRateLimiterTests(SimpleTestCase):
         self.assertIsNone(description)
         self.assertIsNone(short_answer)
         self.assertIsNone(ai_filter)
+        limiter = FeedService._CEREBRAS_RATE_LIMITER
+        self.assertLessEqual(
+            limiter.paused_until - time.monotonic(), limiter.window_seconds + 1
+        )
 
     def test_single_large_request_does_not_wait_forever(self):
         limiter = CerebrasRateLimiter()
@@ -511,12 +562,14 @@ class FeedIngestionBudgetTests(TestCase):
             url='https://example.com/rss.xml',
         )
 
+    @override_settings(NEWS_LOCAL_SUMMARY_ENABLED=False, NEWS_AI_PRIORITY_ENABLED=False)
+    @patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None})
     @patch('my_news.services.EmbeddingService.check_redundancy', return_value=(False, None, 0.0))
     @patch('my_news.services.FeedService.initialize_vector_index', return_value=None)
     @patch('my_news.services.FeedService.initialize_cerebras', return_value=object())
     @patch('my_news.services.FeedService.initialize_gemini', return_value=object())
     @patch('my_news.services.FeedService.process_content_with_cerebras')
-    @patch('my_news.services.feedparser.parse')
+    @patch('my_news.services.parse_feed')
     @patch('my_news.services.requests.get')
     def test_ai_budget_does_not_drop_unprocessed_entries(
         self,
@@ -527,6 +580,7 @@ class FeedIngestionBudgetTests(TestCase):
         _initialize_cerebras,
         _initialize_vector_index,
         _check_redundancy,
+        _get_full_article_content,
     ):
         class Response:
             content = b'<rss></rss>'
@@ -536,6 +590,7 @@ class FeedIngestionBudgetTests(TestCase):
 
         now = timezone.now()
         mock_get.return_value = Response()
+        mock_parse.return_value = ParsedFeed()
         mock_parse.return_value.entries = [
             FeedEntry(
                 id='budget-1',
@@ -565,6 +620,369 @@ class FeedIngestionBudgetTests(TestCase):
         self.assertTrue(first.is_ai_processed)
         self.assertFalse(News.objects.filter(guid='budget-2').exists())
 
+    @patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None})
+    @patch('my_news.services.FeedService.initialize_vector_index', return_value=None)
+    @patch('my_news.services.FeedService.initialize_cerebras', return_value=object())
+    @patch('my_news.services.FeedService.initialize_gemini', return_value=object())
+    @patch('my_news.services.FeedService.process_content_with_cerebras', return_value=('Resumen IA', None, None))
+    @patch('my_news.services.parse_feed')
+    @patch('my_news.services.requests.get')
+    def test_entries_over_the_ai_budget_are_published_with_a_local_summary(
+        self, mock_get, mock_parse, mock_process, *_patches,
+    ):
+        response = SimpleNamespace(status_code=200, content=b'<rss></rss>', headers={'ETag': '"v1"'})
+        response.raise_for_status = lambda: None
+        mock_get.return_value = response
+        now = timezone.now()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [
+            FeedEntry(
+                id=f'local-{index}',
+                title=f'Noticia {index}',
+                link=f'https://example.com/local-{index}',
+                description=(
+                    f'La noticia {index} trae un dato nuevo. Alguien lo comenta en la red. '
+                    'Este texto ocupa el final del artículo.'
+                ),
+                published_parsed=(now - timedelta(minutes=3 - index)).utctimetuple(),
+            )
+            for index in range(3)
+        ]
+
+        created_count = FeedService.fetch_and_save_news(max_ai_items=1)
+
+        self.assertEqual(created_count, 3)
+        self.assertEqual(mock_process.call_count, 1)
+        self.assertTrue(News.objects.get(guid='local-0').is_ai_processed)
+        provisional = News.objects.get(guid='local-2')
+        self.assertTrue(provisional.is_provisional)
+        self.assertFalse(provisional.is_ai_processed)
+        self.assertEqual(provisional.summary_state, News.SUMMARY_PENDING)
+        self.assertIn('La noticia 2 trae un dato nuevo.', provisional.description)
+        self.assertIn('Este texto ocupa el final del artículo.', provisional.pending_content)
+        self.assertEqual(News.visible.count(), 3)
+        # Todo lo del feed quedó guardado: la próxima pasada no lo vuelve a parsear.
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.etag, '"v1"')
+
+
+class FeedConditionalFetchTests(TestCase):
+    def setUp(self):
+        self.source = FeedSource.objects.create(
+            name='Conditional Feed',
+            url='https://example.com/conditional.xml',
+        )
+
+    def response(self, status_code=200, content=b'<rss></rss>', headers=None):
+        response = SimpleNamespace(
+            status_code=status_code,
+            content=content,
+            headers=headers or {},
+        )
+        response.raise_for_status = lambda: None
+        return response
+
+    def entry(self, guid, minutes_ago):
+        return FeedEntry(
+            id=guid,
+            title=f'Noticia {guid}',
+            link=f'https://example.com/{guid}',
+            description='Descripcion',
+            published_parsed=(timezone.now() - timedelta(minutes=minutes_ago)).utctimetuple(),
+        )
+
+    def run_fetch(self, mock_get, mock_parse, max_ai_items=None):
+        with patch('my_news.services.requests.get', mock_get), \
+             patch('my_news.services.parse_feed', mock_parse), \
+             patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None}), \
+             patch('my_news.services.FeedService.initialize_gemini', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_vector_index', return_value=None), \
+             patch('my_news.services.EmbeddingService.check_redundancy', return_value=(False, None, 0.0)), \
+             patch('my_news.services.FeedService.process_content_with_cerebras', return_value=('Resumen IA', None, None)):
+            return FeedService.fetch_and_save_news(max_ai_items=max_ai_items)
+
+    def test_validators_are_sent_and_304_skips_parsing(self):
+        mock_get = MagicMock(return_value=self.response(headers={'ETag': '"v1"', 'Last-Modified': 'Sat, 17 Oct 2026 10:00:00 GMT'}))
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [self.entry('cond-1', 2)]
+        self.run_fetch(mock_get, mock_parse)
+
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.etag, '"v1"')
+        self.assertTrue(self.source.content_hash)
+
+        mock_get.return_value = self.response(status_code=304, content=b'')
+        mock_parse.reset_mock()
+        self.run_fetch(mock_get, mock_parse)
+
+        sent_headers = mock_get.call_args.kwargs['headers']
+        self.assertEqual(sent_headers['If-None-Match'], '"v1"')
+        self.assertEqual(sent_headers['If-Modified-Since'], 'Sat, 17 Oct 2026 10:00:00 GMT')
+        mock_parse.assert_not_called()
+
+    def test_same_body_without_validators_skips_parsing(self):
+        mock_get = MagicMock(return_value=self.response(content=b'<rss>igual</rss>'))
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [self.entry('cond-2', 2)]
+        self.run_fetch(mock_get, mock_parse)
+        mock_parse.reset_mock()
+
+        self.run_fetch(mock_get, mock_parse)
+
+        mock_parse.assert_not_called()
+
+    @override_settings(NEWS_LOCAL_SUMMARY_ENABLED=False, NEWS_AI_PRIORITY_ENABLED=False)
+    def test_validators_are_not_saved_while_entries_are_pending(self):
+        mock_get = MagicMock(return_value=self.response(headers={'ETag': '"v2"'}))
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [self.entry('cond-3', 3), self.entry('cond-4', 1)]
+
+        self.run_fetch(mock_get, mock_parse, max_ai_items=1)
+
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.etag, '')
+        self.assertEqual(self.source.content_hash, '')
+        self.assertFalse(News.objects.filter(guid='cond-4').exists())
+
+
+class FeedPipelineIngestionTests(TestCase):
+    def setUp(self):
+        self.source = FeedSource.objects.create(
+            name='Pipeline Feed',
+            url='https://example.com/pipeline.xml',
+            similarity_threshold=0.9,
+        )
+
+    def test_duplicate_of_an_entry_accepted_in_the_same_run_is_redundant(self):
+        class SameVectorModels:
+            def embed_content(self, model, contents, config):
+                return SimpleNamespace(
+                    embeddings=[SimpleNamespace(values=[1.0, 0.0, 0.0]) for _ in contents]
+                )
+
+        gemini_client = SimpleNamespace(models=SameVectorModels())
+        response = SimpleNamespace(status_code=200, content=b'<rss></rss>', headers={})
+        response.raise_for_status = lambda: None
+        now = timezone.now()
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [
+            FeedEntry(
+                id=f'pipe-{index}',
+                title=f'Noticia repetida {index}',
+                link=f'https://example.com/pipe-{index}',
+                description='Descripcion',
+                published_parsed=(now - timedelta(minutes=10 - index)).utctimetuple(),
+            )
+            for index in range(2)
+        ]
+
+        with patch('my_news.services.requests.get', return_value=response), \
+             patch('my_news.services.parse_feed', mock_parse), \
+             patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None}), \
+             patch('my_news.services.FeedService.initialize_gemini', return_value=gemini_client), \
+             patch('my_news.services.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_vector_index', return_value=None), \
+             patch('my_news.services.FeedService.process_content_with_cerebras', return_value=('Resumen IA', None, None)) as mock_process:
+            created = FeedService.fetch_and_save_news()
+
+        first = News.objects.get(guid='pipe-0')
+        second = News.objects.get(guid='pipe-1')
+        self.assertEqual(created, 2)
+        self.assertEqual(mock_process.call_count, 1)
+        self.assertFalse(first.is_redundant)
+        self.assertTrue(second.is_redundant)
+        self.assertEqual(second.similar_to, first)
+        self.assertEqual(
+            [stage['name'] for stage in FeedService.last_pipeline_stats],
+            ['preparar', 'embeddings', 'redundancia', 'resumen'],
+        )
+        self.assertTrue(all(stage['items_out'] == 2 for stage in FeedService.last_pipeline_stats))
+
+
+    @override_settings(NEWS_SUMMARY_WORKERS=4)
+    def test_summaries_are_requested_concurrently_and_saved_in_order(self):
+        response = SimpleNamespace(status_code=200, content=b'<rss></rss>', headers={})
+        response.raise_for_status = lambda: None
+        now = timezone.now()
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [
+            FeedEntry(
+                id=f'pool-{index}',
+                title=f'Noticia distinta {index}',
+                link=f'https://example.com/pool-{index}',
+                description='Descripcion ' * 30,
+                published_parsed=(now - timedelta(minutes=10 - index)).utctimetuple(),
+            )
+            for index in range(4)
+        ]
+        active = {'now': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        def slow_summary(title, *args, **kwargs):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            time.sleep(0.1)
+            with lock:
+                active['now'] -= 1
+            return f'Resumen de {title}', None, None
+
+        with patch('my_news.services.requests.get', return_value=response), \
+             patch('my_news.services.parse_feed', mock_parse), \
+             patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None}), \
+             patch('my_news.services.FeedService.initialize_gemini', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_vector_index', return_value=None), \
+             patch('my_news.services.EmbeddingService.check_redundancy', return_value=(False, None, 0.0)), \
+             patch('my_news.services.FeedService.process_content_with_cerebras', side_effect=slow_summary):
+            created = FeedService.fetch_and_save_news()
+
+        self.assertEqual(created, 4)
+        self.assertGreater(active['peak'], 1)
+        saved = list(News.objects.filter(guid__startswith='pool-').order_by('id').values_list('guid', 'description'))
+        self.assertEqual(
+            saved,
+            [(f'pool-{index}', f'Resumen de Noticia distinta {index}') for index in range(4)],
+        )
+
+    @override_settings(NEWS_SUMMARY_WORKERS=4, NEWS_LOCAL_SUMMARY_ENABLED=False)
+    def test_a_failed_summary_holds_back_the_newer_entries_of_its_source(self):
+        response = SimpleNamespace(status_code=200, content=b'<rss></rss>', headers={})
+        response.raise_for_status = lambda: None
+        now = timezone.now()
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [
+            FeedEntry(
+                id=f'held-{index}',
+                title=f'Noticia distinta {index}',
+                link=f'https://example.com/held-{index}',
+                description='Descripcion ' * 30,
+                published_parsed=(now - timedelta(minutes=10 - index)).utctimetuple(),
+            )
+            for index in range(3)
+        ]
+
+        def first_fails(title, *args, **kwargs):
+            if title.endswith(' 0'):
+                # Las demás ya están resumidas cuando esta falla.
+                time.sleep(0.2)
+                return None, None, None
+            return f'Resumen de {title}', None, None
+
+        def run(summary):
+            with patch('my_news.services.requests.get', return_value=response), \
+                 patch('my_news.services.parse_feed', mock_parse), \
+                 patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None}), \
+                 patch('my_news.services.FeedService.initialize_gemini', return_value=object()), \
+                 patch('my_news.services.FeedService.initialize_cerebras', return_value=object()), \
+                 patch('my_news.services.FeedService.initialize_vector_index', return_value=None), \
+                 patch('my_news.services.EmbeddingService.check_redundancy', return_value=(False, None, 0.0)), \
+                 patch('my_news.services.FeedService.process_content_with_cerebras', side_effect=summary):
+                return FeedService.fetch_and_save_news()
+
+        self.assertEqual(run(first_fails), 0)
+        self.assertFalse(News.objects.filter(guid__startswith='held-').exists())
+
+        # La siguiente pasada vuelve a recoger la que falló y las posteriores.
+        self.assertEqual(run(lambda title, *args, **kwargs: (f'Resumen de {title}', None, None)), 3)
+        self.assertEqual(
+            list(News.objects.filter(guid__startswith='held-').order_by('id').values_list('guid', flat=True)),
+            ['held-0', 'held-1', 'held-2'],
+        )
+
+
+class FeedIndexedIngestionTests(TransactionTestCase):
+    # TransactionTestCase: la etapa de redundancia lee la BD desde otro hilo y
+    # en SQLite compartido no vería (ni podría leer) filas sin confirmar.
+    def setUp(self):
+        self.source = FeedSource.objects.create(
+            name='Indexed Feed',
+            url='https://example.com/indexed.xml',
+            similarity_threshold=0.9,
+        )
+
+    def test_indexed_duplicates_are_found_with_one_batched_search(self):
+        class BasisModels:
+            def embed_content(self, model, contents, config):
+                return SimpleNamespace(embeddings=[
+                    SimpleNamespace(values=[1.0 if i == index else 0.0 for i in range(3)])
+                    for index, _ in enumerate(contents)
+                ])
+
+        class BatchOnlyIndex:
+            def __init__(self, known):
+                self.known = known
+                self.batches = []
+                self.upserted = []
+
+            def ensure_collection(self, dim):
+                pass
+
+            def search_batch(self, vectors, top_k, min_published_ts=None, exclude_guids=None,
+                             with_payload=True):
+                self.batches.append(len(vectors))
+                return [
+                    [SimpleNamespace(score=0.97, payload={'news_id': self.known.id, 'guid': self.known.guid})]
+                    if vector[0] == 1.0 else []
+                    for vector in vectors
+                ]
+
+            def search(self, *args, **kwargs):
+                raise AssertionError('la ingesta debe buscar por lotes')
+
+            def upsert_many(self, points, wait=True):
+                self.upserted.extend((guid, payload['news_id']) for guid, _, payload in points)
+
+        known = News.objects.create(
+            guid='ya-indexada', title='Noticia ya indexada', link='https://example.com/known',
+            published_date=timezone.now() - timedelta(hours=2), source=self.source,
+        )
+        index = BatchOnlyIndex(known)
+        response = SimpleNamespace(status_code=200, content=b'<rss></rss>', headers={})
+        response.raise_for_status = lambda: None
+        now = timezone.now()
+        mock_parse = MagicMock()
+        mock_parse.return_value = ParsedFeed()
+        mock_parse.return_value.entries = [
+            FeedEntry(
+                id=f'batch-{index}',
+                title=f'Noticia en lote {index}',
+                link=f'https://example.com/batch-{index}',
+                description='Descripcion',
+                published_parsed=(now - timedelta(minutes=10 - index)).utctimetuple(),
+            )
+            for index in range(3)
+        ]
+
+        with patch('my_news.services.requests.get', return_value=response), \
+             patch('my_news.services.parse_feed', mock_parse), \
+             patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None}), \
+             patch('my_news.services.FeedService.initialize_gemini', return_value=SimpleNamespace(models=BasisModels())), \
+             patch('my_news.services.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_vector_index', return_value=index), \
+             patch('my_news.services.FeedService.process_content_with_cerebras', return_value=('Resumen IA', None, None)):
+            FeedService.fetch_and_save_news()
+
+        first = News.objects.get(guid='batch-0')
+        self.assertTrue(first.is_redundant)
+        self.assertEqual(first.similar_to, known)
+        self.assertFalse(News.objects.get(guid='batch-1').is_redundant)
+        self.assertEqual(sum(index.batches), 3)
+        self.assertEqual(
+            sorted(guid for guid, _ in index.upserted), ['batch-1', 'batch-2']
+        )
+        self.assertTrue(all(news_id for _, news_id in index.upserted))
+        self.assertEqual(first.embedding_state, News.EMBEDDING_SKIPPED)
+        self.assertEqual(News.objects.get(guid='batch-1').embedding_state, News.EMBEDDING_INDEXED)
+        self.assertEqual(News.objects.get(guid='batch-1').summary_state, News.SUMMARY_DONE)
+
 
 class NewsFeedOrderingTests(TestCase):
     @classmethod
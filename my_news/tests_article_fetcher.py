@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import SimpleTestCase
+
+from .article_fetcher import ArticleFetcher, extract_article
+
+ARTICLE_HTML = (
+    '<html><body><nav>Menú</nav><article><img src="/img/portada.jpg">'
+    + '<p>' + 'Texto del artículo. ' * 30 + '</p>'
+    + '</article><footer>Pie</footer></body></html>'
+)
+
+
+def fake_response(html=ARTICLE_HTML):
+    response = SimpleNamespace(content=html.encode('utf-8'), text=html)
+    response.raise_for_status = lambda: None
+    return response
+
+
+class ArticleFetcherTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        cache = FileBasedCache(self.tmpdir, {'TIMEOUT': 3600})
+        self.fetcher = ArticleFetcher(cache=cache, max_per_host=2)
+        self.addCleanup(self.fetcher.close)
+
+    def test_extracts_paragraphs_and_absolute_image(self):
+        article = extract_article('https://medio.example.com/n/1', ARTICLE_HTML)
+
+        self.assertTrue(article['text'].startswith('Texto del artículo.'))
+        self.assertNotIn('Menú', article['text'])
+        self.assertEqual(article['image_url'], 'https://medio.example.com/img/portada.jpg')
+
+    def test_second_fetch_comes_from_the_disk_cache(self):
+        with patch('my_news.article_fetcher.requests.Session.get', return_value=fake_response()) as mock_get:
+            first = self.fetcher.fetch('https://medio.example.com/n/1')
+            second = ArticleFetcher(cache=self.fetcher.cache).fetch('https://medio.example.com/n/1')
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(self.fetcher.snapshot()['downloads'], 1)
+
+    def test_pages_without_article_text_are_not_cached(self):
+        empty = fake_response('<html><body><p>Nada</p></body></html>')
+        with patch('my_news.article_fetcher.requests.Session.get', return_value=empty) as mock_get:
+            self.fetcher.fetch('https://medio.example.com/n/2')
+            self.fetcher.fetch('https://medio.example.com/n/2')
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_one_pooled_session_per_host(self):
+        with patch('my_news.article_fetcher.requests.Session.get', return_value=fake_response()):
+            self.fetcher.fetch('https://medio.example.com/n/3')
+            self.fetcher.fetch('https://medio.example.com/n/4')
+            self.fetcher.fetch('https://otro.example.com/n/1')
+
+        self.assertEqual(sorted(self.fetcher._sessions), ['medio.example.com', 'otro.example.com'])
+
+    def test_concurrent_downloads_per_host_are_capped(self):
+        active = {'now': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        def slow_get(session, url, timeout):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            time.sleep(0.03)
+            with lock:
+                active['now'] -= 1
+            return fake_response()
+
+        with patch('my_news.article_fetcher.requests.Session.get', autospec=True, side_effect=slow_get):
+            threads = [
+                threading.Thread(target=self.fetcher.fetch, args=(f'https://medio.example.com/n/{i}',))
+                for i in range(10, 16)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertLessEqual(active['peak'], 2)
+
+    def test_download_errors_return_empty_article(self):
+        with patch('my_news.article_fetcher.requests.Session.get', side_effect=OSError('sin red')), \
+             self.assertLogs('my_news.article_fetcher', level='ERROR'):
+            article = self.fetcher.fetch('https://medio.example.com/n/5')
+
+        self.assertEqual(article, {'text': None, 'image_url': None})
+        self.assertEqual(self.fetcher.snapshot()['failures'], 1)
@@ -0,0 +1,56 @@
+import random
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from . import content_document
+from .content_document import ContentDocument, html_to_text
+from .services import FeedService
+
+FRAGMENTS = [
+    '<p>', '</p>', '<a href="https://example.com/?a=1&amp;b=2">', '</a>', '<br>', '<br/>',
+    '<img src="foto.jpg" alt="a > b"/>', '<strong>', '</strong>', '<P CLASS=x>', "<div class='c'>",
+    '</div>', 'Hola mundo', ' ', '\n', '&amp;', '&lt;b&gt;', '&nbsp;', '&eacute;', '&#8217;', '&#0;',
+    '&copy', '&desconocida;', 'a < b', 'x > y', '5<6', '<!-- nota -->', '<script>x()</script>',
+    '<p', '<span data-x="<">', '</span>', '<ul><li>uno</li><li>dos</li></ul>',
+]
+
+
+class ContentDocumentTests(SimpleTestCase):
+    def test_plain_text_is_parsed_once_and_reused(self):
+        document = ContentDocument('Titulo', '<p>Un <b>texto</b> corto. Y otra frase.</p>')
+
+        with patch.object(content_document, 'html_to_text', wraps=html_to_text) as parse:
+            self.assertEqual(document.plain_text, 'Un texto corto. Y otra frase.')
+            self.assertEqual(document.prompt_text(20), 'Un texto corto.')
+            self.assertEqual(document.embedding_text, 'Titulo Un texto corto. Y otra frase.')
+
+        self.assertEqual(parse.call_count, 1)
+
+    def test_light_markup_skips_beautifulsoup(self):
+        with patch.object(content_document, 'BeautifulSoup') as soup:
+            text = ContentDocument('', '<p>El <a href="x">WiFi 7</a> &amp; más</p>').plain_text
+
+        self.assertEqual(text, 'El WiFi 7 & más')
+        soup.assert_not_called()
+
+    def test_discarded_tags_and_comments_go_through_beautifulsoup(self):
+        for raw in ('<p>Texto</p><script>bad()</script>', '<p>Texto</p><!-- oculto -->'):
+            with self.subTest(raw=raw):
+                self.assertEqual(ContentDocument('', raw).plain_text, 'Texto')
+
+    def test_fast_path_matches_beautifulsoup_on_random_fragments(self):
+        rng = random.Random(7)
+        for _ in range(500):
+            raw = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 12)))
+            self.assertEqual(
+                ContentDocument('T', raw).plain_text,
+                ContentDocument('T', raw, fast=False).plain_text,
+                raw,
+            )
+
+    def test_first_image_comes_from_the_raw_html(self):
+        document = ContentDocument('', '<p>x</p><img class="a" src="https://img/1.jpg"><img src="2.jpg">')
+
+        self.assertEqual(document.first_image, 'https://img/1.jpg')
+        self.assertEqual(FeedService.extract_image_from_description(document.raw_html), 'https://img/1.jpg')
@@ -0,0 +1,103 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from .dedup import RedundancyMatrix
+from .services import EmbeddingService
+
+
+def sequential_dedup(embeddings, threshold):
+    """La regla de siempre, pareja a pareja, para comparar resultados."""
+    accepted, results = [], []
+    for index, embedding in enumerate(embeddings):
+        best_index, best_score = None, 0.0
+        for other in accepted:
+            score = EmbeddingService.cosine_similarity(embedding, embeddings[other])
+            if score > best_score:
+                best_index, best_score = other, score
+        redundant = best_index is not None and best_score >= threshold
+        results.append((redundant, best_index))
+        if not redundant:
+            accepted.append(index)
+    return results
+
+
+class RedundancyMatrixTests(SimpleTestCase):
+    def test_best_match_returns_the_closest_item(self):
+        matrix = RedundancyMatrix()
+        matrix.add('norte', [1.0, 0.0, 0.0])
+        matrix.add('este', [0.0, 1.0, 0.0])
+
+        item, score = matrix.best_match([0.9, 0.1, 0.0])
+
+        self.assertEqual(item, 'norte')
+        self.assertAlmostEqual(score, EmbeddingService.cosine_similarity([0.9, 0.1, 0.0], [1.0, 0.0, 0.0]), places=5)
+
+    def test_empty_or_null_vectors_are_ignored(self):
+        matrix = RedundancyMatrix()
+
+        self.assertFalse(matrix.add('vacio', []))
+        self.assertFalse(matrix.add('nulo', [0.0, 0.0]))
+        self.assertEqual(matrix.best_match([1.0, 0.0]), (None, 0.0))
+
+    def test_matrix_grows_in_chunks(self):
+        matrix = RedundancyMatrix(chunk_rows=4)
+        for index in range(9):
+            matrix.add(index, np.eye(16)[index])
+
+        self.assertEqual(len(matrix), 9)
+        self.assertEqual(matrix._rows.shape[0], 12)
+        self.assertEqual(matrix.best_match(np.eye(16)[7])[0], 7)
+
+    def test_exclude_skips_the_item_itself(self):
+        matrix = RedundancyMatrix()
+        matrix.add('yo', [1.0, 0.0])
+        matrix.add('otra', [0.8, 0.6])
+
+        self.assertEqual(matrix.best_match([1.0, 0.0], exclude='yo')[0], 'otra')
+
+    def test_batch_mode_matches_the_sequential_rule(self):
+        rng = np.random.default_rng(7)
+        base = rng.normal(size=(20, 32))
+        # Algunas casi repetidas de otras anteriores.
+        embeddings = [row for row in base]
+        for source in (2, 5, 5, 11):
+            embeddings.append(base[source] + rng.normal(scale=0.05, size=32))
+        embeddings = [list(map(float, row)) for row in rng.permutation(embeddings)]
+
+        matrix = RedundancyMatrix(chunk_rows=8)
+        items = list(range(len(embeddings)))
+        results = matrix.deduplicate(items, embeddings, [0.9] * len(items))
+
+        expected = sequential_dedup(embeddings, 0.9)
+        self.assertEqual([(redundant, similar if redundant else None) for redundant, similar, _ in results],
+                         [(redundant, similar if redundant else None) for redundant, similar in expected])
+        self.assertEqual(len(matrix), sum(1 for redundant, _ in expected if not redundant))
+
+    def test_batch_mode_compares_with_rows_already_accepted(self):
+        matrix = RedundancyMatrix()
+        matrix.add('previa', [1.0, 0.0])
+
+        results = matrix.deduplicate(['a', 'b'], [[1.0, 0.01], [0.0, 1.0]], [0.9, 0.9])
+
+        self.assertEqual(results[0][:2], (True, 'previa'))
+        self.assertFalse(results[1][0])
+        self.assertEqual(list(matrix), ['previa', 'b'])
+
+    def test_rejected_by_admit_do_not_count_for_later_candidates(self):
+        matrix = RedundancyMatrix()
+        admitted = []
+
+        def admit(index):
+            admitted.append(index)
+            return index == 0
+
+        results = matrix.deduplicate(
+            ['a', 'b', 'c', 'd'],
+            [[1.0, 0.0], [0.0, 1.0], None, [0.0, 1.0]],
+            [0.9] * 4,
+            admit=admit,
+        )
+
+        self.assertEqual(admitted, [0, 1, 2, 3])
+        self.assertFalse(results[3][0])
+        self.assertEqual(list(matrix), ['a'])
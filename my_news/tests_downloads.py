@@ -0,0 +1,88 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from .downloads import ConcurrentDownloader, host_of
+
+
+class ConcurrentDownloaderTests(SimpleTestCase):
+    def test_results_keep_request_order(self):
+        delays = {'a': 0.05, 'b': 0.0, 'c': 0.02}
+
+        def fetch(item):
+            time.sleep(delays[item])
+            return item.upper()
+
+        downloader = ConcurrentDownloader(fetch, max_workers=3, max_per_host=3)
+        results = downloader.download_all(['a', 'b', 'c'], url_of=lambda item: f'https://{item}.example.com/rss')
+
+        self.assertEqual([result.value for result in results], ['A', 'B', 'C'])
+
+    def test_downloads_overlap_instead_of_adding_up(self):
+        # Cada descarga espera a que las cuatro estén en curso a la vez.
+        everyone_in = threading.Barrier(4, timeout=5)
+
+        def fetch(item):
+            everyone_in.wait()
+            return item
+
+        downloader = ConcurrentDownloader(fetch, max_workers=4, max_per_host=1)
+        results = downloader.download_all(range(4), url_of=lambda item: f'https://host{item}.example.com/')
+
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_a_busy_host_does_not_take_every_worker(self):
+        other_host_done = threading.Event()
+
+        def fetch(item):
+            if item == 'otro':
+                other_host_done.set()
+            elif not other_host_done.wait(timeout=5):
+                raise TimeoutError('la descarga del otro host no llegó a empezar')
+            return item
+
+        downloader = ConcurrentDownloader(fetch, max_workers=2, max_per_host=1)
+        items = ['lento-1', 'lento-2', 'lento-3', 'otro']
+        results = downloader.download_all(
+            items,
+            url_of=lambda item: 'https://otro.example.com/' if item == 'otro' else 'https://lento.example.com/',
+        )
+
+        self.assertEqual([result.value for result in results], items)
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_per_host_limit_is_respected(self):
+        active = {'now': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        def fetch(item):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            time.sleep(0.03)
+            with lock:
+                active['now'] -= 1
+            return item
+
+        downloader = ConcurrentDownloader(fetch, max_workers=6, max_per_host=2)
+        downloader.download_all(range(6), url_of=lambda item: 'https://mismo-medio.example.com/feed')
+
+        self.assertLessEqual(active['peak'], 2)
+
+    def test_errors_are_returned_without_stopping_the_rest(self):
+        def fetch(item):
+            if item == 'roto':
+                raise ValueError('fallo de red')
+            return item
+
+        downloader = ConcurrentDownloader(fetch, max_workers=2)
+        results = downloader.download_all(['roto', 'bien'], url_of=lambda item: f'https://{item}.example.com/')
+
+        self.assertFalse(results[0].ok)
+        self.assertIsInstance(results[0].error, ValueError)
+        self.assertEqual(results[1].value, 'bien')
+
+    def test_host_of_ignores_case_and_port(self):
+        self.assertEqual(host_of('https://Example.COM:8443/rss'), 'example.com')
+        self.assertEqual(host_of(''), '')
@@ -0,0 +1,165 @@
+from types import SimpleNamespace
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from . import embedding_cache
+from .content_document import ContentDocument
+from .models import EmbeddingCacheEntry
+from .services import EmbeddingService
+
+
+class FakeModels:
+    """Imita ``client.models`` de google-genai contando las peticiones."""
+
+    def __init__(self, fail_on=None, error=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self.error = error
+
+    def embed_content(self, model, contents, config):
+        self.calls.append(contents)
+        if self.error is not None:
+            raise self.error
+        batch = contents if isinstance(contents, list) else [contents]
+        if self.fail_on and any(self.fail_on in text for text in batch):
+            raise ValueError('texto rechazado')
+        return SimpleNamespace(
+            embeddings=[
+                SimpleNamespace(values=[float(len(text)), 0.0, 3.0]) for text in batch
+            ]
+        )
+
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.models = FakeModels(**kwargs)
+
+
+class EmbeddingBatchTests(TestCase):
+    def test_packs_texts_into_batches_of_the_configured_size(self):
+        client = FakeClient()
+
+        vectors = EmbeddingService.generate_embeddings_batch(
+            [f'texto {i}' for i in range(5)], client, batch_size=2
+        )
+
+        self.assertEqual(len(client.models.calls), 3)
+        self.assertEqual([len(batch) for batch in client.models.calls], [2, 2, 1])
+        self.assertTrue(all(vectors))
+
+    @override_settings(GEMINI_EMBEDDING_BATCH_SIZE=4)
+    def test_batch_size_comes_from_settings(self):
+        client = FakeClient()
+
+        EmbeddingService.generate_embeddings_batch([f'texto {i}' for i in range(6)], client)
+
+        self.assertEqual([len(batch) for batch in client.models.calls], [4, 2])
+
+    def test_each_vector_is_l2_normalized(self):
+        vectors = EmbeddingService.generate_embeddings_batch(['hola', 'adios'], FakeClient())
+
+        for vector in vectors:
+            self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+
+    def test_html_is_stripped_like_the_single_text_api(self):
+        client = FakeClient()
+
+        EmbeddingService.generate_embeddings_batch(['<p>Hola   <b>mundo</b></p>'], client)
+
+        self.assertEqual(client.models.calls[0], ['Hola mundo'])
+
+    def test_documents_are_sent_with_their_embedding_text(self):
+        client = FakeClient()
+
+        EmbeddingService.generate_embeddings_batch(
+            [ContentDocument('Titulo', '<p>Hola <b>mundo</b></p>'), 'Titulo Hola mundo'], client
+        )
+
+        self.assertEqual(client.models.calls, [['Titulo Hola mundo']])
+
+    def test_failed_batch_is_retried_one_by_one_to_isolate_the_bad_text(self):
+        client = FakeClient(fail_on='malo')
+
+        vectors = EmbeddingService.generate_embeddings_batch(['bueno', 'malo', 'otro'], client)
+
+        self.assertIsNotNone(vectors[0])
+        self.assertIsNone(vectors[1])
+        self.assertIsNotNone(vectors[2])
+
+    def test_empty_texts_are_reported_without_calling_gemini(self):
+        client = FakeClient()
+
+        vectors = EmbeddingService.generate_embeddings_batch(['', '   '], client)
+
+        self.assertEqual(vectors, [None, None])
+        self.assertEqual(client.models.calls, [])
+
+
+class EmbeddingCacheTests(TestCase):
+    def test_second_request_for_the_same_text_does_not_call_gemini(self):
+        client = FakeClient()
+
+        first = EmbeddingService.generate_embeddings_batch(['Titular  <b>uno</b>'], client)
+        second = EmbeddingService.generate_embeddings_batch(['Titular uno'], client)
+
+        self.assertEqual(len(client.models.calls), 1)
+        np.testing.assert_allclose(first[0], second[0], rtol=1e-6)
+
+    def test_single_text_api_shares_the_cache(self):
+        client = FakeClient()
+
+        EmbeddingService.generate_embeddings_batch(['Compartido'], client)
+        vector = EmbeddingService.generate_embedding('Compartido', client)
+
+        self.assertEqual(len(client.models.calls), 1)
+        self.assertTrue(vector)
+
+    def test_repeated_texts_in_one_batch_are_requested_once(self):
+        client = FakeClient()
+
+        vectors = EmbeddingService.generate_embeddings_batch(['igual', 'igual', 'otro'], client)
+
+        self.assertEqual(client.models.calls, [['igual', 'otro']])
+        self.assertEqual(vectors[0], vectors[1])
+
+    def test_changing_the_embedding_model_misses_the_cache(self):
+        client = FakeClient()
+        EmbeddingService.generate_embeddings_batch(['Texto'], client)
+
+        with override_settings(GEMINI_EMBEDDING_MODEL='otro-modelo'):
+            EmbeddingService.generate_embeddings_batch(['Texto'], client)
+
+        self.assertEqual(len(client.models.calls), 2)
+
+    def test_vectors_are_stored_as_packed_float32(self):
+        EmbeddingService.generate_embeddings_batch(['Empaquetado'], FakeClient())
+
+        entry = EmbeddingCacheEntry.objects.get()
+        self.assertEqual(len(bytes(entry.vector)), 3 * 4)
+        self.assertEqual(entry.dim, 768)
+
+    @override_settings(NEWS_EMBEDDING_CACHE_MAX_ENTRIES=10)
+    def test_least_recently_used_entries_are_evicted(self):
+        client = FakeClient()
+        EmbeddingService.generate_embeddings_batch(['frecuente'], client)
+        for i in range(12):
+            EmbeddingService.generate_embeddings_batch([f'texto {i}'], client)
+            EmbeddingService.generate_embeddings_batch(['frecuente'], client)
+
+        self.assertLessEqual(EmbeddingCacheEntry.objects.count(), 10)
+        self.assertTrue(
+            EmbeddingCacheEntry.objects.filter(key=embedding_cache.key_for('frecuente')).exists()
+        )
+
+    def test_hit_ratio_summary(self):
+        snapshot = embedding_cache.stats.snapshot()
+        client = FakeClient()
+
+        EmbeddingService.generate_embeddings_batch(['a', 'b'], client)
+        EmbeddingService.generate_embeddings_batch(['a', 'b'], client)
+
+        self.assertEqual(
+            embedding_cache.stats.summary_since(snapshot),
+            '2 aciertos de 4 consultas (50%)',
+        )
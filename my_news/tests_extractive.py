@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase, override_settings
+
+from .content_document import ContentDocument
+from .extractive import compress, split_sentences, summarize
+from .services import DEFAULT_AI_CONTENT_LIMIT, FeedService
+
+TITLE = 'Nvidia lanza la RTX 5090'
+LEAD = 'Nvidia presenta la RTX 5090 con 32 GB de memoria GDDR7 por 1999 dólares.'
+DATE = 'La tarjeta llega el 30 de enero a las tiendas de Estados Unidos y Europa.'
+QUOTE = 'Según Jensen Huang, la RTX 5090 duplica el rendimiento de la generación anterior.'
+COOKIES = 'Este sitio usa cookies para mejorar la experiencia de navegación y mostrar publicidad.'
+NEWSLETTER = 'Suscríbete a nuestro boletín para recibir las últimas noticias cada semana en tu correo.'
+ARTICLE = ' '.join([LEAD, DATE] + [COOKIES] * 5 + [QUOTE] + [NEWSLETTER] * 5)
+
+
+class ExtractiveTests(SimpleTestCase):
+    def test_sentences_split_on_final_punctuation(self):
+        self.assertEqual(
+            split_sentences('Primera frase. "¿Segunda?" dijo. ¡Tercera! 2026 llega. versión 1.5 sale'),
+            ['Primera frase.', '"¿Segunda?" dijo.', '¡Tercera!', '2026 llega. versión 1.5 sale'],
+        )
+
+    def test_text_within_budget_is_unchanged(self):
+        self.assertEqual(compress(TITLE, LEAD, 100), LEAD)
+
+    def test_relevant_sentences_are_kept_in_their_original_order(self):
+        compressed = compress(TITLE, ARTICLE, 60)
+
+        self.assertEqual(compressed, ' '.join([LEAD, DATE, QUOTE]))
+        self.assertLessEqual(len(compressed), 60 * 4)
+
+    def test_text_without_sentences_that_fit_falls_back_to_its_start(self):
+        blob = 'palabra ' * 200
+
+        self.assertEqual(compress(TITLE, blob, 10), ('palabra ' * 5).strip())
+
+    def test_document_keeps_one_prompt_text_per_budget(self):
+        document = ContentDocument(TITLE, f'<p>{ARTICLE}</p>')
+
+        self.assertEqual(document.prompt_text(DEFAULT_AI_CONTENT_LIMIT), ARTICLE)
+        self.assertEqual(document.prompt_text(DEFAULT_AI_CONTENT_LIMIT, 60), ' '.join([LEAD, DATE, QUOTE]))
+        self.assertEqual(document.prompt_text(110, 60), LEAD)
+
+
+class LocalSummaryTests(SimpleTestCase):
+    def test_central_sentences_win_and_repeated_boilerplate_counts_once(self):
+        self.assertEqual(summarize(TITLE, ARTICLE), ' '.join([LEAD, DATE, QUOTE]))
+        self.assertEqual(summarize(TITLE, ARTICLE, max_sentences=2), ' '.join([LEAD, QUOTE]))
+
+    def test_summary_respects_the_character_limit(self):
+        self.assertEqual(summarize(TITLE, ARTICLE, max_chars=100), LEAD)
+        self.assertEqual(summarize(TITLE, 'palabra ' * 200, max_chars=30), 'palabra palabra palabra…')
+        self.assertEqual(summarize(TITLE, ''), '')
+
+
+class PromptCompressionSettingTests(SimpleTestCase):
+    def test_truncation_is_the_default(self):
+        self.assertIsNone(FeedService.prompt_token_budget())
+
+    @override_settings(NEWS_PROMPT_COMPRESSION='extractive', NEWS_PROMPT_TOKEN_BUDGET=60)
+    def test_extractive_mode_compresses_the_batch_prompt(self):
+        prompt = FeedService._batch_prompt(
+            [ContentDocument(TITLE, ARTICLE), ContentDocument('Otra', 'Texto corto.')], '', DEFAULT_AI_CONTENT_LIMIT,
+        )
+
+        self.assertEqual(FeedService.prompt_token_budget(), 60)
+        self.assertIn(QUOTE, prompt)
+        self.assertNotIn(COOKIES, prompt)
@@ -0,0 +1,129 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+import feedparser
+from django.test import SimpleTestCase
+
+from .feed_parser import entry_published, parse_feed
+
+RSS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/"
+     xmlns:content="http://purl.org/rss/1.0/modules/content/"
+     xmlns:media="http://search.yahoo.com/mrss/">
+<channel><title>Fuente</title>
+<item>
+  <title> Uno &amp; dos <![CDATA[<b>negrita</b>]]></title>
+  <link>https://example.com/uno</link>
+  <guid isPermaLink="false">uno</guid>
+  <description><![CDATA[<p>Hola <img src="https://example.com/i.png"></p>]]></description>
+  <content:encoded><![CDATA[<p>Cuerpo completo</p>]]></content:encoded>
+  <pubDate>Tue, 14 Oct 2025 10:00:00 +0200</pubDate>
+  <media:content url="https://example.com/m.jpg" medium="image"/>
+  <enclosure url="https://example.com/e.jpg" type="image/jpeg" length="10"/>
+</item>
+<item>
+  <title>Sin pubDate</title>
+  <link>https://example.com/dos</link>
+  <dc:date>2025-10-13T10:00:00Z</dc:date>
+  <media:group><media:content url="https://example.com/g.jpg"/></media:group>
+</item>
+<item>
+  <title>Solo guid</title>
+  <guid>https://example.com/tres</guid>
+  <content:encoded><![CDATA[<p>Solo cuerpo</p>]]></content:encoded>
+  <pubDate>Mon, 13 Oct 2025 08:00:00 GMT</pubDate>
+</item>
+</channel></rss>'''
+
+ATOM = b'''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Fuente</title>
+<entry>
+  <title type="html">T &lt;b&gt;x&lt;/b&gt;</title>
+  <id>urn:uno</id>
+  <link rel="alternate" href="https://example.com/1"/>
+  <link rel="enclosure" href="https://example.com/1.png" type="image/png"/>
+  <updated>2025-10-14T10:00:00+02:00</updated>
+  <published>2025-10-14T09:00:00Z</published>
+  <summary>Resumen</summary>
+  <content type="html">&lt;p&gt;Cuerpo&lt;/p&gt;</content>
+</entry>
+<entry>
+  <title>Sin published</title>
+  <id>urn:dos</id>
+  <link href="https://example.com/2"/>
+  <updated>2025-10-14T10:00:00Z</updated>
+  <content type="html">&lt;p&gt;Solo cuerpo&lt;/p&gt;</content>
+  <source><id>urn:fuente</id><title>Otra fuente</title></source>
+</entry>
+</feed>'''
+
+FIELDS = ('id', 'title', 'link', 'published_parsed', 'media_content')
+
+
+def shape(entry):
+    """Lo que lee la ingesta de cada entrada."""
+    return {
+        **{key: entry.get(key) for key in FIELDS},
+        'description': entry.get('description'),
+        'content': [block['value'] for block in entry.get('content', [])],
+        'enclosures': [(e.get('href'), e.get('type')) for e in entry.get('enclosures', [])],
+    }
+
+
+class FastFeedParserTests(SimpleTestCase):
+    def assertSameAsFeedparser(self, content, normalize_html=False):
+        parsed = parse_feed(content)
+        expected = feedparser.parse(content).entries
+
+        self.assertEqual(parsed.parser, 'rapido')
+        self.assertEqual(len(parsed.entries), len(expected))
+        for ours, theirs in zip(parsed.entries, expected):
+            ours, theirs = shape(ours), shape(theirs)
+            if normalize_html:
+                # feedparser sanea el HTML (``<img ... />``); la ingesta lo pasa
+                # igualmente a texto plano.
+                ours.pop('description'), theirs.pop('description')
+            self.assertEqual(ours, theirs)
+        return parsed
+
+    def test_rss_entries_match_feedparser(self):
+        parsed = self.assertSameAsFeedparser(RSS, normalize_html=True)
+
+        first = parsed.entries[0]
+        self.assertEqual(first.title, 'Uno & dos <b>negrita</b>')
+        self.assertIn('<img src="https://example.com/i.png">', first.description)
+        self.assertEqual(parsed.entries[2].description, '<p>Solo cuerpo</p>')
+
+    def test_atom_entries_match_feedparser(self):
+        parsed = self.assertSameAsFeedparser(ATOM)
+
+        self.assertEqual(parsed.entries[1].title, 'Sin published')
+        self.assertFalse(hasattr(parsed.entries[1], 'published_parsed'))
+
+    def test_malformed_or_unknown_documents_fall_back_to_feedparser(self):
+        rdf = b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"></rdf:RDF>'
+        for content in (RSS.replace(b'</channel>', b''), RSS.replace(b'&amp;', b'&nbsp;'), rdf):
+            with patch('my_news.feed_parser.feedparser.parse', wraps=feedparser.parse) as fallback:
+                self.assertEqual(parse_feed(content).parser, 'feedparser')
+            fallback.assert_called_once()
+
+    def test_unescaped_markup_in_a_text_field_falls_back(self):
+        content = RSS.replace(b'<description><![CDATA[', b'<description>').replace(b']]></description>', b'</description>')
+
+        self.assertEqual(parse_feed(content).parser, 'feedparser')
+
+    def test_stops_after_a_streak_of_old_entries(self):
+        items = b''.join(
+            b'<item><title>N%d</title><link>https://example.com/%d</link>'
+            b'<pubDate>%s</pubDate></item>' % (day, day, f'{day:02d} Oct 2025 10:00:00 GMT'.encode())
+            for day in (20, 19, 5, 18, 4, 3, 2, 1)
+        )
+        content = b'<rss version="2.0"><channel>' + items + b'</channel></rss>'
+        cutoff = datetime(2025, 10, 10, tzinfo=dt_timezone.utc)
+
+        parsed = parse_feed(content, cutoff=cutoff, stop_after_old=2)
+
+        self.assertTrue(parsed.stopped_early)
+        # La vieja suelta (día 5) no corta: la 18 llega después.
+        self.assertEqual([e.title for e in parsed.entries], ['N20', 'N19', 'N5', 'N18', 'N4', 'N3'])
+        self.assertEqual(entry_published(parsed.entries[3]), datetime(2025, 10, 18, 10, tzinfo=dt_timezone.utc))
@@ -0,0 +1,89 @@
+import random
+import re
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, TestCase
+
+from .keyword_filter import KeywordMatcher
+from .models import FilterWord
+
+
+def sequential_match(words, title, description):
+    """El bucle de antes: una regex por palabra, en orden."""
+    for word in words:
+        phrase = r'\s+'.join(re.escape(term) for term in word.word.split())
+        pattern = re.compile(r'(?<![\w])' + phrase + r'(?![\w])', re.IGNORECASE)
+        if pattern.search(title) or (not word.title_only and pattern.search(description)):
+            return word
+    return None
+
+
+def words(*specs):
+    return [SimpleNamespace(word=word, title_only=title_only) for word, title_only in specs]
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def test_reports_the_first_word_of_the_list_even_if_it_appears_later(self):
+        filter_words = words(('Wars', False), ('Star Wars', False))
+        matcher = KeywordMatcher(filter_words)
+
+        # "Star Wars" empieza antes en el texto, pero "Wars" va antes en la lista.
+        self.assertIs(matcher.match('Nueva serie de Star Wars', ''), filter_words[0])
+
+    def test_title_only_words_are_not_searched_in_the_description(self):
+        filter_words = words(('horóscopo', True), ('fútbol', False))
+        matcher = KeywordMatcher(filter_words)
+
+        self.assertIsNone(matcher.match('Titular', 'El horóscopo de hoy'))
+        self.assertIs(matcher.match('Titular', 'Resumen de fútbol'), filter_words[1])
+        self.assertIs(matcher.match('Tu HORÓSCOPO semanal', ''), filter_words[0])
+
+    def test_phrases_allow_any_whitespace_and_respect_word_boundaries(self):
+        matcher = KeywordMatcher(words(('Star Wars', False), ('C++', False)))
+
+        self.assertIsNotNone(matcher.match('Star\n  Wars', ''))
+        self.assertIsNone(matcher.match('Star Warships', 'Superstar Wars'))
+        self.assertIsNotNone(matcher.match('Aprende C++ hoy', ''))
+
+    def test_empty_words_are_ignored(self):
+        matcher = KeywordMatcher(words(('  ', False)))
+
+        self.assertEqual(len(matcher), 0)
+        self.assertIsNone(matcher.match('Lo que sea', 'Lo que sea'))
+
+    def test_matches_the_sequential_rule_on_random_texts(self):
+        rng = random.Random(3)
+        vocabulary = ['ana', 'Banana', 'río', 'Rio grande', 'gran', 'GRANDE', 'sol-ar', 'c++', 'mar']
+        filter_words = words(*[(word, rng.random() < 0.3) for word in rng.sample(vocabulary, 7)])
+        matcher = KeywordMatcher(filter_words)
+
+        for _ in range(300):
+            title = ' '.join(rng.choice(vocabulary + ['x', 'y']) for _ in range(4))
+            description = rng.choice([' ', '\n ', '-', '_']).join(
+                rng.choice(vocabulary + ['x', 'y', 'z']) for _ in range(12)
+            )
+            self.assertIs(
+                matcher.match(title, description),
+                sequential_match(filter_words, title, description),
+            )
+
+
+class ActiveKeywordMatcherTests(TestCase):
+    def setUp(self):
+        KeywordMatcher._cached = None
+        KeywordMatcher._fingerprint = None
+
+    def test_compiled_matcher_is_reused_until_the_words_change(self):
+        word = FilterWord.objects.create(word='horóscopo')
+        FilterWord.objects.create(word='inactiva', active=False)
+
+        first = KeywordMatcher.active()
+        self.assertIs(KeywordMatcher.active(), first)
+        self.assertIsNone(first.match('Palabra inactiva', ''))
+
+        word.title_only = True
+        word.save()
+        changed = KeywordMatcher.active()
+
+        self.assertIsNot(changed, first)
+        self.assertIsNone(changed.match('Titular', 'El horóscopo'))
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from . import local_vector_index
+from .local_vector_index import LocalVectorIndex, point_id_for
+from .services import FeedService
+
+
+def payload(published_ts=1000, **flags):
+    return {
+        'news_id': flags.pop('news_id', 1),
+        'source_id': 1,
+        'published_ts': published_ts,
+        'is_filtered': flags.pop('is_filtered', False),
+        'is_redundant': flags.pop('is_redundant', False),
+        'is_saved': flags.pop('is_saved', False),
+    }
+
+
+class LocalVectorIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.index = self.make_index()
+        self.index.ensure_collection(3)
+
+    def make_index(self):
+        return LocalVectorIndex(self.tmpdir, 'noticias')
+
+    def test_search_orders_by_cosine_and_applies_filters(self):
+        self.index.upsert('cerca', [1.0, 0.1, 0.0], payload(news_id=1))
+        self.index.upsert('lejos', [0.0, 1.0, 0.0], payload(news_id=2))
+        self.index.upsert('vieja', [1.0, 0.0, 0.0], payload(published_ts=10, news_id=3))
+        self.index.upsert('filtrada', [1.0, 0.0, 0.0], payload(is_filtered=True, news_id=4))
+        self.index.upsert('yo', [1.0, 0.0, 0.0], payload(news_id=5))
+
+        hits = self.index.search([2.0, 0.0, 0.0], top_k=5, min_published_ts=500, exclude_guid='yo')
+
+        self.assertEqual([hit.payload['guid'] for hit in hits], ['cerca', 'lejos'])
+        self.assertAlmostEqual(hits[0].score, 1 / np.sqrt(1.01), places=5)
+        self.assertEqual(hits[0].id, point_id_for('cerca'))
+
+    def test_upsert_replaces_the_row_of_the_same_guid(self):
+        self.index.upsert('a', [1.0, 0.0, 0.0], payload(news_id=1))
+        self.index.upsert('a', [0.0, 1.0, 0.0], payload(news_id=7))
+
+        hits = self.index.search([0.0, 1.0, 0.0], top_k=5)
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0].payload['news_id'], 7)
+
+    def test_vectors_are_returned_normalized_by_guid(self):
+        self.index.upsert('a', [3.0, 4.0, 0.0], payload())
+
+        vectors = self.index.vectors_for_guids(['a', 'no-existe'])
+
+        self.assertEqual(list(vectors), ['a'])
+        np.testing.assert_allclose(vectors['a'], [0.6, 0.8, 0.0], rtol=1e-6)
+        np.testing.assert_allclose(self.index.get_vector('a'), [0.6, 0.8, 0.0], rtol=1e-6)
+        self.assertIsNone(self.index.get_vector('no-existe'))
+
+    def test_delete_keeps_the_remaining_rows_consistent(self):
+        for i, guid in enumerate(['a', 'b', 'c']):
+            self.index.upsert(guid, np.eye(3)[i], payload(news_id=i))
+
+        self.assertEqual(self.index.delete_many(['a']), 1)
+
+        self.assertIsNone(self.index.get_vector('a'))
+        np.testing.assert_allclose(self.index.get_vector('c'), [0.0, 0.0, 1.0])
+        self.assertEqual(self.index.search([0.0, 0.0, 1.0], top_k=1)[0].payload['guid'], 'c')
+
+    def test_scroll_and_delete_by_point_id(self):
+        self.index.upsert('a', [1.0, 0.0, 0.0], payload())
+        self.index.upsert('b', [0.0, 1.0, 0.0], payload())
+
+        points = list(self.index.scroll_points(with_vectors=True))
+        self.assertEqual({point.payload['guid'] for point in points}, {'a', 'b'})
+        self.index.delete_point_ids([point.id for point in points if point.payload['guid'] == 'a'])
+
+        self.assertEqual([point.payload['guid'] for point in self.index.scroll_points()], ['b'])
+
+    def test_ranges_are_counted_purged_and_listed_by_published_ts(self):
+        self.index.upsert('vieja', [1.0, 0.0, 0.0], payload(published_ts=10, news_id=1))
+        self.index.upsert('guardada', [0.0, 1.0, 0.0], payload(published_ts=20, news_id=2, is_saved=True))
+        self.index.upsert('nueva', [0.0, 0.0, 1.0], payload(published_ts=100, news_id=3))
+
+        self.assertEqual(self.index.count_points(max_ts=100), 2)
+        self.assertEqual(self.index.count_points(min_ts=20), 2)
+        self.assertEqual(self.index.purge_before(100), 1)
+
+        self.assertEqual(
+            self.index.news_ids_between(None, None),
+            {point_id_for('guardada'): 2, point_id_for('nueva'): 3},
+        )
+
+    def test_file_grows_in_chunks(self):
+        with patch.object(local_vector_index, 'CHUNK_ROWS', 4):
+            index = LocalVectorIndex(self.tmpdir, 'pequena')
+            index.ensure_collection(2)
+            for i in range(9):
+                index.upsert(f'g{i}', [1.0, float(i)], payload())
+
+        self.assertEqual(index._capacity, 12)
+        np.testing.assert_allclose(
+            index.get_vector('g8'), np.array([1.0, 8.0]) / np.linalg.norm([1.0, 8.0]), rtol=1e-6
+        )
+
+    def test_changes_are_visible_to_another_process(self):
+        other = self.make_index()
+        self.assertEqual(other.search([1.0, 0.0, 0.0], top_k=1), [])
+
+        self.index.upsert('a', [1.0, 0.0, 0.0], payload())
+
+        self.assertEqual(other.search([1.0, 0.0, 0.0], top_k=1)[0].payload['guid'], 'a')
+
+    def test_dimension_mismatch_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.index.ensure_collection(4)
+        with self.assertRaises(ValueError):
+            self.index.upsert('a', [1.0, 0.0], payload())
+
+    def test_backend_is_selected_with_a_setting(self):
+        self.addCleanup(setattr, FeedService, '_VECTOR_INDEX', FeedService._VECTOR_INDEX)
+        FeedService._VECTOR_INDEX = None
+
+        with override_settings(NEWS_VECTOR_BACKEND='local', NEWS_VECTOR_INDEX_DIR=self.tmpdir):
+            index = FeedService.initialize_vector_index()
+
+        self.assertIsInstance(index, LocalVectorIndex)
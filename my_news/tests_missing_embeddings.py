@@ -2,12 +2,13 @@ import numpy as np
 from types import SimpleNamespace
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import FeedSource, FilterWord, News
-from .tasks import retry_missing_embeddings
+from .services import CerebrasRateLimiter, FeedService
+from .tasks import retry_missing_embeddings, retry_summarize_pending
 
 
 class FakeVectorIndex:
@@ -18,6 +19,11 @@ class FakeVectorIndex:
             SimpleNamespace(payload={"news_id": nid}) for nid in indexed_news_ids
         ]
         self.upserted = {}
+        # Vectores que ya tiene el índice, por guid.
+        self.vectors = {}
+
+    def vectors_for_guids(self, guids):
+        return {guid: self.vectors[guid] for guid in guids if guid in self.vectors}
 
     def scroll_points(self, limit=256):
         return iter(self.points)
@@ -28,6 +34,10 @@ class FakeVectorIndex:
     def upsert(self, guid, vector, payload):
         self.upserted[guid] = payload
 
+    def upsert_many(self, points, wait=True):
+        for guid, vector, payload in points:
+            self.upsert(guid, vector, payload)
+
 
 class RetryMissingEmbeddingsTests(TestCase):
     def setUp(self):
@@ -53,8 +63,8 @@ class RetryMissingEmbeddingsTests(TestCase):
         with patch("my_news.tasks.FeedService.initialize_vector_index", return_value=index), \
              patch("my_news.tasks.FeedService.initialize_gemini", return_value=object()), \
              patch(
-                 "my_news.tasks.EmbeddingService.generate_embedding",
-                 return_value=[0.1] * 8,
+                 "my_news.tasks.EmbeddingService.generate_embeddings_batch",
+                 side_effect=lambda texts, client, **kwargs: [[0.1] * 8 for _ in texts],
              ), \
              patch(
                  "my_news.tasks.EmbeddingService.check_redundancy",
@@ -77,12 +87,41 @@ class RetryMissingEmbeddingsTests(TestCase):
         self.assertFalse(payload["is_filtered"])
         self.assertFalse(payload["is_redundant"])
 
-    def test_no_reindexa_lo_que_ya_esta_en_qdrant(self):
+    def test_no_reindexa_lo_que_ya_esta_indexado(self):
+        self.make_news(embedding_state=News.EMBEDDING_INDEXED)
+        index = FakeVectorIndex()
+
+        with patch.object(index, "scroll_points") as scroll:
+            self.assertEqual(self.run_retry(index), 0)
+
+        # El estado basta: ya no se recorre la colección de Qdrant.
+        scroll.assert_not_called()
+        self.assertEqual(index.upserted, {})
+
+    def test_marca_indexada_la_recuperada(self):
+        news = self.make_news(embedding_state=News.EMBEDDING_EMBEDDED, embedding_attempts=2)
+
+        self.run_retry(FakeVectorIndex())
+
+        news.refresh_from_db()
+        self.assertEqual(news.embedding_state, News.EMBEDDING_INDEXED)
+        self.assertIsNone(news.embedding_retry_at)
+
+    def test_la_que_ya_tiene_punto_no_se_vuelve_a_vectorizar(self):
         news = self.make_news()
-        index = FakeVectorIndex(indexed_news_ids=[news.id])
+        index = FakeVectorIndex()
+        index.vectors[news.guid] = np.ones(8, dtype=np.float32)
 
-        self.assertEqual(self.run_retry(index), 0)
+        with patch("my_news.tasks.FeedService.initialize_vector_index", return_value=index), \
+             patch("my_news.tasks.FeedService.initialize_gemini", return_value=object()), \
+             patch("my_news.tasks.EmbeddingService.generate_embeddings_batch") as embed, \
+             patch("my_news.tasks.EmbeddingService.check_redundancy", return_value=(False, None, 0.0)):
+            self.assertEqual(retry_missing_embeddings(), 1)
+
+        embed.assert_not_called()
         self.assertEqual(index.upserted, {})
+        news.refresh_from_db()
+        self.assertEqual(news.embedding_state, News.EMBEDDING_INDEXED)
 
     def test_ignora_las_que_no_se_indexan_por_diseno(self):
         palabra = FilterWord.objects.create(word="horóscopo")
@@ -118,8 +157,8 @@ class RetryMissingEmbeddingsTests(TestCase):
         with patch("my_news.tasks.FeedService.initialize_vector_index", return_value=index), \
              patch("my_news.tasks.FeedService.initialize_gemini", return_value=object()), \
              patch(
-                 "my_news.tasks.EmbeddingService.generate_embedding",
-                 return_value=[0.1] * 8,
+                 "my_news.tasks.EmbeddingService.generate_embeddings_batch",
+                 side_effect=lambda texts, client, **kwargs: [[0.1] * 8 for _ in texts],
              ), \
              patch(
                  "my_news.tasks.EmbeddingService.check_redundancy",
@@ -144,10 +183,110 @@ class RetryMissingEmbeddingsTests(TestCase):
 
         with patch("my_news.tasks.FeedService.initialize_vector_index", return_value=index), \
              patch("my_news.tasks.FeedService.initialize_gemini", return_value=object()), \
-             patch("my_news.tasks.EmbeddingService.generate_embedding", return_value=None):
+             patch(
+                 "my_news.tasks.EmbeddingService.generate_embeddings_batch",
+                 side_effect=lambda texts, client, **kwargs: [None for _ in texts],
+             ):
             self.assertEqual(retry_missing_embeddings(), 0)
 
         self.assertEqual(index.upserted, {})
+        news = News.objects.get()
+        self.assertEqual(news.embedding_state, News.EMBEDDING_PENDING)
+        self.assertEqual(news.embedding_attempts, 1)
+        self.assertGreater(news.embedding_retry_at, timezone.now())
+
+    def test_espera_al_proximo_reintento_programado(self):
+        self.make_news(embedding_attempts=1, embedding_retry_at=timezone.now() + timedelta(minutes=30))
+        vencida = self.make_news(embedding_attempts=1, embedding_retry_at=timezone.now() - timedelta(minutes=1))
+        index = FakeVectorIndex()
+
+        self.assertEqual(self.run_retry(index), 1)
+        self.assertEqual(list(index.upserted), [vencida.guid])
+
+
+@override_settings(CEREBRAS_QUOTA_LEDGER="")
+class RetrySummarizePendingTests(TestCase):
+    def setUp(self):
+        FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+        patcher = patch.object(FeedService, "_MODEL_RATE_LIMITERS", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = FeedSource.objects.create(name="Fuente", url="https://example.com/rss")
+        self.counter = 0
+
+    def make_news(self, **kwargs):
+        self.counter += 1
+        defaults = {
+            "guid": f"guid-s{self.counter}",
+            "title": f"Noticia {self.counter}",
+            "description": "Cuerpo",
+            "link": f"https://example.com/s{self.counter}",
+            "published_date": timezone.now(),
+            "source": self.source,
+        }
+        defaults.update(kwargs)
+        return News.objects.create(**defaults)
+
+    def run_retry(self, result):
+        with patch("my_news.tasks.FeedService.initialize_cerebras", return_value=object()), \
+             patch("my_news.tasks.FeedService.process_content_with_cerebras", return_value=result) as process:
+            processed = retry_summarize_pending()
+        return processed, process
+
+    def test_la_resumida_queda_hecha(self):
+        news = self.make_news()
+
+        processed, _ = self.run_retry(("Resumen", "Respuesta", None))
+
+        news.refresh_from_db()
+        self.assertEqual(processed, 1)
+        self.assertEqual(news.summary_state, News.SUMMARY_DONE)
+        self.assertTrue(news.is_ai_processed)
+
+    def test_el_fallo_programa_el_siguiente_reintento(self):
+        news = self.make_news()
+
+        processed, _ = self.run_retry((None, None, None))
+
+        news.refresh_from_db()
+        self.assertEqual(processed, 0)
+        self.assertEqual(news.summary_state, News.SUMMARY_PENDING)
+        self.assertEqual(news.summary_attempts, 1)
+        self.assertGreater(news.summary_retry_at, timezone.now())
+
+        # Hasta que venza, la siguiente pasada no la vuelve a pedir.
+        _, process = self.run_retry(("Resumen", "Respuesta", None))
+        process.assert_not_called()
+
+    def test_la_pospuesta_por_cuota_no_cuenta_como_intento(self):
+        news = self.make_news()
+        FeedService.rate_limiter().pause(600)
+
+        processed, _ = self.run_retry((None, None, None))
+
+        news.refresh_from_db()
+        self.assertEqual(processed, 0)
+        self.assertEqual(news.summary_attempts, 0)
+        # Vuelve cuando se levanta la pausa, no tras el backoff exponencial.
+        self.assertAlmostEqual(
+            (news.summary_retry_at - timezone.now()).total_seconds(), 600, delta=5
+        )
+
+    def test_la_provisional_se_resume_desde_su_contenido_original(self):
+        news = self.make_news(
+            description="Resumen local", is_provisional=True, pending_content="Texto completo del artículo",
+        )
+        self.assertTrue(News.visible.filter(pk=news.pk).exists())
+
+        processed, process = self.run_retry(("Resumen IA", None, None))
+
+        news.refresh_from_db()
+        self.assertEqual(processed, 1)
+        self.assertEqual(process.call_args.args[1], "Texto completo del artículo")
+        self.assertEqual(news.description, "Resumen IA")
+        self.assertFalse(news.is_provisional)
+        self.assertIsNone(news.pending_content)
+        self.assertTrue(news.is_ai_processed)
 
 
 class RescoreRecentNewsTests(TestCase):
@@ -0,0 +1,132 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import AIModelSetting, FeedSource, News
+from .quota_ledger import QuotaLedger
+from .services import CerebrasRateLimiter, FeedService
+from .tasks import retry_summarize_pending
+
+
+class FakeCerebras:
+    """Responde con el nombre del modelo; los de ``deferred`` se quedan sin cuota."""
+
+    def __init__(self, deferred=()):
+        self.models = []
+        self.deferred = set(deferred)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        model = kwargs['model']
+        self.models.append(model)
+        if model in self.deferred:
+            raise CerebrasRateLimiter.Deferred(f"Cerebras rate limit: {model} sin cuota")
+        content = {'summary': f'Resumen de {model}.', 'short_answer': None, 'ai_filter': None}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(content)))])
+
+
+class ModelRouteSettingTests(SimpleTestCase):
+    def test_route_lists_the_primary_first_without_repeats(self):
+        setting = AIModelSetting(
+            model_name='gemma-4-31b', fallback_models='gpt-oss-120b, ,gemma-4-31b\nzai-glm-4.7'
+        )
+
+        self.assertEqual(setting.route(), ['gemma-4-31b', 'gpt-oss-120b', 'zai-glm-4.7'])
+        self.assertEqual(AIModelSetting(model_name='gemma-4-31b').route(), ['gemma-4-31b'])
+
+    @override_settings(CEREBRAS_QUOTA_LEDGER='/tmp/quota.json')
+    def test_each_model_has_its_own_ledger(self):
+        self.assertEqual(QuotaLedger.from_settings().path, '/tmp/quota.json')
+        self.assertEqual(QuotaLedger.from_settings('gpt-oss-120b').path, '/tmp/quota.gpt-oss-120b.json')
+        self.assertEqual(QuotaLedger.from_settings('org/modelo').path, '/tmp/quota.org_modelo.json')
+
+
+@override_settings(CEREBRAS_QUOTA_LEDGER='', NEWS_SUMMARY_CACHE_ENABLED=False)
+class ModelRouterTests(SimpleTestCase):
+    def setUp(self):
+        FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+        patcher = patch.object(FeedService, '_MODEL_RATE_LIMITERS', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.route = ['gemma-4-31b', 'gpt-oss-120b']
+
+    def summarize(self, client, route=None):
+        return FeedService.process_content_routed(
+            'Titular', '<p>Texto de la noticia.</p>', client, route or self.route, '',
+        )
+
+    def test_each_model_has_its_own_limiter(self):
+        fallback = FeedService.rate_limiter('gpt-oss-120b')
+
+        self.assertIs(FeedService.rate_limiter('gemma-4-31b'), FeedService._CEREBRAS_RATE_LIMITER)
+        self.assertIs(FeedService.rate_limiter(), FeedService._CEREBRAS_RATE_LIMITER)
+        self.assertIsNot(fallback, FeedService._CEREBRAS_RATE_LIMITER)
+        self.assertIs(FeedService.rate_limiter('gpt-oss-120b'), fallback)
+
+    def test_the_primary_is_used_while_it_has_quota(self):
+        client = FakeCerebras()
+
+        result, model = self.summarize(client)
+
+        self.assertEqual((result[0], model), ('Resumen de gemma-4-31b.', 'gemma-4-31b'))
+        self.assertEqual(FeedService.rate_limiter('gemma-4-31b').used_requests, 1)
+        self.assertEqual(FeedService.rate_limiter('gpt-oss-120b').used_requests, 0)
+
+    def test_overflow_goes_to_the_fallback_with_free_quota(self):
+        primary = FeedService.rate_limiter('gemma-4-31b')
+        primary.used_tokens = primary.get_limits('gemma-4-31b')[0]
+        client = FakeCerebras()
+
+        self.assertEqual(
+            FeedService.models_by_capacity(self.route, 'prompt corto'), ['gpt-oss-120b', 'gemma-4-31b']
+        )
+        result, model = self.summarize(client)
+
+        self.assertEqual(model, 'gpt-oss-120b')
+        self.assertEqual(client.models, ['gpt-oss-120b'])
+        self.assertEqual(primary.used_requests, 0)
+
+    def test_a_deferred_model_hands_the_article_to_the_next(self):
+        client = FakeCerebras(deferred={'gemma-4-31b'})
+
+        with self.assertLogs('my_news.services', level='WARNING'):
+            result, model = self.summarize(client)
+
+        self.assertEqual((result[0], model), ('Resumen de gpt-oss-120b.', 'gpt-oss-120b'))
+        self.assertEqual(client.models, ['gemma-4-31b', 'gpt-oss-120b'])
+
+    def test_without_any_model_there_is_no_summary(self):
+        client = FakeCerebras(deferred=set(self.route))
+
+        with self.assertLogs('my_news.services', level='WARNING'):
+            self.assertEqual(self.summarize(client), ((None, None, None), None))
+
+
+@override_settings(CEREBRAS_QUOTA_LEDGER='', NEWS_SUMMARY_CACHE_ENABLED=False)
+class RetrySummaryModelTests(TestCase):
+    def setUp(self):
+        FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+        patcher = patch.object(FeedService, '_MODEL_RATE_LIMITERS', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        AIModelSetting.objects.all().delete()
+        AIModelSetting.objects.create(model_name='gemma-4-31b', fallback_models='gpt-oss-120b')
+        source = FeedSource.objects.create(name='Fuente', url='https://example.com/rss')
+        self.news = News.objects.create(
+            title='Titular', description='Texto de la noticia.', link='https://example.com/1',
+            guid='guid-1', published_date=timezone.now(), source=source,
+        )
+
+    def test_the_news_records_the_model_that_summarized_it(self):
+        client = FakeCerebras(deferred={'gemma-4-31b'})
+
+        with patch('my_news.tasks.FeedService.initialize_cerebras', return_value=client), \
+             self.assertLogs('my_news.services', level='WARNING'):
+            self.assertEqual(retry_summarize_pending(), 1)
+
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.summary_model, 'gpt-oss-120b')
+        self.assertEqual(self.news.description, 'Resumen de gpt-oss-120b.')
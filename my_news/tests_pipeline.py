@@ -0,0 +1,127 @@
+import threading
+import time
+from contextlib import closing
+
+from django.test import SimpleTestCase
+
+from .pipeline import Pipeline, Stage
+
+
+class PipelineTests(SimpleTestCase):
+    def test_results_keep_input_order_with_several_workers(self):
+        def slow_double(item):
+            time.sleep(0.02 if item % 2 else 0.0)
+            return item * 2
+
+        pipeline = Pipeline([
+            Stage('doble', slow_double, workers=4, queue_size=3),
+            Stage('mas_uno', lambda item: item + 1),
+        ])
+
+        self.assertEqual(list(pipeline.run(range(10))), [i * 2 + 1 for i in range(10)])
+
+    def test_stages_overlap(self):
+        def wait(item):
+            time.sleep(0.05)
+            return item
+
+        pipeline = Pipeline([Stage('a', wait), Stage('b', wait), Stage('c', wait)])
+        started = time.monotonic()
+        list(pipeline.run(range(6)))
+
+        # En serie serían 18 esperas (0,9 s); encadenadas, unas 8.
+        self.assertLess(time.monotonic() - started, 0.7)
+
+    def test_batch_stage_groups_items(self):
+        batches = []
+
+        def record(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        pipeline = Pipeline([Stage('lotes', record, batch_size=4, queue_size=10)])
+        results = list(pipeline.run(range(10)))
+
+        self.assertEqual(results, [i * 10 for i in range(10)])
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertEqual(sum(len(batch) for batch in batches), 10)
+
+    def test_batch_stage_with_several_workers_keeps_order(self):
+        def slow_batch(items):
+            time.sleep(0.02 if items[0] % 2 else 0.0)
+            return [item * 10 for item in items]
+
+        pipeline = Pipeline([Stage('lotes', slow_batch, workers=3, batch_size=2, queue_size=10)])
+
+        self.assertEqual(list(pipeline.run(range(11))), [i * 10 for i in range(11)])
+
+    def test_batch_stage_without_max_wait_sees_the_whole_input(self):
+        batches = []
+
+        def slow(item):
+            time.sleep(0.01)
+            return item
+
+        def record(items):
+            batches.append(list(items))
+            return items
+
+        pipeline = Pipeline([
+            Stage('lenta', slow, queue_size=2),
+            Stage('barrera', record, batch_size=100, max_wait=None, queue_size=2),
+        ])
+
+        self.assertEqual(list(pipeline.run(range(8))), list(range(8)))
+        self.assertEqual(batches, [list(range(8))])
+
+    def test_queues_stay_bounded_when_a_stage_is_slow(self):
+        def slow(item):
+            time.sleep(0.01)
+            return item
+
+        pipeline = Pipeline([
+            Stage('rapida', lambda item: item, queue_size=2),
+            Stage('lenta', slow, queue_size=2),
+        ])
+        list(pipeline.run(range(30)))
+
+        for stats in pipeline.stats:
+            self.assertLessEqual(stats.max_depth, 2)
+        self.assertEqual(pipeline.stats[1].items_out, 30)
+        self.assertGreater(pipeline.stats[1].throughput, 0)
+
+    def test_consumer_can_stop_early(self):
+        processed = []
+        lock = threading.Lock()
+
+        def track(item):
+            with lock:
+                processed.append(item)
+            return item
+
+        pipeline = Pipeline([Stage('etapa', track, queue_size=2)])
+        with closing(pipeline.run(range(1000))) as results:
+            for item in results:
+                if item == 3:
+                    break
+
+        self.assertLess(len(processed), 20)
+
+    def test_stage_errors_reach_the_consumer(self):
+        def explode(item):
+            if item == 2:
+                raise ValueError('fallo')
+            return item
+
+        pipeline = Pipeline([Stage('etapa', explode)])
+
+        with self.assertRaises(ValueError), self.assertLogs('my_news.pipeline', level='ERROR'):
+            list(pipeline.run(range(5)))
+
+    def test_summary_mentions_every_stage(self):
+        pipeline = Pipeline([Stage('uno', lambda item: item), Stage('dos', lambda item: item)])
+        list(pipeline.run(range(3)))
+
+        summary = pipeline.summary()
+        self.assertIn('uno: 3 elementos', summary)
+        self.assertIn('dos: 3 elementos', summary)
@@ -0,0 +1,261 @@
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import priority
+from .feed_parser import ParsedFeed
+from .models import FeedSource, News
+from .services import CerebrasRateLimiter, FeedService
+from .tasks import retry_summarize_pending, update_news_cron
+from .tests import FeedEntry
+
+
+class RankTests(SimpleTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def hours_ago(self, hours):
+        return self.now - timedelta(hours=hours)
+
+    def test_without_interest_scores_the_oldest_go_first(self):
+        candidates = [(None, self.hours_ago(1)), (None, self.hours_ago(3)), (None, self.hours_ago(2))]
+
+        self.assertEqual(priority.rank(candidates, now=self.now), [1, 2, 0])
+
+    def test_interest_outweighs_a_few_hours_of_age(self):
+        candidates = [(-0.4, self.hours_ago(3)), (0.1, self.hours_ago(2)), (0.6, self.hours_ago(1))]
+
+        self.assertEqual(priority.rank(candidates, now=self.now), [2, 1, 0])
+
+    def test_items_past_the_wait_limit_go_first(self):
+        candidates = [(0.9, self.hours_ago(1)), (-0.9, self.hours_ago(30)), (0.5, self.hours_ago(2))]
+
+        self.assertEqual(priority.rank(candidates, now=self.now), [1, 0, 2])
+
+    @override_settings(NEWS_AI_PRIORITY_INTEREST_WEIGHT=0.0, NEWS_AI_PRIORITY_AGE_WEIGHT=1.0)
+    def test_weights_come_from_settings(self):
+        candidates = [(-0.4, self.hours_ago(3)), (0.1, self.hours_ago(2)), (0.6, self.hours_ago(1))]
+
+        self.assertEqual(priority.rank(candidates, now=self.now), [0, 1, 2])
+
+    def test_percentiles_are_relative_to_the_run(self):
+        self.assertEqual(
+            priority.interest_percentiles([0.2, None, -0.1, 0.2, 0.5]),
+            [0.5, priority.NEUTRAL_INTEREST, 0.0, 0.5, 1.0],
+        )
+        self.assertEqual(priority.interest_percentiles([0.3, None]), [0.5, 0.5])
+
+
+class FakeInterestModel:
+    """Prefiere las noticias cuyo vector apunta a la tercera dimensión."""
+
+    is_trained = True
+    label_counts = (5, 5)
+
+    def score(self, vector):
+        return float(vector[2]) - float(vector[0])
+
+
+class OneHotModels:
+    """Embeddings ortogonales por noticia: ninguna es redundante con otra."""
+
+    def embed_content(self, model, contents, config):
+        vectors = []
+        for text in contents:
+            index = next(number for number in range(3) if f'Noticia {number}' in text)
+            vectors.append(SimpleNamespace(values=[1.0 if axis == index else 0.0 for axis in range(3)]))
+        return SimpleNamespace(embeddings=vectors)
+
+
+# Los hilos del pipeline no ven las tablas de la transacción del test.
+@override_settings(NEWS_EMBEDDING_CACHE_ENABLED=False)
+class PrioritizedIngestionTests(TestCase):
+    def setUp(self):
+        self.source = FeedSource.objects.create(name='Prioridad', url='https://example.com/prioridad.xml')
+        self.now = timezone.now()
+        self.feeds = {
+            self.source.url: [self.entry(f'prio-{index}', f'Noticia {index}', 10 - index) for index in range(3)],
+        }
+
+    def entry(self, guid, title, minutes_ago):
+        return FeedEntry(
+            id=guid,
+            title=title,
+            link=f'https://example.com/{guid}',
+            description=f'La {title} trae un dato nuevo. Alguien lo comenta en la red social.',
+            published_parsed=(self.now - timedelta(minutes=minutes_ago)).utctimetuple(),
+        )
+
+    def run_fetch(self, summary=('Resumen IA', None, None), summarize=None):
+        # Cada fuente descarga su URL y el parser devuelve sus entradas.
+        def download(url, **kwargs):
+            response = SimpleNamespace(status_code=200, content=url.encode(), headers={})
+            response.raise_for_status = lambda: None
+            return response
+
+        def parse(content, **kwargs):
+            return ParsedFeed(entries=self.feeds[content.decode()])
+
+        with patch('my_news.services.requests.get', side_effect=download), \
+             patch('my_news.services.parse_feed', side_effect=parse), \
+             patch('my_news.services.FeedService.get_full_article_content', return_value={'text': None, 'image_url': None}), \
+             patch('my_news.services.FeedService.initialize_gemini', return_value=SimpleNamespace(models=OneHotModels())), \
+             patch('my_news.services.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.services.FeedService.initialize_vector_index', return_value=None), \
+             patch('my_news.services.InterestModel.load', return_value=FakeInterestModel()), \
+             patch('my_news.services.FeedService.process_content_with_cerebras',
+                   return_value=summary, side_effect=summarize) as mock_process:
+            created = FeedService.fetch_and_save_news(max_ai_items=1)
+        return created, mock_process
+
+    def test_the_budget_goes_to_the_most_interesting_and_writes_keep_their_order(self):
+        created, mock_process = self.run_fetch()
+
+        self.assertEqual(created, 3)
+        self.assertEqual([call.args[0] for call in mock_process.call_args_list], ['Noticia 2'])
+        self.assertTrue(News.objects.get(guid='prio-2').is_ai_processed)
+        self.assertTrue(News.objects.get(guid='prio-0').is_provisional)
+        self.assertEqual(
+            list(News.objects.order_by('id').values_list('guid', flat=True)),
+            ['prio-0', 'prio-1', 'prio-2'],
+        )
+        self.assertIn('prioridad', [stage['name'] for stage in FeedService.last_pipeline_stats])
+
+    @override_settings(NEWS_LOCAL_SUMMARY_ENABLED=False)
+    def test_without_local_summaries_the_rest_are_saved_hidden_until_summarized(self):
+        created, _ = self.run_fetch()
+
+        self.assertEqual(created, 3)
+        self.assertEqual(list(News.visible.values_list('guid', flat=True)), ['prio-2'])
+        pending = News.objects.get(guid='prio-0')
+        self.assertFalse(pending.is_provisional)
+        self.assertEqual(pending.summary_state, News.SUMMARY_PENDING)
+        self.assertIn('Noticia 0', pending.pending_content)
+
+    @override_settings(NEWS_LOCAL_SUMMARY_ENABLED=False, CEREBRAS_QUOTA_LEDGER='')
+    def test_the_ones_left_out_of_the_budget_are_not_lost_on_the_next_run(self):
+        self.run_fetch()
+        # La fuente ya tiene una visible más nueva que las que quedaron fuera.
+        created, mock_process = self.run_fetch()
+        self.assertEqual(created, 0)
+        mock_process.assert_not_called()
+
+        with patch.object(FeedService, '_CEREBRAS_RATE_LIMITER', CerebrasRateLimiter()), \
+             patch.object(FeedService, '_MODEL_RATE_LIMITERS', {}), \
+             patch('my_news.tasks.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.tasks.FeedService.process_content_with_cerebras',
+                   return_value=('Resumen IA', None, None)):
+            self.assertEqual(retry_summarize_pending(), 2)
+
+        self.assertEqual(
+            sorted(News.visible.values_list('guid', flat=True)), ['prio-0', 'prio-1', 'prio-2']
+        )
+
+    @override_settings(NEWS_INGEST_WINDOW=1)
+    def test_summaries_start_before_the_slowest_entry_is_prepared(self):
+        summarizing = threading.Event()
+        waited = []
+        prepare = FeedService.prepare_entry
+
+        def slow_prepare(item, *args):
+            if item['guid'] == 'prio-2':
+                # La descarga más lenta: no sigue hasta que empiece un resumen.
+                waited.append(summarizing.wait(timeout=5))
+            return prepare(item, *args)
+
+        def summarize(*args, **kwargs):
+            summarizing.set()
+            return ('Resumen IA', None, None)
+
+        with patch.object(FeedService, 'prepare_entry', side_effect=slow_prepare):
+            created, mock_process = self.run_fetch(summarize=summarize)
+
+        self.assertEqual(waited, [True])
+        self.assertEqual(created, 3)
+        self.assertEqual(mock_process.call_count, 1)
+
+    @override_settings(NEWS_LOCAL_SUMMARY_ENABLED=False)
+    def test_a_copy_of_an_unsaved_news_waits_for_it(self):
+        copies = FeedSource.objects.create(name='Copias', url='https://example.com/copias.xml')
+        self.feeds[copies.url] = [self.entry('copy-2', 'Noticia 2 repetida', 1)]
+
+        with self.assertLogs('my_news.services', level='WARNING'):
+            self.run_fetch(summary=(None, None, None))
+
+        # La copia no se oculta contra una noticia que no llegó a guardarse.
+        self.assertFalse(News.objects.filter(guid__in=['prio-2', 'copy-2']).exists())
+
+        self.run_fetch()
+
+        copy = News.objects.get(guid='copy-2')
+        self.assertTrue(copy.is_redundant)
+        self.assertEqual(copy.similar_to, News.objects.get(guid='prio-2'))
+
+    @override_settings(NEWS_AI_PRIORITY_ENABLED=False)
+    def test_disabled_spends_the_budget_oldest_first(self):
+        _, mock_process = self.run_fetch()
+
+        self.assertEqual([call.args[0] for call in mock_process.call_args_list], ['Noticia 0'])
+
+
+@override_settings(CEREBRAS_QUOTA_LEDGER='', NEWS_AI_PRIORITY_MAX_WAIT_HOURS=24)
+class OverdueRetryTests(TestCase):
+    def setUp(self):
+        self.source = FeedSource.objects.create(name='Pendientes', url='https://example.com/pendientes.xml')
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        for patcher in (
+            patch.object(FeedService, '_CEREBRAS_RATE_LIMITER', CerebrasRateLimiter()),
+            patch.object(FeedService, '_MODEL_RATE_LIMITERS', {}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def pending(self, guid, hours_ago):
+        return News.objects.create(
+            guid=guid,
+            title=f'Noticia {guid}',
+            description='Cuerpo',
+            pending_content='Cuerpo completo',
+            link=f'https://example.com/{guid}',
+            published_date=timezone.now() - timedelta(hours=hours_ago),
+            source=self.source,
+            summary_state=News.SUMMARY_PENDING,
+        )
+
+    def test_the_cron_summarizes_every_overdue_pending_beyond_the_retry_limit(self):
+        # Más de las 5 que reintenta el cron se quedaron fuera del presupuesto.
+        for index in range(8):
+            self.pending(f'vieja-{index}', 30)
+        for index in range(3):
+            self.pending(f'nueva-{index}', 1)
+
+        with self.settings(BASE_DIR=self.tmpdir), \
+             patch('my_news.tasks.FeedService.fetch_and_save_news'), \
+             patch('my_news.tasks.retry_missing_embeddings'), \
+             patch('my_news.tasks.purge_old_news'), \
+             patch('my_news.tasks.rescore_recent_news'), \
+             patch('my_news.tasks.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.tasks.FeedService.process_content_with_cerebras',
+                   return_value=('Resumen IA', None, None)):
+            update_news_cron()
+
+        pending = News.objects.filter(summary_state=News.SUMMARY_PENDING)
+        self.assertEqual(sorted(pending.values_list('guid', flat=True)), ['nueva-0', 'nueva-1', 'nueva-2'])
+
+    def test_without_overdue_ones_the_limit_still_applies(self):
+        for index in range(7):
+            self.pending(f'nueva-{index}', 1)
+
+        with patch('my_news.tasks.FeedService.initialize_cerebras', return_value=object()), \
+             patch('my_news.tasks.FeedService.process_content_with_cerebras',
+                   return_value=('Resumen IA', None, None)):
+            processed = retry_summarize_pending(limit=5, overdue_before=priority.overdue_before())
+
+        self.assertEqual(processed, 5)
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import portalocker
+from django.test import SimpleTestCase, override_settings
+
+from .quota_ledger import QuotaLedger
+from .services import CerebrasRateLimiter
+
+
+class QuotaLedgerTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.path = os.path.join(self.tmpdir, 'quota.json')
+
+    def limiter(self, **kwargs):
+        # Dos limitadores con el mismo fichero se comportan como dos procesos.
+        return CerebrasRateLimiter(ledger=QuotaLedger(self.path, **kwargs))
+
+    def read_state(self):
+        with open(self.path, encoding='utf-8') as handle:
+            return json.load(handle)
+
+    def test_usage_is_shared_between_processes(self):
+        cron, web = self.limiter(), self.limiter()
+
+        cron.acquire('gemma-4-31b', 'prompt', 8)
+        cron.acquire('gemma-4-31b', 'prompt', 8)
+        web.acquire('gemma-4-31b', 'prompt', 8)
+
+        self.assertEqual(self.read_state()['used_requests'], 3)
+        web.reset_if_needed()
+        self.assertEqual(web.used_requests, 3)
+
+    def test_header_capacity_learned_by_one_process_limits_the_other(self):
+        cron, web = self.limiter(), self.limiter()
+        cron.update_from_headers({
+            'x-ratelimit-remaining-tokens-minute': '500',
+            'x-ratelimit-reset-tokens-minute': '2m',
+        })
+
+        with self.assertRaises(CerebrasRateLimiter.Deferred):
+            web.acquire('gemma-4-31b', 'x' * 1000, 1024)
+
+    def test_in_flight_reservations_count_across_processes(self):
+        cron, web = self.limiter(), self.limiter()
+        cron.update_from_headers({
+            'x-ratelimit-remaining-tokens-minute': '2500',
+            'x-ratelimit-reset-tokens-minute': '2m',
+        })
+
+        reserved = cron.acquire('gemma-4-31b', 'x' * 400, 1000)
+        web.acquire('gemma-4-31b', 'x' * 400, 1000)
+        with self.assertRaises(CerebrasRateLimiter.Deferred):
+            web.acquire('gemma-4-31b', 'x' * 400, 1000)
+
+        cron.release(reserved)
+        web.acquire('gemma-4-31b', 'x' * 400, 1000)
+
+    def test_pause_after_429_is_seen_by_other_processes(self):
+        cron, web = self.limiter(), self.limiter()
+
+        cron.pause(CerebrasRateLimiter.MAX_RETRY_SLEEP_SECONDS + 30)
+
+        with self.assertRaises(CerebrasRateLimiter.Deferred):
+            web.acquire('gemma-4-31b', 'prompt', 8)
+
+    def test_a_long_retry_after_that_defers_only_pauses_until_the_window_resets(self):
+        cron, web = self.limiter(), self.limiter()
+        cron.window_start = time.monotonic() - cron.window_seconds + 5
+
+        self.assertLessEqual(cron.pause_after_rate_limit(600), 6)
+
+        web.reset_if_needed()
+        self.assertLessEqual(web.paused_until - time.monotonic(), 6)
+        self.assertLessEqual(self.read_state()['paused_until'] - time.time(), 6)
+
+    def test_reservations_of_dead_processes_expire(self):
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'window_start': time.time(),
+                'remaining_tokens': 2000,
+                'reset_tokens_at': time.time() + 120,
+                'reservations': [[999999, 1900, time.time() - 1]],
+            }, handle)
+
+        self.limiter().acquire('gemma-4-31b', 'x' * 400, 1000)
+
+        self.assertEqual(len(self.read_state()['reservations']), 1)
+
+    def test_corrupt_ledger_starts_from_scratch(self):
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write('{no es json')
+
+        with self.assertLogs('my_news.quota_ledger', level='WARNING'):
+            self.limiter().acquire('gemma-4-31b', 'prompt', 8)
+
+        self.assertEqual(self.read_state()['used_requests'], 1)
+
+    def test_locked_ledger_falls_back_to_memory(self):
+        limiter = self.limiter(lock_timeout=0)
+
+        with portalocker.Lock(f'{self.path}.lock', timeout=0):
+            with self.assertLogs('my_news.services', level='WARNING'):
+                limiter.acquire('gemma-4-31b', 'prompt', 8)
+
+        self.assertEqual(limiter.used_requests, 1)
+
+    @override_settings(CEREBRAS_QUOTA_LEDGER='')
+    def test_empty_setting_disables_the_ledger(self):
+        self.assertIsNone(QuotaLedger.from_settings())
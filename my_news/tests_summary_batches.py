@@ -0,0 +1,107 @@
+import json
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from .content_document import ContentDocument
+from .services import DEFAULT_AI_CONTENT_LIMIT, CerebrasRateLimiter, FeedService
+
+
+class FakeCerebras:
+    """Cliente de Cerebras que responde con lo que devuelva ``reply(prompt)``."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        self.prompts.append(prompt)
+        content = self.reply(prompt)
+        if isinstance(content, Exception):
+            raise content
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def single_reply(prompt):
+    return json.dumps({'summary': 'Resumen individual.', 'short_answer': None, 'ai_filter': None})
+
+
+def documents(count):
+    return [
+        ContentDocument(f'Titular {number}', f'<p>Contenido de la noticia {number}.</p>')
+        for number in range(1, count + 1)
+    ]
+
+
+# Sin BD: la caché de resúmenes se prueba en tests_summary_cache.py.
+@override_settings(NEWS_SUMMARY_CACHE_ENABLED=False)
+class SummaryBatchTests(SimpleTestCase):
+    def setUp(self):
+        FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+
+    def summarize(self, client, docs):
+        return FeedService.process_batch_with_cerebras(
+            docs, client, 'gemma-4-31b', '- Noticias de deportes',
+        )
+
+    def test_several_articles_share_one_request(self):
+        def reply(prompt):
+            return json.dumps({'articles': [
+                {'id': 2, 'summary': 'Resumen dos.', 'short_answer': None, 'ai_filter': '- Noticias de deportes'},
+                {'id': 1, 'summary': 'Resumen uno.', 'short_answer': 'Dato', 'ai_filter': None},
+            ]})
+
+        client = FakeCerebras(reply)
+        results = self.summarize(client, documents(2))
+
+        self.assertEqual(results, [
+            ('Resumen uno.', 'Dato', None),
+            ('Resumen dos.', None, '- Noticias de deportes'),
+        ])
+        self.assertEqual(len(client.prompts), 1)
+        self.assertEqual(client.prompts[0].count('- Noticias de deportes'), 1)
+        self.assertIn("[id 2]\nTitular: 'Titular 2'", client.prompts[0])
+
+    def test_articles_missing_from_the_answer_are_retried_alone(self):
+        def reply(prompt):
+            if '[id 1]' not in prompt:
+                return single_reply(prompt)
+            return json.dumps({'articles': [
+                {'id': 1, 'summary': 'Resumen uno.', 'short_answer': None, 'ai_filter': None},
+                {'id': 7, 'summary': 'Id inventado.', 'short_answer': None, 'ai_filter': None},
+            ]})
+
+        client = FakeCerebras(reply)
+        results = self.summarize(client, documents(3))
+
+        self.assertEqual([result[0] for result in results], ['Resumen uno.', 'Resumen individual.', 'Resumen individual.'])
+        self.assertEqual(len(client.prompts), 3)
+
+    def test_failed_batch_request_falls_back_to_one_request_per_article(self):
+        def reply(prompt):
+            if '[id 1]' in prompt:
+                return ValueError('respuesta cortada')
+            return single_reply(prompt)
+
+        client = FakeCerebras(reply)
+        results = self.summarize(client, documents(2))
+
+        self.assertEqual([result[0] for result in results], ['Resumen individual.'] * 2)
+        self.assertEqual(FeedService._CEREBRAS_RATE_LIMITER.in_flight_tokens, 0)
+
+    def test_batch_size_follows_the_tokens_left_in_the_window(self):
+        limiter = FeedService._CEREBRAS_RATE_LIMITER
+        docs = documents(6)
+
+        self.assertEqual(FeedService.summary_batch_size(docs, 'gemma-4-31b', '', 4), 4)
+
+        one = limiter.estimate_tokens(
+            FeedService._batch_prompt(docs[:2], '', DEFAULT_AI_CONTENT_LIMIT), 1024, 'gemma-4-31b'
+        )
+        limiter.used_tokens = limiter.get_limits('gemma-4-31b')[0] - one
+        self.assertEqual(FeedService.summary_batch_size(docs, 'gemma-4-31b', '', 4), 2)
+
+        limiter.used_tokens = limiter.get_limits('gemma-4-31b')[0]
+        self.assertEqual(FeedService.summary_batch_size(docs, 'gemma-4-31b', '', 4), 1)
@@ -0,0 +1,102 @@
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import summary_cache
+from .content_document import ContentDocument
+from .models import SummaryCacheEntry
+from .services import CerebrasRateLimiter, FeedService
+
+
+class FakeCerebras:
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        self.prompts.append(prompt)
+        if '[id 1]' in prompt:
+            content = {'articles': [
+                {'id': number, 'summary': f'Resumen lote {number}.', 'short_answer': None, 'ai_filter': None}
+                for number in range(1, prompt.count('[id ') + 1)
+            ]}
+        else:
+            content = {'summary': f'Resumen {len(self.prompts)}.', 'short_answer': 'Dato', 'ai_filter': None}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(content)))])
+
+
+@override_settings(CEREBRAS_QUOTA_LEDGER='')
+class SummaryCacheTests(TestCase):
+    def setUp(self):
+        FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+        patcher = patch.object(FeedService, '_MODEL_RATE_LIMITERS', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = FakeCerebras()
+
+    def summarize(self, title='Titular', content='<p>Texto de la noticia.</p>',
+                  model='gemma-4-31b', instructions='- Deportes', **kwargs):
+        return FeedService.process_content_with_cerebras(
+            title, content, self.client, model, instructions, max_retries=1, **kwargs
+        )
+
+    def test_the_same_content_is_summarized_once(self):
+        first = self.summarize()
+        second = self.summarize()
+
+        self.assertEqual(first, ('Resumen 1.', 'Dato', None))
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.client.prompts), 1)
+
+    def test_model_or_instructions_changes_miss(self):
+        self.summarize()
+        self.summarize(model='gpt-oss-120b')
+        self.summarize(instructions='- Deportes\n- Horóscopos')
+        self.summarize(content='<p>Otro texto.</p>')
+
+        self.assertEqual(len(self.client.prompts), 4)
+        self.assertEqual(SummaryCacheEntry.objects.count(), 4)
+
+    def test_expired_entries_miss_and_are_purged(self):
+        self.summarize()
+        SummaryCacheEntry.objects.update(created_at=timezone.now() - timedelta(days=4))
+
+        self.summarize()
+
+        self.assertEqual(len(self.client.prompts), 2)
+        self.assertEqual(SummaryCacheEntry.objects.count(), 1)
+
+    @override_settings(NEWS_SUMMARY_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        for number in range(3):
+            self.summarize(content=f'<p>Texto {number}.</p>')
+
+        self.assertLessEqual(SummaryCacheEntry.objects.count(), 2)
+        self.summarize(content='<p>Texto 2.</p>')
+        self.assertEqual(len(self.client.prompts), 3)
+
+    def test_write_behind_defers_the_writes(self):
+        writes = summary_cache.WriteBehind()
+
+        self.summarize(write_behind=writes)
+        self.assertFalse(SummaryCacheEntry.objects.exists())
+
+        self.assertEqual(writes.flush(), 1)
+        self.summarize(write_behind=writes)
+        self.assertEqual(len(self.client.prompts), 1)
+
+    def test_batches_only_ask_for_uncached_articles(self):
+        documents = [ContentDocument(f'Titular {n}', f'<p>Texto {n}.</p>') for n in range(3)]
+        self.summarize(title='Titular 1', content='<p>Texto 1.</p>', instructions='')
+
+        results = FeedService.process_batch_with_cerebras(documents, self.client, 'gemma-4-31b', '')
+
+        self.assertEqual([result[0] for result in results], ['Resumen lote 1.', 'Resumen 1.', 'Resumen lote 2.'])
+        self.assertEqual(len(self.client.prompts), 2)
+        self.assertNotIn('Titular 1', self.client.prompts[1])
+        self.assertEqual(SummaryCacheEntry.objects.count(), 3)
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from .quota_ledger import QuotaLedger
+from .services import CerebrasRateLimiter, FeedService
+from .token_estimator import TokenEstimator, usage_tokens
+
+
+def usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+class TokenEstimatorTests(SimpleTestCase):
+    def test_uses_the_old_rule_until_there_are_enough_samples(self):
+        estimator = TokenEstimator()
+        for _ in range(TokenEstimator.MIN_SAMPLES - 1):
+            estimator.record('gemma-4-31b', 3000, 1000, 150, 1262)
+
+        self.assertEqual(estimator.estimate('gemma-4-31b', 'x' * 400, 512), 100 + 512)
+
+    def test_calibrated_estimate_uses_the_learned_ratio_and_completion_quantile(self):
+        estimator = TokenEstimator()
+        for completion in range(100, 120):
+            estimator.record('gemma-4-31b', 3000, 1000, completion, 1262)
+
+        # 3 caracteres por token con un 5% de margen; p95 de 100..119 es 118.
+        self.assertEqual(estimator.estimate('gemma-4-31b', 'x' * 600, 512), 210 + 118)
+        self.assertEqual(estimator.estimate('gemma-4-31b', 'x' * 600, 50), 210 + 50)
+        self.assertEqual(estimator.estimate('otro-modelo', 'x' * 600, 512), 150 + 512)
+
+    def test_batches_and_single_calls_share_per_article_samples(self):
+        estimator = TokenEstimator()
+        for _ in range(TokenEstimator.MIN_SAMPLES):
+            # Un lote de 5 noticias responde 5 resúmenes de ~300 tokens.
+            estimator.record('gemma-4-31b', 3000, 1000, 1500, 4000, articles=5)
+            estimator.record('gemma-4-31b', 3000, 1000, 300, 1500)
+
+        self.assertEqual(estimator.estimate('gemma-4-31b', 'x' * 600, 2048), 210 + 300)
+        self.assertEqual(estimator.estimate('gemma-4-31b', 'x' * 600, 2048 * 5, articles=5), 210 + 1500)
+        self.assertEqual(estimator.estimate('gemma-4-31b', 'x' * 600, 1000, articles=5), 210 + 1000)
+
+    def test_state_round_trips_through_a_dump(self):
+        estimator = TokenEstimator()
+        for _ in range(TokenEstimator.MIN_SAMPLES):
+            estimator.record('gemma-4-31b', 3000, 1000, 150, 1262)
+        restored = TokenEstimator()
+
+        restored.load(estimator.dump())
+
+        self.assertEqual(
+            restored.estimate('gemma-4-31b', 'x' * 900, 512),
+            estimator.estimate('gemma-4-31b', 'x' * 900, 512),
+        )
+
+    def test_error_summary_compares_reserved_and_spent_tokens(self):
+        estimator = TokenEstimator()
+        snapshot = estimator.snapshot()
+        estimator.record('gemma-4-31b', 3000, 800, 200, 1500)
+        estimator.record('gemma-4-31b', 3000, 800, 200, 500)
+
+        self.assertEqual(
+            estimator.summary_since(snapshot),
+            '2 respuestas, 2000 tokens reservados para 2000 gastados (+0%), '
+            'error medio 500 tokens por petición',
+        )
+
+    def test_usage_is_read_from_objects_and_dicts(self):
+        self.assertEqual(usage_tokens(usage(10, 5)), (10, 5))
+        self.assertEqual(usage_tokens({'prompt_tokens': 10, 'completion_tokens': 5}), (10, 5))
+        self.assertIsNone(usage_tokens(SimpleNamespace(prompt_tokens=10)))
+        self.assertIsNone(usage_tokens(None))
+
+
+# Sin BD: la caché de resúmenes se prueba en tests_summary_cache.py.
+@override_settings(NEWS_SUMMARY_CACHE_ENABLED=False)
+class ReconcileTests(SimpleTestCase):
+    def test_reservation_is_replaced_by_the_spent_tokens(self):
+        limiter = CerebrasRateLimiter()
+        reserved = limiter.acquire('gemma-4-31b', 'x' * 400, 1000)
+
+        limiter.reconcile('gemma-4-31b', reserved, 'x' * 400, usage(120, 80))
+
+        self.assertEqual(reserved, 1100)
+        self.assertEqual(limiter.used_tokens, 200)
+        self.assertEqual(limiter.in_flight_tokens, 0)
+        self.assertEqual(limiter.estimator.responses, 1)
+
+    def test_reservation_from_a_previous_window_is_not_corrected(self):
+        limiter = CerebrasRateLimiter()
+        reserved = limiter.acquire('gemma-4-31b', 'x' * 400, 1000)
+        limiter.window_start -= limiter.window_seconds + 1
+        limiter.reset_if_needed()
+
+        limiter.reconcile('gemma-4-31b', reserved, 'x' * 400, usage(120, 80))
+
+        self.assertEqual(limiter.used_tokens, 0)
+        self.assertEqual(limiter.in_flight_tokens, 0)
+
+    def test_without_usage_it_only_releases(self):
+        limiter = CerebrasRateLimiter()
+        reserved = limiter.acquire('gemma-4-31b', 'prompt', 8)
+
+        limiter.reconcile('gemma-4-31b', reserved, 'prompt', None)
+
+        self.assertEqual(limiter.used_tokens, reserved)
+        self.assertEqual(limiter.in_flight_tokens, 0)
+        self.assertEqual(limiter.estimator.responses, 0)
+
+    def test_a_batch_response_is_learned_per_article(self):
+        limiter = CerebrasRateLimiter()
+        for _ in range(TokenEstimator.MIN_SAMPLES):
+            reserved = limiter.acquire('gemma-4-31b', 'x' * 3000, 4000, articles=4)
+            limiter.reconcile('gemma-4-31b', reserved, 'x' * 3000, usage(1000, 800), articles=4)
+
+        self.assertEqual(limiter.estimate_tokens('x' * 3000, 1000, 'gemma-4-31b'), 1050 + 200)
+        self.assertEqual(limiter.estimate_tokens('x' * 3000, 4000, 'gemma-4-31b', articles=4), 1050 + 800)
+
+    def test_calibration_is_shared_through_the_ledger(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        path = os.path.join(tmpdir, 'quota.json')
+        cron = CerebrasRateLimiter(ledger=QuotaLedger(path))
+        for _ in range(TokenEstimator.MIN_SAMPLES):
+            reserved = cron.acquire('gemma-4-31b', 'x' * 3000, 512)
+            cron.reconcile('gemma-4-31b', reserved, 'x' * 3000, usage(1000, 100))
+
+        web = CerebrasRateLimiter(ledger=QuotaLedger(path))
+        reserved = web.acquire('gemma-4-31b', 'x' * 3000, 512)
+
+        self.assertEqual(reserved, 1050 + 100)
+
+    def test_summaries_reconcile_with_the_response_usage(self):
+        FeedService._CEREBRAS_RATE_LIMITER = CerebrasRateLimiter()
+        message = SimpleNamespace(content='{"summary": "Resumen.", "short_answer": null, "ai_filter": null}')
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage(900, 60))
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **kwargs: response,
+        )))
+
+        FeedService.process_content_with_cerebras(
+            'Titulo', 'Descripcion', client, 'gemma-4-31b',
+            FeedService._DEFAULT_FILTER_INSTRUCTIONS, max_retries=1,
+        )
+
+        limiter = FeedService._CEREBRAS_RATE_LIMITER
+        self.assertEqual(limiter.used_tokens, 960)
+        self.assertEqual(limiter.in_flight_tokens, 0)
@@ -0,0 +1,284 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from qdrant_client import QdrantClient
+from qdrant_client import models as qm
+
+from .local_vector_index import LocalVectorIndex, point_id_for
+from .models import FeedSource, News
+from .tasks import purge_old_news, purge_orphan_vectors
+from .vector_index import UpsertBuffer, VectorIndexService
+
+
+def payload(news_id, published_ts=1000, **flags):
+    return {
+        'news_id': news_id,
+        'source_id': 1,
+        'published_ts': published_ts,
+        'is_filtered': flags.get('is_filtered', False),
+        'is_redundant': flags.get('is_redundant', False),
+        'is_saved': flags.get('is_saved', False),
+    }
+
+
+class VectorIndexServiceTests(SimpleTestCase):
+    def setUp(self):
+        # Qdrant en modo local en memoria: mismo cliente, sin servidor.
+        with patch('my_news.vector_index.QdrantClient', side_effect=lambda **kwargs: QdrantClient(':memory:')):
+            self.index = VectorIndexService(url='http://qdrant.invalid', collection='noticias')
+
+    def test_collection_existence_is_checked_once_per_process(self):
+        with patch.object(self.index.client, 'collection_exists', wraps=self.index.client.collection_exists) as exists:
+            for _ in range(5):
+                self.index.ensure_collection(3)
+
+        self.assertEqual(exists.call_count, 1)
+
+    def test_failed_calls_make_the_next_ensure_check_again(self):
+        self.index.ensure_collection(3)
+        with patch.object(self.index.client, 'upsert', side_effect=OSError('caído')):
+            with self.assertRaises(OSError):
+                self.index.upsert('a', [1.0, 0.0, 0.0], payload(1))
+
+        self.assertFalse(self.index._collection_ready)
+
+    def test_search_batch_returns_one_result_list_per_vector(self):
+        self.index.ensure_collection(3)
+        self.index.upsert('a', [1.0, 0.0, 0.0], payload(1))
+        self.index.upsert('b', [0.0, 1.0, 0.0], payload(2))
+        self.index.upsert('vieja', [0.0, 1.0, 0.0], payload(3, published_ts=10))
+
+        results = self.index.search_batch(
+            [[1.0, 0.1, 0.0], [0.0, 1.0, 0.0], [1.0, 0.0, 0.0]],
+            top_k=1,
+            min_published_ts=500,
+            exclude_guids=[None, None, 'a'],
+        )
+
+        self.assertEqual(
+            [[hit.payload['guid'] for hit in hits] for hits in results],
+            [['a'], ['b'], ['b']],
+        )
+
+
+    def test_search_can_return_only_some_payload_fields(self):
+        self.index.ensure_collection(3)
+        self.index.upsert('a', [1.0, 0.0, 0.0], payload(1))
+
+        hits = self.index.search([1.0, 0.0, 0.0], top_k=1, with_payload=['news_id', 'guid'])
+
+        self.assertEqual(hits[0].payload, {'news_id': 1, 'guid': 'a'})
+
+    def test_purge_before_deletes_with_a_filter_and_keeps_saved_news(self):
+        self.index.ensure_collection(3)
+        self.index.upsert('vieja', [1.0, 0.0, 0.0], payload(1, published_ts=10))
+        self.index.upsert('guardada', [0.0, 1.0, 0.0], payload(2, published_ts=20, is_saved=True))
+        self.index.upsert('nueva', [0.0, 0.0, 1.0], payload(3, published_ts=100))
+
+        with patch.object(self.index.client, 'delete', wraps=self.index.client.delete) as delete:
+            self.assertEqual(self.index.purge_before(100), 1)
+
+        self.assertEqual(delete.call_count, 1)
+        self.assertEqual(self.index.count_points(max_ts=100), 1)
+        self.assertEqual(sorted(self.index.news_ids_between(min_ts=0).values()), [2, 3])
+
+    def test_purge_keeps_news_marked_as_saved_afterwards(self):
+        self.index.ensure_collection(3)
+        self.index.upsert('vieja', [1.0, 0.0, 0.0], payload(1, published_ts=10))
+        self.index.upsert('guardada', [0.0, 1.0, 0.0], payload(2, published_ts=20))
+
+        self.index.set_saved(['guardada'], True)
+
+        self.assertEqual(self.index.purge_before(100), 1)
+        self.assertEqual(list(self.index.news_ids_between().values()), [2])
+
+    def test_missing_payload_indexes_are_added_to_an_existing_collection(self):
+        self.index.client.create_collection(
+            'noticias', vectors_config=qm.VectorParams(size=3, distance=qm.Distance.COSINE)
+        )
+        # Colección creada antes de los índices de news_id e is_saved.
+        existing = {
+            field: None for field, _ in VectorIndexService.PAYLOAD_INDEXES
+            if field not in ('news_id', 'is_saved')
+        }
+        with patch.object(self.index.client, 'get_collection', return_value=SimpleNamespace(payload_schema=existing)), \
+             patch.object(self.index.client, 'create_payload_index') as create_index:
+            self.index.ensure_collection(3)
+
+        self.assertEqual(
+            [call.kwargs['field_name'] for call in create_index.call_args_list], ['news_id', 'is_saved']
+        )
+
+    def test_upsert_many_writes_all_points_in_one_request(self):
+        self.index.ensure_collection(3)
+        with patch.object(self.index.client, 'upsert', wraps=self.index.client.upsert) as upsert:
+            self.index.upsert_many([
+                ('a', [1.0, 0.0, 0.0], payload(1)),
+                ('b', [0.0, 1.0, 0.0], payload(2)),
+            ])
+
+        self.assertEqual(upsert.call_count, 1)
+        self.assertEqual(self.index.search([0.0, 1.0, 0.0], top_k=1)[0].payload['news_id'], 2)
+
+
+class LocalSearchBatchTests(SimpleTestCase):
+    def test_batch_matches_single_searches(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        index = LocalVectorIndex(tmpdir, 'noticias')
+        index.ensure_collection(3)
+        index.upsert('a', [1.0, 0.0, 0.0], payload(1))
+        index.upsert('b', [0.0, 1.0, 0.0], payload(2))
+        index.upsert('c', [0.7, 0.7, 0.0], payload(3, is_redundant=True))
+        queries = [[1.0, 0.2, 0.0], [0.1, 1.0, 0.0], [0.0, 0.0, 0.0]]
+
+        batch = index.search_batch(queries, top_k=2, exclude_guids=['a', None, None])
+        single = [
+            index.search(query, top_k=2, exclude_guid=exclude)
+            for query, exclude in zip(queries, ['a', None, None])
+        ]
+
+        self.assertEqual(batch, single)
+        self.assertEqual([hit.payload['guid'] for hit in batch[0]], ['b'])
+        self.assertEqual(batch[2], [])
+
+
+class UpsertBufferTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.index = LocalVectorIndex(self.tmpdir, 'noticias')
+
+    def test_points_are_sent_in_batches_and_flushed_on_exit(self):
+        written = []
+        with patch.object(self.index, 'upsert_many', wraps=self.index.upsert_many) as upsert_many:
+            with UpsertBuffer(self.index, batch_size=2, max_age=None) as buffer:
+                for i in range(5):
+                    buffer.add(f'g{i}', [1.0, float(i), 0.0], payload(i), on_written=written.append)
+                self.assertEqual(len(buffer), 1)
+
+        self.assertEqual([len(call.args[0]) for call in upsert_many.call_args_list], [2, 2, 1])
+        self.assertEqual(written, [f'g{i}' for i in range(5)])
+        self.assertEqual(buffer.stats['written'], 5)
+        self.assertIsNotNone(self.index.get_vector('g4'))
+
+    def test_old_points_are_flushed_without_waiting_for_a_full_batch(self):
+        buffer = UpsertBuffer(self.index, batch_size=100, max_age=0)
+
+        buffer.add('a', [1.0, 0.0, 0.0], payload(1))
+
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.stats['requests'], 1)
+
+    def test_failed_batch_is_counted_and_not_reported_as_written(self):
+        written = []
+        with patch.object(self.index, 'upsert_many', side_effect=OSError('caído')), \
+             self.assertLogs('my_news.vector_index', level='ERROR'):
+            with UpsertBuffer(self.index, batch_size=10, max_age=None) as buffer:
+                buffer.add('a', [1.0, 0.0, 0.0], payload(1), on_written=written.append)
+                buffer.add('b', [0.0, 1.0, 0.0], payload(2), on_written=written.append)
+
+        self.assertEqual(buffer.stats['failed'], 2)
+        self.assertEqual(written, [])
+
+
+class VectorReconcileTests(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        self.index = LocalVectorIndex(tmpdir, 'noticias')
+        self.index.ensure_collection(3)
+        self.source = FeedSource.objects.create(name='Fuente', url='https://example.com/rss')
+        self.counter = 0
+
+    def make_news(self, age, indexed=True, **kwargs):
+        self.counter += 1
+        news = News.objects.create(
+            guid=f'guid-{self.counter}',
+            title=f'Noticia {self.counter}',
+            description='Cuerpo',
+            link=f'https://example.com/{self.counter}',
+            published_date=timezone.now() - age,
+            source=self.source,
+            embedding_state=News.EMBEDDING_INDEXED,
+            **kwargs,
+        )
+        if indexed:
+            self.index.upsert(news.guid, [1.0, 0.0, 0.0], self.point_payload(news))
+        return news
+
+    @staticmethod
+    def point_payload(news):
+        return payload(
+            news.id, published_ts=int(news.published_date.timestamp()), is_saved=news.is_saved
+        )
+
+    def test_only_mismatched_buckets_are_scanned(self):
+        self.make_news(timedelta(days=1))
+        self.make_news(timedelta(days=5))
+        self.make_news(timedelta(days=20), is_saved=True)
+        huerfana = self.make_news(timedelta(days=3))
+        huerfana.delete()
+        sin_punto = self.make_news(timedelta(days=8), indexed=False)
+
+        with patch.object(self.index, 'news_ids_between', wraps=self.index.news_ids_between) as scanned:
+            deleted = purge_orphan_vectors(days=15, vector_index=self.index)
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(scanned.call_count, 2)
+        self.assertEqual(self.index.count_points(), 3)
+        self.assertNotIn(point_id_for(huerfana.guid), self.index.news_ids_between())
+        sin_punto.refresh_from_db()
+        self.assertEqual(sin_punto.embedding_state, News.EMBEDDING_PENDING)
+
+        # Ya cuadra todo: la siguiente pasada no recorre ningún tramo.
+        with patch.object(self.index, 'news_ids_between') as scanned:
+            self.assertEqual(purge_orphan_vectors(days=15, vector_index=self.index), 0)
+        scanned.assert_not_called()
+
+    def test_purge_drops_expired_vectors_but_keeps_saved_ones(self):
+        reciente = self.make_news(timedelta(days=1))
+        guardada = self.make_news(timedelta(days=20), is_saved=True)
+        caducada = self.make_news(timedelta(days=20))
+
+        with patch('my_news.tasks.FeedService.initialize_vector_index', return_value=self.index):
+            self.assertEqual(purge_old_news(days=15), 1)
+
+        self.assertFalse(News.objects.filter(pk=caducada.pk).exists())
+        self.assertEqual(
+            sorted(self.index.news_ids_between().values()), sorted([reciente.id, guardada.id])
+        )
+
+    def test_a_saved_news_whose_mark_never_reached_the_index_is_kept(self):
+        guardada = self.make_news(timedelta(days=15, hours=12), indexed=False, is_saved=True)
+        # El punto se quedó con is_saved=False (p. ej. Qdrant caído al guardarla).
+        self.index.upsert(
+            guardada.guid,
+            [1.0, 0.0, 0.0],
+            payload(guardada.id, published_ts=int(guardada.published_date.timestamp())),
+        )
+
+        with patch('my_news.tasks.FeedService.initialize_vector_index', return_value=self.index):
+            purge_old_news(days=15)
+
+        self.assertEqual(list(self.index.news_ids_between().values()), [guardada.id])
+
+    def test_saving_from_the_view_marks_the_point(self):
+        news = self.make_news(timedelta(days=1))
+        self.client.force_login(
+            get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        )
+
+        with patch('my_news.views.FeedService.initialize_vector_index', return_value=self.index):
+            self.client.post(reverse('my_news:toggle_save_news', args=[news.id]))
+
+        self.assertEqual(
+            [point.payload['is_saved'] for point in self.index.scroll_points()], [True]
+        )
@@ -0,0 +1,94 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import FeedSource, News
+from .write_buffer import NewsWriteBuffer
+
+
+class NewsWriteBufferTests(TestCase):
+    def setUp(self):
+        self.source = FeedSource.objects.create(name='Buffer Feed', url='https://example.com/rss.xml')
+
+    def news(self, guid, **kwargs):
+        return News(
+            guid=guid,
+            title=f'Titular {guid}',
+            description='Texto',
+            link=f'https://example.com/{guid}',
+            published_date=timezone.now(),
+            source=self.source,
+            **kwargs,
+        )
+
+    def test_rows_are_written_in_batches_with_ids(self):
+        buffer = NewsWriteBuffer(batch_size=3, max_age=None)
+
+        with self.assertNumQueries(0):
+            buffer.add(self.news('a'))
+            buffer.add(self.news('b'))
+        buffer.add(self.news('c'))
+        buffer.add(self.news('d'))
+
+        self.assertEqual(News.objects.count(), 3)
+        self.assertEqual(len(buffer), 1)
+        buffer.flush()
+        self.assertEqual(News.objects.count(), 4)
+        self.assertEqual(buffer.stats['batches'], 2)
+
+    def test_on_saved_runs_after_the_row_has_an_id(self):
+        seen = []
+        with NewsWriteBuffer(batch_size=10, max_age=None) as buffer:
+            buffer.add(self.news('a'), on_saved=lambda news: seen.append(news.pk))
+            self.assertEqual(seen, [])
+
+        self.assertEqual(seen, [News.objects.get(guid='a').pk])
+
+    def test_reference_to_a_pending_row_is_saved_with_its_id(self):
+        buffer = NewsWriteBuffer(batch_size=10, max_age=None)
+        original = self.news('original')
+        buffer.add(original)
+        buffer.add(self.news('copia', is_redundant=True, similar_to=original))
+        buffer.flush()
+
+        copia = News.objects.get(guid='copia')
+        self.assertEqual(copia.similar_to_id, original.pk)
+        self.assertEqual(buffer.stats['batches'], 2)
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        News.objects.create(
+            guid='repetida', title='Ya estaba', link='https://example.com/x',
+            published_date=timezone.now(), source=self.source,
+        )
+        saved = []
+        buffer = NewsWriteBuffer(batch_size=10, max_age=None)
+        for guid in ('uno', 'repetida', 'dos'):
+            buffer.add(self.news(guid), on_saved=lambda news: saved.append(news.guid))
+
+        with self.assertLogs('my_news.write_buffer', level='WARNING') as logs:
+            buffer.flush()
+
+        self.assertEqual(saved, ['uno', 'dos'])
+        self.assertEqual(buffer.stats['failed'], 1)
+        self.assertTrue(any('repetida' in line for line in logs.output))
+
+    def test_reference_to_a_row_that_failed_is_dropped(self):
+        News.objects.create(
+            guid='repetida', title='Ya estaba', link='https://example.com/x',
+            published_date=timezone.now(), source=self.source,
+        )
+        buffer = NewsWriteBuffer(batch_size=10, max_age=None)
+        original = self.news('repetida')
+        buffer.add(original)
+        with self.assertLogs('my_news.write_buffer', level='WARNING'):
+            buffer.add(self.news('copia', similar_to=original))
+        buffer.flush()
+
+        self.assertIsNone(News.objects.get(guid='copia').similar_to_id)
+
+    def test_pending_rows_are_written_when_the_block_raises(self):
+        with self.assertRaises(RuntimeError):
+            with NewsWriteBuffer(batch_size=10, max_age=None) as buffer:
+                buffer.add(self.news('a'))
+                raise RuntimeError('pasada cortada')
+
+        self.assertTrue(News.objects.filter(guid='a').exists())
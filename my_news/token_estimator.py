@@ -0,0 +1,132 @@
+"""Estimación de tokens de Cerebras calibrada con lo que gasta cada respuesta.
+
+``CerebrasRateLimiter`` reservaba ``len(prompt) // 4`` más todo
+``max_completion_tokens`` por petición. Con los 22.500 TPM seguros de
+gemma-4-31b esa sobre-reserva deja fuera resúmenes que sí cabían en el minuto.
+``TokenEstimator`` aprende, por modelo, de los ``usage`` que devuelve la API:
+
+* los caracteres por token del prompt (media con olvido, para seguir cambios
+  de plantilla o de idioma), con un pequeño margen;
+* la longitud de las respuestas por noticia: se reserva el percentil 95 de
+  las últimas por cada noticia de la petición (un lote de N responde N
+  resúmenes), nunca más que ``max_completion_tokens``.
+
+Hasta juntar ``MIN_SAMPLES`` respuestas de un modelo se usa la regla de antes.
+El estado se guarda en el ledger de cuota (ver ``quota_ledger.py``) para que
+cada corrida del cron no empiece de cero. El error entre lo reservado y lo
+gastado se acumula en el proceso y se resume en el log de la ingesta.
+"""
+
+import math
+import threading
+
+DEFAULT_CHARS_PER_TOKEN = 4
+
+
+def usage_tokens(usage):
+    """``(prompt_tokens, completion_tokens)`` de un ``usage`` (objeto o dict), o None."""
+    if usage is None:
+        return None
+    values = []
+    for name in ('prompt_tokens', 'completion_tokens'):
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            return None
+        values.append(value)
+    return tuple(values)
+
+
+class TokenEstimator:
+    MIN_SAMPLES = 5
+    MAX_COMPLETION_SAMPLES = 200
+    COMPLETION_QUANTILE = 0.95
+    PROMPT_MARGIN = 1.05
+    # Peso de lo ya aprendido frente a cada respuesta nueva.
+    DECAY = 0.98
+
+    def __init__(self):
+        # modelo -> {'chars', 'prompt_tokens', 'samples', 'completions'}
+        self.models = {}
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.reserved_total = 0
+        self.actual_total = 0
+        self.abs_error_total = 0
+
+    def estimate(self, model_name, prompt, max_completion_tokens, articles=1):
+        chars = len(prompt or '')
+        completion_cap = int(max_completion_tokens or 0)
+        with self._lock:
+            stats = self.models.get(model_name or '')
+            if (not stats or stats['samples'] < self.MIN_SAMPLES
+                    or not stats['prompt_tokens'] or not stats['completions']):
+                return max(1, chars // DEFAULT_CHARS_PER_TOKEN) + completion_cap
+            chars_per_token = stats['chars'] / stats['prompt_tokens']
+            completions = sorted(stats['completions'])
+        prompt_tokens = max(1, round(chars / chars_per_token * self.PROMPT_MARGIN))
+        position = max(0, math.ceil(self.COMPLETION_QUANTILE * len(completions)) - 1)
+        return prompt_tokens + min(completion_cap, completions[position] * max(1, int(articles)))
+
+    def record(self, model_name, prompt_chars, prompt_tokens, completion_tokens, reserved_tokens,
+               articles=1):
+        """Aprende de una respuesta y anota el error de lo que se había reservado.
+
+        La respuesta se guarda por noticia (``completion_tokens / articles``)
+        para que los lotes y las peticiones sueltas compartan muestras.
+        """
+        actual = prompt_tokens + completion_tokens
+        with self._lock:
+            stats = self.models.setdefault(
+                model_name or '', {'chars': 0.0, 'prompt_tokens': 0.0, 'samples': 0, 'completions': []}
+            )
+            if prompt_chars and prompt_tokens:
+                stats['chars'] = stats['chars'] * self.DECAY + prompt_chars
+                stats['prompt_tokens'] = stats['prompt_tokens'] * self.DECAY + prompt_tokens
+            stats['samples'] += 1
+            stats['completions'].append(round(completion_tokens / max(1, int(articles))))
+            del stats['completions'][:-self.MAX_COMPLETION_SAMPLES]
+
+            self.responses += 1
+            self.reserved_total += int(reserved_tokens or 0)
+            self.actual_total += actual
+            self.abs_error_total += abs(int(reserved_tokens or 0) - actual)
+        return int(reserved_tokens or 0) - actual
+
+    def dump(self):
+        with self._lock:
+            return {
+                model: dict(stats, completions=list(stats['completions']))
+                for model, stats in self.models.items()
+            }
+
+    def load(self, data):
+        if not isinstance(data, dict):
+            return
+        with self._lock:
+            self.models = {
+                model: {
+                    'chars': float(stats.get('chars') or 0),
+                    'prompt_tokens': float(stats.get('prompt_tokens') or 0),
+                    'samples': int(stats.get('samples') or 0),
+                    'completions': [int(value) for value in stats.get('completions') or []],
+                }
+                for model, stats in data.items()
+                if isinstance(stats, dict)
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return self.responses, self.reserved_total, self.actual_total, self.abs_error_total
+
+    def summary_since(self, snapshot):
+        """Texto para el log con el error de las reservas desde ``snapshot``."""
+        responses, reserved, actual, abs_error = (
+            now - before for now, before in zip(self.snapshot(), snapshot)
+        )
+        if not responses:
+            return "sin respuestas con usage"
+        over = (100.0 * (reserved - actual) / actual) if actual else 0.0
+        return (
+            f"{responses} respuestas, {reserved} tokens reservados para {actual} gastados "
+            f"({over:+.0f}%), error medio {abs_error / responses:.0f} tokens por petición"
+        )
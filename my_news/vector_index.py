@@ -1,7 +1,12 @@
 import hashlib
+import logging
+import threading
+import time
 import uuid
 from typing import List, Optional
 
+from django.conf import settings
+
 try:
     from qdrant_client import QdrantClient
     from qdrant_client import models as qm
@@ -10,6 +15,13 @@ except Exception:  # pragma: no cover
     qm = None  # type: ignore
 
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRPC_PORT = 6334
+DEFAULT_UPSERT_BATCH = 64
+DEFAULT_UPSERT_MAX_AGE = 5
+
+
 class VectorIndexUnavailable(Exception):
     pass
 
@@ -17,66 +29,111 @@ class VectorIndexUnavailable(Exception):
 class VectorIndexService:
     """Wrapper mínimo para operar Qdrant sin silencios."""
 
-    def __init__(self, url: str, collection: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        url: str,
+        collection: str,
+        api_key: Optional[str] = None,
+        prefer_grpc: bool = False,
+        grpc_port: int = DEFAULT_GRPC_PORT,
+    ):
         if QdrantClient is None:
             raise VectorIndexUnavailable(
                 "qdrant-client no está instalado. Instálalo con 'pip install qdrant-client'."
             )
-        self.client = QdrantClient(url=url, api_key=api_key)
+        # gRPC (opcional) ahorra la serialización JSON de los vectores en
+        # lotes grandes; las operaciones que no lo soportan siguen por REST.
+        self.client = QdrantClient(
+            url=url, api_key=api_key, prefer_grpc=prefer_grpc, grpc_port=grpc_port
+        )
         self.collection = collection
+        # La existencia de la colección se comprueba una vez por proceso:
+        # antes era un get_collections por cada búsqueda y cada upsert.
+        self._collection_ready = False
+        self._lock = threading.Lock()
+
+    # Índices de payload usados en filtros: (campo, tipo de qm.PayloadSchemaType).
+    PAYLOAD_INDEXES = (
+        ("published_ts", "INTEGER"),
+        ("is_filtered", "BOOL"),
+        ("is_redundant", "BOOL"),
+        ("source_id", "INTEGER"),
+        ("guid_hash", "KEYWORD"),
+        ("news_id", "INTEGER"),
+        ("is_saved", "BOOL"),
+    )
 
     def ensure_collection(self, dim: int) -> None:
-        """Crea la colección si no existe (lanza excepción en error)."""
-        cols = self.client.get_collections().collections
-        if any(c.name == self.collection for c in cols):
+        """Crea la colección si no existe (lanza excepción en error).
+
+        En una colección que ya existía crea los índices de payload que le
+        falten: los añadidos después no llegaban a las colecciones de
+        producción, creadas con la lista de entonces.
+        """
+        if self._collection_ready:
             return
+        with self._lock:
+            if self._collection_ready:
+                return
+            if not self.client.collection_exists(self.collection):
+                self._create_collection(dim)
+            else:
+                self._ensure_payload_indexes()
+            self._collection_ready = True
+
+    def forget_collection(self) -> None:
+        """Vuelve a comprobar la colección en el próximo ``ensure_collection``."""
+        self._collection_ready = False
+
+    def _create_collection(self, dim: int) -> None:
         self.client.create_collection(
             collection_name=self.collection,
             vectors_config=qm.VectorParams(size=dim, distance=qm.Distance.COSINE),
         )
-        # Índices de payload usados en filtros
-        self.client.create_payload_index(
-            self.collection,
-            field_name="published_ts",
-            field_schema=qm.PayloadSchemaType.INTEGER,
-        )
-        self.client.create_payload_index(
-            self.collection,
-            field_name="is_filtered",
-            field_schema=qm.PayloadSchemaType.BOOL,
-        )
-        self.client.create_payload_index(
-            self.collection,
-            field_name="is_redundant",
-            field_schema=qm.PayloadSchemaType.BOOL,
-        )
-        self.client.create_payload_index(
-            self.collection,
-            field_name="source_id",
-            field_schema=qm.PayloadSchemaType.INTEGER,
-        )
-        self.client.create_payload_index(
-            self.collection,
-            field_name="guid_hash",
-            field_schema=qm.PayloadSchemaType.KEYWORD,
-        )
+        self._ensure_payload_indexes(existing=())
+
+    def _ensure_payload_indexes(self, existing=None) -> None:
+        if existing is None:
+            info = self.client.get_collection(self.collection)
+            existing = set((getattr(info, "payload_schema", None) or {}).keys())
+        for field_name, schema in self.PAYLOAD_INDEXES:
+            if field_name in existing:
+                continue
+            self.client.create_payload_index(
+                self.collection,
+                field_name=field_name,
+                field_schema=getattr(qm.PayloadSchemaType, schema),
+            )
 
     @staticmethod
     def guid_hash(guid: str) -> str:
         return hashlib.sha256(guid.encode("utf-8")).hexdigest()
 
-    def upsert(self, guid: str, vector: List[float], payload: dict) -> None:
-        point_id = str(uuid.uuid5(uuid.NAMESPACE_URL, guid))
-        point = qm.PointStruct(
-            id=point_id,
-            vector=vector,
+    def _point(self, guid: str, vector: List[float], payload: dict):
+        return qm.PointStruct(
+            id=str(uuid.uuid5(uuid.NAMESPACE_URL, guid)),
+            vector=list(vector),
             payload={
                 "guid": guid,
                 "guid_hash": self.guid_hash(guid),
                 **payload,
             },
         )
-        self.client.upsert(self.collection, points=[point])
+
+    def upsert(self, guid: str, vector: List[float], payload: dict) -> None:
+        self.upsert_many([(guid, vector, payload)])
+
+    def upsert_many(self, points, wait: bool = True) -> int:
+        """Inserta ``(guid, vector, payload)`` en una sola petición."""
+        structs = [self._point(guid, vector, payload) for guid, vector, payload in points]
+        if not structs:
+            return 0
+        try:
+            self.client.upsert(self.collection, points=structs, wait=wait)
+        except Exception:
+            self.forget_collection()
+            raise
+        return len(structs)
 
     def delete(self, guid: str) -> None:
         point_id = str(uuid.uuid5(uuid.NAMESPACE_URL, guid))
@@ -182,14 +239,75 @@ class VectorIndexService:
         )
         return len(cleaned_ids)
 
-    def search(
-        self,
-        vector: List[float],
-        top_k: int,
-        min_published_ts: Optional[int] = None,
-        exclude_guid: Optional[str] = None,
-        extra_must: Optional[list] = None,
-    ):
+    # --- Purga y conciliación por rangos de published_ts (índice de payload) ---
+
+    @staticmethod
+    def _published_between(min_ts=None, max_ts=None):
+        return qm.FieldCondition(
+            key="published_ts",
+            range=qm.Range(
+                gte=None if min_ts is None else int(min_ts),
+                lt=None if max_ts is None else int(max_ts),
+            ),
+        )
+
+    def count_points(self, min_ts=None, max_ts=None) -> int:
+        """Puntos con ``published_ts`` en ``[min_ts, max_ts)``, contados en el servidor."""
+        result = self.client.count(
+            self.collection,
+            count_filter=qm.Filter(must=[self._published_between(min_ts, max_ts)]),
+            exact=True,
+        )
+        return result.count
+
+    def purge_before(self, cutoff_ts: int) -> int:
+        """Borra con un filtro los puntos anteriores a ``cutoff_ts``.
+
+        Solo borra los marcados con ``is_saved`` a False: las guardadas se
+        conservan sin mandar su lista, que crecería con todo el historial. Los
+        puntos sin la marca (indexados antes de que existiera) no se tocan; si
+        su noticia ya no existe, la conciliación los borra como huérfanos.
+        Devuelve cuántos puntos cumplían el filtro justo antes de borrar.
+        """
+        selector = qm.Filter(must=[
+            self._published_between(max_ts=cutoff_ts),
+            qm.FieldCondition(key="is_saved", match=qm.MatchValue(value=False)),
+        ])
+        doomed = self.client.count(self.collection, count_filter=selector, exact=True).count
+        if doomed:
+            self.client.delete(self.collection, points_selector=qm.FilterSelector(filter=selector))
+        return doomed
+
+    def set_saved(self, guids, is_saved: bool) -> int:
+        """Marca (o desmarca) como guardadas las noticias de ``guids`` en su payload."""
+        point_ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, guid)) for guid in guids if guid]
+        if not point_ids:
+            return 0
+        self.client.set_payload(
+            self.collection, payload={"is_saved": bool(is_saved)}, points=point_ids
+        )
+        return len(point_ids)
+
+    def news_ids_between(self, min_ts=None, max_ts=None, limit: int = 256) -> dict:
+        """``{id de punto: news_id}`` del rango, sin vectores y solo con ``news_id``."""
+        found = {}
+        offset = None
+        scroll_filter = qm.Filter(must=[self._published_between(min_ts, max_ts)])
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=scroll_filter,
+                limit=limit,
+                offset=offset,
+                with_payload=["news_id"],
+                with_vectors=False,
+            )
+            for point in points:
+                found[str(point.id)] = (point.payload or {}).get("news_id")
+            if offset is None:
+                return found
+
+    def _filter(self, min_published_ts=None, exclude_guid=None, extra_must=None):
         must = [
             qm.FieldCondition(key="is_filtered", match=qm.MatchValue(value=False)),
             qm.FieldCondition(key="is_redundant", match=qm.MatchValue(value=False)),
@@ -210,11 +328,139 @@ class VectorIndexService:
                     key="guid_hash", match=qm.MatchValue(value=self.guid_hash(exclude_guid))
                 )
             )
-        qfilter = qm.Filter(must=must, must_not=must_not)
+        return qm.Filter(must=must, must_not=must_not)
 
-        return self.client.search(
-            collection_name=self.collection,
-            query_vector=vector,
-            query_filter=qfilter,
-            limit=top_k,
+    def search(
+        self,
+        vector: List[float],
+        top_k: int,
+        min_published_ts: Optional[int] = None,
+        exclude_guid: Optional[str] = None,
+        extra_must: Optional[list] = None,
+        with_payload=True,
+    ):
+        """``with_payload`` admite una lista de campos para no traer el resto."""
+        try:
+            return self.client.search(
+                collection_name=self.collection,
+                query_vector=vector,
+                query_filter=self._filter(min_published_ts, exclude_guid, extra_must),
+                limit=top_k,
+                with_payload=with_payload,
+            )
+        except Exception:
+            self.forget_collection()
+            raise
+
+    def search_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        min_published_ts: Optional[int] = None,
+        exclude_guids: Optional[List[Optional[str]]] = None,
+        extra_must: Optional[list] = None,
+        with_payload=True,
+    ):
+        """Varias búsquedas en una sola petición (``query_batch_points``).
+
+        Devuelve una lista de resultados por vector, en el mismo orden.
+        """
+        if not vectors:
+            return []
+        exclude_guids = exclude_guids or [None] * len(vectors)
+        requests = [
+            qm.QueryRequest(
+                query=list(vector),
+                filter=self._filter(min_published_ts, exclude_guid, extra_must),
+                limit=top_k,
+                with_payload=with_payload,
+            )
+            for vector, exclude_guid in zip(vectors, exclude_guids)
+        ]
+        try:
+            responses = self.client.query_batch_points(self.collection, requests=requests)
+        except Exception:
+            self.forget_collection()
+            raise
+        return [response.points for response in responses]
+
+
+class UpsertBuffer:
+    """Junta puntos y los manda con ``upsert_many`` en lotes.
+
+    Antes cada noticia era una petición HTTP. El lote se manda al llegar a
+    ``batch_size`` puntos, cuando el más antiguo lleva ``max_age`` segundos
+    esperando y al salir del ``with`` (o con ``flush``). Un lote fallido se
+    registra y se cuenta en ``stats['failed']``; ``on_written(guid)`` se
+    llama por cada punto que sí llegó. Sirve para cualquier índice con
+    ``ensure_collection`` y ``upsert_many`` (Qdrant o el local).
+    """
+
+    def __init__(self, index, batch_size=DEFAULT_UPSERT_BATCH, max_age=DEFAULT_UPSERT_MAX_AGE,
+                 wait=True):
+        self.index = index
+        self.batch_size = max(1, int(batch_size))
+        self.max_age = max_age
+        self.wait = wait
+        self._pending = []
+        self._oldest = None
+        self.stats = {'written': 0, 'failed': 0, 'requests': 0, 'seconds': 0.0}
+
+    @classmethod
+    def from_settings(cls, index, **kwargs):
+        kwargs.setdefault('batch_size', getattr(settings, 'NEWS_VECTOR_UPSERT_BATCH', DEFAULT_UPSERT_BATCH))
+        kwargs.setdefault('max_age', getattr(settings, 'NEWS_VECTOR_UPSERT_MAX_AGE', DEFAULT_UPSERT_MAX_AGE))
+        return cls(index, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, guid, vector, payload, on_written=None):
+        self._pending.append((guid, vector, payload, on_written))
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if len(self._pending) >= self.batch_size or (
+            self.max_age is not None and time.monotonic() - self._oldest >= self.max_age
+        ):
+            self.flush()
+
+    def flush(self):
+        """Manda lo pendiente; devuelve cuántos puntos se escribieron."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, []
+        self._oldest = None
+        started = time.monotonic()
+        try:
+            self.index.ensure_collection(len(batch[0][1]))
+            self.index.upsert_many(
+                [(guid, vector, payload) for guid, vector, payload, _ in batch], wait=self.wait
+            )
+        except Exception:
+            # No se silencia: lo no indexado no participa en la detección de
+            # duplicados de las siguientes.
+            self.stats['failed'] += len(batch)
+            logger.exception("Error indexando un lote de %s vectores", len(batch))
+            return 0
+        finally:
+            self.stats['requests'] += 1
+            self.stats['seconds'] += time.monotonic() - started
+
+        self.stats['written'] += len(batch)
+        for guid, _, _, on_written in batch:
+            if on_written is not None:
+                on_written(guid)
+        return len(batch)
+
+    def summary(self):
+        return (
+            f"{self.stats['written']} vectores en {self.stats['requests']} peticiones "
+            f"({self.stats['seconds']:.2f}s), {self.stats['failed']} fallidos"
         )
@@ -20,6 +20,7 @@ from Bookshelf.html_sanitizer import sanitize_html
 import pytz
 from django.db.models import Q, Count, Max
 from .tasks import purge_old_news, retry_summarize_pending
+from .vector_index import UpsertBuffer
 import subprocess
 import platform
 import hashlib
@@ -677,6 +678,14 @@ def toggle_save_news(request, pk):
         news.is_saved = not news.is_saved
         news.save(update_fields=['is_saved'])
         _bump_cache_version()
+        # La purga de vectores conserva los marcados como guardados. Si esto
+        # falla, purge_old_news vuelve a marcarla antes de que caduque.
+        try:
+            vector_index = FeedService.initialize_vector_index()
+            if vector_index is not None:
+                vector_index.set_saved([news.guid], news.is_saved)
+        except Exception:
+            logger.exception("Error marcando en el índice vectorial la noticia guardada %s", news.id)
 
         total_news, total_pages = _get_total_news_and_pages(saved_only=saved_only)
         return JsonResponse({
@@ -884,30 +893,33 @@ def generate_embeddings(request):
         if vector_index is None:
             return JsonResponse({'status': 'error', 'message': 'Qdrant no disponible'})
 
-        news_to_index = News.visible.order_by('-published_date')[:50]
-
-        processed_count = 0
-        for news in news_to_index:
-            content = f"{news.title} {news.description}"
-            embedding = EmbeddingService.generate_embedding(content, gemini_client)
-            if not embedding:
-                continue
-
-            vector_index.ensure_collection(len(embedding))
-            payload = {
-                'news_id': news.id,
-                'source_id': news.source_id,
-                'published_ts': int(news.published_date.timestamp()) if news.published_date else int(time.time()),
-                'is_filtered': False,
-                'is_redundant': False,
-                'model_version': getattr(settings, 'GEMINI_EMBEDDING_MODEL', 'gemini-embedding-001'),
-            }
-            vector_index.upsert(news.guid, embedding, payload)
-            processed_count += 1
-        
+        news_to_index = list(News.visible.order_by('-published_date')[:50])
+        embeddings = EmbeddingService.generate_embeddings_batch(
+            [f"{news.title} {news.description}" for news in news_to_index],
+            gemini_client,
+        )
+
+        indexed_guids = []
+        with UpsertBuffer.from_settings(vector_index) as upserts:
+            for news, embedding in zip(news_to_index, embeddings):
+                if not embedding:
+                    continue
+
+                payload = {
+                    'news_id': news.id,
+                    'source_id': news.source_id,
+                    'published_ts': int(news.published_date.timestamp()) if news.published_date else int(time.time()),
+                    'is_filtered': False,
+                    'is_redundant': False,
+                    'is_saved': bool(news.is_saved),
+                    'model_version': getattr(settings, 'GEMINI_EMBEDDING_MODEL', 'gemini-embedding-001'),
+                }
+                upserts.add(news.guid, embedding, payload, on_written=indexed_guids.append)
+        FeedService.mark_indexed(indexed_guids)
+
         return JsonResponse({
             'status': 'success',
-            'processed_count': processed_count,
+            'processed_count': upserts.stats['written'],
             'remaining': None
         })
     except Exception as e:
@@ -921,7 +933,15 @@ def check_all_redundancy(request):
         gemini_client = FeedService.initialize_gemini()
         vector_index = FeedService.initialize_vector_index()
 
-        news_to_check = News.visible.select_related('source').order_by('-published_date')[:100]
+        news_to_check = list(News.visible.select_related('source').order_by('-published_date')[:100])
+        # Vectorizar las 100 de una vez en lugar de una petición por noticia.
+        embeddings = EmbeddingService.generate_embeddings_batch(
+            [f"{news.title} {news.description}" for news in news_to_check],
+            gemini_client,
+        )
+        for news, embedding in zip(news_to_check, embeddings):
+            news._embedding_vector = embedding
+            news._embedding_attempted = True
         
         redundant_count = 0
         for news in news_to_check:
@@ -0,0 +1,186 @@
+"""Escritura por lotes de las noticias que produce la ingesta.
+
+Cada resultado de la ingesta (título largo, palabra filtro, redundante,
+filtrada por IA o normal) se guardaba con su propio ``create``: en SQLite cada
+uno era una transacción implícita con su fsync. El buffer junta las filas y
+las guarda con ``bulk_create`` en una sola transacción por lote.
+
+Lo que necesita la clave primaria sigue funcionando:
+
+* ``bulk_create`` devuelve los ids (``RETURNING`` en PostgreSQL y en SQLite
+  3.35+); si la BD no los devuelve, se leen por guid.
+* Una fila cuyo ``similar_to`` apunta a otra que sigue en el buffer fuerza
+  antes la escritura de esa otra, así la referencia se guarda con su id.
+* Lo que va después de guardar (indexar en Qdrant con ``news_id``) se pasa
+  como ``on_saved`` y se ejecuta tras el lote, ya con el id asignado.
+
+Si un lote falla (p. ej. un guid repetido) se deshace entero y se guarda fila
+a fila, cada una en su transacción: solo se pierde la que falla.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import News
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_AGE_SECONDS = 10
+
+
+@dataclass
+class _Pending:
+    news: News
+    label: str
+    on_saved: Optional[Callable[[News], None]]
+
+
+class NewsWriteBuffer:
+    """Acumula noticias nuevas y las inserta en lotes transaccionales.
+
+    Se usa desde un solo hilo (el que consume el pipeline de ingesta). Como
+    gestor de contexto escribe lo pendiente al salir, haya error o no.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.batch_size = max(1, int(batch_size))
+        # Una pasada con resúmenes lentos tardaría minutos en llenar un lote:
+        # pasado este tiempo se escribe lo que haya para no perderlo si el
+        # proceso muere.
+        self.max_age = max_age
+        self._pending = []
+        self._pending_ids = set()
+        self._oldest = None
+        self.stats = {'saved': 0, 'failed': 0, 'batches': 0, 'seconds': 0.0}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            batch_size=getattr(settings, 'NEWS_WRITE_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+            max_age=getattr(settings, 'NEWS_WRITE_MAX_AGE', DEFAULT_MAX_AGE_SECONDS),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def is_pending(self, news):
+        """True si la noticia está en el buffer esperando a guardarse."""
+        return id(news) in self._pending_ids
+
+    def add(self, news, label='noticia', on_saved=None):
+        """Encola ``news``; ``on_saved(news)`` se llama cuando ya tiene id."""
+        if any(self.is_pending(related) for related in self._cached_relations(news)):
+            self.flush()
+
+        self._pending.append(_Pending(news, label, on_saved))
+        self._pending_ids.add(id(news))
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+        if len(self._pending) >= self.batch_size or (
+            self.max_age is not None and time.monotonic() - self._oldest >= self.max_age
+        ):
+            self.flush()
+
+    def flush(self):
+        """Guarda lo pendiente; devuelve cuántas filas se guardaron."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, []
+        self._pending_ids = set()
+        self._oldest = None
+
+        started = time.monotonic()
+        for pending in batch:
+            self._drop_unsaved_relations(pending.news)
+        saved = self._insert_batch(batch)
+        self.stats['batches'] += 1
+        self.stats['seconds'] += time.monotonic() - started
+        self.stats['saved'] += len(saved)
+        self.stats['failed'] += len(batch) - len(saved)
+
+        for pending in saved:
+            if pending.on_saved is not None:
+                pending.on_saved(pending.news)
+        return len(saved)
+
+    def summary(self):
+        return (
+            f"{self.stats['saved']} filas en {self.stats['batches']} lotes "
+            f"({self.stats['seconds']:.2f}s), {self.stats['failed']} fallidas"
+        )
+
+    def _insert_batch(self, batch):
+        objs = [pending.news for pending in batch]
+        try:
+            with transaction.atomic():
+                News.objects.bulk_create(objs)
+                self._fill_missing_ids(objs)
+            return batch
+        except Exception as error:
+            logger.warning(
+                "Lote de %s noticias rechazado (%s); se guardan una a una.", len(batch), error
+            )
+
+        saved = []
+        for pending in batch:
+            news = pending.news
+            news.pk = None
+            news._state.adding = True
+            try:
+                with transaction.atomic():
+                    news.save(force_insert=True)
+            except Exception:
+                logger.exception(
+                    "Error al guardar %s. GUID=%s título=%s",
+                    pending.label,
+                    (news.guid or '')[:100],
+                    (news.title or '')[:100],
+                )
+                news.pk = None
+                continue
+            saved.append(pending)
+        return saved
+
+    @staticmethod
+    def _fill_missing_ids(objs):
+        # Backends sin RETURNING en inserciones masivas: recuperar los ids por guid.
+        missing = [news for news in objs if news.pk is None]
+        if not missing:
+            return
+        ids = dict(
+            News.objects.filter(guid__in=[news.guid for news in missing]).values_list('guid', 'id')
+        )
+        for news in missing:
+            news.pk = ids.get(news.guid)
+
+    @staticmethod
+    def _cached_relations(news):
+        for field in news._meta.concrete_fields:
+            if field.is_relation and field.is_cached(news):
+                related = field.get_cached_value(news)
+                if related is not None:
+                    yield related
+
+    @staticmethod
+    def _drop_unsaved_relations(news):
+        # Una referencia opcional a una fila que no llegó a guardarse se
+        # descarta, como hacía la ingesta antes con ``similar_to``.
+        for field in news._meta.concrete_fields:
+            if field.is_relation and field.null and field.is_cached(news):
+                related = field.get_cached_value(news)
+                if related is not None and related.pk is None:
+                    setattr(news, field.name, None)